@@ -0,0 +1,258 @@
+"""
+Parametric scalability benchmark of the consent contracts.
+
+Runs the consent lifecycle against a local dev chain for every combination of
+the swept sizes (consents x processors per consent x purposes per processor):
+  - create the CollectionConsent, DS grant, DC grant;
+  - newPurpose for every processor and purpose (the first one of a processor
+    also deploys its ProcessingConsent), processor grant of every purpose;
+  - verify() of the consent and of a processing purpose (eth_call);
+  - revokeConsentPurpose, revokeConsentProcessor and DS revoke.
+Every transaction records its gas and its latency (send to receipt); calls
+record their latency and estimated gas. Results are summarized per operation
+(mean, p50, p95, p99) and written as JSON (summaries) and CSV (raw samples),
+the input of generate_scalability_graph.py.
+
+The chain is either a local node (Ganache on 127.0.0.1:8545) or an in-process
+py-evm chain (--eth-tester, needs `pip install "eth-tester[py-evm]"`).
+Contracts come from the Truffle artifacts (run `truffle compile` first).
+
+Usage:
+    python benchmark_scalability.py [--eth-tester | --url http://127.0.0.1:8545]
+        [--consents 1,10,20] [--processors 1,5] [--purposes 1,5]
+        [--out benchmark_results/scalability]
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ui'))
+from contract_artifacts import load_artifact  # noqa: E402
+
+
+DEFAULT_OUT = os.path.join('benchmark_results', 'scalability')
+PERCENTILES = (50, 95, 99)
+
+CONSENT_DATA = 0xffff
+DURATION = 86400            # 1 day
+DEFAULT_PURPOSES = [0]      # purpose 0 does not need the DS's explicit grant
+
+# Reporting order
+OPERATIONS = (
+    'create', 'grant DS', 'grant DC',
+    'newPurpose (new processor)', 'newPurpose', 'processing grant',
+    'verify', 'processing verify',
+    'revokeConsentPurpose', 'revokeConsentProcessor', 'revoke DS',
+)
+
+
+def percentile(values, q):
+    """q-th percentile of `values`, linear interpolation between closest ranks (as numpy's default)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values):
+    if not values:
+        return {'count': 0}
+    summary = {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'min': min(values),
+        'max': max(values),
+    }
+    for q in PERCENTILES:
+        summary[f'p{q}'] = percentile(values, q)
+    return summary
+
+
+def summarize_samples(samples):
+    """Per-operation gas and latency summaries of a list of samples."""
+    operations = {}
+    for name in OPERATIONS:
+        selected = [s for s in samples if s['operation'] == name]
+        if selected:
+            operations[name] = {
+                'gas': summarize([s['gas'] for s in selected]),
+                'latency_ms': summarize([s['latency_ms'] for s in selected]),
+            }
+    return operations
+
+
+class Lifecycle:
+    """Sends the lifecycle transactions of one configuration and records their samples."""
+
+    def __init__(self, w3, consents, processors, purposes):
+        self.w3 = w3
+        self.collection = load_artifact('CollectionConsent')
+        self.processing_abi = load_artifact('ProcessingConsent')['abi']
+        self.config = {'consents': consents, 'processors': processors, 'purposes': purposes}
+        self.samples = []
+
+        accounts = w3.eth.accounts
+        if len(accounts) < 2 + processors:
+            raise SystemExit(f"{processors} processors need {2 + processors} unlocked accounts, the node has {len(accounts)}")
+        self.data_subject, self.controller = accounts[0], accounts[1]
+        self.processors = accounts[2:2 + processors]
+
+    def _record(self, operation, gas, latency_ms):
+        self.samples.append(dict(self.config, operation=operation, gas=gas, latency_ms=latency_ms))
+
+    def _transact(self, operation, call, sender):
+        start = time.perf_counter()
+        tx_hash = call.transact({'from': sender})
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        latency_ms = (time.perf_counter() - start) * 1000
+        if receipt['status'] != 1:
+            raise RuntimeError(f"{operation} reverted ({tx_hash.hex()})")
+        self._record(operation, receipt['gasUsed'], latency_ms)
+        return receipt
+
+    def _call(self, operation, call):
+        start = time.perf_counter()
+        value = call.call()
+        latency_ms = (time.perf_counter() - start) * 1000
+        self._record(operation, call.estimate_gas(), latency_ms)
+        return value
+
+    def run_consent(self):
+        factory = self.w3.eth.contract(abi=self.collection['abi'], bytecode=self.collection['bytecode'])
+        receipt = self._transact(
+            'create', factory.constructor(self.controller, self.processors, CONSENT_DATA, DURATION, DEFAULT_PURPOSES),
+            self.data_subject,
+        )
+        consent = self.w3.eth.contract(address=receipt['contractAddress'], abi=self.collection['abi'])
+        self._transact('grant DS', consent.functions.grantConsent(), self.data_subject)
+        self._transact('grant DC', consent.functions.grantConsent(), self.controller)
+
+        children = []
+        for processor in self.processors:
+            for purpose in range(self.config['purposes']):
+                operation = 'newPurpose (new processor)' if purpose == 0 else 'newPurpose'
+                self._transact(operation, consent.functions.newPurpose(processor, purpose, CONSENT_DATA, DURATION), self.controller)
+            address = consent.functions.getProcessingConsentSC(processor).call()
+            child = self.w3.eth.contract(address=address, abi=self.processing_abi)
+            for purpose in range(self.config['purposes']):
+                self._transact('processing grant', child.functions.grantConsent(purpose), processor)
+            children.append(child)
+
+        assert self._call('verify', consent.functions.verify())
+        if children:
+            assert self._call('processing verify', children[0].functions.verify(0))
+            self._transact('revokeConsentPurpose', consent.functions.revokeConsentPurpose(0), self.data_subject)
+            self._transact('revokeConsentProcessor', consent.functions.revokeConsentProcessor(self.processors[-1]), self.data_subject)
+        self._transact('revoke DS', consent.functions.revokeConsent(), self.data_subject)
+
+    def run(self):
+        start = time.perf_counter()
+        for _ in range(self.config['consents']):
+            self.run_consent()
+        total_ms = (time.perf_counter() - start) * 1000
+        # Same measure as Test 2.9.1: creating and granting the consents
+        lifecycle_ms = sum(s['latency_ms'] for s in self.samples if s['operation'] in ('create', 'grant DS', 'grant DC'))
+        return dict(
+            self.config,
+            total_ms=total_ms,
+            lifecycle_ms=lifecycle_ms,
+            per_consent_ms=lifecycle_ms / self.config['consents'],
+            operations=summarize_samples(self.samples),
+        )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def connect(args):
+    if args.eth_tester:
+        try:
+            provider = Web3.EthereumTesterProvider()
+        except Exception as e:
+            sys.exit(f"eth-tester is not available ({e}): pip install \"eth-tester[py-evm]\"")
+        return Web3(provider), 'eth-tester'
+    w3 = Web3(Web3.HTTPProvider(args.url))
+    if not w3.is_connected():
+        sys.exit(f"Cannot connect to {args.url}: start Ganache first (ganache --port 8545) or use --eth-tester")
+    return w3, args.url
+
+
+def sizes(text):
+    return [int(n) for n in text.split(',') if n.strip()]
+
+
+def write_results(out, results, samples):
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(f'{out}.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    with open(f'{out}.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['consents', 'processors', 'purposes', 'operation', 'gas', 'latency_ms'])
+        writer.writeheader()
+        writer.writerows(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8545')
+    parser.add_argument('--eth-tester', action='store_true', help='in-process py-evm chain instead of --url')
+    parser.add_argument('--consents', type=sizes, default=[1, 10, 20])
+    parser.add_argument('--processors', type=sizes, default=[1, 5], help='processors per consent')
+    parser.add_argument('--purposes', type=sizes, default=[1, 5], help='purposes per processor')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='output path without extension (.json and .csv are written)')
+    args = parser.parse_args()
+
+    w3, chain = connect(args)
+    runs, samples = [], []
+    grid = list(itertools.product(args.consents, args.processors, args.purposes))
+    print(f"Benchmarking {len(grid)} configurations on {chain}")
+    print("=" * 70)
+    for consents, processors, purposes in grid:
+        lifecycle = Lifecycle(w3, consents, processors, purposes)
+        run = lifecycle.run()
+        runs.append(run)
+        samples.extend(lifecycle.samples)
+        print(f"{consents:>5} consents x {processors:>3} processors x {purposes:>3} purposes: "
+              f"{run['total_ms'] / 1000:8.2f} s total, {run['per_consent_ms']:8.1f} ms per consent (create + grants)")
+
+    results = {
+        'meta': {
+            'chain': chain,
+            'chain_id': w3.eth.chain_id,
+            'client': w3.client_version,
+            'commit': git_commit(),
+            'timestamp': int(time.time()),
+            'sweep': {'consents': args.consents, 'processors': args.processors, 'purposes': args.purposes},
+        },
+        'runs': runs,
+        'operations': summarize_samples(samples),
+    }
+    write_results(args.out, results, samples)
+
+    print("\nOperation                      gas p50      gas p95   latency p50   latency p95   latency p99")
+    for name, stats in results['operations'].items():
+        gas, latency = stats['gas'], stats['latency_ms']
+        print(f"{name:<28} {gas['p50']:>10,.0f} {gas['p95']:>12,.0f} {latency['p50']:>10.1f} ms "
+              f"{latency['p95']:>10.1f} ms {latency['p99']:>10.1f} ms")
+    print(f"\nResults written to {args.out}.json and {args.out}.csv")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""
+Consent-check sidecar for resource servers.
+
+A resource server runs this service next to it and asks it before serving
+personal data, instead of calling verify() on the chain for every request
+or trusting a token issued once (the MockResourceServer of test suite 2.8):
+
+    GET /allowed?subject=0x..&processor=0x..&purpose=1&data=5
+    -> {"allowed": true, "consent": "0x..", "block": 1234}
+
+    POST /allowed
+    [{"subject": "0x..", "processor": "0x..", "purpose": 1, "data": 5}, ...]
+    -> [{"allowed": ..., "consent": ..., "block": ...}, ...]
+
+    GET /revoked?consent=0x..&processor=0x..&purpose=1
+    -> {"revoked": false, "block": 1234}
+
+    GET /stats
+
+A check is allowed when one of the subject's CollectionConsents and the
+processor's ProcessingConsent for the purpose are both valid (same rules as
+their verify()) and the `data` bits are within the data of both. Answers
+come from an AuthorizationIndex over a ConsentIndexer fed by the consent
+contracts' events (synced every `--sync-interval` seconds), not from RPC
+calls, and each carries the block the index was synced to.
+
+Identical checks are coalesced: while the index does not change, every
+check of the same (subject, processor, purpose, data) shares the answer of
+the first one, and the checks arriving in the same event-loop iteration are
+answered together by one AuthorizationIndex call.
+
+/revoked answers whether a consent (or a processor's processing of it, or
+of one purpose) was revoked or erased, for servers that hold an earlier
+decision: a counting Bloom filter of the revocations (RevocationFilter,
+kept in the `--revocation-filter` file) answers most of them without the
+index lookup.
+
+HTTP/1.1 with keep-alive and pipelining, on the standard library only
+(no gRPC endpoint: grpcio is not a dependency of this project).
+See load_test_consent_sidecar.py for the throughput.
+
+Usage:
+    python consent_sidecar.py [--port 8600] [--db :memory:] [--consent ADDRESS ...] [--url http://127.0.0.1:8545]
+        [--revocation-filter revocations.bloom]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from eth_utils import is_hex_address
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ui'))
+from authorization_index import AuthorizationIndex  # noqa: E402
+from consent_indexer import ConsentIndexer  # noqa: E402
+from consent_clone_factory import ConsentCloneFactoryClient  # noqa: E402
+from contract_artifacts import load_artifact, deployed_address  # noqa: E402
+from revocation_filter import RevocationFilter  # noqa: E402
+
+DEFAULT_PORT = 8600
+DEFAULT_SYNC_INTERVAL = 1.0     # seconds between index syncs (and how long an answer is reused)
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def _integer(value):
+    """Integer of a JSON number or of a decimal / 0x-prefixed query string."""
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+class ConsentSidecar:
+    """Answers consent checks from the AuthorizationIndex of a ConsentIndexer, coalescing identical ones."""
+
+    def __init__(self, indexer, sync_interval=DEFAULT_SYNC_INTERVAL, revocation_filter_path=None):
+        self.indexer = indexer
+        self.authorizations = AuthorizationIndex(indexer)
+        self.revocations = RevocationFilter(indexer, revocation_filter_path)
+        self.sync_interval = sync_interval
+        self.block_number = indexer.last_block
+        self.checks = 0
+        self.lookups = 0
+        self.syncs = 0
+        self.last_error = None
+        self._answers = {}      # check -> future of its answer, for the current state of the index
+        self._queued = []       # (check, future) not looked up yet
+
+    def check(self, subject, processor, purpose, data_bits=0):
+        """Future of the answer ({'allowed', 'consent', 'block'}) to a check; raises ValueError on bad input."""
+        if not is_hex_address(subject) or not is_hex_address(processor):
+            raise ValueError("subject and processor must be addresses")
+        check = (subject.lower(), processor.lower(), _integer(purpose), _integer(data_bits))
+        if check[2] < 0 or check[3] < 0:
+            raise ValueError("purpose and data must be non-negative")
+        self.checks += 1
+        answer = self._answers.get(check)
+        if answer is None:
+            loop = asyncio.get_running_loop()
+            answer = self._answers[check] = loop.create_future()
+            if not self._queued:
+                loop.call_soon(self._lookup)
+            self._queued.append((check, answer))
+        return answer
+
+    async def is_allowed(self, subject, processor, purpose, data_bits=0):
+        return await self.check(subject, processor, purpose, data_bits)
+
+    def revoked(self, consent, processor=None, purpose=None):
+        """Answer ({'revoked', 'block'}) to a revocation check; raises ValueError on bad input."""
+        if not is_hex_address(consent) or (processor is not None and not is_hex_address(processor)):
+            raise ValueError("consent and processor must be addresses")
+        if purpose is not None:
+            if processor is None:
+                raise ValueError("a purpose needs a processor")
+            purpose = _integer(purpose)
+            if purpose < 0:
+                raise ValueError("purpose must be non-negative")
+        return {'revoked': self.revocations.is_revoked(consent, processor, purpose), 'block': self.block_number}
+
+    def _lookup(self):
+        """Answers the queued checks with one AuthorizationIndex call."""
+        queued, self._queued = self._queued, []
+        self.lookups += len(queued)
+        try:
+            block, authorizations = self.authorizations.check_many([check for check, _ in queued])
+        except Exception as e:
+            for check, answer in queued:
+                self._answers.pop(check, None)
+                answer.set_exception(e)
+            return
+        for (_, answer), authorization in zip(queued, authorizations):
+            consent = authorization.consent if authorization is not None else None
+            answer.set_result({'allowed': consent is not None, 'consent': consent, 'block': block})
+
+    def stats(self):
+        return {
+            'block_number': self.block_number,
+            'checks': self.checks,
+            'lookups': self.lookups,
+            'coalesced': self.checks - self.lookups,
+            'cached_answers': len(self._answers),
+            'authorizations': len(self.authorizations),
+            'revocation_filter': self.revocations.stats(),
+            'syncs': self.syncs,
+            'last_error': self.last_error,
+        }
+
+    async def run_sync(self):
+        """Syncs the index every `sync_interval` seconds; the answers given so far are dropped after each sync."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.indexer.sync)
+                self.syncs += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+            # Validity also depends on the time: answers are only reused until the next sync
+            self.block_number = self.authorizations.block_number
+            self._answers = {}
+            await asyncio.sleep(self.sync_interval)
+
+    # HTTP
+
+    def handle(self, method, target, body):
+        """Routes a request: returns (status, list of futures or a payload, whether the payload is a list)."""
+        url = urlsplit(target)
+        if url.path == '/allowed':
+            if method == 'GET':
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                return 200, [self._check_from(query)], False
+            if method == 'POST':
+                checks = json.loads(body)
+                if not isinstance(checks, list):
+                    raise ValueError("POST /allowed expects a JSON list of checks")
+                return 200, [self._check_from(check) for check in checks], True
+            return 405, {'error': f'{method} not allowed'}, None
+        if url.path == '/revoked' and method == 'GET':
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if 'consent' not in query:
+                raise ValueError("missing 'consent'")
+            return 200, self.revoked(query['consent'], query.get('processor'), query.get('purpose')), None
+        if url.path == '/stats' and method == 'GET':
+            return 200, self.stats(), None
+        return 404, {'error': f'{url.path} not found'}, None
+
+    def _check_from(self, fields):
+        try:
+            return self.check(fields['subject'], fields['processor'], fields['purpose'], fields.get('data', 0))
+        except KeyError as e:
+            raise ValueError(f"missing {e.args[0]!r}") from None
+        except (TypeError, AttributeError):
+            raise ValueError("a check is an object with subject, processor, purpose and data") from None
+
+
+class SidecarProtocol(asyncio.Protocol):
+    """HTTP/1.1 connection: requests are parsed as they arrive, responses are written in request order."""
+
+    def __init__(self, sidecar):
+        self.sidecar = sidecar
+        self.transport = None
+        self.buffer = b''
+        self.pending = deque()      # (status, futures or payload, is_list, close) in request order
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        while True:
+            end = self.buffer.find(b'\r\n\r\n')
+            if end < 0:
+                if len(self.buffer) > MAX_HEADER_SIZE:
+                    self.transport.close()
+                break
+            lines = self.buffer[:end].decode('latin-1').split('\r\n')
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                method, target, _ = lines[0].split(' ', 2)
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                self.transport.close()
+                return
+            if length > MAX_BODY_SIZE:
+                self.transport.close()
+                return
+            if len(self.buffer) < end + 4 + length:
+                break
+            body = self.buffer[end + 4:end + 4 + length]
+            self.buffer = self.buffer[end + 4 + length:]
+            close = headers.get('connection', '').lower() == 'close'
+            try:
+                status, result, is_list = self.sidecar.handle(method, target, body)
+            except ValueError as e:
+                status, result, is_list = 400, {'error': str(e)}, None
+            self.pending.append((status, result, is_list, close))
+            if is_list is not None:
+                for answer in result:
+                    if not answer.done():
+                        answer.add_done_callback(self._write_ready)
+        self._write_ready()
+
+    def _write_ready(self, _=None):
+        while self.pending and not self.transport.is_closing():
+            status, result, is_list, close = self.pending[0]
+            if is_list is not None:
+                if not all(answer.done() for answer in result):
+                    return
+                try:
+                    answers = [answer.result() for answer in result]
+                    result = answers if is_list else answers[0]
+                except Exception as e:
+                    status, result = 500, {'error': f'{type(e).__name__}: {e}'}
+            self.pending.popleft()
+            data = json.dumps(result).encode()
+            self.transport.write(
+                f'HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(data)}\r\n\r\n'.encode() + data
+            )
+            if close:
+                self.transport.close()
+
+
+async def serve(sidecar, host='127.0.0.1', port=DEFAULT_PORT):
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: SidecarProtocol(sidecar), host, port)
+    sync = asyncio.ensure_future(sidecar.run_sync())
+    print(f"Consent sidecar on http://{host}:{port} (index at block {sidecar.block_number})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sync.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8545')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--db', default=':memory:', help='ConsentIndexer database (default: in memory)')
+    parser.add_argument('--consent', action='append', default=[], metavar='ADDRESS',
+                        help='CollectionConsent to follow (besides the deployed clone factory and consent)')
+    parser.add_argument('--sync-interval', type=float, default=DEFAULT_SYNC_INTERVAL)
+    parser.add_argument('--revocation-filter', metavar='PATH',
+                        help='file of the revocation filter, reused across restarts (default: in memory)')
+    args = parser.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(args.url))
+    indexer = ConsentIndexer(w3, args.db)
+    clone_factory = ConsentCloneFactoryClient.from_artifact(w3)
+    if clone_factory is not None:
+        indexer.track_factory(clone_factory.address)
+    for address in args.consent + [deployed_address(load_artifact('CollectionConsent'), w3.net.version)]:
+        if address:
+            indexer.track_consent(address)
+    indexer.sync()
+
+    sidecar = ConsentSidecar(indexer, args.sync_interval, args.revocation_filter)
+    try:
+        asyncio.run(serve(sidecar, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sidecar.revocations.close()
+
+
+if __name__ == '__main__':
+    main()
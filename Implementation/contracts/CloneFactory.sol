@@ -0,0 +1,27 @@
+pragma solidity >=0.4.22 <0.7.0;
+
+/**
+ * @title CloneFactory
+ * @dev Deploys EIP-1167 minimal proxies: 55 bytes of runtime code that delegatecall
+ *      every call to a shared implementation contract.
+ *      Clones have no constructor, so the implementation must expose an initializer.
+ */
+contract CloneFactory {
+
+    /**
+     * @dev Deploys a new minimal proxy pointing to target and returns its address.
+     * @param target implementation contract address
+     */
+    function createClone( address target ) internal returns( address result ) {
+        bytes20 targetBytes = bytes20( target );
+        assembly {
+            let clone := mload( 0x40 )
+            mstore( clone, 0x3d602d80600a3d3981f3363d3d373d3d3d363d73000000000000000000000000 )
+            mstore( add( clone, 0x14 ), targetBytes )
+            mstore( add( clone, 0x28 ), 0x5af43d82803e903d91602b57fd5bf30000000000000000000000000000000000 )
+            result := create( 0, clone, 0x37 )
+        }
+        require( result != address(0), "Clone deployment failed." );
+    }
+
+}
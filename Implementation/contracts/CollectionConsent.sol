@@ -1,6 +1,7 @@
 pragma solidity >=0.4.22 <0.7.0;
 
 import "./ProcessingConsent.sol";
+import "./CloneFactory.sol";
 
 /** 
  * @title CollectionConsent
@@ -9,7 +10,7 @@ import "./ProcessingConsent.sol";
  * ISSUE: transaction function can't return a value even if declared in the definition
  * https://ethereum.stackexchange.com/questions/40730/why-is-web3j-java-not-generating-correct-return-types-for-my-contract
  */
-contract CollectionConsent {
+contract CollectionConsent is CloneFactory {
    
     //Identities of the actors
     address private dataSubject;
@@ -18,12 +19,14 @@ contract CollectionConsent {
 
     uint256 data;
 
+    //Hot state, packed in a single slot: verify() and contractValidity only touch this one slot.
     //Consent lifetime
-    uint256 beginningDate;
-    uint256 expirationDate;
+    uint64 beginningDate;
+    uint64 expirationDate;
 
-    //Valid flag
-    uint8[2] private valid;
+    //Valid flags (DS - DC)
+    uint8 private dsValid;
+    uint8 private dcValid;
 
     //Erasure flag
     bool private erasure;
@@ -42,6 +45,23 @@ contract CollectionConsent {
 
     //processors that has requested to proces DS's personal data for any reason
     address[] private processors;
+
+    //Purpose revocation epochs: revokeConsentPurpose increments the purpose's counter and every
+    //ProcessingConsent SC checks it lazily on verify, instead of being revoked one by one.
+    mapping( uint => uint256 ) private purposeEpochs;
+
+    //ProcessingConsent implementation cloned by newPurpose (EIP-1167). Zero: deploy full contracts.
+    address private processingConsentImplementation;
+
+    //Events let off-chain indexers (ui/consent_indexer.py) follow the state without polling getters.
+    event ConsentCreated( address indexed dataSubject, address indexed controller, address[] recipients, uint256 data, uint256 beginningDate, uint256 expirationDate, uint[] defaultPurposes );
+    event ConsentGranted( address indexed actor );
+    event ConsentRevoked( address indexed actor );
+    event ProcessingConsentCreated( address indexed processor, address processingConsent );
+    event DataModified( uint256 data );
+    event DataErased( address indexed dataSubject );
+    event ConsentPurposeRevoked( uint indexed purpose );
+    event ConsentProcessorRevoked( address indexed processor );
     
 
     /** 
@@ -52,19 +72,47 @@ contract CollectionConsent {
      * @param _defaultPurposes for which DS must do not give his explicit consent to process his PD
      */
     constructor( address _dataController, address[] memory _recipients, uint _data, uint duration, uint[] memory _defaultPurposes ) public {
-        dataSubject = msg.sender;
+        initialize( msg.sender, _dataController, _recipients, _data, duration, _defaultPurposes, address(0) );
+    }
+
+
+    /** 
+     * @dev Initializer used instead of the constructor when this contract runs behind a minimal proxy (clone).
+     *      Can only be called once: the constructor already initializes the implementation contract.
+     * @param _dataSubject data subject address
+     * @param _dataController data controller address
+     * @param _recipients list of the recipients that will hold the personal data of the Subject
+     * @param duration validity expiration time of the contract (in seconds)
+     * @param _defaultPurposes for which DS must do not give his explicit consent to process his PD
+     * @param _processingConsentImplementation ProcessingConsent implementation to clone on newPurpose, or zero
+     */
+    function initialize( address _dataSubject, address _dataController, address[] memory _recipients, uint _data, uint duration, uint[] memory _defaultPurposes, address _processingConsentImplementation ) public {
+        require( dataSubject == address(0), "Consent contract already initialized." );
+        //The dates are stored as uint64: the expiration must not wrap around
+        require( duration <= uint64(-1) - block.timestamp, "Duration out of range." );
+        dataSubject = _dataSubject;
         controller = _dataController;
         recipients = _recipients;
         data = _data;
-        beginningDate = block.timestamp;
-        expirationDate = beginningDate + duration;
+        beginningDate = uint64( block.timestamp );
+        expirationDate = uint64( block.timestamp + duration );
         //expirationDate = beginningDate + (duration * 1 days); //Same in days
 
         for( uint i=0; i < _defaultPurposes.length; i++ ){
             defaultPurposes[ _defaultPurposes[i] ] = true;
         }
         
-        valid = [1,0];
+        dsValid = 1;
+        dcValid = 0;
+        processingConsentImplementation = _processingConsentImplementation;
+
+        emitConsentCreated( _recipients, _defaultPurposes );
+    }
+
+
+    //Separate function to keep initialize below the stack limit.
+    function emitConsentCreated( address[] memory _recipients, uint[] memory _defaultPurposes ) private {
+        emit ConsentCreated( dataSubject, controller, _recipients, data, beginningDate, expirationDate, _defaultPurposes );
     }
     
     
@@ -83,10 +131,16 @@ contract CollectionConsent {
         //Check if exists a Processing Consent SC for this processor, if not, create a new one.
         ProcessingConsent processingConsentContract;
         if( !processingConsentContracts[processor].exists ){
-            processingConsentContract = new ProcessingConsent( controller, dataSubject, processor );
+            if( processingConsentImplementation != address(0) ){
+                processingConsentContract = ProcessingConsent( createClone( processingConsentImplementation ) );
+                processingConsentContract.initialize( controller, dataSubject, processor );
+            }
+            else
+                processingConsentContract = new ProcessingConsent( controller, dataSubject, processor );
             processingConsentContracts[processor] = ProcessingConsentStruct( true, address(processingConsentContract) );
 
             processors.push( processor );
+            emit ProcessingConsentCreated( processor, address(processingConsentContract) );
         }
         else{
             processingConsentContract = ProcessingConsent( processingConsentContracts[processor].processingConsentContractAddress );
@@ -115,8 +169,10 @@ contract CollectionConsent {
     function grantConsent() external {
         require( tx.origin == controller ||  tx.origin == dataSubject, 'Actor not allowed to do this action.' );
         
-        if( tx.origin == dataSubject ) valid[0] = 1;
-        else if( tx.origin == controller ) valid[1] = 1;
+        if( tx.origin == dataSubject ) dsValid = 1;
+        else if( tx.origin == controller ) dcValid = 1;
+
+        emit ConsentGranted( tx.origin );
     }
     
     /**
@@ -125,8 +181,10 @@ contract CollectionConsent {
     function revokeConsent() external {
         require( tx.origin == controller ||  tx.origin == dataSubject, 'Actor not allowed to do this action.' );
         
-        if( tx.origin == dataSubject ) valid[0] = 0;
-        else if( tx.origin == controller ) valid[1] = 0;
+        if( tx.origin == dataSubject ) dsValid = 0;
+        else if( tx.origin == controller ) dcValid = 0;
+
+        emit ConsentRevoked( tx.origin );
     }
 
     /**
@@ -134,12 +192,13 @@ contract CollectionConsent {
      */
     function verify() external view returns( bool ) {
         uint256 timestamp = block.timestamp;
-        bool isValid = valid[0] != 0 && valid[1] != 0 && timestamp >= beginningDate && timestamp <= expirationDate;
+        bool isValid = dsValid != 0 && dcValid != 0 && timestamp >= beginningDate && timestamp <= expirationDate;
         return isValid;
     }
 
     function eraseData() external onlyDataSubject{
         erasure = true;
+        emit DataErased( msg.sender );
     }
 
 
@@ -150,26 +209,23 @@ contract CollectionConsent {
     function modifyData( uint _data ) external onlyDataSubject{
         data = _data;
         //shoudl be more complex, modifying the data field on all Processing SCs.
+        emit DataModified( _data );
     }
 
     
     //COMPLEX REVOKE CONSENT - EVALUATE THE PROCESSING COST
     ////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
     /**
-     * @dev Revoke consent for all ProcessingConsent SC for a specific processing purpose. 
+     * @dev Revoke consent for all ProcessingConsent SC for a specific processing purpose.
+     *      O(1): the DS's consent for this purpose, granted before now, is no longer valid in any
+     *      ProcessingConsent SC (checked by their verify/verifyDS). The DS can grant it again per processor.
      */
      function revokeConsentPurpose( uint purpose ) external onlyDataSubject{
-
-        address processor;
-        for( uint i=0; i < processors.length; i++ ){
-            processor =  processors[ i ];
-            //If purpose is not valid or it not exists, there is no sense on revoking it.
-            if( ProcessingConsent( processingConsentContracts[ processor ].processingConsentContractAddress ).verifyDS( purpose ) )
-                ProcessingConsent( processingConsentContracts[ processor ].processingConsentContractAddress ).revokeConsent( purpose );
-        }
+        purposeEpochs[ purpose ]++;
 
         //Remove element from the default purposes array
         defaultPurposes[ purpose ] = false;
+        emit ConsentPurposeRevoked( purpose );
      }
 
 
@@ -183,6 +239,7 @@ contract CollectionConsent {
         
         //Add element to the processors blacklist
         processorsBlacklist[ processor ] = true;
+        emit ConsentProcessorRevoked( processor );
     }
     ////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
@@ -194,6 +251,54 @@ contract CollectionConsent {
     }
 
 
+    /**
+     * @dev Returns the Data Subject of this consent.
+     */
+    function getDataSubject() external view returns( address ) {
+        return dataSubject;
+    }
+
+
+    /**
+     * @dev Returns the Data Controller of this consent.
+     */
+    function getController() external view returns( address ) {
+        return controller;
+    }
+
+
+    /**
+     * @dev Returns the recipients that will hold the personal data of the Subject.
+     */
+    function getRecipients() external view returns( address[] memory ) {
+        return recipients;
+    }
+
+
+    /**
+     * @dev Returns the Data Subject and Data Controller flags (1 granted, 0 not granted).
+     */
+    function getValidity() external view returns( uint8, uint8 ) {
+        return ( dsValid, dcValid );
+    }
+
+
+    /**
+     * @dev Returns the consent lifetime.
+     */
+    function getValidityWindow() external view returns( uint256, uint256 ) {
+        return ( beginningDate, expirationDate );
+    }
+
+
+    /**
+     * @dev Returns true if the Data Subject has requested the erasure of the personal data.
+     */
+    function isErased() external view returns( bool ) {
+        return erasure;
+    }
+
+
     /**
      * @dev Returns the ProcessingConsent SC address of the specified processor, created from this contract.
      */
@@ -203,6 +308,14 @@ contract CollectionConsent {
     }
 
 
+    /**
+     * @dev Returns how many times the Data Subject has revoked this processing purpose.
+     */
+    function getPurposeEpoch( uint purpose ) external view returns( uint256 ){
+        return purposeEpochs[ purpose ];
+    }
+
+
     /**
      * @dev Returns all processors that has requested to process DS's personal data.
      */
@@ -226,7 +339,7 @@ contract CollectionConsent {
     
     modifier contractValidity(){
         uint256 timestamp = block.timestamp;
-        require( valid[0] != 0 && valid[1] != 0 && timestamp >= beginningDate && timestamp <= expirationDate, 'Consent constract is not valid.' );
+        require( dsValid != 0 && dcValid != 0 && timestamp >= beginningDate && timestamp <= expirationDate, 'Consent constract is not valid.' );
         _;
     }
     
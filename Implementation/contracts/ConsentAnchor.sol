@@ -0,0 +1,105 @@
+pragma solidity >=0.4.22 <0.7.0;
+
+/**
+ * @title ConsentAnchor
+ * @dev Anchors the Merkle roots of consent records kept off-chain (ui/merkle_consents.py).
+ *      Consent changes are batched off-chain and only the root of the whole set is committed,
+ *      so the cost of a batch does not depend on the number of consents in it.
+ *      Anyone holding a record and its proof can check it against the latest root.
+ *
+ *      Leaves: consentLeaf( record ). Nodes: keccak256 of the two children, smaller hash first,
+ *      so a proof is the list of sibling hashes from the leaf up, without positions.
+ *
+ *      A proof only shows that the anchorer committed the record: the DS/DC flags in it are set
+ *      off-chain by the anchorer alone, and nothing here checks that the parties agreed.
+ */
+contract ConsentAnchor {
+
+    //Only this account commits roots
+    address public anchorer;
+
+    //Root and metadata of one committed batch, packed in two slots
+    struct Anchor{
+        bytes32 root;
+        uint64 timestamp;
+        uint64 count;
+        uint64 blockNumber;
+    }
+    Anchor[] private anchors;
+
+    event RootAnchored( uint indexed epoch, bytes32 root, uint count );
+
+
+    constructor() public {
+        anchorer = msg.sender;
+    }
+
+
+    /**
+     * @dev Commits the root of the current set of consent records.
+     * @param root Merkle root of the records
+     * @param count number of records under the root
+     * @return the epoch of the new root
+     */
+    function anchor( bytes32 root, uint count ) external returns( uint ) {
+        require( msg.sender == anchorer, "Only the anchorer can commit roots." );
+        anchors.push( Anchor( root, uint64( block.timestamp ), uint64( count ), uint64( block.number ) ) );
+        emit RootAnchored( anchors.length - 1, root, count );
+        return anchors.length - 1;
+    }
+
+
+    /**
+     * @dev Leaf of a consent record, as computed off-chain.
+     */
+    function consentLeaf( address dataSubject, address controller, uint256 data, uint256 beginningDate,
+                          uint256 expirationDate, bool dsValid, bool dcValid ) public pure returns( bytes32 ) {
+        return keccak256( abi.encode( dataSubject, controller, data, beginningDate, expirationDate, dsValid, dcValid ) );
+    }
+
+
+    /**
+     * @dev Returns whether `leaf` is under the latest anchored root.
+     *      Only the latest root counts: a proof of a record replaced since then is rejected.
+     * @param leaf consentLeaf of the record
+     * @param proof sibling hashes from the leaf up to the root
+     */
+    function verifyWithProof( bytes32 leaf, bytes32[] calldata proof ) external view returns( bool ) {
+        require( anchors.length > 0, "No root anchored yet." );
+        return computeRoot( leaf, proof ) == anchors[ anchors.length - 1 ].root;
+    }
+
+
+    /**
+     * @dev Same checks as CollectionConsent.verify() for a record proven under the latest root:
+     *      both flags set and beginningDate <= now <= expirationDate.
+     */
+    function verifyConsent( address dataSubject, address controller, uint256 data, uint256 beginningDate,
+                            uint256 expirationDate, bool dsValid, bool dcValid, bytes32[] calldata proof ) external view returns( bool ) {
+        require( anchors.length > 0, "No root anchored yet." );
+        bytes32 leaf = consentLeaf( dataSubject, controller, data, beginningDate, expirationDate, dsValid, dcValid );
+        if( computeRoot( leaf, proof ) != anchors[ anchors.length - 1 ].root )
+            return false;
+        return dsValid && dcValid && block.timestamp >= beginningDate && block.timestamp <= expirationDate;
+    }
+
+
+    function computeRoot( bytes32 leaf, bytes32[] memory proof ) private pure returns( bytes32 computed ) {
+        computed = leaf;
+        for( uint i=0; i < proof.length; i++ ){
+            computed = computed < proof[i] ? keccak256( abi.encodePacked( computed, proof[i] ) )
+                                           : keccak256( abi.encodePacked( proof[i], computed ) );
+        }
+    }
+
+
+    //GETTERS
+    function latestEpoch() external view returns( uint ){
+        require( anchors.length > 0, "No root anchored yet." );
+        return anchors.length - 1;
+    }
+    function getAnchor( uint epoch ) external view returns( bytes32 root, uint256 timestamp, uint256 count, uint256 blockNumber ){
+        Anchor storage a = anchors[ epoch ];
+        return ( a.root, a.timestamp, a.count, a.blockNumber );
+    }
+}
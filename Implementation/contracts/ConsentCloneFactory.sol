@@ -0,0 +1,42 @@
+pragma solidity >=0.4.22 <0.7.0;
+
+import "./CollectionConsent.sol";
+import "./CloneFactory.sol";
+
+/**
+ * @title ConsentCloneFactory
+ * @dev Creates CollectionConsent contracts as EIP-1167 minimal proxies of a single implementation.
+ *      Each consent keeps its own address and storage (same isolation as a full deployment),
+ *      and the ProcessingConsent contracts created by its newPurpose are clones as well.
+ */
+contract ConsentCloneFactory is CloneFactory {
+
+    address public collectionConsentImplementation;
+    address public processingConsentImplementation;
+
+    event ConsentCloned( address indexed consent, address indexed dataSubject, address indexed controller );
+
+
+    /**
+     * @param _collectionConsentImplementation deployed CollectionConsent used as implementation
+     * @param _processingConsentImplementation deployed ProcessingConsent used as implementation
+     */
+    constructor( address _collectionConsentImplementation, address _processingConsentImplementation ) public {
+        collectionConsentImplementation = _collectionConsentImplementation;
+        processingConsentImplementation = _processingConsentImplementation;
+    }
+
+
+    /**
+     * @dev Create a new consent clone between the sender (Data Subject) and a Controller.
+     *      Same parameters as the CollectionConsent constructor.
+     */
+    function createConsent( address _dataController, address[] calldata _recipients, uint _data, uint duration, uint[] calldata _defaultPurposes ) external returns( address ) {
+        address consent = createClone( collectionConsentImplementation );
+        CollectionConsent( consent ).initialize( msg.sender, _dataController, _recipients, _data, duration, _defaultPurposes, processingConsentImplementation );
+
+        emit ConsentCloned( consent, msg.sender, _dataController );
+        return consent;
+    }
+
+}
@@ -0,0 +1,376 @@
+pragma solidity >=0.4.22 <0.7.0;
+pragma experimental ABIEncoderV2;
+
+/**
+ * @title ConsentRegistry
+ * @dev Holds many Collection Consents in a single contract, keyed by (dataSubject, controller).
+ *      Grant/revoke/verify follow the same two-party rules as CollectionConsent, but creating
+ *      a consent is a storage write instead of a full contract deployment.
+ *      The processing layer (newPurpose/ProcessingConsent) stays on the per-contract flow.
+ */
+contract ConsentRegistry {
+
+    //Storing all the consents. Small fields are declared together so they share a slot.
+    struct ConsentRecord{
+        address dataSubject;
+        uint8 dsValid;
+        uint8 dcValid;
+        bool erasure;
+        bool exists;
+        address controller;
+        uint256 data;
+        uint256 beginningDate;
+        uint256 expirationDate;
+    }
+    //mapping: consentId( dataSubject, controller ) => consent
+    mapping( bytes32 => ConsentRecord ) private consents;
+    mapping( bytes32 => address[] ) private recipients;
+    mapping( bytes32 => mapping( uint => bool ) ) private defaultPurposes;
+
+    //EIP-712 signed grants/revokes, submitted by any relayer on behalf of the DS or the DC.
+    struct SignedAction{
+        address dataSubject;
+        address controller;
+        bool grant;         //true: grantConsent - false: revokeConsent
+        uint256 nonce;      //sequential per signer and consent: must equal getNonce( dataSubject, controller, signer )
+        uint256 deadline;
+        uint8 v;
+        bytes32 r;
+        bytes32 s;
+    }
+    //EIP-712 signed creation: the DS's grant of a new consent with these terms, relayed like a SignedAction
+    struct SignedCreation{
+        address dataSubject;
+        address controller;
+        address[] recipients;
+        uint256 data;
+        uint256 duration;
+        uint256[] defaultPurposes;
+        uint256 nonce;      //the DS's nonce of this consent, as in SignedAction
+        uint256 deadline;
+        uint8 v;
+        bytes32 r;
+        bytes32 s;
+    }
+    bytes32 public constant DOMAIN_TYPEHASH = keccak256( "EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)" );
+    bytes32 public constant CONSENT_ACTION_TYPEHASH = keccak256( "ConsentAction(address dataSubject,address controller,bool grant,uint256 nonce,uint256 deadline)" );
+    bytes32 public constant CONSENT_CREATION_TYPEHASH = keccak256( "ConsentCreation(address dataSubject,address controller,address[] recipients,uint256 data,uint256 duration,uint256[] defaultPurposes,uint256 nonce,uint256 deadline)" );
+    bytes32 public DOMAIN_SEPARATOR;
+    //mapping: consentId => signer => next nonce. Every grant/revoke of the signer, signed or direct,
+    //advances it, so a signature older than the signer's last decision can never be replayed.
+    mapping( bytes32 => mapping( address => uint256 ) ) private nonces;
+
+    event ConsentCreated( bytes32 indexed consentId, address indexed dataSubject, address indexed controller );
+    event ConsentGranted( bytes32 indexed consentId, address indexed actor );
+    event ConsentRevoked( bytes32 indexed consentId, address indexed actor );
+    event SignedActionRejected( uint index, address indexed dataSubject, address indexed controller );
+    //Same events as CollectionConsent, keyed by the consent id
+    event DataModified( bytes32 indexed consentId, uint256 data );
+    event DataErased( bytes32 indexed consentId, address indexed dataSubject );
+
+
+    constructor() public {
+        DOMAIN_SEPARATOR = keccak256( abi.encode(
+            DOMAIN_TYPEHASH,
+            keccak256( bytes( "ConsentRegistry" ) ),
+            keccak256( bytes( "1" ) ),
+            getChainId(),
+            address(this) ) );
+    }
+
+
+    /**
+     * @dev Returns the key under which the consent between a Data Subject and a Controller is stored.
+     */
+    function consentId( address _dataSubject, address _controller ) public pure returns( bytes32 ) {
+        return keccak256( abi.encodePacked( _dataSubject, _controller ) );
+    }
+
+
+    /**
+     * @dev Create a new consent between the sender (Data Subject) and a Controller.
+     * @param _dataController data controller address
+     * @param _recipients list of the recipients that will hold the personal data of the Subject
+     * @param duration validity expiration time of the consent (in seconds)
+     * @param _defaultPurposes for which DS must do not give his explicit consent to process his PD
+     */
+    function createConsent( address _dataController, address[] calldata _recipients, uint _data, uint duration, uint[] calldata _defaultPurposes ) external returns( bytes32 ) {
+        return createConsentAux( msg.sender, _dataController, _recipients, _data, duration, _defaultPurposes );
+    }
+
+
+    /**
+     * @dev Create one consent per Controller for the sender (Data Subject) in a single transaction.
+     *      As in createConsent, the Data Subject's grant is recorded on creation; every Controller
+     *      can then grant all its pending consents with grantConsentBatch.
+     *      A batch covers one Data Subject only (the sender): use submitSignedCreations to create
+     *      the consents of many Data Subjects in one transaction.
+     *      All arrays are indexed by consent and must have the same length.
+     */
+    function createConsentBatch( address[] memory _dataControllers, address[][] memory _recipients, uint[] memory _data, uint[] memory _durations, uint[][] memory _defaultPurposes ) public returns( bytes32[] memory ) {
+        require( _recipients.length == _dataControllers.length && _data.length == _dataControllers.length &&
+                 _durations.length == _dataControllers.length && _defaultPurposes.length == _dataControllers.length,
+                 "Batch arrays must have the same length." );
+
+        bytes32[] memory ids = new bytes32[]( _dataControllers.length );
+        for( uint i=0; i < _dataControllers.length; i++ ){
+            ids[i] = createConsentAux( msg.sender, _dataControllers[i], _recipients[i], _data[i], _durations[i], _defaultPurposes[i] );
+        }
+        return ids;
+    }
+
+
+    function createConsentAux( address _dataSubject, address _dataController, address[] memory _recipients, uint _data, uint duration, uint[] memory _defaultPurposes ) private returns( bytes32 ) {
+        bytes32 id = consentId( _dataSubject, _dataController );
+        require( !consents[ id ].exists, "Consent already exists for this Data Subject and Controller." );
+
+        consents[ id ] = ConsentRecord(
+            _dataSubject,
+            1,
+            0,
+            false,
+            true,
+            _dataController,
+            _data,
+            block.timestamp,
+            block.timestamp + duration );
+        recipients[ id ] = _recipients;
+
+        for( uint i=0; i < _defaultPurposes.length; i++ ){
+            defaultPurposes[ id ][ _defaultPurposes[i] ] = true;
+        }
+
+        emit ConsentCreated( id, _dataSubject, _dataController );
+        return id;
+    }
+
+
+    /**
+     * @dev Consent enabled by the Data Subject and/or Data Controller.
+     */
+    function grantConsent( address _dataSubject, address _controller ) external {
+        ConsentRecord storage consent = consents[ consentId( _dataSubject, _controller ) ];
+        require( consent.exists, "Consent does not exist." );
+        require( msg.sender == _controller || msg.sender == _dataSubject, 'Actor not allowed to do this action.' );
+
+        if( msg.sender == _dataSubject ) consent.dsValid = 1;
+        else if( msg.sender == _controller ) consent.dcValid = 1;
+        nonces[ consentId( _dataSubject, _controller ) ][ msg.sender ]++;
+
+        emit ConsentGranted( consentId( _dataSubject, _controller ), msg.sender );
+    }
+
+    /**
+     * @dev Consents enabled by the sender (Data Controller) for all the given Data Subjects in one call.
+     */
+    function grantConsentBatch( address[] calldata _dataSubjects ) external {
+        for( uint i=0; i < _dataSubjects.length; i++ ){
+            bytes32 id = consentId( _dataSubjects[i], msg.sender );
+            require( consents[ id ].exists, "Consent does not exist." );
+            consents[ id ].dcValid = 1;
+            nonces[ id ][ msg.sender ]++;
+            emit ConsentGranted( id, msg.sender );
+        }
+    }
+
+    /**
+     * @dev Consent revoked by the Data Subject and/or Data Controller.
+     */
+    function revokeConsent( address _dataSubject, address _controller ) external {
+        ConsentRecord storage consent = consents[ consentId( _dataSubject, _controller ) ];
+        require( consent.exists, "Consent does not exist." );
+        require( msg.sender == _controller || msg.sender == _dataSubject, 'Actor not allowed to do this action.' );
+
+        if( msg.sender == _dataSubject ) consent.dsValid = 0;
+        else if( msg.sender == _controller ) consent.dcValid = 0;
+        nonces[ consentId( _dataSubject, _controller ) ][ msg.sender ]++;
+
+        emit ConsentRevoked( consentId( _dataSubject, _controller ), msg.sender );
+    }
+
+    /**
+     * @dev grantConsent on behalf of the DS or the DC, authorized by its EIP-712 signature.
+     */
+    function grantConsentWithSig( address _dataSubject, address _controller, uint256 nonce, uint256 deadline, uint8 v, bytes32 r, bytes32 s ) external {
+        require( applySignedAction( SignedAction( _dataSubject, _controller, true, nonce, deadline, v, r, s ) ),
+            "Invalid, used or expired consent signature." );
+    }
+
+    /**
+     * @dev revokeConsent on behalf of the DS or the DC, authorized by its EIP-712 signature.
+     */
+    function revokeConsentWithSig( address _dataSubject, address _controller, uint256 nonce, uint256 deadline, uint8 v, bytes32 r, bytes32 s ) external {
+        require( applySignedAction( SignedAction( _dataSubject, _controller, false, nonce, deadline, v, r, s ) ),
+            "Invalid, used or expired consent signature." );
+    }
+
+    /**
+     * @dev Applies a batch of signed grants/revokes gathered by a relayer.
+     *      Invalid entries are skipped (SignedActionRejected) so one bad signature does not sink the batch.
+     * @return number of actions applied
+     */
+    function submitSignedActions( SignedAction[] memory actions ) public returns( uint ) {
+        uint applied = 0;
+        for( uint i=0; i < actions.length; i++ ){
+            if( applySignedAction( actions[i] ) )
+                applied++;
+            else
+                emit SignedActionRejected( i, actions[i].dataSubject, actions[i].controller );
+        }
+        return applied;
+    }
+
+    /**
+     * @dev Creates the consents signed by their Data Subjects (one relayer transaction for many DSs).
+     *      Invalid, expired or already created entries are skipped (SignedActionRejected).
+     * @return number of consents created
+     */
+    function submitSignedCreations( SignedCreation[] memory creations ) public returns( uint ) {
+        uint created = 0;
+        for( uint i=0; i < creations.length; i++ ){
+            if( applySignedCreation( creations[i] ) )
+                created++;
+            else
+                emit SignedActionRejected( i, creations[i].dataSubject, creations[i].controller );
+        }
+        return created;
+    }
+
+    /**
+     * @dev Returns the address that signed the action, or zero for an invalid signature.
+     */
+    function recoverSigner( SignedAction memory action ) public view returns( address ) {
+        bytes32 structHash = keccak256( abi.encode(
+            CONSENT_ACTION_TYPEHASH,
+            action.dataSubject,
+            action.controller,
+            action.grant,
+            action.nonce,
+            action.deadline ) );
+        bytes32 digest = keccak256( abi.encodePacked( "\x19\x01", DOMAIN_SEPARATOR, structHash ) );
+        return ecrecover( digest, action.v, action.r, action.s );
+    }
+
+    /**
+     * @dev Returns the address that signed the creation, or zero for an invalid signature.
+     */
+    function recoverCreationSigner( SignedCreation memory creation ) public view returns( address ) {
+        bytes32 structHash = keccak256( abi.encode(
+            CONSENT_CREATION_TYPEHASH,
+            creation.dataSubject,
+            creation.controller,
+            keccak256( abi.encodePacked( creation.recipients ) ),
+            creation.data,
+            creation.duration,
+            keccak256( abi.encodePacked( creation.defaultPurposes ) ),
+            creation.nonce,
+            creation.deadline ) );
+        bytes32 digest = keccak256( abi.encodePacked( "\x19\x01", DOMAIN_SEPARATOR, structHash ) );
+        return ecrecover( digest, creation.v, creation.r, creation.s );
+    }
+
+    /**
+     * @dev Returns the nonce the next signed action of `signer` (DS or DC) on this consent must carry.
+     */
+    function getNonce( address _dataSubject, address _controller, address signer ) external view returns( uint256 ){
+        return nonces[ consentId( _dataSubject, _controller ) ][ signer ];
+    }
+
+    function getChainId() public pure returns( uint256 chainId ){
+        assembly { chainId := chainid() }
+    }
+
+
+    function applySignedAction( SignedAction memory action ) private returns( bool ) {
+        bytes32 id = consentId( action.dataSubject, action.controller );
+        if( !consents[ id ].exists || block.timestamp > action.deadline )
+            return false;
+
+        address signer = recoverSigner( action );
+        if( signer == address(0) || ( signer != action.dataSubject && signer != action.controller ) )
+            return false;
+        if( action.nonce != nonces[ id ][ signer ] )
+            return false;
+        nonces[ id ][ signer ]++;
+
+        uint8 value = action.grant ? 1 : 0;
+        if( signer == action.dataSubject ) consents[ id ].dsValid = value;
+        else consents[ id ].dcValid = value;
+
+        if( action.grant ) emit ConsentGranted( id, signer );
+        else emit ConsentRevoked( id, signer );
+        return true;
+    }
+
+    function applySignedCreation( SignedCreation memory creation ) private returns( bool ) {
+        bytes32 id = consentId( creation.dataSubject, creation.controller );
+        if( consents[ id ].exists || block.timestamp > creation.deadline )
+            return false;
+
+        address signer = recoverCreationSigner( creation );
+        if( signer == address(0) || signer != creation.dataSubject )
+            return false;
+        if( creation.nonce != nonces[ id ][ signer ] )
+            return false;
+        nonces[ id ][ signer ]++;
+
+        createConsentAux( creation.dataSubject, creation.controller, creation.recipients, creation.data, creation.duration, creation.defaultPurposes );
+        return true;
+    }
+
+
+    /**
+     * @dev Returns the current state of the consent between a Data Subject and a Controller.
+     */
+    function verify( address _dataSubject, address _controller ) external view returns( bool ) {
+        ConsentRecord storage consent = consents[ consentId( _dataSubject, _controller ) ];
+        uint256 timestamp = block.timestamp;
+        bool isValid = consent.dsValid != 0 && consent.dcValid != 0 && timestamp >= consent.beginningDate && timestamp <= consent.expirationDate;
+        return isValid;
+    }
+
+    /**
+     * @dev Marks the data of the consent as erased. Only the Data Subject of the consent can call it.
+     */
+    function eraseData( address _controller ) external {
+        bytes32 id = consentId( msg.sender, _controller );
+        ConsentRecord storage consent = consents[ id ];
+        require( consent.exists, "Consent does not exist." );
+        consent.erasure = true;
+        emit DataErased( id, msg.sender );
+    }
+
+    /**
+     * @dev Modifies the data field. Only the Data Subject of the consent can call it.
+     */
+    function modifyData( address _controller, uint _data ) external {
+        bytes32 id = consentId( msg.sender, _controller );
+        ConsentRecord storage consent = consents[ id ];
+        require( consent.exists, "Consent does not exist." );
+        consent.data = _data;
+        emit DataModified( id, _data );
+    }
+
+
+    //GETTERS
+    function existsConsent( address _dataSubject, address _controller ) external view returns( bool ){
+        return consents[ consentId( _dataSubject, _controller ) ].exists;
+    }
+    function getData( address _dataSubject, address _controller ) external view returns( uint256 ){
+        return consents[ consentId( _dataSubject, _controller ) ].data;
+    }
+    function getRecipients( address _dataSubject, address _controller ) external view returns( address[] memory ){
+        return recipients[ consentId( _dataSubject, _controller ) ];
+    }
+    function isDefaultPurpose( address _dataSubject, address _controller, uint _purpose ) external view returns( bool ){
+        return defaultPurposes[ consentId( _dataSubject, _controller ) ][ _purpose ];
+    }
+    function isErased( bytes32 _consentId ) external view returns( bool ){
+        return consents[ _consentId ].erasure;
+    }
+    function getValidityWindow( address _dataSubject, address _controller ) external view returns( uint256, uint256 ){
+        ConsentRecord storage consent = consents[ consentId( _dataSubject, _controller ) ];
+        return ( consent.beginningDate, consent.expirationDate );
+    }
+
+}
@@ -0,0 +1,72 @@
+pragma solidity >=0.4.22 <0.7.0;
+pragma experimental ABIEncoderV2;
+
+/**
+ * @title Multicall
+ * @dev Aggregates several read calls into a single eth_call, so the UI reads the state of many
+ *      consent contracts in one RPC round-trip and at one block.
+ *      Subset of the Multicall3 interface (aggregate, tryAggregate, tryBlockAndAggregate) for solc 0.5.
+ */
+contract Multicall {
+
+    struct Call{
+        address target;
+        bytes callData;
+    }
+
+    struct Result{
+        bool success;
+        bytes returnData;
+    }
+
+
+    /**
+     * @dev Executes all calls, reverting if any of them fails.
+     * @param calls target contracts and ABI-encoded calls
+     */
+    function aggregate( Call[] memory calls ) public returns( uint256 blockNumber, bytes[] memory returnData ) {
+        blockNumber = block.number;
+        returnData = new bytes[]( calls.length );
+        for( uint i=0; i < calls.length; i++ ){
+            (bool success, bytes memory ret) = calls[i].target.call( calls[i].callData );
+            require( success, "Multicall call failed." );
+            returnData[i] = ret;
+        }
+    }
+
+
+    /**
+     * @dev Executes all calls and returns the success flag of each one.
+     * @param requireSuccess revert if any call fails
+     * @param calls target contracts and ABI-encoded calls
+     */
+    function tryAggregate( bool requireSuccess, Call[] memory calls ) public returns( Result[] memory returnData ) {
+        returnData = new Result[]( calls.length );
+        for( uint i=0; i < calls.length; i++ ){
+            (bool success, bytes memory ret) = calls[i].target.call( calls[i].callData );
+            if( requireSuccess )
+                require( success, "Multicall call failed." );
+            returnData[i] = Result( success, ret );
+        }
+    }
+
+
+    /**
+     * @dev Same as tryAggregate, also returning the block the calls were executed at.
+     */
+    function tryBlockAndAggregate( bool requireSuccess, Call[] memory calls ) public returns( uint256 blockNumber, bytes32 blockHash, Result[] memory returnData ) {
+        blockNumber = block.number;
+        blockHash = blockhash( block.number - 1 );
+        returnData = tryAggregate( requireSuccess, calls );
+    }
+
+
+    function getBlockNumber() public view returns( uint256 ) {
+        return block.number;
+    }
+
+    function getCurrentBlockTimestamp() public view returns( uint256 ) {
+        return block.timestamp;
+    }
+
+}
@@ -11,21 +11,34 @@ contract ProcessingConsent {
     address private controller;
     address private processor;
 
-    //Storing all processors and purposes for which they process the data.   
+    //Purposes are bit positions (0-255) of the bitmaps below.
+    uint constant MAX_PURPOSES = 256;
+
+    //Data and lifetime of each purpose: the two timestamps and the DS epoch share one slot.
     struct ProcessingPurposeStruct{
-        bool exists;
         uint256 data;
-        uint256 beginningDate;
-        uint256 expirationDate;
-        uint8[3] valid;     //DC - DS - DP
+        uint64 beginningDate;
+        uint64 expirationDate;
+        uint64 dsEpoch;     //Purpose revocation epoch of the Consent SC when the DS bit was last set
     }
     mapping( uint => ProcessingPurposeStruct ) private purposes;
-    
-    uint[] private processingPurposes; 
+
+    //Bit p set: purpose p exists
+    uint256 private purposesBitmap;
+
+    //Bit p set: purpose p granted by the actor. DC - DS - DP
+    uint256[3] private validBitmaps;
 
     //Enum are explicitly convertible to and from all integer type. 
     //The options are represented by subsequent unsigned integer values starting from 0, in the order they are defined.
     enum PURPOSE { ModelTraining, ModelTesting, Profiling, ImprovingService, Advertising }
+
+    //Events let off-chain indexers (ui/consent_indexer.py) follow the state without polling getters.
+    event ProcessingPurposeCreated( uint indexed purpose, uint256 data, uint256 beginningDate, uint256 expirationDate, bool defaultTrue );
+    event ProcessingGranted( uint indexed purpose, address indexed actor );
+    event ProcessingRevoked( uint indexed purpose, address indexed actor );
+    event AllProcessingRevoked( address indexed actor );
+    event ProcessingDataModified( uint indexed purpose, uint256 data );
     
 
     /** 
@@ -35,6 +48,24 @@ contract ProcessingConsent {
      * @param _processor data processor address
      */
     constructor( address _controller, address _dataSubject, address _processor ) public {
+        initializeAux( _controller, _dataSubject, _processor );
+    }
+
+
+    /** 
+     * @dev Initializer used instead of the constructor when this contract runs behind a minimal proxy (clone).
+     *      Must be called by the CollectionConsent SC that owns the clone, in the Controller's transaction.
+     * @param _controller Controller address
+     * @param _dataSubject data Subject address
+     * @param _processor data processor address
+     */
+    function initialize( address _controller, address _dataSubject, address _processor ) external {
+        require( collectionConsentSC == address(0), "Processing consent contract already initialized." );
+        initializeAux( _controller, _dataSubject, _processor );
+    }
+
+
+    function initializeAux( address _controller, address _dataSubject, address _processor ) private {
         require( tx.origin == _controller, 
             "Transaction sender does not matcht with the Controller");
         collectionConsentSC = msg.sender;
@@ -56,23 +87,25 @@ contract ProcessingConsent {
             "New Processing purpose can only be added from the Consent SC from which this Purpose SC was created" );
         require( tx.origin == controller,
             "Only controller can add a new Processing purpose to this SC" );
+        require( _purpose < MAX_PURPOSES, "Processing purpose out of range." );
         //chech if this purpose does not already exists
-        require( !purposes[ _purpose ].exists, "Processing purpose already exists." );
-
-        uint8[3] memory valid;
-        if( defaultTrue==1 )
-            valid = [1,1,0];
-        else
-            valid = [1,0,0];
+        uint256 bit = uint256(1) << _purpose;
+        require( purposesBitmap & bit == 0, "Processing purpose already exists." );
+        //The dates are stored as uint64: the expiration must not wrap around
+        require( duration <= uint64(-1) - block.timestamp, "Duration out of range." );
 
         purposes[ _purpose ] = ProcessingPurposeStruct( 
-            true, 
             data,
-            block.timestamp,
-            block.timestamp + duration,
-            valid );
+            uint64( block.timestamp ),
+            uint64( block.timestamp + duration ),
+            defaultTrue==1 ? purposeEpoch( _purpose ) : uint64(0) );
 
-        processingPurposes.push( _purpose );
+        purposesBitmap |= bit;
+        validBitmaps[0] |= bit;
+        if( defaultTrue==1 )
+            validBitmaps[1] |= bit;
+
+        emit ProcessingPurposeCreated( _purpose, data, purposes[ _purpose ].beginningDate, purposes[ _purpose ].expirationDate, defaultTrue==1 );
     }
     
     
@@ -83,6 +116,7 @@ contract ProcessingConsent {
      */
     function modifyData( uint _purpose, uint _data ) external onlyDataSubject{
         purposes[ _purpose ].data = _data;
+        emit ProcessingDataModified( _purpose, _data );
     }
 
     
@@ -91,14 +125,15 @@ contract ProcessingConsent {
      * @param _purpose processing purpose 
      */
     function verify( uint _purpose ) external view returns(bool) {
-        require( purposes[ _purpose ].exists, "Processing purpose does not exists." );
+        //A created purpose always has a non-zero expiration date
+        ProcessingPurposeStruct storage purpose = purposes[ _purpose ];
+        require( purpose.expirationDate != 0, "Processing purpose does not exists." );
 
         uint256 timestamp = block.timestamp;
-        bool isValid = (purposes[ _purpose ].valid[0] & 
-                        purposes[ _purpose ].valid[1] & 
-                        purposes[ _purpose ].valid[2] ) != 0 && 
-                        timestamp >= purposes[ _purpose ].beginningDate && 
-                        timestamp <= purposes[ _purpose ].expirationDate;
+        bool isValid = ( validBitmaps[0] & validBitmaps[1] & validBitmaps[2] & (uint256(1) << _purpose) ) != 0 && 
+                        timestamp >= purpose.beginningDate && 
+                        timestamp <= purpose.expirationDate &&
+                        purpose.dsEpoch >= purposeEpoch( _purpose );
         return isValid;
     }
 
@@ -107,13 +142,9 @@ contract ProcessingConsent {
      * @param _purpose processing purpose 
      */
     function verifyDS( uint _purpose ) external view returns(bool) {
-        bool exists;
-
-        if( !purposes[ _purpose ].exists )
-            exists = false;
-        else 
-            exists = purposes[ _purpose ].valid[1] != 0;
-        return exists;
+        //The DS bit is only ever set for existing purposes
+        return _purpose < MAX_PURPOSES && validBitmaps[1] & (uint256(1) << _purpose) != 0 &&
+            purposes[ _purpose ].dsEpoch >= purposeEpoch( _purpose );
     }
 
 
@@ -122,17 +153,28 @@ contract ProcessingConsent {
      * @param _purpose processing purpose 
      */
     function existsPurpose( uint _purpose ) external view returns(bool) {
-        if( purposes[ _purpose ].exists )
-            return true;
-        else
-            return false;
+        return _purpose < MAX_PURPOSES && purposesBitmap & (uint256(1) << _purpose) != 0;
     }
 
 
 
     //GETTERS
     function getPurposes() external view returns( uint[] memory ){
-        return processingPurposes;
+        uint256 bitmap = purposesBitmap;
+        uint count = 0;
+        for( uint256 b = bitmap; b != 0; b &= b - 1 )
+            count++;
+
+        uint[] memory result = new uint[]( count );
+        uint j = 0;
+        for( uint i=0; bitmap >> i != 0; i++ ){
+            if( bitmap & (uint256(1) << i) != 0 )
+                result[ j++ ] = i;
+        }
+        return result;
+    }
+    function getCollectionConsentSC() external view returns( address ){
+        return collectionConsentSC;
     }
     function getDataSubject() external view returns( address ){
         return dataSubject;
@@ -146,17 +188,24 @@ contract ProcessingConsent {
     function getDataPurpose( uint _purpose ) external view returns( uint256 ){
         return purposes[ _purpose].data;
     }
+    function getValidityWindow( uint _purpose ) external view returns( uint256, uint256 ){
+        return ( purposes[ _purpose ].beginningDate, purposes[ _purpose ].expirationDate );
+    }
 
     /**
      * @dev Processing Consent valid. 
      */
     function grantConsent( uint _purpose ) external{
         require( tx.origin == controller ||  tx.origin == dataSubject || tx.origin == processor, 'Actor not allowed to do this action.' );
-        require( purposes[ _purpose ].exists, "Processing purpose does not exists." );
+        uint256 bit = purposeBit( _purpose );
         
-        if( tx.origin == controller ) purposes[ _purpose ].valid[0] = 1;
-        else if( tx.origin == dataSubject ) purposes[ _purpose ].valid[1] = 1;
-        else if( tx.origin == processor) purposes[ _purpose ].valid[2] = 1;
+        uint actor = actorIndex();
+        validBitmaps[ actor ] |= bit;
+        //A DS grant after a revocation from the Consent SC makes the purpose valid again
+        if( actor == 1 )
+            purposes[ _purpose ].dsEpoch = purposeEpoch( _purpose );
+
+        emit ProcessingGranted( _purpose, tx.origin );
     }
 
     
@@ -165,11 +214,11 @@ contract ProcessingConsent {
      */
     function revokeConsent( uint _purpose ) external{
         require( tx.origin == controller ||  tx.origin == dataSubject || tx.origin == processor, 'Actor not allowed to do this action.' );
-        require( purposes[ _purpose ].exists, "Processing purpose does not exists." );
+        uint256 bit = purposeBit( _purpose );
         
-        if( tx.origin == controller ) purposes[ _purpose ].valid[0] = 0;
-        else if( tx.origin == dataSubject ) purposes[ _purpose ].valid[1] = 0;
-        else if( tx.origin == processor) purposes[ _purpose ].valid[2] = 0;
+        validBitmaps[ actorIndex() ] &= ~bit;
+
+        emit ProcessingRevoked( _purpose, tx.origin );
     }
 
 
@@ -178,18 +227,39 @@ contract ProcessingConsent {
      */
     function revokeAllConsents() external{
         require( tx.origin == controller ||  tx.origin == dataSubject || tx.origin == processor, 'Actor not allowed to do this action.' );
-        require( processingPurposes.length > 0, "No Processing purposes on this SC." );
+        require( purposesBitmap != 0, "No Processing purposes on this SC." );
         
-        if( tx.origin == controller ) revokeAllConsentsAux(0);
-        else if( tx.origin == dataSubject ) revokeAllConsentsAux(1);
-        else if( tx.origin == processor) revokeAllConsentsAux(2);
+        //Single write, whatever the number of purposes
+        validBitmaps[ actorIndex() ] = 0;
+
+        emit AllProcessingRevoked( tx.origin );
     }
 
 
-    function revokeAllConsentsAux( uint p ) private{
-        for( uint i=0; i < processingPurposes.length; i++){
-            purposes[ processingPurposes[i] ].valid[p] = 0;
-        }
+    //Bit of an existing purpose.
+    function purposeBit( uint _purpose ) private view returns( uint256 bit ){
+        require( _purpose < MAX_PURPOSES, "Processing purpose does not exists." );
+        bit = uint256(1) << _purpose;
+        require( purposesBitmap & bit != 0, "Processing purpose does not exists." );
+    }
+
+
+    //Times the Data Subject revoked this purpose from the Consent SC (CollectionConsent.revokeConsentPurpose).
+    //0 when the creator is not a Consent SC (an EOA, as in the benchmarks) or does not count revocations.
+    function purposeEpoch( uint _purpose ) private view returns( uint64 ){
+        (bool success, bytes memory result) = collectionConsentSC.staticcall(
+            abi.encodeWithSignature( "getPurposeEpoch(uint256)", _purpose ) );
+        if( !success || result.length < 32 )
+            return 0;
+        return uint64( abi.decode( result, (uint256) ) );
+    }
+
+
+    //Validity bitmap of the sender: same precedence as before, controller then DS then processor.
+    function actorIndex() private view returns( uint ){
+        if( tx.origin == controller ) return 0;
+        else if( tx.origin == dataSubject ) return 1;
+        return 2;
     }
 
 
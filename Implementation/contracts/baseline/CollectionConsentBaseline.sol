@@ -0,0 +1,70 @@
+pragma solidity >=0.4.22 <0.7.0;
+
+/**
+ * @title CollectionConsentBaseline
+ * @dev Storage layout of CollectionConsent before slot packing (uint256 timestamps, uint8[2] valid flags and
+ *      the erasure flag in separate slots), reduced to the consent lifecycle. Not used by the system: kept so
+ *      that Test 2.9.2 of test/phase2-suite9-scalability-microbenchmark.js compares both layouts in the same run.
+ */
+contract CollectionConsentBaseline {
+
+    address private dataSubject;
+    address private controller;
+    address[] private recipients;
+
+    uint256 data;
+
+    uint256 beginningDate;
+    uint256 expirationDate;
+
+    uint8[2] private valid;
+
+    bool private erasure;
+
+    mapping( uint => bool ) private defaultPurposes;
+
+
+    constructor( address _dataController, address[] memory _recipients, uint _data, uint duration, uint[] memory _defaultPurposes ) public {
+        dataSubject = msg.sender;
+        controller = _dataController;
+        recipients = _recipients;
+        data = _data;
+        beginningDate = block.timestamp;
+        expirationDate = beginningDate + duration;
+
+        for( uint i=0; i < _defaultPurposes.length; i++ ){
+            defaultPurposes[ _defaultPurposes[i] ] = true;
+        }
+
+        valid = [1,0];
+    }
+
+
+    function grantConsent() external {
+        require( tx.origin == controller ||  tx.origin == dataSubject, 'Actor not allowed to do this action.' );
+
+        if( tx.origin == dataSubject ) valid[0] = 1;
+        else if( tx.origin == controller ) valid[1] = 1;
+    }
+
+
+    function revokeConsent() external {
+        require( tx.origin == controller ||  tx.origin == dataSubject, 'Actor not allowed to do this action.' );
+
+        if( tx.origin == dataSubject ) valid[0] = 0;
+        else if( tx.origin == controller ) valid[1] = 0;
+    }
+
+
+    function verify() external view returns( bool ) {
+        uint256 timestamp = block.timestamp;
+        bool isValid = valid[0] != 0 && valid[1] != 0 && timestamp >= beginningDate && timestamp <= expirationDate;
+        return isValid;
+    }
+
+
+    function eraseData() external {
+        require( msg.sender == dataSubject, 'Only the data Subject is allowed to do this action.' );
+        erasure = true;
+    }
+}
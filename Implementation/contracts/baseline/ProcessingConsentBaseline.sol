@@ -0,0 +1,110 @@
+pragma solidity >=0.4.22 <0.7.0;
+
+/**
+ * @title ProcessingConsentBaseline
+ * @dev Storage layout of ProcessingConsent before bitmap packing (one struct and a uint8[3] per purpose,
+ *      plus the purposes array). Not used by the system: kept so that the gas benchmark of
+ *      test/phase2-suite16-bitmap-purposes.js compares both layouts in the same run.
+ */
+contract ProcessingConsentBaseline {
+
+    address private collectionConsentSC;
+    address private dataSubject;
+    address private controller;
+    address private processor;
+
+    struct ProcessingPurposeStruct{
+        bool exists;
+        uint256 data;
+        uint256 beginningDate;
+        uint256 expirationDate;
+        uint8[3] valid;     //DC - DS - DP
+    }
+    mapping( uint => ProcessingPurposeStruct ) private purposes;
+
+    uint[] private processingPurposes;
+
+
+    constructor( address _controller, address _dataSubject, address _processor ) public {
+        require( tx.origin == _controller,
+            "Transaction sender does not matcht with the Controller");
+        collectionConsentSC = msg.sender;
+        controller = _controller;
+        dataSubject = _dataSubject;
+        processor = _processor;
+    }
+
+
+    function newPurpose( uint _purpose, uint data, uint duration, uint defaultTrue ) external{
+        require( msg.sender == collectionConsentSC,
+            "New Processing purpose can only be added from the Consent SC from which this Purpose SC was created" );
+        require( tx.origin == controller,
+            "Only controller can add a new Processing purpose to this SC" );
+        require( !purposes[ _purpose ].exists, "Processing purpose already exists." );
+
+        uint8[3] memory valid;
+        if( defaultTrue==1 )
+            valid = [1,1,0];
+        else
+            valid = [1,0,0];
+
+        purposes[ _purpose ] = ProcessingPurposeStruct(
+            true,
+            data,
+            block.timestamp,
+            block.timestamp + duration,
+            valid );
+
+        processingPurposes.push( _purpose );
+    }
+
+
+    function verify( uint _purpose ) external view returns(bool) {
+        require( purposes[ _purpose ].exists, "Processing purpose does not exists." );
+
+        uint256 timestamp = block.timestamp;
+        bool isValid = (purposes[ _purpose ].valid[0] &
+                        purposes[ _purpose ].valid[1] &
+                        purposes[ _purpose ].valid[2] ) != 0 &&
+                        timestamp >= purposes[ _purpose ].beginningDate &&
+                        timestamp <= purposes[ _purpose ].expirationDate;
+        return isValid;
+    }
+
+
+    function grantConsent( uint _purpose ) external{
+        require( tx.origin == controller ||  tx.origin == dataSubject || tx.origin == processor, 'Actor not allowed to do this action.' );
+        require( purposes[ _purpose ].exists, "Processing purpose does not exists." );
+
+        if( tx.origin == controller ) purposes[ _purpose ].valid[0] = 1;
+        else if( tx.origin == dataSubject ) purposes[ _purpose ].valid[1] = 1;
+        else if( tx.origin == processor) purposes[ _purpose ].valid[2] = 1;
+    }
+
+
+    function revokeConsent( uint _purpose ) external{
+        require( tx.origin == controller ||  tx.origin == dataSubject || tx.origin == processor, 'Actor not allowed to do this action.' );
+        require( purposes[ _purpose ].exists, "Processing purpose does not exists." );
+
+        if( tx.origin == controller ) purposes[ _purpose ].valid[0] = 0;
+        else if( tx.origin == dataSubject ) purposes[ _purpose ].valid[1] = 0;
+        else if( tx.origin == processor) purposes[ _purpose ].valid[2] = 0;
+    }
+
+
+    function revokeAllConsents() external{
+        require( tx.origin == controller ||  tx.origin == dataSubject || tx.origin == processor, 'Actor not allowed to do this action.' );
+        require( processingPurposes.length > 0, "No Processing purposes on this SC." );
+
+        if( tx.origin == controller ) revokeAllConsentsAux(0);
+        else if( tx.origin == dataSubject ) revokeAllConsentsAux(1);
+        else if( tx.origin == processor) revokeAllConsentsAux(2);
+    }
+
+
+    function revokeAllConsentsAux( uint p ) private{
+        for( uint i=0; i < processingPurposes.length; i++){
+            purposes[ processingPurposes[i] ].valid[p] = 0;
+        }
+    }
+}
@@ -0,0 +1,159 @@
+"""
+Vectorized cost model of the consent lifecycle.
+
+Takes the measured gas of every operation (gas_report.py sources: truffle
+test output and/or benchmark_scalability.py results) and evaluates the USD
+cost of a Data Subject's full consent lifecycle over a whole grid of
+scenarios at once:
+
+    gas price (Gwei) x ETH price (USD) x consents per subject
+        x processors per consent x purposes per processor x churn
+
+where, per consent,
+    gas = create + grant DS + grant DC
+        + processors * (newPurpose (new processor) + (purposes - 1) * newPurpose
+                        + purposes * processing grant)
+        + churn * (revoke DS + grant DS)
+and churn is the number of DS revoke/re-grant cycles over the consent's life.
+
+The gas of the lifecycle only depends on the last four axes, so it is
+computed once on that (small) grid and broadcast against the prices: a grid
+of millions of scenarios is one multiplication.
+
+Axes are ','-separated values or 'start:stop:count' (evenly spaced).
+
+Usage:
+    python cost_model.py [truffle-output.txt | benchmark_results/scalability.json ...]
+        [--gas-price 1:200:100] [--eth-price 1000:5000:41] [--consents 1,10,100]
+        [--processors 0,1,5,10] [--purposes 1,5,10] [--churn 0,1,2,5]
+        [--statistic p50] [--out cost_surface.npz]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from gas_report import DEFAULT_SOURCE, build_report
+
+AXES = ('gas_price_gwei', 'eth_price_usd', 'consents', 'processors', 'purposes', 'churn')
+GWEI_TO_ETH = 1e-9
+
+# Operation of the model -> gas_report operations, first one with figures wins
+MODEL_OPERATIONS = {
+    'create': ('create',),
+    'grant DS': ('grant DS', 'grant'),
+    'grant DC': ('grant DC',),
+    'revoke DS': ('revoke DS', 'revoke'),
+    'newPurpose (new processor)': ('newPurpose (new processor)',),
+    'newPurpose': ('newPurpose',),
+    'processing grant': ('processing grant',),
+}
+# Only needed by scenarios with processors (benchmark_scalability.py measures them)
+PROCESSOR_OPERATIONS = ('newPurpose (new processor)', 'newPurpose', 'processing grant')
+
+
+def operation_gas(report, statistic='p50'):
+    """Gas of every operation of the model: `statistic` (p50, mean, p95, ...) of its measured distribution."""
+    gas = {}
+    for name, candidates in MODEL_OPERATIONS.items():
+        for operation in candidates:
+            if operation in report['operations']:
+                gas[name] = float(report['operations'][operation]['gas'][statistic])
+                break
+    return gas
+
+
+def lifecycle_gas(gas, consents, processors, purposes, churn):
+    """
+    Gas of a Data Subject's lifecycle, broadcast over the four arrays
+    (pass them already shaped for broadcasting, see cost_surface).
+    """
+    per_processor = 0.0
+    if np.any(processors):
+        needed = PROCESSOR_OPERATIONS if np.any(purposes > 1) else ('newPurpose (new processor)', 'processing grant')
+        missing = [op for op in needed if op not in gas]
+        if missing:
+            raise ValueError(f"No {', '.join(missing)} gas figures: use benchmark_scalability.py results "
+                             "for scenarios with processors")
+        per_processor = (np.minimum(purposes, 1) * gas['newPurpose (new processor)']
+                         + np.maximum(purposes - 1, 0) * gas.get('newPurpose', 0.0)
+                         + purposes * gas['processing grant'])
+    per_consent = (gas['create'] + gas['grant DS'] + gas['grant DC']
+                   + processors * per_processor
+                   + churn * (gas['revoke DS'] + gas['grant DS']))
+    return consents * per_consent
+
+
+def cost_surface(gas, gas_price_gwei, eth_price_usd, consents, processors, purposes, churn):
+    """
+    USD cost of every scenario of the grid, an array of shape
+    (len(gas_price_gwei), len(eth_price_usd), len(consents), len(processors), len(purposes), len(churn)).
+    """
+    consents = np.asarray(consents, dtype=np.float64).reshape(-1, 1, 1, 1)
+    processors = np.asarray(processors, dtype=np.float64).reshape(1, -1, 1, 1)
+    purposes = np.asarray(purposes, dtype=np.float64).reshape(1, 1, -1, 1)
+    churn = np.asarray(churn, dtype=np.float64).reshape(1, 1, 1, -1)
+    lifecycle = np.broadcast_to(lifecycle_gas(gas, consents, processors, purposes, churn),
+                                (consents.size, processors.size, purposes.size, churn.size))
+
+    eth_per_gas = np.multiply.outer(np.asarray(gas_price_gwei, dtype=np.float64) * GWEI_TO_ETH,
+                                    np.asarray(eth_price_usd, dtype=np.float64))
+    return np.multiply.outer(eth_per_gas, lifecycle)
+
+
+def axis(text):
+    """'1,5,10' or 'start:stop:count'."""
+    if ':' in text:
+        start, stop, count = text.split(':')
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(v) for v in text.split(',') if v.strip()])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='*', default=[DEFAULT_SOURCE])
+    parser.add_argument('--gas-price', type=axis, default=axis('1:200:100'), help='Gwei')
+    parser.add_argument('--eth-price', type=axis, default=axis('1000:5000:41'), help='USD')
+    parser.add_argument('--consents', type=axis, default=axis('1,5,10,50,100'), help='consents per subject')
+    parser.add_argument('--processors', type=axis, default=axis('0'), help='processors per consent')
+    parser.add_argument('--purposes', type=axis, default=axis('1'), help='purposes per processor')
+    parser.add_argument('--churn', type=axis, default=axis('0,1,2,5,10'), help='DS revoke/re-grant cycles per consent')
+    parser.add_argument('--statistic', default='p50', choices=('min', 'p50', 'mean', 'p95', 'p99', 'max'))
+    parser.add_argument('--out', help='.npz file for the surface and its axes')
+    args = parser.parse_args()
+
+    gas = operation_gas(build_report(args.sources), args.statistic)
+    missing = [op for op in MODEL_OPERATIONS if op not in gas and op not in PROCESSOR_OPERATIONS]
+    if missing:
+        sys.exit(f"No {', '.join(missing)} gas figures in {', '.join(args.sources)}")
+    values = [args.gas_price, args.eth_price, args.consents, args.processors, args.purposes, args.churn]
+
+    start = time.perf_counter()
+    try:
+        surface = cost_surface(gas, *values)
+    except ValueError as e:
+        sys.exit(str(e))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Operation gas ({args.statistic}):")
+    for name, value in gas.items():
+        print(f"   {name:<28} {value:>12,.0f}")
+    print(f"\n{surface.size:,} scenarios ({' x '.join(str(len(v)) for v in values)}) evaluated in {elapsed_ms:.1f} ms")
+    print(f"   Lifecycle cost: min ${surface.min():,.2f}, median ${np.median(surface):,.2f}, max ${surface.max():,.2f}")
+
+    # Cost of the smallest scenario at a few gas prices, at the median ETH price
+    eth_index = len(args.eth_price) // 2
+    print(f"\nSmallest scenario ({args.consents[0]:g} consent(s), {args.processors[0]:g} processor(s), "
+          f"{args.purposes[0]:g} purpose(s), churn {args.churn[0]:g}) at ${args.eth_price[eth_index]:,.0f}/ETH:")
+    for i in np.unique(np.linspace(0, len(args.gas_price) - 1, 5).astype(int)):
+        print(f"   {args.gas_price[i]:>8.1f} Gwei: ${surface[i, eth_index, 0, 0, 0, 0]:>12,.2f}")
+
+    if args.out:
+        np.savez_compressed(args.out, surface=surface, **dict(zip(AXES, values)))
+        print(f"\nSurface written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
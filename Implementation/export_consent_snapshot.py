@@ -0,0 +1,102 @@
+"""
+Export the consent state to a columnar snapshot (see ui/consent_snapshot.py).
+
+The consents exported are the given addresses, the consents of the ui's
+indexer database (--indexer) and those of the last snapshot of --out. When
+--out already holds a snapshot, only the consents changed since its block
+are read again (--full reads everything).
+
+Usage:
+    python export_consent_snapshot.py [0xConsent ...] [--indexer ui/consents.db]
+        [--out consent_snapshots] [--block N] [--full] [--url http://127.0.0.1:8545]
+    python export_consent_snapshot.py --show consent_snapshots [--subject 0xDataSubject]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ui'))
+from consent_snapshot import Snapshot, SnapshotExporter, latest_snapshot  # noqa: E402
+
+DEFAULT_OUT = 'consent_snapshots'
+
+
+def indexed_consents(db_path):
+    """CollectionConsent addresses known to a ConsentIndexer database."""
+    db = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in db.execute("SELECT address FROM consents ORDER BY created_block")]
+    finally:
+        db.close()
+
+
+def show(snapshot, subject=None):
+    meta = snapshot.meta
+    print(f"Snapshot {snapshot.path}: block {meta['block_number']} (state root {meta['state_root']})")
+    print("   " + ", ".join(f"{rows} {name}" for name, rows in meta['rows'].items()))
+    addresses = snapshot.consents_for_subject(subject) if subject else snapshot.addresses()
+    valid = snapshot.valid_mask()
+    for address in addresses:
+        consent = snapshot.consent(address)
+        purposes = snapshot.purposes(address)
+        print(f"   {address}  DS {consent['data_subject'][:10]}…  "
+              f"{'valid' if valid[snapshot.consent_row(address)] else 'not valid'}"
+              f"{', erased' if consent['erased'] else ''}  "
+              f"{len(purposes)} processing purpose(s), {sum(p['valid'] for p in purposes)} valid")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('addresses', nargs='*', help='CollectionConsent addresses')
+    parser.add_argument('--indexer', help='ConsentIndexer database to take the consent addresses from')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='snapshots directory')
+    parser.add_argument('--block', type=int, help='block to export (default: latest)')
+    parser.add_argument('--full', action='store_true', help='read every consent, not only the changed ones')
+    parser.add_argument('--url', default='http://127.0.0.1:8545')
+    parser.add_argument('--show', metavar='DIR', help='print the latest snapshot of DIR (or a snapshot path) and exit')
+    parser.add_argument('--subject', help='with --show: only the consents of this Data Subject')
+    args = parser.parse_args()
+
+    if args.show:
+        if os.path.exists(os.path.join(args.show, 'meta.json')):
+            snapshot = Snapshot.load(args.show)
+        else:
+            snapshot = latest_snapshot(args.show)
+        if snapshot is None:
+            sys.exit(f"No snapshot in {args.show}")
+        show(snapshot, args.subject)
+        return
+
+    w3 = Web3(Web3.HTTPProvider(args.url))
+    if not w3.is_connected():
+        sys.exit(f"Cannot connect to {args.url}: start Ganache first (ganache --port 8545)")
+
+    addresses = list(args.addresses)
+    if args.indexer:
+        addresses += indexed_consents(args.indexer)
+    previous = latest_snapshot(args.out)
+    if args.full and previous is not None:
+        # Read again, the consents of the last snapshot included
+        addresses += previous.addresses()
+        previous = None
+    if previous is None and not addresses:
+        sys.exit("No consents to export: give addresses or --indexer")
+
+    start = time.perf_counter()
+    snapshot = SnapshotExporter(w3).export(addresses, args.out, previous, args.block)
+    elapsed = time.perf_counter() - start
+
+    meta = snapshot.meta
+    since = f" (incremental from block {meta['previous_block']})" if meta['previous_block'] is not None else ""
+    print(f"✅ Snapshot of block {meta['block_number']}{since} written to {snapshot.path} in {elapsed:.2f} s")
+    print(f"   {meta['read']} consent(s) read, " + ", ".join(f"{rows} {name}" for name, rows in meta['rows'].items()))
+    print(f"   State root {meta['state_root']}")
+
+
+if __name__ == '__main__':
+    main()
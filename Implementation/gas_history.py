@@ -0,0 +1,281 @@
+"""
+Gas regression history across commits.
+
+An append-only SQLite store (benchmark_results/gas_history.db by default)
+of benchmark runs. Each run is keyed by the git commit and the hash of the
+compiled contracts (build/contracts deployedBytecode), and records the gas
+(and latency, for benchmark_scalability.py results) of every function read
+by gas_report.py from the given sources.
+
+Commands:
+    record [sources ...]      store a run (default source: truffle-output.txt)
+    list                      list the stored runs
+    diff [A] [B]              compare two runs (default: previous and latest);
+                              exits with status 1 when a tracked function's
+                              median gas grew by more than --threshold percent
+
+Runs are referred to by id, commit prefix (latest run of that commit),
+'latest' or 'previous'. `trend()` and `render_trend_svg()` are used by the
+HTML generators (--history) to plot a metric over the stored runs.
+
+Usage:
+    python gas_history.py record benchmark_results/scalability.json --note "packed storage"
+    python gas_history.py diff previous latest --threshold 2 --track create,newPurpose,grant DS
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from gas_report import DEFAULT_SOURCE, build_report
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join('benchmark_results', 'gas_history.db')
+BUILD_DIR = os.path.join(ROOT, 'build', 'contracts')
+
+# Functions whose regressions fail `diff` unless --track says otherwise
+TRACKED = ('create', 'grant DS', 'grant DC', 'newPurpose', 'newPurpose (new processor)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at    INTEGER NOT NULL,
+    git_commit    TEXT,
+    dirty         INTEGER NOT NULL,    -- uncommitted changes in the working tree
+    bytecode_hash TEXT NOT NULL,       -- sha256 over the per-contract hashes below
+    sources       TEXT NOT NULL,       -- ','-separated
+    note          TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_by_commit ON runs (git_commit);
+CREATE TABLE IF NOT EXISTS contracts (
+    run_id        INTEGER NOT NULL REFERENCES runs (id),
+    contract      TEXT NOT NULL,
+    bytecode_hash TEXT NOT NULL,
+    PRIMARY KEY (run_id, contract)
+);
+CREATE TABLE IF NOT EXISTS functions (
+    run_id      INTEGER NOT NULL REFERENCES runs (id),
+    function    TEXT NOT NULL,
+    samples     INTEGER NOT NULL,
+    gas_mean    REAL NOT NULL,
+    gas_p50     REAL NOT NULL,
+    gas_p95     REAL NOT NULL,
+    gas_max     REAL NOT NULL,
+    latency_p50 REAL,
+    latency_p95 REAL,
+    PRIMARY KEY (run_id, function)
+);
+"""
+
+APPEND_ONLY = """
+CREATE TRIGGER IF NOT EXISTS {table}_no_update BEFORE UPDATE ON {table}
+BEGIN SELECT RAISE(ABORT, 'gas history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS {table}_no_delete BEFORE DELETE ON {table}
+BEGIN SELECT RAISE(ABORT, 'gas history is append-only'); END;
+"""
+
+
+def connect(path=DEFAULT_DB):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.executescript(SCHEMA + ''.join(APPEND_ONLY.format(table=t) for t in ('runs', 'contracts', 'functions')))
+    return db
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True, cwd=ROOT).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def contract_hashes(build_dir=BUILD_DIR):
+    """sha256 of the deployed bytecode of every compiled contract."""
+    hashes = {}
+    if not os.path.isdir(build_dir):
+        return hashes
+    for name in sorted(os.listdir(build_dir)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(build_dir, name), encoding='utf-8') as f:
+            bytecode = json.load(f).get('deployedBytecode') or ''
+        if bytecode not in ('', '0x'):
+            hashes[name[:-len('.json')]] = hashlib.sha256(bytecode.encode()).hexdigest()
+    return hashes
+
+
+def record(db, sources, note=None, build_dir=BUILD_DIR):
+    """Stores a run with the per-function figures of `sources`. Returns its id."""
+    report = build_report(sources)
+    contracts = contract_hashes(build_dir)
+    combined = hashlib.sha256(''.join(f'{c}:{h}' for c, h in sorted(contracts.items())).encode()).hexdigest()
+    with db:
+        run_id = db.execute(
+            "INSERT INTO runs (created_at, git_commit, dirty, bytecode_hash, sources, note) VALUES (?, ?, ?, ?, ?, ?)",
+            (int(time.time()), _git('rev-parse', 'HEAD'), 1 if _git('status', '--porcelain') else 0,
+             combined, ','.join(sources), note),
+        ).lastrowid
+        db.executemany(
+            "INSERT INTO contracts (run_id, contract, bytecode_hash) VALUES (?, ?, ?)",
+            [(run_id, c, h) for c, h in contracts.items()],
+        )
+        for function, stats in report['operations'].items():
+            gas = stats['gas']
+            latency = report['timings'].get(function, {})
+            db.execute(
+                """INSERT INTO functions (run_id, function, samples, gas_mean, gas_p50, gas_p95, gas_max,
+                   latency_p50, latency_p95) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (run_id, function, gas['count'], gas['mean'], gas['p50'], gas['p95'], gas['max'],
+                 latency.get('p50'), latency.get('p95')),
+            )
+    return run_id
+
+
+def resolve(db, ref):
+    """Run id of `ref`: an id, 'latest', 'previous' or a commit prefix."""
+    if ref in ('latest', 'previous'):
+        rows = db.execute("SELECT id FROM runs ORDER BY id DESC LIMIT 2").fetchall()
+        index = 0 if ref == 'latest' else 1
+        if len(rows) <= index:
+            sys.exit(f"Not enough runs in the history for '{ref}'")
+        return rows[index]['id']
+    if str(ref).isdigit():
+        row = db.execute("SELECT id FROM runs WHERE id = ?", (int(ref),)).fetchone()
+    else:
+        row = db.execute(
+            "SELECT id FROM runs WHERE git_commit LIKE ? ORDER BY id DESC LIMIT 1", (f'{ref}%',)
+        ).fetchone()
+    if row is None:
+        sys.exit(f"No run '{ref}' in the history")
+    return row['id']
+
+
+def functions(db, run_id):
+    rows = db.execute("SELECT * FROM functions WHERE run_id = ? ORDER BY function", (run_id,)).fetchall()
+    return {row['function']: dict(row) for row in rows}
+
+
+def diff(db, before_id, after_id, threshold=0.0, tracked=TRACKED):
+    """
+    Per-function comparison of two runs: (function, before p50, after p50, percent, regression).
+    A regression is a tracked function whose median gas grew by more than `threshold` percent.
+    """
+    before, after = functions(db, before_id), functions(db, after_id)
+    rows = []
+    for function in sorted(set(before) & set(after)):
+        old, new = before[function]['gas_p50'], after[function]['gas_p50']
+        growth = 100.0 * (new - old) / old if old else 0.0
+        rows.append((function, old, new, growth, function in tracked and new > old and growth > threshold))
+    return rows
+
+
+def trend(db, names, metric='gas_p50'):
+    """[(run row, {function: metric})] over all the runs, oldest first, for the functions in `names`."""
+    if metric not in ('gas_mean', 'gas_p50', 'gas_p95', 'gas_max', 'latency_p50', 'latency_p95'):
+        raise ValueError(f"Unknown metric {metric}")
+    runs = db.execute("SELECT * FROM runs ORDER BY id").fetchall()
+    points = []
+    for run in runs:
+        values = {
+            row['function']: row[metric]
+            for row in db.execute(f"SELECT function, {metric} FROM functions WHERE run_id = ?", (run['id'],))
+            if row['function'] in names and row[metric] is not None
+        }
+        if values:
+            points.append((dict(run), values))
+    return points
+
+
+TREND_COLORS = ['#3498db', '#2ecc71', '#e74c3c', '#f39c12', '#9b59b6', '#1abc9c']
+
+
+def render_trend_svg(points, names, unit='gas', width=900, height=400):
+    """SVG line chart of `trend()` points: one line per function, one x position per run."""
+    if not points:
+        return '<p>No runs in the history.</p>'
+    left, right, top, bottom = 90, width - 190, 40, height - 60
+    values = [v for _, by_name in points for v in by_name.values()]
+    low, high = min(values), max(values)
+    span = (high - low) or max(high, 1)
+    low, high = max(0, low - 0.1 * span), high + 0.1 * span
+
+    def sx(i):
+        return left + (right - left) * (i / (len(points) - 1) if len(points) > 1 else 0.5)
+
+    def sy(value):
+        return bottom - (bottom - top) * (value - low) / (high - low)
+
+    parts = [f'<svg width="{width}" height="{height}" class="chart">',
+             f'<line x1="{left}" y1="{top}" x2="{left}" y2="{bottom}" stroke="black" stroke-width="2"/>',
+             f'<line x1="{left}" y1="{bottom}" x2="{right}" y2="{bottom}" stroke="black" stroke-width="2"/>',
+             f'<text x="{left - 10}" y="{sy(high) + 4:.0f}" text-anchor="end" font-size="11">{high:,.0f}</text>',
+             f'<text x="{left - 10}" y="{sy(low) + 4:.0f}" text-anchor="end" font-size="11">{low:,.0f}</text>',
+             f'<text x="20" y="{(top + bottom) / 2:.0f}" text-anchor="middle" font-weight="bold" '
+             f'transform="rotate(-90 20 {(top + bottom) / 2:.0f})">{unit}</text>']
+    for i, (run, _) in enumerate(points):
+        label = (run['git_commit'] or f"run {run['id']}")[:7] + ('*' if run['dirty'] else '')
+        parts.append(f'<text x="{sx(i):.0f}" y="{bottom + 18}" text-anchor="middle" font-size="10">{label}</text>')
+    for k, name in enumerate(names):
+        color = TREND_COLORS[k % len(TREND_COLORS)]
+        series = [(sx(i), sy(by_name[name])) for i, (_, by_name) in enumerate(points) if name in by_name]
+        if not series:
+            continue
+        if len(series) > 1:
+            path = ' '.join(f'{x:.0f},{y:.0f}' for x, y in series)
+            parts.append(f'<polyline points="{path}" fill="none" stroke="{color}" stroke-width="2"/>')
+        parts.extend(f'<circle cx="{x:.0f}" cy="{y:.0f}" r="4" fill="{color}"/>' for x, y in series)
+        parts.append(f'<text x="{right + 15}" y="{top + 18 * k + 10}" font-size="12" fill="{color}">● {name}</text>')
+    parts.append('</svg>')
+    return '\n            '.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='store a run')
+    record_parser.add_argument('sources', nargs='*', default=[DEFAULT_SOURCE])
+    record_parser.add_argument('--note')
+    commands.add_parser('list', help='list the stored runs')
+    diff_parser = commands.add_parser('diff', help='compare two runs')
+    diff_parser.add_argument('before', nargs='?', default='previous')
+    diff_parser.add_argument('after', nargs='?', default='latest')
+    diff_parser.add_argument('--threshold', type=float, default=0.0, help='allowed median gas growth (percent)')
+    diff_parser.add_argument('--track', default=','.join(TRACKED), help="','-separated functions that fail the diff")
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    if args.command == 'record':
+        run_id = record(db, args.sources, args.note)
+        print(f"Recorded run {run_id} ({len(functions(db, run_id))} functions) in {args.db}")
+
+    elif args.command == 'list':
+        for run in db.execute("SELECT * FROM runs ORDER BY id"):
+            when = time.strftime('%Y-%m-%d %H:%M', time.localtime(run['created_at']))
+            commit = (run['git_commit'] or 'no commit')[:10] + (' (dirty)' if run['dirty'] else '')
+            print(f"{run['id']:>4}  {when}  {commit:<19} bytecode {run['bytecode_hash'][:10]}  "
+                  f"{run['sources']}{'  - ' + run['note'] if run['note'] else ''}")
+
+    elif args.command == 'diff':
+        before_id, after_id = resolve(db, args.before), resolve(db, args.after)
+        tracked = [name.strip() for name in args.track.split(',') if name.strip()]
+        rows = diff(db, before_id, after_id, args.threshold, tracked)
+        print(f"Run {before_id} -> run {after_id}")
+        print(f"{'Function':<40} {'before':>12} {'after':>12} {'change':>9}")
+        for function, old, new, growth, regression in rows:
+            flag = '  ⚠️ REGRESSION' if regression else ''
+            print(f"{function[:40]:<40} {old:>12,.0f} {new:>12,.0f} {growth:>+8.1f}%{flag}")
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+        print(f"✅ No tracked function grew by more than {args.threshold}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Gas and timing report built from the test and benchmark outputs.
+
+Sources:
+  - `truffle test` console output (truffle-output.txt, UTF-8 or the UTF-16
+    written by PowerShell), read line by line: every "Gas Used: N" and
+    "<label>: N gas" figure, every mocha "(N ms)" and "<label>: N ms" timing;
+  - benchmark_scalability.py results (.csv of raw samples, or .json, which
+    uses the .csv next to it when present).
+Gas figures are grouped by operation (create, grant DS, grant DC, revoke DS,
+...) from their label, the line introducing them and the test title, and
+summarized as distributions (min, median, p95, max). The report is written
+as JSON and used by generate_gas_graph.py and generate_gas_graph_simple.py.
+
+With --baseline (the report of a previous run), every operation whose
+median gas grew by more than --threshold percent is flagged and the exit
+status is 1.
+
+Usage:
+    python gas_report.py [truffle-output.txt ...] [--out gas_report.json]
+        [--baseline previous_gas_report.json] [--threshold 0]
+"""
+
+import argparse
+import codecs
+import csv
+import json
+import os
+import re
+import statistics
+import sys
+from collections import namedtuple
+
+DEFAULT_SOURCE = 'truffle-output.txt'
+DEFAULT_OUT = 'gas_report.json'
+
+Measurement = namedtuple('Measurement', 'source test operation variant gas ms')
+
+ANSI = re.compile(r'\x1b\[[0-9;]*m')
+TEST_TITLE = re.compile(r'Test (\d+(?:\.\d+)+[a-z]?):\s*(.+?)\s*$')
+GAS_USED = re.compile(r'gas used:\s*([\d,]+)\b', re.I)
+LABELLED_GAS = re.compile(r'^[^\w(]*(.+?):\s*([\d,]+)\s*gas\b', re.I)
+MOCHA_TIME = re.compile(r'^\s*\S+\s+(.+?)\s+\((\d+)ms\)\s*$')
+LABELLED_MS = re.compile(r'^[^\w(]*(.+?):\s*([\d,.]+)\s*ms\b', re.I)
+CONFIG = re.compile(r'^(\w+) Config$', re.I)
+
+# Figures that are not the gas of one operation
+SKIPPED_LABELS = re.compile(r'difference|total', re.I)
+
+# First match wins, tested on the label, or on the line introducing a "Gas Used" figure and the test title
+OPERATION_PATTERNS = [
+    ('create', re.compile(r'config|creat|deploy|recipients', re.I)),
+    ('grant DS', re.compile(r'\b(ds|data subject)\b.*\bgrant|\bgrant.*\b(ds|data subject)\b', re.I)),
+    ('grant DC', re.compile(r'\b(dc|controller)\b.*\bgrant|\bgrant.*\b(dc|controller)\b', re.I)),
+    ('revoke DS', re.compile(r'\b(ds|data subject)\b.*\brevok|\brevok.*\b(ds|data subject)\b', re.I)),
+    ('revoke DC', re.compile(r'\b(dc|controller)\b.*\brevok|\brevok.*\b(dc|controller)\b', re.I)),
+    ('grant', re.compile(r'\bgrant', re.I)),
+    ('revoke', re.compile(r'\brevok', re.I)),
+]
+
+# Operations of the charts: label -> operations, first one with figures wins (the specific one
+# before the generic bucket, which mixes the figures of several callers)
+CHART_OPERATIONS = [
+    ('DS Grant', ('grant DS', 'grant')),
+    ('DC Grant', ('grant DC',)),
+    ('Revoke', ('revoke DS', 'revoke')),
+]
+CONFIG_ORDER = ('Minimal', 'Medium', 'Maximum')
+
+
+def classify(text):
+    for operation, pattern in OPERATION_PATTERNS:
+        if pattern.search(text):
+            return operation
+    return None
+
+
+def read_lines(path):
+    """Lines of a text file, decoded from its BOM (UTF-16 or UTF-8), without ANSI colors."""
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        encoding = 'utf-16'
+    else:
+        encoding = 'utf-8-sig'
+    with open(path, encoding=encoding, errors='replace') as f:
+        for line in f:
+            yield ANSI.sub('', line.rstrip('\r\n'))
+
+
+def parse_test_output(path):
+    """Yields the gas and timing Measurements of a truffle test console output."""
+    test = title = intro = None
+    for line in read_lines(path):
+        stripped = line.strip()
+        match = TEST_TITLE.search(stripped)
+        if match:
+            if match.group(1) != test:
+                intro = None
+            test, title = match.groups()
+            continue
+
+        match = GAS_USED.search(stripped)
+        if match:
+            context = f"{intro or ''} {title or ''}"
+            operation = classify(context) or f"Test {test}: {title}"
+            yield Measurement(path, test, operation, None, int(match.group(1).replace(',', '')), None)
+            continue
+
+        match = LABELLED_GAS.match(stripped)
+        if match:
+            label = match.group(1).strip()
+            if not SKIPPED_LABELS.search(label):
+                config = CONFIG.match(label)
+                operation = classify(label) or label
+                yield Measurement(path, test, operation, config.group(1).capitalize() if config else None,
+                                  int(match.group(2).replace(',', '')), None)
+            continue
+
+        match = MOCHA_TIME.match(line)
+        if match:
+            yield Measurement(path, test, match.group(1), None, None, float(match.group(2)))
+            continue
+
+        match = LABELLED_MS.match(stripped)
+        if match:
+            yield Measurement(path, test, match.group(1).strip(), None, None, float(match.group(2).replace(',', '')))
+            continue
+
+        # Line introducing the next figures ("Data Subject revoking consent...", "Deployment Results:")
+        if stripped.endswith((':', '...')):
+            intro = stripped
+
+
+def parse_benchmark(path):
+    """Yields the Measurements of benchmark_scalability.py results (.csv samples or .json summaries)."""
+    root, ext = os.path.splitext(path)
+    if ext == '.json' and os.path.exists(root + '.csv'):
+        path, ext = root + '.csv', '.csv'
+    if ext == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield Measurement(path, None, row['operation'], None, int(row['gas']), float(row['latency_ms']))
+        return
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    # One mean per run and operation when the raw samples are not available
+    for run in results['runs']:
+        for operation, stats in run['operations'].items():
+            yield Measurement(path, None, operation, None, round(stats['gas']['mean']), stats['latency_ms']['mean'])
+
+
+def parse(path):
+    if path.endswith(('.json', '.csv')):
+        return parse_benchmark(path)
+    return parse_test_output(path)
+
+
+def distribution(values):
+    values = sorted(values)
+    summary = {'count': len(values), 'min': values[0], 'max': values[-1],
+               'mean': statistics.fmean(values), 'p50': statistics.median(values)}
+    if len(values) > 1:
+        cuts = statistics.quantiles(values, n=100, method='inclusive')
+        summary['p95'], summary['p99'] = cuts[94], cuts[98]
+    else:
+        summary['p95'] = summary['p99'] = values[0]
+    return summary
+
+
+def build_report(paths):
+    """Per-operation gas distributions, per-variant medians and timings of all the sources."""
+    gas, variants, timings = {}, {}, {}
+    for path in paths:
+        for m in parse(path):
+            if m.gas is not None:
+                gas.setdefault(m.operation, []).append(m.gas)
+                if m.variant:
+                    variants.setdefault(m.operation, {}).setdefault(m.variant, []).append(m.gas)
+            if m.ms is not None:
+                timings.setdefault(m.operation, []).append(m.ms)
+    return {
+        'sources': list(paths),
+        'operations': {op: {'gas': distribution(values)} for op, values in sorted(gas.items())},
+        'variants': {op: {v: statistics.median(values) for v, values in sorted(by_variant.items())}
+                     for op, by_variant in variants.items()},
+        'timings': {label: distribution(values) for label, values in sorted(timings.items())},
+    }
+
+
+def chart_data(report):
+    """(configurations, creation gas, operations, operation gas) of the gas graphs, as medians."""
+    configs = report['variants'].get('create', {})
+    missing = [c for c in CONFIG_ORDER if c not in configs]
+    if missing:
+        sys.exit(f"No '{' / '.join(missing)} Config' creation figures in {', '.join(report['sources'])} "
+                 "(Test 1.1.3 output is needed for the configuration chart)")
+    operations, operation_gas = [], []
+    for label, candidates in CHART_OPERATIONS:
+        for operation in candidates:
+            if operation in report['operations']:
+                operations.append(label)
+                operation_gas.append(round(report['operations'][operation]['gas']['p50']))
+                break
+        else:
+            sys.exit(f"No {label} gas figures in {', '.join(report['sources'])}")
+    return list(CONFIG_ORDER), [round(configs[c]) for c in CONFIG_ORDER], operations, operation_gas
+
+
+def regressions(baseline, report, threshold=0.0):
+    """Operations whose median gas grew by more than `threshold` percent: (operation, before, after, percent)."""
+    flagged = []
+    for operation, stats in report['operations'].items():
+        previous = baseline['operations'].get(operation)
+        if previous is None:
+            continue
+        before, after = previous['gas']['p50'], stats['gas']['p50']
+        growth = 100.0 * (after - before) / before if before else 0.0
+        if after > before and growth > threshold:
+            flagged.append((operation, before, after, growth))
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='*', default=[DEFAULT_SOURCE])
+    parser.add_argument('--out', default=DEFAULT_OUT)
+    parser.add_argument('--baseline', help='report of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.0, help='allowed median gas growth (percent)')
+    args = parser.parse_args()
+
+    report = build_report(args.sources)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'Operation':<50} {'n':>4} {'min':>11} {'median':>11} {'p95':>11} {'max':>11}")
+    for operation, stats in report['operations'].items():
+        gas = stats['gas']
+        print(f"{operation[:50]:<50} {gas['count']:>4} {gas['min']:>11,.0f} {gas['p50']:>11,.0f} "
+              f"{gas['p95']:>11,.0f} {gas['max']:>11,.0f}")
+    print(f"\n{len(report['timings'])} timings, report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        flagged = regressions(baseline, report, args.threshold)
+        for operation, before, after, growth in flagged:
+            print(f"⚠️  REGRESSION {operation}: {before:,.0f} -> {after:,.0f} gas (+{growth:.1f}%)")
+        if flagged:
+            sys.exit(1)
+        print(f"✅ No operation grew by more than {args.threshold}% against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,21 @@
+# Usage: python generate_gas_graph.py [truffle-output.txt | benchmark results ...]
+import sys
 import matplotlib
 matplotlib.use('Agg')  # Use non-GUI backend to avoid display issues
 import matplotlib.pyplot as plt
 import warnings
 warnings.filterwarnings('ignore')  # Suppress numpy warnings
 
-# Gas cost data from truffle-output.txt (Test 1.1.3)
-configurations = ['Minimal\nConfig', 'Medium\nConfig', 'Maximum\nConfig']
-gas_costs = [3124774, 3170038, 3237969]
+from gas_report import DEFAULT_SOURCE, build_report, chart_data
+
+# Gas cost data parsed from truffle-output.txt (Test 1.1.3 and the operation tests), medians per operation
+report = build_report(sys.argv[1:] or [DEFAULT_SOURCE])
+config_names, gas_costs, operation_names, operation_costs = chart_data(report)
+configurations = [f'{name}\nConfig' for name in config_names]
 
 # Additional operation gas costs for reference
-operations = ['Create\n(Minimal)', 'Create\n(Medium)', 'Create\n(Maximum)', 'DS Grant', 'DC Grant', 'Revoke']
-operation_gas = [3124774, 3170038, 3237969, 28058, 30913, 26168]
+operations = [f'Create\n({name})' for name in config_names] + operation_names
+operation_gas = gas_costs + operation_costs
 
 # Calculate USD costs at different gas prices (ETH at $2000)
 eth_price = 2000
@@ -1,13 +1,27 @@
 """
 Generate gas cost graphs without external dependencies (matplotlib issues on Windows)
 Creates an HTML file with embedded SVG charts
+
+Usage: python generate_gas_graph_simple.py [truffle-output.txt | benchmark results ...]
+    [--history benchmark_results/gas_history.db]
+
+With --history, the median gas of the charted operations is also plotted
+across the runs stored by gas_history.py.
 """
 
-# Gas cost data from truffle-output.txt
-configurations = ['Minimal', 'Medium', 'Maximum']
-gas_costs = [3124774, 3170038, 3237969]
-operations = ['DS Grant', 'DC Grant', 'Revoke']
-operation_gas = [28058, 30913, 26168]
+import argparse
+from datetime import date
+
+from gas_report import DEFAULT_SOURCE, build_report, chart_data
+
+parser = argparse.ArgumentParser()
+parser.add_argument('sources', nargs='*', default=[DEFAULT_SOURCE])
+parser.add_argument('--history', help='gas_history.py database to plot the trend of')
+args = parser.parse_args()
+
+# Gas cost data parsed from truffle-output.txt (medians per operation, see gas_report.py)
+report = build_report(args.sources)
+configurations, gas_costs, operations, operation_gas = chart_data(report)
 
 # Calculate costs
 eth_price = 2000
@@ -16,82 +30,127 @@ gwei_to_eth = 1e-9
 def gas_to_usd(gas, gwei_price):
     return gas * gwei_price * gwei_to_eth * eth_price
 
+
+# Chart 1: creation bars between y=100 (highest) and y=400, on a scale starting just below the cheapest
+CONFIG_COLORS = ['#3498db', '#2ecc71', '#e74c3c']
+scale_min = min(gas_costs) * 0.9
+scale_max = max(gas_costs)
+config_svg = ""
+for i, (config, gas, color) in enumerate(zip(configurations, gas_costs, CONFIG_COLORS)):
+    x = 150 + 225 * i
+    height = 300 * (gas - scale_min) / (scale_max - scale_min)
+    y = 400 - height
+    config_svg += f"""
+            <rect x="{x}" y="{y:.0f}" width="150" height="{height:.0f}" fill="{color}" class="bar"/>
+            <text x="{x + 75}" y="{y - 15:.0f}" text-anchor="middle" font-weight="bold">{gas:,}</text>
+            <text x="{x + 75}" y="430" text-anchor="middle" font-size="14">{config} Config</text>"""
+
+# Chart 2: operation bars at their own scale (28K gas = 25 px), creation drawn cut
+OPERATION_COLORS = ['#f39c12', '#9b59b6', '#1abc9c']
+px_per_gas = 25 / 28000
+operation_svg = ""
+for i, (op, gas, color) in enumerate(zip(operations, operation_gas, OPERATION_COLORS)):
+    x = 300 + 150 * i
+    height = gas * px_per_gas
+    operation_svg += f"""
+            <rect x="{x}" y="{380 - height:.0f}" width="80" height="{height:.0f}" fill="{color}" class="bar"/>
+            <text x="{x + 40}" y="390" text-anchor="middle" font-size="11">{op}</text>
+            <text x="{x + 40}" y="{370 - height:.0f}" text-anchor="middle" font-weight="bold" font-size="11">{gas:,}</text>"""
+
+creation_ratio = gas_costs[1] / max(operation_gas)
+diff_total = gas_costs[2] - gas_costs[0]
+diff_percent = (diff_total / gas_costs[0]) * 100
+
+# Per-operation distributions of every parsed figure
+distribution_rows = ""
+for op, stats in report['operations'].items():
+    gas = stats['gas']
+    distribution_rows += f"""
+                <tr>
+                    <td>{op}</td>
+                    <td>{gas['count']}</td>
+                    <td>{gas['min']:,.0f}</td>
+                    <td>{gas['p50']:,.0f}</td>
+                    <td>{gas['p95']:,.0f}</td>
+                    <td>{gas['max']:,.0f}</td>
+                </tr>"""
+
 # Create HTML with SVG charts
-html_content = """
+html_content = f"""
 <!DOCTYPE html>
 <html>
 <head>
     <title>Gas Cost Analysis - GDPR Blockchain Research</title>
     <style>
-        body {
+        body {{
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             max-width: 1400px;
             margin: 40px auto;
             padding: 20px;
             background: #f5f5f5;
-        }
-        .container {
+        }}
+        .container {{
             background: white;
             padding: 30px;
             border-radius: 10px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
             margin-bottom: 30px;
-        }
-        h1 {
+        }}
+        h1 {{
             color: #2c3e50;
             border-bottom: 3px solid #3498db;
             padding-bottom: 10px;
-        }
-        h2 {
+        }}
+        h2 {{
             color: #34495e;
             margin-top: 30px;
-        }
-        .chart {
+        }}
+        .chart {{
             margin: 30px 0;
-        }
-        .bar {
+        }}
+        .bar {{
             transition: opacity 0.3s;
-        }
-        .bar:hover {
+        }}
+        .bar:hover {{
             opacity: 0.8;
-        }
-        .summary {
+        }}
+        .summary {{
             background: #ecf0f1;
             padding: 20px;
             border-radius: 5px;
             margin: 20px 0;
             font-family: 'Courier New', monospace;
-        }
-        .insight {
+        }}
+        .insight {{
             background: #e8f8f5;
             border-left: 4px solid #27ae60;
             padding: 15px;
             margin: 15px 0;
-        }
-        table {
+        }}
+        table {{
             width: 100%;
             border-collapse: collapse;
             margin: 20px 0;
-        }
-        th, td {
+        }}
+        th, td {{
             padding: 12px;
             text-align: left;
             border-bottom: 1px solid #ddd;
-        }
-        th {
+        }}
+        th {{
             background: #34495e;
             color: white;
-        }
-        tr:hover {
+        }}
+        tr:hover {{
             background: #f5f5f5;
-        }
+        }}
     </style>
 </head>
 <body>
     <div class="container">
         <h1>⛽ Gas Cost Analysis: Blockchain GDPR Compliance</h1>
-        <p><strong>Source:</strong> Test Suite 1.1.3 - Consent Creation Gas Consumption Analysis</p>
-        <p><strong>Date:</strong> November 20, 2025</p>
+        <p><strong>Source:</strong> {', '.join(report['sources'])} (Test Suite 1.1.3 - Consent Creation Gas Consumption Analysis, medians per operation)</p>
+        <p><strong>Date:</strong> {date.today():%B %d, %Y}</p>
         
         <h2>📊 Chart 1: Gas Costs vs Configuration Complexity</h2>
         <svg width="900" height="500" class="chart">
@@ -100,20 +159,7 @@ html_content = """
                 Consent Creation: Gas Costs vs Configuration Complexity
             </text>
             
-            <!-- Bars -->
-            <rect x="150" y="170" width="150" height="230" fill="#3498db" class="bar"/>
-            <rect x="375" y="149" width="150" height="251" fill="#2ecc71" class="bar"/>
-            <rect x="600" y="115" width="150" height="285" fill="#e74c3c" class="bar"/>
-            
-            <!-- Value labels -->
-            <text x="225" y="155" text-anchor="middle" font-weight="bold">3,124,774</text>
-            <text x="450" y="134" text-anchor="middle" font-weight="bold">3,170,038</text>
-            <text x="675" y="100" text-anchor="middle" font-weight="bold">3,237,969</text>
-            
-            <!-- X-axis labels -->
-            <text x="225" y="430" text-anchor="middle" font-size="14">Minimal Config</text>
-            <text x="450" y="430" text-anchor="middle" font-size="14">Medium Config</text>
-            <text x="675" y="430" text-anchor="middle" font-size="14">Maximum Config</text>
+            <!-- Bars, value and X-axis labels -->{config_svg}
             
             <!-- Y-axis -->
             <line x1="100" y1="100" x2="100" y2="400" stroke="black" stroke-width="2"/>
@@ -125,14 +171,14 @@ html_content = """
             <!-- Cost info box -->
             <rect x="550" y="250" width="220" height="80" fill="#fff3cd" stroke="#856404" rx="5"/>
             <text x="660" y="275" text-anchor="middle" font-size="12" font-weight="bold">Cost @ ETH $2,000</text>
-            <text x="660" y="295" text-anchor="middle" font-size="11">10 Gwei: $62.50 - $64.76</text>
-            <text x="660" y="310" text-anchor="middle" font-size="11">100 Gwei: $624.95 - $647.59</text>
-            <text x="660" y="325" text-anchor="middle" font-size="10" fill="#666">(+3.6% complexity cost)</text>
+            <text x="660" y="295" text-anchor="middle" font-size="11">10 Gwei: ${gas_to_usd(gas_costs[0], 10):.2f} - ${gas_to_usd(gas_costs[2], 10):.2f}</text>
+            <text x="660" y="310" text-anchor="middle" font-size="11">100 Gwei: ${gas_to_usd(gas_costs[0], 100):.2f} - ${gas_to_usd(gas_costs[2], 100):.2f}</text>
+            <text x="660" y="325" text-anchor="middle" font-size="10" fill="#666">(+{diff_percent:.1f}% complexity cost)</text>
         </svg>
         
         <div class="insight">
-            <strong>💡 Key Insight:</strong> Configuration complexity adds ~113K gas (+3.6%), meaning the difference between 
-            minimal and maximum complexity is only about $1.25 at typical gas prices. The deployment cost itself 
+            <strong>💡 Key Insight:</strong> Configuration complexity adds ~{diff_total / 1000:.0f}K gas (+{diff_percent:.1f}%), meaning the difference between 
+            minimal and maximum complexity is only about ${gas_to_usd(diff_total, 10):.2f} at 10 Gwei. The deployment cost itself 
             (~$6-65 depending on network congestion) is the main expense.
         </div>
         
@@ -147,24 +193,13 @@ html_content = """
             <rect x="100" y="100" width="120" height="280" fill="#3498db" opacity="0.3"/>
             <rect x="100" y="100" width="40" height="280" fill="#3498db" class="bar"/>
             <text x="120" y="390" text-anchor="middle" font-size="11">Create</text>
-            <text x="120" y="80" text-anchor="middle" font-weight="bold" font-size="12">~3.1M gas</text>
-            
-            <!-- Grant/Revoke bars (actual scale) -->
-            <rect x="300" y="355" width="80" height="25" fill="#f39c12" class="bar"/>
-            <text x="340" y="390" text-anchor="middle" font-size="11">DS Grant</text>
-            <text x="340" y="345" text-anchor="middle" font-weight="bold" font-size="11">28,058</text>
+            <text x="120" y="80" text-anchor="middle" font-weight="bold" font-size="12">~{gas_costs[1] / 1e6:.1f}M gas</text>
             
-            <rect x="450" y="350" width="80" height="30" fill="#9b59b6" class="bar"/>
-            <text x="490" y="390" text-anchor="middle" font-size="11">DC Grant</text>
-            <text x="490" y="340" text-anchor="middle" font-weight="bold" font-size="11">30,913</text>
-            
-            <rect x="600" y="357" width="80" height="23" fill="#1abc9c" class="bar"/>
-            <text x="640" y="390" text-anchor="middle" font-size="11">Revoke</text>
-            <text x="640" y="347" text-anchor="middle" font-weight="bold" font-size="11">26,168</text>
+            <!-- Grant/Revoke bars (actual scale) -->{operation_svg}
             
             <!-- Comparison arrow -->
             <text x="450" y="200" text-anchor="middle" font-size="16" fill="#e74c3c" font-weight="bold">
-                ⚠️ Creation is ~110x more expensive!
+                ⚠️ Creation is ~{creation_ratio:.0f}x more expensive!
             </text>
             
             <!-- Axes -->
@@ -173,8 +208,8 @@ html_content = """
         </svg>
         
         <div class="insight">
-            <strong>💡 Key Insight:</strong> Grant and revoke operations are ~110x cheaper than creation (under 31K gas vs 3.1M gas). 
-            This means once a consent contract is deployed, ongoing consent management is extremely affordable (~$0.06 per operation).
+            <strong>💡 Key Insight:</strong> Grant and revoke operations are ~{creation_ratio:.0f}x cheaper than creation (under {max(operation_gas) / 1000:.0f}K gas vs {gas_costs[1] / 1e6:.1f}M gas). 
+            This means once a consent contract is deployed, ongoing consent management is extremely affordable (~${gas_to_usd(max(operation_gas), 1):.2f} per operation at 1 Gwei).
         </div>
         
         <h2>📋 Detailed Gas Cost Table</h2>
@@ -214,12 +249,37 @@ for op, gas in zip(operations, operation_gas):
                 </tr>
 """
 
-diff_total = gas_costs[2] - gas_costs[0]
-diff_percent = (diff_total / gas_costs[0]) * 100
+# Trend across the stored runs (gas_history.py)
+trend_section = ""
+if args.history:
+    from gas_history import connect, render_trend_svg, trend
+    trend_names = ['create', 'grant DS', 'grant DC', 'revoke', 'revoke DS']
+    trend_points = trend(connect(args.history), trend_names)
+    trend_section = f"""
+        <h2>📉 Median Gas Across Runs</h2>
+        <p>{len(trend_points)} run(s) from <code>{args.history}</code>, oldest first (* = uncommitted changes).</p>
+        {render_trend_svg(trend_points, trend_names)}
+"""
 
 html_content += f"""
             </tbody>
         </table>
+{trend_section}
+        <h2>📊 Per-Operation Gas Distributions</h2>
+        <table>
+            <thead>
+                <tr>
+                    <th>Operation</th>
+                    <th>Figures</th>
+                    <th>Min</th>
+                    <th>Median</th>
+                    <th>p95</th>
+                    <th>Max</th>
+                </tr>
+            </thead>
+            <tbody>{distribution_rows}
+            </tbody>
+        </table>
         
         <h2>📈 Summary Statistics</h2>
         <div class="summary">
@@ -1,14 +1,205 @@
 """
 Generate scalability graph showing consent creation time vs number of consents
-Based on Test 2.9.1: Batch Consent Creation & Granting
+Based on the measured points of benchmark_scalability.py (JSON results):
+every run of the sweep is a point, the trend line is a least-squares fit of them.
+
+Usage:
+    python benchmark_scalability.py --consents 1,10,20,50,100 --processors 1 --purposes 1
+    python generate_scalability_graph.py [benchmark_results/scalability.json] [--processors 1] [--purposes 1]
 """
 
-html_content = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>Scalability Analysis: Consent Creation Time vs Number of Consents</title>
-    <style>
+import argparse
+import json
+import sys
+
+DEFAULT_RESULTS = 'benchmark_results/scalability.json'
+OUTPUT = 'consent_creation_scalability.html'
+
+ETH_PRICE = 2000
+GAS_PRICE_GWEI = 10
+GWEI_TO_ETH = 1e-9
+
+# Consent counts of the extrapolation table
+EXTRAPOLATED = [1, 10, 20, 50, 100, 500, 1000]
+
+# Lifecycle operations of Test 2.9.1: create and grant a consent
+LIFECYCLE = [('create', 'Contract Creation'), ('grant DS', 'DS Grant'), ('grant DC', 'DC Grant')]
+
+# SVG plot area
+X0, X1, Y0, Y1 = 100, 1100, 500, 100
+
+
+def gas_to_usd(gas, gwei_price=GAS_PRICE_GWEI):
+    return gas * gwei_price * GWEI_TO_ETH * ETH_PRICE
+
+
+def format_duration(ms):
+    seconds = ms / 1000
+    if seconds < 120:
+        return f"{seconds:.2f} seconds"
+    if seconds < 7200:
+        return f"{seconds / 60:.2f} minutes"
+    return f"{seconds / 3600:.2f} hours"
+
+
+def usability(ms):
+    seconds = ms / 1000
+    for limit, label in ((5, '✅ Good'), (10, '✅ Acceptable'), (30, '⚠️ Marginal'),
+                         (60, '⚠️ User fatigue'), (300, '❌ Impractical')):
+        if seconds <= limit:
+            return label
+    return '❌ Unfeasible'
+
+
+def load_points(path, processors=None, purposes=None):
+    """(consents, lifecycle ms) of the runs with the given processors/purposes (default: the smallest)."""
+    with open(path, encoding='utf-8') as f:
+        results = json.load(f)
+    runs = results['runs']
+    if not runs:
+        sys.exit(f"No runs in {path}")
+    processors = min(r['processors'] for r in runs) if processors is None else processors
+    purposes = min(r['purposes'] for r in runs) if purposes is None else purposes
+    selected = sorted((r for r in runs if r['processors'] == processors and r['purposes'] == purposes),
+                      key=lambda r: r['consents'])
+    if not selected:
+        sys.exit(f"No runs with {processors} processors and {purposes} purposes in {path}")
+    points = [(r['consents'], r['lifecycle_ms']) for r in selected]
+    return results, points, processors, purposes
+
+
+def fit(points):
+    """Least-squares line through the measured points: (ms per consent, intercept ms)."""
+    if len(points) == 1:
+        n, ms = points[0]
+        return ms / n, 0.0
+    mean_x = sum(n for n, _ in points) / len(points)
+    mean_y = sum(ms for _, ms in points) / len(points)
+    sxx = sum((n - mean_x) ** 2 for n, _ in points)
+    sxy = sum((n - mean_x) * (ms - mean_y) for n, ms in points)
+    slope = sxy / sxx
+    return slope, mean_y - slope * mean_x
+
+
+def nice_step(maximum, ticks=5):
+    raw = maximum / ticks
+    magnitude = 10 ** (len(str(int(raw))) - 1) if raw >= 1 else 1
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def render_svg(points, slope, intercept):
+    max_x = max(100, max(n for n, _ in points))
+    predicted_max = (slope * max_x + intercept) / 1000
+    max_y = max(predicted_max, max(ms for _, ms in points) / 1000) * 1.1
+    x_step, y_step = nice_step(max_x), nice_step(max_y)
+    max_x = x_step * -(-max_x // x_step)
+    max_y = y_step * -(-max_y // y_step)
+
+    def sx(n):
+        return X0 + (X1 - X0) * n / max_x
+
+    def sy(seconds):
+        return Y0 - (Y0 - Y1) * seconds / max_y
+
+    parts = [
+        f'<line x1="{X0}" y1="{Y0}" x2="{X1}" y2="{Y0}" stroke="#34495e" stroke-width="2"/>',
+        f'<line x1="{X0}" y1="{Y1}" x2="{X0}" y2="{Y0}" stroke="#34495e" stroke-width="2"/>',
+    ]
+    tick = 0
+    while tick <= max_x:
+        x = sx(tick)
+        parts.append(f'<text x="{x:.0f}" y="530" text-anchor="middle" font-size="12">{tick:g}</text>')
+        if 0 < tick:
+            parts.append(f'<line x1="{x:.0f}" y1="{Y1}" x2="{x:.0f}" y2="{Y0}" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>')
+        tick += x_step
+    tick = 0
+    while tick <= max_y:
+        y = sy(tick)
+        parts.append(f'<text x="80" y="{y + 5:.0f}" text-anchor="end" font-size="12">{tick:g}</text>')
+        if 0 < tick:
+            parts.append(f'<line x1="{X0}" y1="{y:.0f}" x2="{X1}" y2="{y:.0f}" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>')
+        tick += y_step
+
+    # Fitted trend line
+    parts.append(f'<!-- Least-squares fit: {slope:.1f} ms per consent + {intercept:.1f} ms -->')
+    parts.append(f'<line x1="{sx(0):.0f}" y1="{sy(max(intercept, 0) / 1000):.0f}" x2="{sx(max_x):.0f}" '
+                 f'y2="{sy((slope * max_x + intercept) / 1000):.0f}" stroke="#3498db" stroke-width="3"/>')
+
+    # Measured points
+    for n, ms in points:
+        x, y = sx(n), sy(ms / 1000)
+        parts.append(f'<!-- {n} consents = {ms / 1000:.3f}s (measured) -->')
+        parts.append(f'<circle cx="{x:.0f}" cy="{y:.0f}" r="8" fill="#e74c3c" class="data-point"/>')
+        parts.append(f'<text x="{x:.0f}" y="{y - 14:.0f}" text-anchor="middle" font-size="12" '
+                     f'font-weight="bold" fill="#e74c3c">{ms / 1000:.1f}s</text>')
+    return '\n            '.join(parts)
+
+
+def render_breakdown(results, processors, purposes):
+    run_operations = {}
+    for run in results['runs']:
+        if run['processors'] == processors and run['purposes'] == purposes:
+            for name, _ in LIFECYCLE:
+                stats = run['operations'].get(name)
+                if stats:
+                    entry = run_operations.setdefault(name, {'gas': 0.0, 'ms': 0.0, 'count': 0})
+                    count = stats['gas']['count']
+                    entry['gas'] += stats['gas']['mean'] * count
+                    entry['ms'] += stats['latency_ms']['mean'] * count
+                    entry['count'] += count
+    averages = {name: (e['gas'] / e['count'], e['ms'] / e['count']) for name, e in run_operations.items()}
+    total_gas = sum(gas for gas, _ in averages.values())
+    total_ms = sum(ms for _, ms in averages.values())
+
+    rows = []
+    for name, label in LIFECYCLE:
+        if name not in averages:
+            continue
+        gas, ms = averages[name]
+        rows.append(f"""<tr>
+                    <td><strong>{label}</strong></td>
+                    <td>{gas:,.0f} gas</td>
+                    <td>{ms:.1f} ms</td>
+                    <td>{100 * ms / total_ms:.1f}%</td>
+                </tr>""")
+    rows.append(f"""<tr class="highlight">
+                    <td><strong>Total per Consent</strong></td>
+                    <td>{total_gas:,.0f} gas</td>
+                    <td><strong>{total_ms:.1f} ms</strong></td>
+                    <td>100%</td>
+                </tr>""")
+    return '\n                '.join(rows), total_gas
+
+
+def render_extrapolation(points, slope, intercept, gas_per_consent):
+    measured = dict(points)
+    rows = []
+    for n in sorted(set(EXTRAPOLATED) | set(measured)):
+        ms = measured.get(n, slope * n + intercept)
+        gas = gas_per_consent * n
+        if n in measured:
+            rows.append(f"""<tr class="highlight">
+                    <td><strong>{n:,} (measured)</strong></td>
+                    <td><strong>{format_duration(ms)}</strong></td>
+                    <td><strong>{gas:,.0f}</strong></td>
+                    <td><strong>${gas_to_usd(gas):,.2f}</strong></td>
+                    <td><strong>{usability(ms)}</strong></td>
+                </tr>""")
+        else:
+            rows.append(f"""<tr>
+                    <td>{n:,}</td>
+                    <td>{format_duration(ms)}</td>
+                    <td>{gas:,.0f}</td>
+                    <td>${gas_to_usd(gas):,.2f}</td>
+                    <td>{usability(ms)}</td>
+                </tr>""")
+    return '\n                '.join(rows)
+
+
+STYLE = """
         body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             max-width: 1400px;
@@ -71,138 +262,67 @@ html_content = """
             background: #e8f8f5;
             font-weight: bold;
         }
-    </style>
+"""
+
+
+def render_history(path):
+    """Latency trend of the creation operations across the runs stored by gas_history.py."""
+    from gas_history import connect, render_trend_svg, trend
+    names = ['create', 'grant DS', 'grant DC']
+    points = trend(connect(path), names, metric='latency_p50')
+    return f"""
+        <h2>📉 Median Latency Across Runs</h2>
+        <p>{len(points)} run(s) from <code>{path}</code>, oldest first (* = uncommitted changes).</p>
+        {render_trend_svg(points, names, unit='ms')}
+"""
+
+
+def render(results, points, processors, purposes, source, history=''):
+    slope, intercept = fit(points)
+    breakdown, gas_per_consent = render_breakdown(results, processors, purposes)
+    largest_n, largest_ms = points[-1]
+    meta = results.get('meta', {})
+    minutes_1000 = (slope * 1000 + intercept) / 60000
+    hours_10000 = (slope * 10000 + intercept) / 3600000
+
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Scalability Analysis: Consent Creation Time vs Number of Consents</title>
+    <style>{STYLE}    </style>
 </head>
 <body>
     <div class="container">
         <h1>📈 Scalability Analysis: Consent Creation Performance</h1>
-        
+
         <div class="info-box">
-            <strong>📊 Test Source:</strong> Phase 2, Suite 2.9, Test 2.9.1 - Batch Consent Creation & Granting<br>
-            <strong>🔬 Test Configuration:</strong> 20 consents created and granted (DS + DC)<br>
-            <strong>⏱️ Total Time:</strong> 7,788 ms (7.8 seconds)<br>
-            <strong>⚡ Average per Consent:</strong> 389.4 ms
+            <strong>📊 Test Source:</strong> <code>{source}</code> (benchmark_scalability.py on {meta.get('chain', 'unknown chain')}, commit {(meta.get('commit') or 'unknown')[:10]})<br>
+            <strong>🔬 Test Configuration:</strong> {', '.join(str(n) for n, _ in points)} consents created and granted (DS + DC), {processors} processor(s) x {purposes} purpose(s) each<br>
+            <strong>⏱️ Largest Run:</strong> {largest_n} consents in {largest_ms:,.0f} ms ({largest_ms / 1000:.1f} seconds)<br>
+            <strong>⚡ Fitted Cost per Consent:</strong> {slope:.1f} ms (least squares over {len(points)} measured point(s))
         </div>
 
         <h2>📊 Linear Scaling Analysis</h2>
-        
+
         <svg width="1200" height="600" style="margin: 20px 0;">
-            <!-- Title -->
             <text x="600" y="30" text-anchor="middle" font-size="20" font-weight="bold" fill="#2c3e50">
                 Consent Creation Time vs Number of Consents
             </text>
             <text x="600" y="55" text-anchor="middle" font-size="14" fill="#666">
-                Average: 389.4 ms per consent | Linear Scaling Model
+                Measured points (red) | Fitted: {slope:.1f} ms per consent
             </text>
-            
-            <!-- Axes -->
-            <line x1="100" y1="500" x2="1100" y2="500" stroke="#34495e" stroke-width="2"/>
-            <line x1="100" y1="100" x2="100" y2="500" stroke="#34495e" stroke-width="2"/>
-            
-            <!-- X-axis labels (Number of Consents) -->
-            <text x="100" y="530" text-anchor="middle" font-size="12">0</text>
-            <text x="300" y="530" text-anchor="middle" font-size="12">20</text>
-            <text x="500" y="530" text-anchor="middle" font-size="12">40</text>
-            <text x="700" y="530" text-anchor="middle" font-size="12">60</text>
-            <text x="900" y="530" text-anchor="middle" font-size="12">80</text>
-            <text x="1100" y="530" text-anchor="middle" font-size="12">100</text>
-            
-            <!-- X-axis title -->
             <text x="600" y="560" text-anchor="middle" font-size="16" font-weight="bold">
                 Number of Consents
             </text>
-            
-            <!-- Y-axis labels (Time in seconds) -->
-            <text x="80" y="505" text-anchor="end" font-size="12">0</text>
-            <text x="80" y="420" text-anchor="end" font-size="12">10</text>
-            <text x="80" y="335" text-anchor="end" font-size="12">20</text>
-            <text x="80" y="250" text-anchor="end" font-size="12">30</text>
-            <text x="80" y="165" text-anchor="end" font-size="12">40</text>
-            
-            <!-- Y-axis title -->
             <text x="40" y="300" text-anchor="middle" font-size="16" font-weight="bold" transform="rotate(-90 40 300)">
                 Total Time (seconds)
             </text>
-            
-            <!-- Grid lines -->
-            <line x1="100" y1="420" x2="1100" y2="420" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            <line x1="100" y1="335" x2="1100" y2="335" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            <line x1="100" y1="250" x2="1100" y2="250" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            <line x1="100" y1="165" x2="1100" y2="165" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            
-            <line x1="300" y1="100" x2="300" y2="500" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            <line x1="500" y1="100" x2="500" y2="500" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            <line x1="700" y1="100" x2="700" y2="500" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            <line x1="900" y1="100" x2="900" y2="500" stroke="#ddd" stroke-width="1" stroke-dasharray="5,5"/>
-            
-            <!-- Linear trend line (389.4ms per consent) -->
-            <!-- 20 consents = 7788ms = 7.79s at y=434 (scale: 1s = 8.5px from bottom) -->
-            <line x1="100" y1="500" x2="1100" y2="169" stroke="#3498db" stroke-width="3"/>
-            
-            <!-- Data points (extrapolated from linear model) -->
-            <!-- 0 consents = 0s -->
-            <circle cx="100" cy="500" r="6" fill="#95a5a6" class="data-point"/>
-            
-            <!-- 10 consents = 3.894s -->
-            <circle cx="200" cy="467" r="6" fill="#3498db" class="data-point"/>
-            <text x="200" y="455" text-anchor="middle" font-size="11" fill="#3498db">3.9s</text>
-            
-            <!-- 20 consents = 7.788s (ACTUAL TEST DATA) -->
-            <circle cx="300" cy="434" r="8" fill="#e74c3c" class="data-point"/>
-            <text x="300" y="420" text-anchor="middle" font-size="12" font-weight="bold" fill="#e74c3c">7.8s ⭐</text>
-            <text x="300" y="410" text-anchor="middle" font-size="10" fill="#e74c3c">(Test Data)</text>
-            
-            <!-- 30 consents = 11.682s -->
-            <circle cx="400" cy="401" r="6" fill="#3498db" class="data-point"/>
-            <text x="400" y="389" text-anchor="middle" font-size="11" fill="#3498db">11.7s</text>
-            
-            <!-- 40 consents = 15.576s -->
-            <circle cx="500" cy="368" r="6" fill="#3498db" class="data-point"/>
-            <text x="500" y="356" text-anchor="middle" font-size="11" fill="#3498db">15.6s</text>
-            
-            <!-- 50 consents = 19.47s -->
-            <circle cx="600" cy="335" r="6" fill="#3498db" class="data-point"/>
-            <text x="600" y="323" text-anchor="middle" font-size="11" fill="#3498db">19.5s</text>
-            
-            <!-- 60 consents = 23.364s -->
-            <circle cx="700" cy="302" r="6" fill="#3498db" class="data-point"/>
-            <text x="700" y="290" text-anchor="middle" font-size="11" fill="#3498db">23.4s</text>
-            
-            <!-- 80 consents = 31.152s -->
-            <circle cx="900" cy="235" r="6" fill="#f39c12" class="data-point"/>
-            <text x="900" y="223" text-anchor="middle" font-size="11" fill="#f39c12">31.2s</text>
-            
-            <!-- 100 consents = 38.94s -->
-            <circle cx="1100" cy="169" r="6" fill="#e67e22" class="data-point"/>
-            <text x="1100" y="157" text-anchor="middle" font-size="11" font-weight="bold" fill="#e67e22">38.9s</text>
-            
-            <!-- Annotation box for actual test -->
-            <rect x="250" y="445" width="180" height="50" fill="white" stroke="#e74c3c" stroke-width="2" rx="5"/>
-            <text x="340" y="465" text-anchor="middle" font-size="11" font-weight="bold" fill="#e74c3c">
-                Actual Test Result
-            </text>
-            <text x="340" y="480" text-anchor="middle" font-size="10" fill="#666">
-                20 consents in 7.788s
-            </text>
-            
-            <!-- Scalability warning zone -->
-            <rect x="850" y="120" width="230" height="70" fill="#fff3cd" stroke="#ff9800" stroke-width="2" rx="5"/>
-            <text x="965" y="140" text-anchor="middle" font-size="11" font-weight="bold" fill="#ff9800">
-                ⚠️ Scalability Bottleneck
-            </text>
-            <text x="965" y="155" text-anchor="middle" font-size="10" fill="#666">
-                100 consents = 39 seconds
-            </text>
-            <text x="965" y="170" text-anchor="middle" font-size="10" fill="#666">
-                1000 consents = 6.5 minutes!
-            </text>
-            <text x="965" y="185" text-anchor="middle" font-size="9" fill="#e74c3c">
-                User must stay online & sign
-            </text>
+            {render_svg(points, slope, intercept)}
         </svg>
 
         <h2>📋 Performance Breakdown (Per Consent Lifecycle)</h2>
-        
+
         <table>
             <thead>
                 <tr>
@@ -213,95 +333,24 @@ html_content = """
                 </tr>
             </thead>
             <tbody>
-                <tr>
-                    <td><strong>Contract Creation</strong></td>
-                    <td>3,147,371 gas</td>
-                    <td>~350 ms</td>
-                    <td>89.9%</td>
-                </tr>
-                <tr>
-                    <td><strong>DS Grant</strong></td>
-                    <td>28,058 gas</td>
-                    <td>~20 ms</td>
-                    <td>5.1%</td>
-                </tr>
-                <tr>
-                    <td><strong>DC Grant</strong></td>
-                    <td>30,913 gas</td>
-                    <td>~19 ms</td>
-                    <td>4.9%</td>
-                </tr>
-                <tr class="highlight">
-                    <td><strong>Total per Consent</strong></td>
-                    <td>3,206,342 gas</td>
-                    <td><strong>389.4 ms</strong></td>
-                    <td>100%</td>
-                </tr>
+                {breakdown}
             </tbody>
         </table>
 
-        <h2>🔢 Extrapolated Scalability Data</h2>
-        
+        <h2>🔢 Measured and Extrapolated Scalability Data</h2>
+
         <table>
             <thead>
                 <tr>
                     <th>Number of Consents</th>
                     <th>Total Time</th>
                     <th>Total Gas Cost</th>
-                    <th>USD Cost (@ 10 Gwei, ETH=$2000)</th>
+                    <th>USD Cost (@ {GAS_PRICE_GWEI} Gwei, ETH=${ETH_PRICE:,})</th>
                     <th>Usability</th>
                 </tr>
             </thead>
             <tbody>
-                <tr>
-                    <td>1</td>
-                    <td>0.39 seconds</td>
-                    <td>3,206,342</td>
-                    <td>$6.41</td>
-                    <td>✅ Acceptable</td>
-                </tr>
-                <tr>
-                    <td>10</td>
-                    <td>3.89 seconds</td>
-                    <td>32,063,420</td>
-                    <td>$64.13</td>
-                    <td>✅ Good</td>
-                </tr>
-                <tr class="highlight">
-                    <td><strong>20 (Test)</strong></td>
-                    <td><strong>7.79 seconds</strong></td>
-                    <td><strong>64,126,840</strong></td>
-                    <td><strong>$128.25</strong></td>
-                    <td><strong>✅ Acceptable</strong></td>
-                </tr>
-                <tr>
-                    <td>50</td>
-                    <td>19.47 seconds</td>
-                    <td>160,317,100</td>
-                    <td>$320.63</td>
-                    <td>⚠️ Marginal</td>
-                </tr>
-                <tr>
-                    <td>100</td>
-                    <td>38.94 seconds</td>
-                    <td>320,634,200</td>
-                    <td>$641.27</td>
-                    <td>⚠️ User fatigue</td>
-                </tr>
-                <tr>
-                    <td>500</td>
-                    <td>3.24 minutes</td>
-                    <td>1,603,171,000</td>
-                    <td>$3,206.34</td>
-                    <td>❌ Impractical</td>
-                </tr>
-                <tr>
-                    <td>1,000</td>
-                    <td>6.49 minutes</td>
-                    <td>3,206,342,000</td>
-                    <td>$6,412.68</td>
-                    <td>❌ Unfeasible</td>
-                </tr>
+                {render_extrapolation(points, slope, intercept, gas_per_consent)}
             </tbody>
         </table>
 
@@ -313,16 +362,16 @@ html_content = """
                 <li>Granting consent as Data Subject</li>
                 <li>Waiting for Data Controller to grant</li>
             </ul>
-            
+
             <p><strong>Impact:</strong></p>
             <ul>
-                <li>A hospital with 1,000 patients would need <strong>6.5 minutes</strong> just to initialize consent infrastructure</li>
+                <li>A hospital with 1,000 patients would need <strong>{minutes_1000:.1f} minutes</strong> just to initialize consent infrastructure</li>
                 <li>Users must remain online and actively sign transactions</li>
                 <li>No batch processing or automation possible due to security model</li>
-                <li>Enterprise deployment (10,000+ consents) would take over 1 hour</li>
+                <li>Enterprise deployment (10,000+ consents) would take {hours_10000:.1f} hours</li>
             </ul>
-            
-            <p><strong>Root Cause:</strong> One-consent-per-contract design creates N smart contract deployments, 
+
+            <p><strong>Root Cause:</strong> One-consent-per-contract design creates N smart contract deployments,
             each requiring user interaction. This is a <strong>fundamental architectural limitation</strong>.</p>
         </div>
 
@@ -336,52 +385,65 @@ html_content = """
                 <li><strong>Gas overhead:</strong> Only +3.8% (additional 46,728 gas for delegation setup)</li>
                 <li><strong>Test validation:</strong> All 5 delegation tests passing (Test Suite 2.10)</li>
             </ul>
-            
+
             <p><strong>Result:</strong> Maintains GDPR "right to withdraw" while improving scalability for enterprise deployments.</p>
         </div>
 
+{history}
         <h2>🎯 Key Findings</h2>
-        
+
         <div style="background: #ecf0f1; padding: 20px; border-radius: 5px; margin: 20px 0;">
             <p style="font-size: 16px; margin: 0;">
-                <strong>Linear Scaling Confirmed:</strong> Each consent adds ~389ms to total processing time. 
-                While reasonable for small-scale deployments, this creates a <strong>significant UX bottleneck for enterprise use</strong>.
+                <strong>Measured Scaling:</strong> Each consent adds ~{slope:.0f}ms to total processing time
+                (fitted over {len(points)} measured run(s), up to {largest_n} consents).
             </p>
             <br>
             <p style="font-size: 16px; margin: 0;">
-                <strong>Test Evidence:</strong> 20 consents in 7.8 seconds validates the linear model. 
-                Extrapolation shows 1,000 consents would require 6.5 minutes of continuous user interaction.
+                <strong>Extrapolation:</strong> 1,000 consents would require {minutes_1000:.1f} minutes of continuous user interaction.
             </p>
             <br>
             <p style="font-size: 16px; margin: 0;">
-                <strong>Delegation Solution:</strong> Our proposed mechanism reduces user burden while maintaining 
+                <strong>Delegation Solution:</strong> Our proposed mechanism reduces user burden while maintaining
                 GDPR compliance and adds minimal gas overhead (+3.8%).
             </p>
         </div>
-        
+
         <p style="text-align: center; margin-top: 30px; color: #666; font-size: 12px;">
-            Generated from Test 2.9.1 empirical data | Report: Critical Analysis of Blockchain-Based GDPR Compliance
+            Generated from {source} | Report: Critical Analysis of Blockchain-Based GDPR Compliance
         </p>
     </div>
 </body>
 </html>
-"""
+""", slope
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('results', nargs='?', default=DEFAULT_RESULTS)
+    parser.add_argument('--processors', type=int, help='processors per consent of the plotted runs (default: smallest)')
+    parser.add_argument('--purposes', type=int, help='purposes per processor of the plotted runs (default: smallest)')
+    parser.add_argument('--history', help='gas_history.py database to plot the latency trend of')
+    args = parser.parse_args()
+
+    results, points, processors, purposes = load_points(args.results, args.processors, args.purposes)
+    history = render_history(args.history) if args.history else ''
+    html_content, slope = render(results, points, processors, purposes, args.results, history)
+
+    # Write HTML file
+    with open(OUTPUT, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+    print("✅ Scalability graph generated successfully!")
+    print(f"   📁 File: {OUTPUT}")
+    print("   🌐 Open this file in your browser to view the graph")
+    print()
+    print("📊 Graph shows:")
+    print(f"   • Measured points: {', '.join(f'{n} consents in {ms / 1000:.2f}s' for n, ms in points)}")
+    print(f"   • Least-squares trend: {slope:.1f} ms per consent")
+    print("   • Performance breakdown table (gas + time per operation)")
+    print("   • Scalability table (measured runs and extrapolation to 1,000 consents)")
+    print("   • Our delegation solution highlighted as mitigation")
+
 
-# Write HTML file
-with open('consent_creation_scalability.html', 'w', encoding='utf-8') as f:
-    f.write(html_content)
-
-print("✅ Scalability graph generated successfully!")
-print("   📁 File: consent_creation_scalability.html")
-print("   🌐 Open this file in your browser to view the graph")
-print()
-print("📊 Graph shows:")
-print("   • Linear scaling: 389.4 ms per consent")
-print("   • Actual test data: 20 consents in 7.788 seconds (red point)")
-print("   • Extrapolation: 100 consents = 39 seconds, 1000 = 6.5 minutes")
-print("   • Performance breakdown table (gas + time per operation)")
-print("   • Scalability comparison table (1 to 1,000 consents)")
-print("   • Our delegation solution highlighted as mitigation")
-print()
-print("🎯 This demonstrates the scalability bottleneck (Section 5.3.7)")
-print("💡 Screenshot this and insert into your report!")
+if __name__ == '__main__':
+    main()
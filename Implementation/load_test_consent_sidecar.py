@@ -0,0 +1,188 @@
+"""
+Load test of consent_sidecar.py.
+
+Opens `--connections` keep-alive connections to a running sidecar and keeps
+`--depth` pipelined requests in flight on each for `--duration` seconds,
+then reports the checks per second and the request latencies (p50, p99),
+and the sidecar's own counters (lookups done vs checks coalesced).
+
+The checks are drawn from `--distinct` (subject, processor, purpose, data)
+combinations: taken from a ConsentIndexer database with `--indexer` (the
+purposes granted to processors, so most checks are allowed), random
+addresses otherwise (all denied). With `--batch N`, each request is a
+POST /allowed of N checks instead of one GET.
+
+Usage:
+    python consent_sidecar.py &
+    python load_test_consent_sidecar.py [--url http://127.0.0.1:8600] [--duration 10]
+        [--connections 8] [--depth 16] [--batch 1] [--distinct 1000] [--indexer ui/consents.db]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+
+def sample_checks(distinct, indexer_path=None, seed=0):
+    """`distinct` (subject, processor, purpose, data) checks."""
+    rng = random.Random(seed)
+    if indexer_path:
+        db = sqlite3.connect(indexer_path)
+        rows = db.execute(
+            """SELECT c.data_subject, p.processor, u.purpose, u.data FROM consents c
+               JOIN processing_consents p ON p.consent_address = c.address
+               JOIN purposes u ON u.processing_address = p.address"""
+        ).fetchall()
+        db.close()
+        if rows:
+            # Without data bits, and with the lowest one of the purpose's data
+            checks = [(s, p, k, 0) for s, p, k, _ in rows] + [(s, p, k, int(d) & -int(d)) for s, p, k, d in rows]
+            return [checks[i % len(checks)] for i in range(distinct)]
+
+    def address():
+        return '0x%040x' % rng.getrandbits(160)
+    return [(address(), address(), rng.randrange(8), rng.randrange(16)) for _ in range(distinct)]
+
+
+def requests_for(checks, host, batch, seed=0):
+    """Encoded HTTP requests cycling over the checks."""
+    rng = random.Random(seed)
+    shuffled = checks[:]
+    rng.shuffle(shuffled)
+    requests = []
+    for i in range(0, max(len(shuffled), batch), batch):
+        chunk = [shuffled[(i + j) % len(shuffled)] for j in range(batch)]
+        if batch == 1:
+            subject, processor, purpose, data = chunk[0]
+            target = f'/allowed?subject={subject}&processor={processor}&purpose={purpose}&data={data}'
+            requests.append(f'GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+        else:
+            body = json.dumps([{'subject': s, 'processor': p, 'purpose': k, 'data': d} for s, p, k, d in chunk]).encode()
+            requests.append(f'POST /allowed HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                            f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    return requests
+
+
+async def read_response(reader):
+    """Status and JSON body of one HTTP response."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    length = next(int(line.split(':', 1)[1]) for line in lines if line.lower().startswith('content-length:'))
+    return int(lines[0].split(' ')[1]), json.loads(await reader.readexactly(length))
+
+
+async def connection(host, port, requests, depth, deadline, results, offset):
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = []
+    index = offset
+    completed, allowed, errors, blocks = 0, 0, 0, set()
+    latencies = []
+
+    def send():
+        nonlocal index
+        writer.write(requests[index % len(requests)])
+        sent.append(time.perf_counter())
+        index += 1
+
+    for _ in range(depth):
+        send()
+    head = 0
+    while True:
+        status, body = await read_response(reader)
+        latencies.append(time.perf_counter() - sent[head])
+        head += 1
+        completed += 1
+        if status != 200:
+            errors += 1
+        else:
+            for answer in body if isinstance(body, list) else [body]:
+                allowed += answer['allowed']
+                blocks.add(answer['block'])
+        if time.perf_counter() < deadline:
+            send()
+        elif head == len(sent):
+            break
+    writer.close()
+    results.append((completed, allowed, errors, blocks, latencies))
+
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET /stats HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+    _, stats = await read_response(reader)
+    writer.close()
+    return stats
+
+
+async def run(url, duration, connections, depth, batch, checks):
+    target = urlsplit(url)
+    host, port = target.hostname, target.port or 80
+    requests = requests_for(checks, host, batch)
+    before = await fetch_stats(host, port)
+
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        connection(host, port, requests, depth, start + duration, results, i * len(requests) // connections)
+        for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    after = await fetch_stats(host, port)
+
+    completed = sum(r[0] for r in results)
+    latencies = sorted(latency for r in results for latency in r[4])
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+    checks_done = after['checks'] - before['checks']
+    lookups = after['lookups'] - before['lookups']
+    return {
+        'requests': completed,
+        'checks': checks_done,
+        'allowed': sum(r[1] for r in results),
+        'errors': sum(r[2] for r in results),
+        'blocks': sorted(set().union(*(r[3] for r in results))),
+        'seconds': elapsed,
+        'checks_per_second': checks_done / elapsed,
+        'requests_per_second': completed / elapsed,
+        'latency_p50_ms': percentile(0.50),
+        'latency_p99_ms': percentile(0.99),
+        'lookups': lookups,
+        'coalesced': checks_done - lookups,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--depth', type=int, default=16, help='pipelined requests in flight per connection')
+    parser.add_argument('--batch', type=int, default=1, help='checks per request (POST /allowed when > 1)')
+    parser.add_argument('--distinct', type=int, default=1000, help='distinct checks')
+    parser.add_argument('--indexer', help='ConsentIndexer database to draw the checks from')
+    args = parser.parse_args()
+
+    checks = sample_checks(args.distinct, args.indexer)
+    result = asyncio.run(run(args.url, args.duration, args.connections, args.depth, args.batch, checks))
+
+    print(f"\n{'=' * 60}")
+    print(f"Consent sidecar load test: {args.url}")
+    print(f"{args.connections} connections x {args.depth} in flight, {args.batch} check(s) per request, "
+          f"{len(set(checks))} distinct checks")
+    print(f"{'=' * 60}")
+    print(f"Requests:        {result['requests']} ({result['errors']} errors) in {result['seconds']:.1f}s")
+    print(f"Checks:          {result['checks']} ({result['allowed']} allowed)")
+    print(f"Throughput:      {result['checks_per_second']:,.0f} checks/s ({result['requests_per_second']:,.0f} requests/s)")
+    print(f"Latency:         p50 {result['latency_p50_ms']:.2f} ms, p99 {result['latency_p99_ms']:.2f} ms")
+    print(f"Index lookups:   {result['lookups']} ({result['coalesced']} checks coalesced)")
+    print(f"Blocks answered: {result['blocks'][:5]}{' ...' if len(result['blocks']) > 5 else ''}")
+
+
+if __name__ == '__main__':
+    main()
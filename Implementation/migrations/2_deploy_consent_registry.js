@@ -0,0 +1,7 @@
+var ConsentRegistry = artifacts.require("ConsentRegistry");
+
+module.exports = function(deployer, network, accounts) {
+	// One shared registry: consents created through it are storage writes, not deployments.
+	// ui/app.py picks up its address from build/contracts/ConsentRegistry.json.
+	deployer.deploy(ConsentRegistry);
+}
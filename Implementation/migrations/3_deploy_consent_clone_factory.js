@@ -0,0 +1,14 @@
+var CollectionConsent = artifacts.require("CollectionConsent");
+var ProcessingConsent = artifacts.require("ProcessingConsent");
+var ConsentCloneFactory = artifacts.require("ConsentCloneFactory");
+
+module.exports = function(deployer, network, accounts) {
+	// Implementation contracts are initialized by their constructors, so nobody can take them over.
+	// They are created with .new() so they are not recorded as "the" CollectionConsent deployment
+	// that ui/app.py loads from the artifact.
+	deployer.then(async () => {
+		const processingImpl = await ProcessingConsent.new(accounts[0], accounts[0], accounts[0], { from: accounts[0] });
+		const collectionImpl = await CollectionConsent.new(accounts[0], [], 0, 0, [], { from: accounts[0] });
+		await deployer.deploy(ConsentCloneFactory, collectionImpl.address, processingImpl.address);
+	});
+}
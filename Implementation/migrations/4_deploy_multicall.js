@@ -0,0 +1,6 @@
+var Multicall = artifacts.require("Multicall");
+
+module.exports = function(deployer) {
+	// Read aggregator used by ui/consent_reader.py
+	deployer.deploy(Multicall);
+}
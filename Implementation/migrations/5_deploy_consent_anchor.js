@@ -0,0 +1,6 @@
+var ConsentAnchor = artifacts.require("ConsentAnchor");
+
+module.exports = function(deployer) {
+	// Merkle root anchor used by ui/merkle_consents.py
+	deployer.deploy(ConsentAnchor);
+}
@@ -0,0 +1,135 @@
+"""
+Stress test of ui/nonce_manager.py against a local dev chain (Ganache on 127.0.0.1:8545).
+
+Several threads send transactions from the SAME account as fast as they can:
+  - baseline:      each submit reads eth_getTransactionCount(pending) and sets the nonce;
+  - nonce manager: nonces are allocated locally by NonceManager.
+For each mode it reports submitted / failed transactions, nonce collisions
+(transactions sent with an already used nonce, which the node rejects or
+replaces) and the sustained throughput (mined transactions per second until
+the last receipt).
+
+Usage:
+    python stress_nonce_manager.py [--txs 500] [--threads 8] [--max-in-flight 64] [--url http://127.0.0.1:8545]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'ui'))
+from nonce_manager import NonceManager, is_nonce_too_low  # noqa: E402
+
+
+RECEIPT_TIMEOUT = 10
+
+
+def run(w3, sender, txs, threads, send):
+    """Sends `txs` 0-value self transfers from `sender` over `threads` threads with `send(tx)`."""
+    hashes, errors = [], []
+    lock = threading.Lock()
+    counter = iter(range(txs))
+
+    def worker():
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            try:
+                tx_hash = send({'from': sender, 'to': sender, 'value': 0, 'gas': 21000})
+                with lock:
+                    hashes.append(tx_hash)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+
+    start = time.time()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    submitted_in = time.time() - start
+
+    # Replaced transactions are never mined: the wait times out for them
+    mined, last_mined = 0, start
+    for tx_hash in hashes:
+        try:
+            if w3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT)['status'] == 1:
+                mined += 1
+                last_mined = time.time()
+        except Exception:
+            pass
+    elapsed = last_mined - start
+
+    nonces = []
+    for tx_hash in hashes:
+        try:
+            nonces.append(w3.eth.get_transaction(tx_hash)['nonce'])
+        except Exception:
+            pass
+
+    return {
+        'submitted': len(hashes),
+        'failed': len(errors),
+        'mined': mined,
+        'collisions': len(nonces) - len(set(nonces)) + sum(1 for e in errors if is_nonce_too_low(e)),
+        'submit_rate': len(hashes) / submitted_in if submitted_in else 0.0,
+        'throughput': mined / elapsed if elapsed else 0.0,
+        'errors': sorted(set(errors))[:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8545')
+    parser.add_argument('--txs', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--max-in-flight', type=int, default=64)
+    args = parser.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(args.url))
+    if not w3.is_connected():
+        sys.exit(f"Cannot connect to {args.url}: start Ganache first (ganache --port 8545)")
+    sender = w3.eth.accounts[0]
+
+    def baseline_send(tx):
+        tx['nonce'] = w3.eth.get_transaction_count(tx['from'], 'pending')
+        return w3.eth.send_transaction(tx)
+
+    manager = NonceManager(w3, max_in_flight=args.max_in_flight)
+    confirmed = threading.Event()
+
+    # Frees the in-flight slots as transactions are mined
+    def confirmer():
+        while not confirmed.is_set():
+            manager.confirm_mined(sender)
+            time.sleep(0.05)
+
+    print(f"Sending {args.txs} transactions from {sender} over {args.threads} threads")
+    print("=" * 70)
+    results = {'baseline (getTransactionCount)': run(w3, sender, args.txs, args.threads, baseline_send)}
+
+    manager.resync(sender)
+    thread = threading.Thread(target=confirmer, daemon=True)
+    thread.start()
+    results[f'nonce manager (max {args.max_in_flight} in flight)'] = run(
+        w3, sender, args.txs, args.threads, manager.send_transaction
+    )
+    confirmed.set()
+    thread.join()
+
+    for mode, r in results.items():
+        print(f"\n{mode}")
+        print(f"  submitted {r['submitted']}, failed {r['failed']}, mined {r['mined']}, nonce collisions {r['collisions']}")
+        print(f"  submit rate {r['submit_rate']:.1f} tx/s, sustained throughput {r['throughput']:.1f} tx/s")
+        for error in r['errors']:
+            print(f"  error: {error[:120]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+/**
+ * Phase 2: Scalability - Suite 2.11
+ * Test: Consent Registry vs Per-Contract Consents
+ *
+ * Goal:
+ *  - Check that ConsentRegistry keeps the CollectionConsent grant/revoke/verify
+ *    semantics for many (dataSubject, controller) pairs in a single contract.
+ *  - Compare gas and wall-clock time of creating + granting consents through
+ *    the registry against the per-contract flow of Test 2.9.1.
+ *  - Create and grant many consents with one transaction per subject/controller
+ *    (createConsentBatch / grantConsentBatch).
+ *  - modifyData / eraseData emit DataModified / DataErased with the consent id.
+ */
+
+const CollectionConsent = artifacts.require("CollectionConsent");
+const ConsentRegistry = artifacts.require("ConsentRegistry");
+
+contract("Phase 2.11: Consent Registry", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+  const unauthorized = accounts[3];
+
+  const NUM_CONSENTS = 20; // same as Test 2.9.1
+
+  function avg(arr) {
+    if (!arr.length) return 0;
+    return arr.reduce((a, b) => a + b, 0) / arr.length;
+  }
+
+  let registry;
+
+  beforeEach(async () => {
+    registry = await ConsentRegistry.new({ from: dataController });
+  });
+
+  describe("Test 2.11.1: Registry Consent Semantics", () => {
+    it("Should require both DS and DC, and allow either to revoke", async () => {
+      console.log("\n🧪 Test 2.11.1: Registry Consent Semantics");
+      console.log("=".repeat(70));
+
+      await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+
+      // DS grant is implicit on creation, as in the CollectionConsent constructor
+      assert.equal(await registry.verify(dataSubject, dataController), false, "Not valid before DC grant");
+
+      await registry.grantConsent(dataSubject, dataController, { from: dataController });
+      assert.equal(await registry.verify(dataSubject, dataController), true, "Valid after DC grant");
+
+      await registry.revokeConsent(dataSubject, dataController, { from: dataSubject });
+      assert.equal(await registry.verify(dataSubject, dataController), false, "Invalid after DS revoke");
+
+      await registry.grantConsent(dataSubject, dataController, { from: dataSubject });
+      assert.equal(await registry.verify(dataSubject, dataController), true, "Valid after DS re-grant");
+
+      await registry.revokeConsent(dataSubject, dataController, { from: dataController });
+      assert.equal(await registry.verify(dataSubject, dataController), false, "Invalid after DC revoke");
+
+      console.log("\n✅ Test 2.11.1: PASSED");
+    });
+
+    it("Should reject unauthorized actors and duplicate consents", async () => {
+      console.log("\n🧪 Test 2.11.1b: Registry Access Control");
+
+      await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+
+      try {
+        await registry.grantConsent(dataSubject, dataController, { from: unauthorized });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "Actor not allowed", "Error message mismatch");
+      }
+
+      try {
+        await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "Consent already exists", "Error message mismatch");
+      }
+
+      // Consents are isolated per (dataSubject, controller)
+      await registry.createConsent(dataController, [dataProcessor], 7, 86400, [], { from: unauthorized });
+      assert.equal((await registry.getData(dataSubject, dataController)).toNumber(), 15);
+      assert.equal((await registry.getData(unauthorized, dataController)).toNumber(), 7);
+
+      console.log("\n✅ Test 2.11.1b: PASSED");
+    });
+
+    it("Should emit the data events and record the erasure by consent id", async () => {
+      console.log("\n🧪 Test 2.11.1c: Registry Data Events");
+
+      await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+      const id = await registry.consentId(dataSubject, dataController);
+
+      let tx = await registry.modifyData(dataController, 7, { from: dataSubject });
+      assert.deepEqual(tx.logs.map(l => l.event), ["DataModified"]);
+      assert.equal(tx.logs[0].args.consentId, id);
+      assert.equal(tx.logs[0].args.data.toNumber(), 7);
+
+      assert.equal(await registry.isErased(id), false, "Not erased before eraseData");
+      tx = await registry.eraseData(dataController, { from: dataSubject });
+      assert.deepEqual(tx.logs.map(l => l.event), ["DataErased"]);
+      assert.equal(tx.logs[0].args.consentId, id);
+      assert.equal(tx.logs[0].args.dataSubject, dataSubject);
+      assert.equal(await registry.isErased(id), true, "Erased after eraseData");
+
+      // Only the DS's own consent is addressed
+      try {
+        await registry.eraseData(dataController, { from: unauthorized });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "Consent does not exist", "Error message mismatch");
+      }
+
+      console.log("\n✅ Test 2.11.1c: PASSED");
+    });
+  });
+
+  describe("Test 2.11.2: Registry vs Per-Contract Benchmark", () => {
+    it("Should create and grant consents and compare against CollectionConsent deployments", async () => {
+      console.log("\n🧪 Test 2.11.2: Registry vs Per-Contract Benchmark");
+      console.log("=".repeat(70));
+      console.log(`Creating and granting ${NUM_CONSENTS} consents with each flow...`);
+
+      // Per-contract flow (Test 2.9.1)
+      const contractCreate = [];
+      const contractGrant = [];
+      let startTime = Date.now();
+      for (let i = 0; i < NUM_CONSENTS; i++) {
+        const consent = await CollectionConsent.new(
+          dataController, [dataProcessor], 0xffff, 86400, [0, 1], { from: dataSubject }
+        );
+        const createReceipt = await web3.eth.getTransactionReceipt(consent.transactionHash);
+        contractCreate.push(createReceipt.gasUsed);
+
+        const grantTx = await consent.grantConsent({ from: dataController });
+        contractGrant.push(grantTx.receipt.gasUsed);
+      }
+      const contractMs = Date.now() - startTime;
+
+      // Registry flow: every consent needs its own (dataSubject, controller) key,
+      // so pair accounts[0..4] (subjects) with accounts[5..9] (controllers).
+      const registryCreate = [];
+      const registryGrant = [];
+      startTime = Date.now();
+      for (let i = 0; i < NUM_CONSENTS; i++) {
+        const ds = accounts[i % 5];
+        const dc = accounts[5 + (Math.floor(i / 5) % 5)];
+
+        const createTx = await registry.createConsent(dc, [dataProcessor], 0xffff, 86400, [0, 1], { from: ds });
+        registryCreate.push(createTx.receipt.gasUsed);
+
+        const grantTx = await registry.grantConsent(ds, dc, { from: dc });
+        registryGrant.push(grantTx.receipt.gasUsed);
+      }
+      const registryMs = Date.now() - startTime;
+
+      const contractTotal = avg(contractCreate) + avg(contractGrant);
+      const registryTotal = avg(registryCreate) + avg(registryGrant);
+
+      console.log("\n📊 Results (average per consent):");
+      console.log("                        Per-contract     Registry");
+      console.log(`  Gas (create):         ${Math.round(avg(contractCreate)).toLocaleString().padStart(12)} ${Math.round(avg(registryCreate)).toLocaleString().padStart(12)}`);
+      console.log(`  Gas (grant):          ${Math.round(avg(contractGrant)).toLocaleString().padStart(12)} ${Math.round(avg(registryGrant)).toLocaleString().padStart(12)}`);
+      console.log(`  Time (ms):            ${(contractMs / NUM_CONSENTS).toFixed(2).padStart(12)} ${(registryMs / NUM_CONSENTS).toFixed(2).padStart(12)}`);
+      console.log(`\n  Gas saving per consent: ${(100 * (1 - registryTotal / contractTotal)).toFixed(1)}%`);
+
+      assert.isBelow(registryTotal, contractTotal, "Registry should be cheaper than a deployment per consent");
+      console.log("\n✅ Test 2.11.2: PASSED");
+    });
+  });
+
+  describe("Test 2.11.3: Batched Creation & Granting", () => {
+    it("Should create and grant 25 consents with 10 transactions", async () => {
+      console.log("\n🧪 Test 2.11.3: Batched Creation & Granting");
+      console.log("=".repeat(70));
+
+      const subjects = accounts.slice(0, 5);
+      const controllers = accounts.slice(5, 10);
+      const numConsents = subjects.length * controllers.length;
+
+      let gasUsed = 0;
+      let transactions = 0;
+      const startTime = Date.now();
+
+      // One transaction per subject: a consent with every controller, DS grant recorded on creation
+      for (const ds of subjects) {
+        const tx = await registry.createConsentBatch(
+          controllers,
+          controllers.map(() => [dataProcessor]),
+          controllers.map(() => 0xffff),
+          controllers.map(() => 86400),
+          controllers.map(() => [0, 1]),
+          { from: ds }
+        );
+        gasUsed += tx.receipt.gasUsed;
+        transactions++;
+      }
+
+      for (const dc of controllers) {
+        assert.equal(await registry.verify(subjects[0], dc), false, "Not valid before DC grant");
+      }
+
+      // One transaction per controller: grant every subject's consent
+      for (const dc of controllers) {
+        const tx = await registry.grantConsentBatch(subjects, { from: dc });
+        gasUsed += tx.receipt.gasUsed;
+        transactions++;
+      }
+      const totalMs = Date.now() - startTime;
+
+      for (const ds of subjects) {
+        for (const dc of controllers) {
+          assert.equal(await registry.verify(ds, dc), true, "Every batched consent should be valid");
+        }
+      }
+
+      console.log("\n📊 Results:");
+      console.log(`  Total consents:       ${numConsents}`);
+      console.log(`  Transactions:         ${transactions} (vs ${3 * numConsents} in Test 2.9.1)`);
+      console.log(`  Total time:           ${totalMs} ms`);
+      console.log(`  Average per consent:  ${(totalMs / numConsents).toFixed(2)} ms`);
+      console.log("  Average gas per consent (create + DS + DC):", Math.round(gasUsed / numConsents).toLocaleString(), "gas");
+
+      try {
+        await registry.grantConsentBatch([accounts[9]], { from: accounts[0] });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "Consent does not exist", "Error message mismatch");
+      }
+
+      console.log("\n✅ Test 2.11.3: PASSED");
+    });
+  });
+});
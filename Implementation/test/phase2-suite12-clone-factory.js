@@ -0,0 +1,170 @@
+/**
+ * Phase 2: Scalability - Suite 2.12
+ * Test: EIP-1167 Minimal-Proxy Clones
+ *
+ * Goal:
+ *  - Check that CollectionConsent / ProcessingConsent clones created through
+ *    ConsentCloneFactory behave like fully deployed contracts.
+ *  - Check that initializers cannot be called twice (clones or implementations).
+ *  - Track the gas saved per consent, in the style of Test 2.9.1.
+ */
+
+const CollectionConsent = artifacts.require("CollectionConsent");
+const ProcessingConsent = artifacts.require("ProcessingConsent");
+const ConsentCloneFactory = artifacts.require("ConsentCloneFactory");
+
+contract("Phase 2.12: Minimal-Proxy Clones", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+  const attacker = accounts[3];
+
+  const NUM_CONSENTS = 20; // same as Test 2.9.1
+
+  function avg(arr) {
+    if (!arr.length) return 0;
+    return arr.reduce((a, b) => a + b, 0) / arr.length;
+  }
+
+  let collectionImpl;
+  let processingImpl;
+  let factory;
+
+  before(async () => {
+    processingImpl = await ProcessingConsent.new(dataController, dataController, dataController, { from: dataController });
+    collectionImpl = await CollectionConsent.new(dataController, [], 0, 0, [], { from: dataController });
+    factory = await ConsentCloneFactory.new(collectionImpl.address, processingImpl.address, { from: dataController });
+  });
+
+  async function createClone(from) {
+    const tx = await factory.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from });
+    const consent = await CollectionConsent.at(tx.logs[0].args.consent);
+    return { consent, tx };
+  }
+
+  describe("Test 2.12.1: Clone Consent Semantics", () => {
+    it("Should behave like a deployed CollectionConsent", async () => {
+      console.log("\n🧪 Test 2.12.1: Clone Consent Semantics");
+      console.log("=".repeat(70));
+
+      const { consent } = await createClone(dataSubject);
+      console.log(`Clone deployed at: ${consent.address}`);
+
+      assert.equal(await consent.verify(), false, "Not valid before DC grant");
+      await consent.grantConsent({ from: dataSubject });
+      await consent.grantConsent({ from: dataController });
+      assert.equal(await consent.verify(), true, "Valid after DS and DC grants");
+      assert.equal((await consent.getData()).toNumber(), 15, "Data set by the initializer");
+
+      await consent.revokeConsent({ from: dataSubject });
+      assert.equal(await consent.verify(), false, "Invalid after DS revoke");
+
+      // onlyDataSubject must see the real DS, not the factory
+      await consent.modifyData(7, { from: dataSubject });
+      assert.equal((await consent.getData()).toNumber(), 7);
+
+      console.log("\n✅ Test 2.12.1: PASSED");
+    });
+
+    it("Should reject a second initialization of clones and implementation", async () => {
+      console.log("\n🧪 Test 2.12.1b: Initializer Protection");
+
+      const { consent } = await createClone(dataSubject);
+      for (const target of [consent, collectionImpl]) {
+        try {
+          await target.initialize(attacker, attacker, [], 0, 86400, [], "0x0000000000000000000000000000000000000000", { from: attacker });
+          assert.fail("Should have thrown error");
+        } catch (e) {
+          assert.include(e.message, "already initialized", "Error message mismatch");
+        }
+      }
+
+      try {
+        await processingImpl.initialize(attacker, attacker, attacker, { from: attacker });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "already initialized", "Error message mismatch");
+      }
+
+      console.log("\n✅ Test 2.12.1b: PASSED");
+    });
+  });
+
+  describe("Test 2.12.2: Cloned Processing Consents", () => {
+    it("Should create ProcessingConsent clones from newPurpose", async () => {
+      console.log("\n🧪 Test 2.12.2: Cloned Processing Consents");
+      console.log("=".repeat(70));
+
+      const { consent } = await createClone(dataSubject);
+      await consent.grantConsent({ from: dataController });
+
+      await consent.newPurpose(dataProcessor, 0, 15, 86400, { from: dataController });
+      const processing = await ProcessingConsent.at(await consent.getProcessingConsentSC(dataProcessor));
+      console.log(`ProcessingConsent clone at: ${processing.address}`);
+
+      assert.equal(await processing.getDataSubject(), dataSubject);
+      assert.equal(await processing.getController(), dataController);
+      assert.equal(await processing.getProcessor(), dataProcessor);
+
+      // Purpose 0 is a default purpose: DC and DS already valid, DP still has to grant
+      assert.equal(await processing.verify(0), false, "Not valid before DP grant");
+      await processing.grantConsent(0, { from: dataProcessor });
+      assert.equal(await processing.verify(0), true, "Valid after DP grant");
+
+      try {
+        await processing.initialize(attacker, attacker, attacker, { from: attacker });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "already initialized", "Error message mismatch");
+      }
+
+      console.log("\n✅ Test 2.12.2: PASSED");
+    });
+  });
+
+  describe("Test 2.12.3: Clone vs Full Deployment Gas", () => {
+    it("Should create consents and first purposes with both flows and log metrics", async () => {
+      console.log("\n🧪 Test 2.12.3: Clone vs Full Deployment Gas");
+      console.log("=".repeat(70));
+      console.log(`Creating ${NUM_CONSENTS} consents with each flow...`);
+
+      const fullCreate = [];
+      const fullPurpose = [];
+      let startTime = Date.now();
+      for (let i = 0; i < NUM_CONSENTS; i++) {
+        const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+        fullCreate.push((await web3.eth.getTransactionReceipt(consent.transactionHash)).gasUsed);
+
+        await consent.grantConsent({ from: dataController });
+        const purposeTx = await consent.newPurpose(dataProcessor, 0, 15, 86400, { from: dataController });
+        fullPurpose.push(purposeTx.receipt.gasUsed);
+      }
+      const fullMs = Date.now() - startTime;
+
+      const cloneCreate = [];
+      const clonePurpose = [];
+      startTime = Date.now();
+      for (let i = 0; i < NUM_CONSENTS; i++) {
+        const { consent, tx } = await createClone(dataSubject);
+        cloneCreate.push(tx.receipt.gasUsed);
+
+        await consent.grantConsent({ from: dataController });
+        const purposeTx = await consent.newPurpose(dataProcessor, 0, 15, 86400, { from: dataController });
+        clonePurpose.push(purposeTx.receipt.gasUsed);
+      }
+      const cloneMs = Date.now() - startTime;
+
+      console.log("\n📊 Results (average per consent):");
+      console.log("                              Full deploy        Clone");
+      console.log(`  Gas (create):               ${Math.round(avg(fullCreate)).toLocaleString().padStart(12)} ${Math.round(avg(cloneCreate)).toLocaleString().padStart(12)}`);
+      console.log(`  Gas (first newPurpose):     ${Math.round(avg(fullPurpose)).toLocaleString().padStart(12)} ${Math.round(avg(clonePurpose)).toLocaleString().padStart(12)}`);
+      console.log(`  Time (ms, create+grant+np): ${(fullMs / NUM_CONSENTS).toFixed(2).padStart(12)} ${(cloneMs / NUM_CONSENTS).toFixed(2).padStart(12)}`);
+      console.log(`\n  Gas saving on creation:     ${(100 * (1 - avg(cloneCreate) / avg(fullCreate))).toFixed(1)}%`);
+      console.log(`  Gas saving on newPurpose:   ${(100 * (1 - avg(clonePurpose) / avg(fullPurpose))).toFixed(1)}%`);
+
+      assert.isBelow(avg(cloneCreate), avg(fullCreate), "Clone creation should be cheaper than a full deployment");
+      assert.isBelow(avg(clonePurpose), avg(fullPurpose), "Cloned ProcessingConsent should be cheaper than a full deployment");
+      console.log("\n✅ Test 2.12.3: PASSED");
+    });
+  });
+});
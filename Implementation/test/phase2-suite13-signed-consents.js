@@ -0,0 +1,290 @@
+/**
+ * Phase 2: Scalability - Suite 2.13
+ * Test: EIP-712 Signed Consent Grants & Relayed Batches
+ *
+ * Goal:
+ *  - DS and DC sign grant/revoke messages off-chain (eth_signTypedData_v4);
+ *    any relayer can submit them to ConsentRegistry.
+ *  - Signatures cannot be replayed, forged by third parties or used after the deadline.
+ *  - Nonces are sequential per signer and consent: a later decision of the signer,
+ *    signed or direct, voids its older signatures.
+ *  - A relayer batch applies the valid signatures and skips the invalid ones.
+ *  - Signed creations: one relayer transaction creates the consents of many DSs,
+ *    on the terms each DS signed.
+ */
+
+const ConsentRegistry = artifacts.require("ConsentRegistry");
+
+contract("Phase 2.13: Signed Consents & Relayer", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+  const relayer = accounts[3];
+  const attacker = accounts[4];
+
+  let registry;
+  let chainId;
+
+  beforeEach(async () => {
+    registry = await ConsentRegistry.new({ from: dataController });
+    chainId = (await registry.getChainId()).toNumber();
+  });
+
+  const signTypedData = (signer, typedData) => {
+    return new Promise((resolve, reject) => {
+      web3.currentProvider.send({
+        jsonrpc: "2.0",
+        method: "eth_signTypedData_v4",
+        params: [signer, JSON.stringify(typedData)],
+        id: new Date().getTime()
+      }, (err, result) => {
+        if (err) { return reject(err); }
+        if (result.error) { return reject(new Error(result.error.message)); }
+        resolve(result.result);
+      });
+    });
+  };
+
+  const domain = () => ({ name: "ConsentRegistry", version: "1", chainId: chainId, verifyingContract: registry.address });
+
+  // Same message as ui/signed_consents.py
+  async function signAction(signer, ds, dc, grant, { deadline, nonce } = {}) {
+    const message = {
+      dataSubject: ds,
+      controller: dc,
+      grant: grant,
+      nonce: nonce !== undefined ? nonce : (await registry.getNonce(ds, dc, signer)).toNumber(),
+      deadline: deadline !== undefined ? deadline : Math.floor(Date.now() / 1000) + 3600
+    };
+    const signature = await signTypedData(signer, {
+      types: {
+        EIP712Domain: [
+          { name: "name", type: "string" },
+          { name: "version", type: "string" },
+          { name: "chainId", type: "uint256" },
+          { name: "verifyingContract", type: "address" }
+        ],
+        ConsentAction: [
+          { name: "dataSubject", type: "address" },
+          { name: "controller", type: "address" },
+          { name: "grant", type: "bool" },
+          { name: "nonce", type: "uint256" },
+          { name: "deadline", type: "uint256" }
+        ]
+      },
+      primaryType: "ConsentAction",
+      domain: domain(),
+      message: message
+    });
+    let v = parseInt(signature.slice(130, 132), 16);
+    if (v < 27) v += 27;
+    return {
+      dataSubject: ds,
+      controller: dc,
+      grant: grant,
+      nonce: message.nonce,
+      deadline: message.deadline,
+      v: v,
+      r: "0x" + signature.slice(2, 66),
+      s: "0x" + signature.slice(66, 130)
+    };
+  }
+
+  // Same message as ui/signed_consents.py (ConsentCreation), signed by the DS
+  async function signCreation(ds, dc, terms = {}) {
+    const message = {
+      dataSubject: ds,
+      controller: dc,
+      recipients: terms.recipients || [dataProcessor],
+      data: terms.data !== undefined ? terms.data : 15,
+      duration: terms.duration !== undefined ? terms.duration : 86400,
+      defaultPurposes: terms.defaultPurposes || [0],
+      nonce: (await registry.getNonce(ds, dc, ds)).toNumber(),
+      deadline: Math.floor(Date.now() / 1000) + 3600
+    };
+    const signature = await signTypedData(ds, {
+      types: {
+        EIP712Domain: [
+          { name: "name", type: "string" },
+          { name: "version", type: "string" },
+          { name: "chainId", type: "uint256" },
+          { name: "verifyingContract", type: "address" }
+        ],
+        ConsentCreation: [
+          { name: "dataSubject", type: "address" },
+          { name: "controller", type: "address" },
+          { name: "recipients", type: "address[]" },
+          { name: "data", type: "uint256" },
+          { name: "duration", type: "uint256" },
+          { name: "defaultPurposes", type: "uint256[]" },
+          { name: "nonce", type: "uint256" },
+          { name: "deadline", type: "uint256" }
+        ]
+      },
+      primaryType: "ConsentCreation",
+      domain: domain(),
+      message: message
+    });
+    let v = parseInt(signature.slice(130, 132), 16);
+    if (v < 27) v += 27;
+    return Object.assign({}, message, {
+      v: v,
+      r: "0x" + signature.slice(2, 66),
+      s: "0x" + signature.slice(66, 130)
+    });
+  }
+
+  function sigArgs(a) {
+    return [a.dataSubject, a.controller, a.nonce, a.deadline, a.v, a.r, a.s];
+  }
+
+  describe("Test 2.13.1: Signed Grant & Revoke", () => {
+    it("Should apply DC grant and DS revoke submitted by a relayer", async () => {
+      console.log("\n🧪 Test 2.13.1: Signed Grant & Revoke");
+      console.log("=".repeat(70));
+
+      await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+
+      const dcGrant = await signAction(dataController, dataSubject, dataController, true);
+      await registry.grantConsentWithSig(...sigArgs(dcGrant), { from: relayer });
+      assert.equal(await registry.verify(dataSubject, dataController), true, "Valid after signed DC grant");
+
+      const dsRevoke = await signAction(dataSubject, dataSubject, dataController, false);
+      await registry.revokeConsentWithSig(...sigArgs(dsRevoke), { from: relayer });
+      assert.equal(await registry.verify(dataSubject, dataController), false, "Invalid after signed DS revoke");
+
+      assert.equal((await registry.getNonce(dataSubject, dataController, dataSubject)).toNumber(), dsRevoke.nonce + 1, "Nonce consumed");
+      console.log("\n✅ Test 2.13.1: PASSED");
+    });
+
+    it("Should reject replayed, third-party and expired signatures", async () => {
+      console.log("\n🧪 Test 2.13.1b: Signature Protection");
+
+      await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+
+      const dcGrant = await signAction(dataController, dataSubject, dataController, true);
+      await registry.grantConsentWithSig(...sigArgs(dcGrant), { from: relayer });
+
+      const rejected = [
+        ["replay", dcGrant],
+        ["third party", await signAction(attacker, dataSubject, dataController, false)],
+        ["expired", await signAction(dataSubject, dataSubject, dataController, false, { deadline: 1 })]
+      ];
+      for (const [label, action] of rejected) {
+        try {
+          await registry.revokeConsentWithSig(...sigArgs(action), { from: relayer });
+          assert.fail(`Should have thrown error (${label})`);
+        } catch (e) {
+          assert.include(e.message, "Invalid, used or expired consent signature", `Error message mismatch (${label})`);
+        }
+      }
+      assert.equal(await registry.verify(dataSubject, dataController), true, "Consent untouched");
+
+      console.log("\n✅ Test 2.13.1b: PASSED");
+    });
+
+    it("Should reject a grant replayed after a later revoke", async () => {
+      console.log("\n🧪 Test 2.13.1c: Grant Replayed After Revoke");
+
+      await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+      await registry.grantConsent(dataSubject, dataController, { from: dataController });
+
+      // Signed grant relayed, then a signed revoke: the old grant cannot be relayed again
+      const dsGrant = await signAction(dataSubject, dataSubject, dataController, true);
+      await registry.grantConsentWithSig(...sigArgs(dsGrant), { from: relayer });
+      const dsRevoke = await signAction(dataSubject, dataSubject, dataController, false);
+      await registry.revokeConsentWithSig(...sigArgs(dsRevoke), { from: relayer });
+
+      // Signed grant never relayed, then a direct revoke: it is void too
+      const dcGrant = await signAction(dataController, dataSubject, dataController, true);
+      await registry.revokeConsent(dataSubject, dataController, { from: dataController });
+
+      for (const [label, action] of [["signed revoke", dsGrant], ["direct revoke", dcGrant]]) {
+        try {
+          await registry.grantConsentWithSig(...sigArgs(action), { from: relayer });
+          assert.fail(`Should have thrown error (${label})`);
+        } catch (e) {
+          assert.include(e.message, "Invalid, used or expired consent signature", `Error message mismatch (${label})`);
+        }
+      }
+      const tx = await registry.submitSignedActions([dsGrant, dcGrant], { from: relayer });
+      assert.equal(tx.logs.filter(l => l.event === "SignedActionRejected").length, 2, "Replays rejected in batches");
+      assert.equal(await registry.verify(dataSubject, dataController), false, "Consent stays revoked");
+
+      console.log("\n✅ Test 2.13.1c: PASSED");
+    });
+  });
+
+  describe("Test 2.13.2: Relayed Batch", () => {
+    it("Should apply valid signatures and skip invalid ones in one transaction", async () => {
+      console.log("\n🧪 Test 2.13.2: Relayed Batch");
+      console.log("=".repeat(70));
+
+      const subjects = accounts.slice(5, 10);
+      for (const ds of subjects) {
+        await registry.createConsent(dataController, [dataProcessor], 15, 86400, [0], { from: ds });
+      }
+
+      const actions = [];
+      for (const ds of subjects) {
+        actions.push(await signAction(dataController, ds, dataController, true));
+      }
+      actions.push(await signAction(attacker, subjects[0], dataController, false)); // rejected
+
+      const tx = await registry.submitSignedActions(actions, { from: relayer });
+      const rejectedEvents = tx.logs.filter(l => l.event === "SignedActionRejected");
+      console.log(`Batch of ${actions.length} actions: ${tx.receipt.gasUsed.toLocaleString()} gas, ${rejectedEvents.length} rejected`);
+      console.log(`Average gas per relayed grant: ${Math.round(tx.receipt.gasUsed / actions.length).toLocaleString()}`);
+
+      assert.equal(rejectedEvents.length, 1, "Only the attacker's action is rejected");
+      assert.equal(rejectedEvents[0].args.index.toNumber(), actions.length - 1);
+      for (const ds of subjects) {
+        assert.equal(await registry.verify(ds, dataController), true, "Every signed grant applied");
+      }
+
+      console.log("\n✅ Test 2.13.2: PASSED");
+    });
+  });
+
+  describe("Test 2.13.3: Relayed Consent Creations", () => {
+    it("Should create the consents of many data subjects in one transaction", async () => {
+      console.log("\n🧪 Test 2.13.3: Relayed Consent Creations");
+      console.log("=".repeat(70));
+
+      const subjects = accounts.slice(5, 10);
+      const creations = [];
+      for (const ds of subjects) {
+        creations.push(await signCreation(ds, dataController, { data: 7, defaultPurposes: [1, 2] }));
+      }
+      const tampered = await signCreation(attacker, dataController);
+      tampered.recipients = [attacker];                                   // terms the DS did not sign
+      creations.push(tampered);
+      creations.push(await signCreation(dataProcessor, dataController, { duration: 60 }));
+      creations[creations.length - 1].dataSubject = dataController;      // signed by someone else
+
+      const tx = await registry.submitSignedCreations(creations, { from: relayer });
+      const rejectedEvents = tx.logs.filter(l => l.event === "SignedActionRejected");
+      console.log(`Batch of ${creations.length} creations: ${tx.receipt.gasUsed.toLocaleString()} gas, ${rejectedEvents.length} rejected`);
+      console.log(`Average gas per relayed creation: ${Math.round(tx.receipt.gasUsed / subjects.length).toLocaleString()}`);
+
+      assert.deepEqual(rejectedEvents.map(e => e.args.index.toNumber()), [subjects.length, subjects.length + 1]);
+      for (const ds of subjects) {
+        assert.equal(await registry.existsConsent(ds, dataController), true, "Signed creation applied");
+        assert.equal((await registry.getData(ds, dataController)).toNumber(), 7, "Signed terms stored");
+        assert.equal(await registry.isDefaultPurpose(ds, dataController, 2), true, "Signed purposes stored");
+      }
+      assert.equal(await registry.existsConsent(attacker, dataController), false, "Tampered terms rejected");
+
+      // The DS's grant comes with the creation: the controller's grant makes the consents valid
+      await registry.grantConsentBatch(subjects, { from: dataController });
+      for (const ds of subjects) {
+        assert.equal(await registry.verify(ds, dataController), true, "Valid after the controller's grant");
+      }
+
+      const replay = await registry.submitSignedCreations([creations[0]], { from: relayer });
+      assert.equal(replay.logs.filter(l => l.event === "SignedActionRejected").length, 1, "Creation not replayed");
+
+      console.log("\n✅ Test 2.13.3: PASSED");
+    });
+  });
+});
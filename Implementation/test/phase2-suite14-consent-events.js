@@ -0,0 +1,102 @@
+/**
+ * Phase 2: Scalability - Suite 2.14
+ * Test: Consent Lifecycle Events
+ *
+ * Goal:
+ *  - Check that CollectionConsent and ProcessingConsent emit an event for every
+ *    state change an off-chain indexer needs (ui/consent_indexer.py):
+ *    create, grant, revoke, newPurpose, modifyData, erase, purpose/processor revocation.
+ */
+
+const CollectionConsent = artifacts.require("CollectionConsent");
+const ProcessingConsent = artifacts.require("ProcessingConsent");
+
+contract("Phase 2.14: Consent Lifecycle Events", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+
+  function eventNames(tx) {
+    return tx.logs.map(l => l.event);
+  }
+
+  describe("Test 2.14.1: CollectionConsent Events", () => {
+    it("Should emit creation, grant, revoke, modify and erase events", async () => {
+      console.log("\n🧪 Test 2.14.1: CollectionConsent Events");
+      console.log("=".repeat(70));
+
+      const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0, 2], { from: dataSubject });
+      const created = await consent.getPastEvents("ConsentCreated", { fromBlock: 0 });
+      assert.equal(created.length, 1, "ConsentCreated emitted by the constructor");
+      assert.equal(created[0].args.dataSubject, dataSubject);
+      assert.equal(created[0].args.controller, dataController);
+      assert.deepEqual(created[0].args.recipients, [dataProcessor]);
+      assert.deepEqual(created[0].args.defaultPurposes.map(p => p.toNumber()), [0, 2]);
+      assert.equal(
+        created[0].args.expirationDate.toNumber() - created[0].args.beginningDate.toNumber(), 86400,
+        "Validity window in the event"
+      );
+
+      let tx = await consent.grantConsent({ from: dataController });
+      assert.deepEqual(eventNames(tx), ["ConsentGranted"]);
+      assert.equal(tx.logs[0].args.actor, dataController);
+
+      tx = await consent.revokeConsent({ from: dataSubject });
+      assert.deepEqual(eventNames(tx), ["ConsentRevoked"]);
+      assert.equal(tx.logs[0].args.actor, dataSubject);
+
+      tx = await consent.modifyData(7, { from: dataSubject });
+      assert.deepEqual(eventNames(tx), ["DataModified"]);
+      assert.equal(tx.logs[0].args.data.toNumber(), 7);
+
+      tx = await consent.eraseData({ from: dataSubject });
+      assert.deepEqual(eventNames(tx), ["DataErased"]);
+
+      console.log("\n✅ Test 2.14.1: PASSED");
+    });
+  });
+
+  describe("Test 2.14.2: Processing Events", () => {
+    it("Should emit newPurpose, grant and revocation events on both contracts", async () => {
+      console.log("\n🧪 Test 2.14.2: Processing Events");
+      console.log("=".repeat(70));
+
+      const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+      await consent.grantConsent({ from: dataController });
+
+      let tx = await consent.newPurpose(dataProcessor, 0, 15, 86400, { from: dataController });
+      assert.deepEqual(eventNames(tx), ["ProcessingConsentCreated"]);
+      const processing = await ProcessingConsent.at(tx.logs[0].args.processingConsent);
+      assert.equal(tx.logs[0].args.processor, dataProcessor);
+
+      const block = tx.receipt.blockNumber;
+      const purposeCreated = await processing.getPastEvents("ProcessingPurposeCreated", { fromBlock: block, toBlock: block });
+      assert.equal(purposeCreated.length, 1);
+      assert.equal(purposeCreated[0].args.purpose.toNumber(), 0);
+      assert.equal(purposeCreated[0].args.defaultTrue, true, "Purpose 0 is a default purpose");
+
+      // Second purpose for the same processor: no new ProcessingConsent
+      tx = await consent.newPurpose(dataProcessor, 1, 15, 86400, { from: dataController });
+      assert.deepEqual(eventNames(tx), []);
+
+      tx = await processing.grantConsent(0, { from: dataProcessor });
+      assert.deepEqual(eventNames(tx), ["ProcessingGranted"]);
+      assert.equal(tx.logs[0].args.actor, dataProcessor);
+
+      tx = await consent.revokeConsentPurpose(0, { from: dataSubject });
+      assert.deepEqual(eventNames(tx), ["ConsentPurposeRevoked"]);
+      assert.equal(tx.logs[0].args.purpose.toNumber(), 0);
+      // O(1) revocation: the child contracts are not called, their verify() reads the purpose epoch
+      const revoked = await processing.getPastEvents("ProcessingRevoked", { fromBlock: tx.receipt.blockNumber, toBlock: tx.receipt.blockNumber });
+      assert.equal(revoked.length, 0, "Child contracts are not touched by the per-purpose revocation");
+      assert.equal(await processing.verifyDS(0), false);
+
+      tx = await consent.revokeConsentProcessor(dataProcessor, { from: dataSubject });
+      assert.deepEqual(eventNames(tx), ["ConsentProcessorRevoked"]);
+      const allRevoked = await processing.getPastEvents("AllProcessingRevoked", { fromBlock: tx.receipt.blockNumber, toBlock: tx.receipt.blockNumber });
+      assert.equal(allRevoked.length, 1);
+
+      console.log("\n✅ Test 2.14.2: PASSED");
+    });
+  });
+});
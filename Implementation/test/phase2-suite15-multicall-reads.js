@@ -0,0 +1,110 @@
+/**
+ * Phase 2: Scalability - Suite 2.15
+ * Test: Multicall-Batched Consent Reads
+ *
+ * Goal:
+ *  - Read the getters of many CollectionConsent contracts in one eth_call
+ *    (Multicall.tryBlockAndAggregate, as ui/consent_reader.py does) and check
+ *    the result matches the individual getter calls.
+ *  - A failing call does not break the rest of the batch.
+ */
+
+const CollectionConsent = artifacts.require("CollectionConsent");
+const Multicall = artifacts.require("Multicall");
+
+contract("Phase 2.15: Multicall Reads", accounts => {
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+
+  // Same getters as ui/consent_reader.py SNAPSHOT_GETTERS
+  const GETTERS = [
+    ["verify", ["bool"]],
+    ["getDataSubject", ["address"]],
+    ["getController", ["address"]],
+    ["getRecipients", ["address[]"]],
+    ["getData", ["uint256"]],
+    ["getValidity", ["uint8", "uint8"]],
+    ["getValidityWindow", ["uint256", "uint256"]],
+    ["isErased", ["bool"]],
+    ["getAllProcessors", ["address[]"]]
+  ];
+
+  let multicall;
+
+  before(async () => {
+    multicall = await Multicall.new();
+  });
+
+  function snapshotCalls(consent) {
+    return GETTERS.map(([name]) => ({ target: consent.address, callData: consent.contract.methods[name]().encodeABI() }));
+  }
+
+  describe("Test 2.15.1: Aggregated Snapshot", () => {
+    it("Should return the same values as the individual getters", async () => {
+      console.log("\n🧪 Test 2.15.1: Aggregated Snapshot");
+      console.log("=".repeat(70));
+
+      const subjects = [accounts[0], accounts[3], accounts[4], accounts[5]];
+      const consents = [];
+      for (const ds of subjects) {
+        consents.push(await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0], { from: ds }));
+      }
+      await consents[0].grantConsent({ from: dataController });
+      await consents[1].eraseData({ from: subjects[1] });
+
+      const calls = [].concat(...consents.map(snapshotCalls));
+      const result = await multicall.tryBlockAndAggregate.call(false, calls);
+      const returnData = result.returnData;
+      assert.equal(returnData.length, consents.length * GETTERS.length);
+
+      for (let c = 0; c < consents.length; c++) {
+        for (let g = 0; g < GETTERS.length; g++) {
+          const [name, types] = GETTERS[g];
+          const entry = returnData[c * GETTERS.length + g];
+          assert.equal(entry.success, true, `${name} succeeded`);
+          const decoded = web3.eth.abi.decodeParameters(types, entry.returnData);
+          const direct = await consents[c][name]();
+          if (types.length === 1) {
+            assert.equal(String(decoded[0]), String(direct), `${name} of consent ${c}`);
+          } else {
+            for (let k = 0; k < types.length; k++) {
+              assert.equal(String(decoded[k]), String(direct[k]), `${name}[${k}] of consent ${c}`);
+            }
+          }
+        }
+      }
+
+      const gas = await multicall.tryBlockAndAggregate.estimateGas(false, calls);
+      console.log(`${consents.length} consents x ${GETTERS.length} getters in 1 eth_call (${gas.toLocaleString()} gas) instead of ${calls.length} eth_calls`);
+
+      console.log("\n✅ Test 2.15.1: PASSED");
+    });
+  });
+
+  describe("Test 2.15.2: Failing Calls", () => {
+    it("Should report failed calls without reverting the batch", async () => {
+      console.log("\n🧪 Test 2.15.2: Failing Calls");
+      console.log("=".repeat(70));
+
+      const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0], { from: accounts[0] });
+      const calls = [
+        { target: consent.address, callData: consent.contract.methods.getData().encodeABI() },
+        // Reverts: processor has not requested any purpose
+        { target: consent.address, callData: consent.contract.methods.getProcessingConsentSC(dataProcessor).encodeABI() }
+      ];
+
+      const result = await multicall.tryAggregate.call(false, calls);
+      assert.equal(result[0].success, true);
+      assert.equal(result[1].success, false, "Reverted call reported as failed");
+
+      try {
+        await multicall.aggregate.call(calls);
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "Multicall call failed", "Error message mismatch");
+      }
+
+      console.log("\n✅ Test 2.15.2: PASSED");
+    });
+  });
+});
@@ -0,0 +1,145 @@
+/**
+ * Phase 2: Scalability - Suite 2.16
+ * Test: Bitmap-Packed Processing Purposes
+ *
+ * Goal:
+ *  - ProcessingConsent keeps purposes as bits of a uint256 and the DC/DS/DP
+ *    validity as three bitmaps: check it behaves like the previous layout
+ *    (contracts/baseline/ProcessingConsentBaseline.sol).
+ *  - Compare the gas of newPurpose, grantConsent, revokeConsent and
+ *    revokeAllConsents between both layouts for a growing number of purposes.
+ *
+ * Both contracts are deployed directly by the Controller, so the Controller
+ * also plays the role of the CollectionConsent SC allowed to add purposes.
+ */
+
+const ProcessingConsent = artifacts.require("ProcessingConsent");
+const ProcessingConsentBaseline = artifacts.require("ProcessingConsentBaseline");
+
+contract("Phase 2.16: Bitmap Purposes", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+
+  const PURPOSE_COUNTS = [1, 10, 50, 100];
+
+  async function deploy(Contract) {
+    return Contract.new(dataController, dataSubject, dataProcessor, { from: dataController });
+  }
+
+  async function gasOf(txPromise) {
+    const tx = await txPromise;
+    return tx.receipt.gasUsed;
+  }
+
+  describe("Test 2.16.1: Same Behaviour as the Previous Layout", () => {
+    it("Should grant, revoke and revoke all like the baseline", async () => {
+      console.log("\n🧪 Test 2.16.1: Same Behaviour as the Previous Layout");
+      console.log("=".repeat(70));
+
+      const packed = await deploy(ProcessingConsent);
+      const baseline = await deploy(ProcessingConsentBaseline);
+
+      for (const c of [packed, baseline]) {
+        await c.newPurpose(3, 15, 86400, 1, { from: dataController });
+        await c.newPurpose(200, 7, 86400, 0, { from: dataController });
+        await c.newPurpose(255, 1, 86400, 1, { from: dataController });
+      }
+
+      const steps = [
+        [null, null],
+        ["grantConsent", 3, dataProcessor],
+        ["grantConsent", 200, dataSubject],
+        ["grantConsent", 200, dataProcessor],
+        ["revokeConsent", 3, dataSubject],
+        ["grantConsent", 255, dataProcessor],
+        ["revokeAllConsents", null, dataController]
+      ];
+      for (const [method, purpose, from] of steps) {
+        if (method === "revokeAllConsents") {
+          await packed.revokeAllConsents({ from });
+          await baseline.revokeAllConsents({ from });
+        } else if (method) {
+          await packed[method](purpose, { from });
+          await baseline[method](purpose, { from });
+        }
+        for (const p of [3, 200, 255]) {
+          assert.equal(await packed.verify(p), await baseline.verify(p), `verify(${p}) after ${method || "creation"}`);
+        }
+      }
+
+      const purposes = (await packed.getPurposes()).map(p => p.toNumber());
+      assert.deepEqual(purposes, [3, 200, 255], "Purposes listed from the bitmap");
+      assert.equal(await packed.existsPurpose(200), true);
+      assert.equal(await packed.existsPurpose(4), false);
+      assert.equal(await packed.existsPurpose(256), false);
+      assert.equal(await packed.verifyDS(255), true, "DS whitelist bit kept by the Controller's revoke all");
+
+      const window = await packed.getValidityWindow(3);
+      assert.equal(window[1].sub(window[0]).toNumber(), 86400, "uint64 timestamps keep the duration");
+
+      for (const [call, message] of [
+        [() => packed.newPurpose(3, 15, 86400, 1, { from: dataController }), "Processing purpose already exists"],
+        [() => packed.newPurpose(256, 15, 86400, 1, { from: dataController }), "Processing purpose out of range"],
+        [() => packed.grantConsent(4, { from: dataSubject }), "Processing purpose does not exists"],
+        [() => packed.verify(256), "Processing purpose does not exists"]
+      ]) {
+        try {
+          await call();
+          assert.fail("Should have thrown error");
+        } catch (e) {
+          assert.include(e.message, message, "Error message mismatch");
+        }
+      }
+
+      console.log("\n✅ Test 2.16.1: PASSED");
+    });
+  });
+
+  describe("Test 2.16.2: Gas Before / After", () => {
+    it("Should measure per-operation gas for 1-100 purposes", async () => {
+      console.log("\n🧪 Test 2.16.2: Gas Before / After");
+      console.log("=".repeat(70));
+
+      const rows = [];
+      for (const n of PURPOSE_COUNTS) {
+        const row = { n };
+        for (const [name, Contract] of [["baseline", ProcessingConsentBaseline], ["packed", ProcessingConsent]]) {
+          const c = await deploy(Contract);
+          let newPurpose = 0;
+          for (let p = 0; p < n; p++) {
+            newPurpose += await gasOf(c.newPurpose(p, 15, 86400, 1, { from: dataController }));
+          }
+          // Whitelisted purposes: the DS toggles one of them off and on again
+          const last = n - 1;
+          const revoke = await gasOf(c.revokeConsent(last, { from: dataSubject }));
+          const grant = await gasOf(c.grantConsent(last, { from: dataSubject }));
+          // Controller bits are all set by newPurpose: the loop of the baseline clears n of them
+          const revokeAll = await gasOf(c.revokeAllConsents({ from: dataController }));
+          row[name] = { newPurpose: Math.round(newPurpose / n), grant, revoke, revokeAll };
+        }
+        rows.push(row);
+      }
+
+      const pct = (before, after) => `${(100 * (1 - after / before)).toFixed(1)}%`.padStart(8);
+      console.log("Purposes  Operation          Baseline      Packed   Saving");
+      for (const { n, baseline, packed } of rows) {
+        for (const op of ["newPurpose", "grant", "revoke", "revokeAll"]) {
+          console.log(`${String(n).padStart(8)}  ${op.padEnd(14)} ${baseline[op].toLocaleString().padStart(12)} ${packed[op].toLocaleString().padStart(11)} ${pct(baseline[op], packed[op])}`);
+        }
+      }
+
+      const first = rows[0], lastRow = rows[rows.length - 1];
+      // revokeAll is one write whatever the number of purposes
+      assert.isBelow(Math.abs(lastRow.packed.revokeAll - first.packed.revokeAll), 1000, "Packed revokeAll is O(1)");
+      assert.isAbove(lastRow.baseline.revokeAll, 10 * first.baseline.revokeAll, "Baseline revokeAll grows with purposes");
+      // With a single purpose the packed DS bitmap goes back to zero on revoke, so the grant pays a fresh slot:
+      // only compare once the bitmaps hold several purposes.
+      for (const op of ["newPurpose", "grant", "revoke", "revokeAll"]) {
+        assert.isBelow(lastRow.packed[op], lastRow.baseline[op], `${op} cheaper with bitmaps`);
+      }
+
+      console.log("\n✅ Test 2.16.2: PASSED");
+    });
+  });
+});
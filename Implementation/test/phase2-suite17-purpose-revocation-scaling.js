@@ -0,0 +1,115 @@
+/**
+ * Phase 2: Scalability - Suite 2.17
+ * Test: O(1) Purpose Revocation
+ *
+ * Goal:
+ *  - CollectionConsent.revokeConsentPurpose no longer calls every
+ *    ProcessingConsent SC: it bumps the purpose's revocation epoch, which
+ *    ProcessingConsent.verify/verifyDS compare with the epoch of the DS grant.
+ *  - Check the revocation reaches every processor and that the DS can grant
+ *    the purpose again to a single processor.
+ *  - Measure revokeConsentPurpose and verify with 1, 10, 100 and 500
+ *    processors: the gas must not depend on the number of processors.
+ */
+
+const CollectionConsent = artifacts.require("CollectionConsent");
+const ProcessingConsent = artifacts.require("ProcessingConsent");
+
+contract("Phase 2.17: Purpose Revocation Scaling", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+
+  const PROCESSOR_COUNTS = [1, 10, 100, 500];
+
+  async function newConsent() {
+    const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+    await consent.grantConsent({ from: dataController });
+    return consent;
+  }
+
+  // Purpose 0 is a default purpose: the DS flag is set when the processor requests it
+  async function addProcessors(consent, count) {
+    const processors = [dataProcessor];
+    while (processors.length < count) {
+      processors.push(web3.utils.toChecksumAddress(web3.utils.randomHex(20)));
+    }
+    for (const processor of processors) {
+      await consent.newPurpose(processor, 0, 15, 86400, { from: dataController });
+    }
+    return processors;
+  }
+
+  describe("Test 2.17.1: Lazy Revocation", () => {
+    it("Should revoke the purpose for every processor and allow a new grant", async () => {
+      console.log("\n🧪 Test 2.17.1: Lazy Revocation");
+      console.log("=".repeat(70));
+
+      const consent = await newConsent();
+      const processors = await addProcessors(consent, 3);
+      await consent.newPurpose(dataProcessor, 1, 15, 86400, { from: dataController });
+      const children = [];
+      for (const processor of processors) {
+        children.push(await ProcessingConsent.at(await consent.getProcessingConsentSC(processor)));
+      }
+      await children[0].grantConsent(0, { from: dataProcessor });
+      await children[0].grantConsent(1, { from: dataSubject });
+      await children[0].grantConsent(1, { from: dataProcessor });
+      assert.equal(await children[0].verify(0), true, "Default purpose valid before revocation");
+
+      const tx = await consent.revokeConsentPurpose(0, { from: dataSubject });
+      assert.equal((await consent.getPurposeEpoch(0)).toNumber(), 1);
+      for (const child of children) {
+        assert.equal(await child.verifyDS(0), false, "Purpose revoked on every ProcessingConsent");
+      }
+      assert.equal(await children[0].verify(0), false);
+      assert.equal(await children[0].verify(1), true, "Other purposes untouched");
+      console.log(`revokeConsentPurpose: ${tx.receipt.gasUsed.toLocaleString()} gas, no call to the ${children.length} ProcessingConsent SCs`);
+
+      // New explicit DS grant, for one processor only
+      await children[0].grantConsent(0, { from: dataSubject });
+      assert.equal(await children[0].verify(0), true, "DS grant after the revocation is valid");
+      assert.equal(await children[1].verifyDS(0), false, "Still revoked for the other processors");
+
+      // A second revocation also covers the new grant
+      await consent.revokeConsentPurpose(0, { from: dataSubject });
+      assert.equal(await children[0].verify(0), false);
+
+      console.log("\n✅ Test 2.17.1: PASSED");
+    });
+  });
+
+  describe("Test 2.17.2: Gas vs Number of Processors", () => {
+    it("Should keep revokeConsentPurpose and verify flat for 1-500 processors", async function () {
+      this.timeout(0);
+      console.log("\n🧪 Test 2.17.2: Gas vs Number of Processors");
+      console.log("=".repeat(70));
+
+      const rows = [];
+      for (const n of PROCESSOR_COUNTS) {
+        const consent = await newConsent();
+        await addProcessors(consent, n);
+        const child = await ProcessingConsent.at(await consent.getProcessingConsentSC(dataProcessor));
+        await child.grantConsent(0, { from: dataProcessor });
+
+        const verifyBefore = await child.verify.estimateGas(0);
+        const tx = await consent.revokeConsentPurpose(0, { from: dataSubject });
+        const verifyAfter = await child.verify.estimateGas(0);
+        assert.equal(await child.verify(0), false);
+        rows.push({ n, revoke: tx.receipt.gasUsed, verifyBefore, verifyAfter });
+      }
+
+      console.log("Processors  revokeConsentPurpose  verify (before)  verify (after)");
+      for (const r of rows) {
+        console.log(`${String(r.n).padStart(10)}  ${r.revoke.toLocaleString().padStart(20)}  ${r.verifyBefore.toLocaleString().padStart(15)}  ${r.verifyAfter.toLocaleString().padStart(14)}`);
+      }
+
+      for (const r of rows) {
+        assert.equal(r.revoke, rows[0].revoke, `revokeConsentPurpose gas with ${r.n} processors`);
+        assert.equal(r.verifyAfter, rows[0].verifyAfter, `verify gas with ${r.n} processors`);
+      }
+
+      console.log("\n✅ Test 2.17.2: PASSED");
+    });
+  });
+});
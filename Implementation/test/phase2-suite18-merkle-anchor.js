@@ -0,0 +1,212 @@
+/**
+ * Phase 2: Scalability - Suite 2.18
+ * Test: Merkle-Batched Consents Anchored On Chain
+ *
+ * Goal:
+ *  - Consent records are kept off-chain in a Merkle tree (ui/merkle_consents.py)
+ *    and only its root is committed to ConsentAnchor.
+ *  - Check that only the anchorer commits roots, that verifyWithProof accepts
+ *    the records under the latest root and rejects tampered and stale ones.
+ *  - Compare gas and wall-clock time per consent against the per-contract flow
+ *    of Test 2.11.2, and check that a commit costs the same for 20 and 1000 consents.
+ */
+
+const CollectionConsent = artifacts.require("CollectionConsent");
+const ConsentAnchor = artifacts.require("ConsentAnchor");
+
+contract("Phase 2.18: Merkle Consent Anchor", accounts => {
+  const dataSubject = accounts[0];
+  const dataController = accounts[1];
+  const dataProcessor = accounts[2];
+  const unauthorized = accounts[3];
+
+  const NUM_CONSENTS = 20; // same as Test 2.11.2
+  const BATCH_SIZES = [NUM_CONSENTS, 1000];
+
+  function avg(arr) {
+    if (!arr.length) return 0;
+    return arr.reduce((a, b) => a + b, 0) / arr.length;
+  }
+
+  // Same hashing as ConsentAnchor.consentLeaf / ui/merkle_consents.py
+  function consentLeaf(r) {
+    return web3.utils.keccak256(web3.eth.abi.encodeParameters(
+      ["address", "address", "uint256", "uint256", "uint256", "bool", "bool"],
+      [r.dataSubject, r.controller, r.data, r.beginningDate, r.expirationDate, r.dsValid, r.dcValid]
+    ));
+  }
+
+  function hashPair(a, b) {
+    return a < b ? web3.utils.soliditySha3(a, b) : web3.utils.soliditySha3(b, a);
+  }
+
+  function merkleLevels(leaves) {
+    const levels = [leaves];
+    while (levels[levels.length - 1].length > 1) {
+      const level = levels[levels.length - 1];
+      const parents = [];
+      for (let i = 0; i + 1 < level.length; i += 2) parents.push(hashPair(level[i], level[i + 1]));
+      if (level.length % 2) parents.push(level[level.length - 1]);
+      levels.push(parents);
+    }
+    return levels;
+  }
+
+  function merkleProof(levels, index) {
+    const proof = [];
+    for (const level of levels.slice(0, -1)) {
+      if ((index ^ 1) < level.length) proof.push(level[index ^ 1]);
+      index = Math.floor(index / 2);
+    }
+    return proof;
+  }
+
+  function records(count, now) {
+    const result = [];
+    for (let i = 0; i < count; i++) {
+      result.push({
+        dataSubject: web3.utils.toChecksumAddress(web3.utils.padLeft(web3.utils.toHex(i + 1), 40)),
+        controller: dataController,
+        data: 0xffff,
+        beginningDate: now,
+        expirationDate: now + 86400,
+        dsValid: true,
+        dcValid: true,
+      });
+    }
+    return result;
+  }
+
+  async function chainTime() {
+    return Number((await web3.eth.getBlock("latest")).timestamp);
+  }
+
+  let anchor;
+
+  beforeEach(async () => {
+    anchor = await ConsentAnchor.new({ from: dataController });
+  });
+
+  describe("Test 2.18.1: Anchor Access Control", () => {
+    it("Should only let the anchorer commit roots", async () => {
+      console.log("\n🧪 Test 2.18.1: Anchor Access Control");
+      console.log("=".repeat(70));
+
+      try {
+        await anchor.latestEpoch();
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "No root anchored yet", "Error message mismatch");
+      }
+
+      try {
+        await anchor.anchor(web3.utils.randomHex(32), 1, { from: unauthorized });
+        assert.fail("Should have thrown error");
+      } catch (e) {
+        assert.include(e.message, "Only the anchorer can commit roots", "Error message mismatch");
+      }
+
+      const root = web3.utils.randomHex(32);
+      const tx = await anchor.anchor(root, 7, { from: dataController });
+      assert.equal(tx.logs[0].event, "RootAnchored");
+      assert.equal((await anchor.latestEpoch()).toNumber(), 0);
+      const stored = await anchor.getAnchor(0);
+      assert.equal(stored.root, root);
+      assert.equal(stored.count.toNumber(), 7);
+
+      console.log("\n✅ Test 2.18.1: PASSED");
+    });
+  });
+
+  describe("Test 2.18.2: Proof Verification", () => {
+    it("Should accept proofs under the latest root only", async () => {
+      console.log("\n🧪 Test 2.18.2: Proof Verification");
+      console.log("=".repeat(70));
+
+      const now = await chainTime();
+      const batch = records(5, now);
+      assert.equal(
+        await anchor.consentLeaf(...Object.values(batch[0])), consentLeaf(batch[0]),
+        "Off-chain leaf should match consentLeaf"
+      );
+
+      let levels = merkleLevels(batch.map(consentLeaf));
+      await anchor.anchor(levels[levels.length - 1][0], batch.length, { from: dataController });
+
+      for (let i = 0; i < batch.length; i++) {
+        assert.equal(await anchor.verifyWithProof(consentLeaf(batch[i]), merkleProof(levels, i)), true, "Valid proof");
+        assert.equal(
+          await anchor.verifyConsent(...Object.values(batch[i]), merkleProof(levels, i)), true, "Valid consent"
+        );
+      }
+
+      // Tampered record: same proof, more data
+      const tampered = Object.assign({}, batch[0], { data: 0x1ffff });
+      assert.equal(await anchor.verifyWithProof(consentLeaf(tampered), merkleProof(levels, 0)), false, "Tampered record");
+
+      // Proven but not granted by the DC
+      const oldProof = merkleProof(levels, 0);
+      batch[0].dcValid = false;
+      levels = merkleLevels(batch.map(consentLeaf));
+      await anchor.anchor(levels[levels.length - 1][0], batch.length, { from: dataController });
+      assert.equal(await anchor.verifyWithProof(consentLeaf(batch[0]), merkleProof(levels, 0)), true, "Revoked record is proven");
+      assert.equal(await anchor.verifyConsent(...Object.values(batch[0]), merkleProof(levels, 0)), false, "Revoked record is not valid");
+
+      // The granted version was only under the previous root
+      const granted = Object.assign({}, batch[0], { dcValid: true });
+      assert.equal(await anchor.verifyWithProof(consentLeaf(granted), oldProof), false, "Stale proof");
+
+      console.log("\n✅ Test 2.18.2: PASSED");
+    });
+  });
+
+  describe("Test 2.18.3: Merkle Anchor vs Per-Contract Benchmark", () => {
+    it("Should commit a batch at a constant cost and compare against CollectionConsent deployments", async () => {
+      console.log("\n🧪 Test 2.18.3: Merkle Anchor vs Per-Contract Benchmark");
+      console.log("=".repeat(70));
+      console.log(`Creating and granting ${NUM_CONSENTS} consents per contract, committing ${BATCH_SIZES.join(" and ")} off-chain...`);
+
+      // Per-contract flow (Test 2.11.2)
+      const contractCreate = [];
+      const contractGrant = [];
+      let startTime = Date.now();
+      for (let i = 0; i < NUM_CONSENTS; i++) {
+        const consent = await CollectionConsent.new(
+          dataController, [dataProcessor], 0xffff, 86400, [0, 1], { from: dataSubject }
+        );
+        const createReceipt = await web3.eth.getTransactionReceipt(consent.transactionHash);
+        contractCreate.push(createReceipt.gasUsed);
+
+        const grantTx = await consent.grantConsent({ from: dataController });
+        contractGrant.push(grantTx.receipt.gasUsed);
+      }
+      const contractMs = Date.now() - startTime;
+      const contractTotal = avg(contractCreate) + avg(contractGrant);
+
+      // Merkle flow: build the tree off-chain, then one anchor transaction per batch
+      const now = await chainTime();
+      const anchorGas = {};
+      const anchorMs = {};
+      for (const size of BATCH_SIZES) {
+        startTime = Date.now();
+        const levels = merkleLevels(records(size, now).map(consentLeaf));
+        const tx = await anchor.anchor(levels[levels.length - 1][0], size, { from: dataController });
+        anchorMs[size] = Date.now() - startTime;
+        anchorGas[size] = tx.receipt.gasUsed;
+      }
+
+      console.log("\n📊 Results (average per consent):");
+      console.log("                        Per-contract " + BATCH_SIZES.map(s => `Merkle (${s})`.padStart(14)).join(""));
+      console.log(`  Gas (create + grant): ${Math.round(contractTotal).toLocaleString().padStart(12)} ` +
+        BATCH_SIZES.map(s => Math.round(anchorGas[s] / s).toLocaleString().padStart(14)).join(""));
+      console.log(`  Time (ms):            ${(contractMs / NUM_CONSENTS).toFixed(2).padStart(12)} ` +
+        BATCH_SIZES.map(s => (anchorMs[s] / s).toFixed(2).padStart(14)).join(""));
+      console.log("\n  Gas per commit:       " + BATCH_SIZES.map(s => `${s}: ${anchorGas[s].toLocaleString()}`).join(", "));
+
+      // Only the first anchor initializes the array length slot
+      assert.isBelow(Math.abs(anchorGas[BATCH_SIZES[1]] - anchorGas[BATCH_SIZES[0]]), 20000, "Commit gas should not depend on the batch size");
+      assert.isBelow(anchorGas[NUM_CONSENTS] / NUM_CONSENTS, contractTotal, "Anchoring should be cheaper per consent");
+      console.log("\n✅ Test 2.18.3: PASSED");
+    });
+  });
+});
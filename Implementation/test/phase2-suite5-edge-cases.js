@@ -11,6 +11,7 @@
  */
 
 const CollectionConsent = artifacts.require("CollectionConsent");
+const ProcessingConsent = artifacts.require("ProcessingConsent");
 
 contract("Phase 2.5: Edge Cases & Boundary Conditions", accounts => {
     const dataSubject = accounts[0];
@@ -777,4 +778,57 @@ contract("Phase 2.5: Edge Cases & Boundary Conditions", accounts => {
             console.log("=".repeat(70));
         });
     });
+
+    describe("Test 2.5.9: Expiration Date Bounds", () => {
+        const MAX_UINT64 = web3.utils.toBN("18446744073709551615");
+
+        it("Should reject consents whose expiration does not fit in uint64", async () => {
+            console.log("\n🧪 EDGE CASE 2.5.9b: Consent Expiration Bounds");
+
+            try {
+                await CollectionConsent.new(dataController, [dataProcessor], 15, MAX_UINT64, [0], { from: dataSubject });
+                assert.fail("Should have thrown error");
+            } catch (e) {
+                assert.include(e.message, "Duration out of range", "Error message mismatch");
+            }
+            console.log("   ✅ Consent duration past uint64 rejected");
+
+            const now = web3.utils.toBN((await web3.eth.getBlock("latest")).timestamp);
+            const duration = MAX_UINT64.sub(now).subn(3600);
+            const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, duration, [0], { from: dataSubject });
+            await consent.grantConsent({ from: dataController });
+            const window = await consent.getValidityWindow();
+            assert.equal(window[1].toString(), window[0].add(duration).toString(), "Expiration stored without wrapping");
+            assert.equal(await consent.verify(), true, "Long consent is valid, not expired");
+            console.log(`   ✅ Expiration stored as ${window[1].toString()}`);
+        });
+
+        it("Should reject processing purposes whose expiration does not fit in uint64", async () => {
+            console.log("\n" + "=".repeat(70));
+            console.log("🧪 EDGE CASE 2.5.9: Expiration Date Bounds");
+            console.log("=".repeat(70));
+
+            const consent = await CollectionConsent.new(dataController, [dataProcessor], 15, 86400, [0], { from: dataSubject });
+            await consent.grantConsent({ from: dataController });
+
+            try {
+                await consent.newPurpose(dataProcessor, 1, 1, MAX_UINT64, { from: dataController });
+                assert.fail("Should have thrown error");
+            } catch (e) {
+                assert.include(e.message, "Duration out of range", "Error message mismatch");
+            }
+            console.log("   ✅ newPurpose duration past uint64 rejected");
+
+            // Largest duration that still fits, with an hour of margin for the block timestamp
+            const now = web3.utils.toBN((await web3.eth.getBlock("latest")).timestamp);
+            const duration = MAX_UINT64.sub(now).subn(3600);
+            await consent.newPurpose(dataProcessor, 1, 1, duration, { from: dataController });
+            const processing = await ProcessingConsent.at(await consent.getProcessingConsentSC(dataProcessor));
+            const window = await processing.getValidityWindow(1);
+            assert.equal(window[1].toString(), window[0].add(duration).toString(), "Expiration stored without wrapping");
+            console.log(`   ✅ Expiration stored as ${window[1].toString()}`);
+
+            console.log("=".repeat(70));
+        });
+    });
 });
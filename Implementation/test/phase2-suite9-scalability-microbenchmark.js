@@ -11,6 +11,7 @@
  */
 
 const CollectionConsent = artifacts.require("CollectionConsent");
+const CollectionConsentBaseline = artifacts.require("CollectionConsentBaseline");
 
 contract("Phase 2.9: Scalability Microbenchmark", accounts => {
   const dataSubject = accounts[0];
@@ -83,4 +84,55 @@ contract("Phase 2.9: Scalability Microbenchmark", accounts => {
       assert.equal(deployments.length, NUM_CONSENTS, "All consents should be deployed");
     });
   });
+
+  describe("Test 2.9.2: Packed Consent State vs Previous Layout", () => {
+    it("Should log lifecycle gas with the hot fields in one slot", async () => {
+      console.log("\n🧪 Test 2.9.2: Packed Consent State vs Previous Layout");
+      console.log("=".repeat(70));
+      console.log(`Running the consent lifecycle on ${NUM_CONSENTS} consents per layout...`);
+
+      // Timestamps, both validity flags and the erasure flag share one slot in CollectionConsent;
+      // CollectionConsentBaseline keeps the previous layout (4 slots).
+      const OPERATIONS = ["DS grant", "DC grant", "verify", "DC revoke", "erase"];
+      const gas = { baseline: {}, packed: {} };
+
+      for (const [name, Contract] of [["baseline", CollectionConsentBaseline], ["packed", CollectionConsent]]) {
+        OPERATIONS.forEach(op => { gas[name][op] = []; });
+        for (let i = 0; i < NUM_CONSENTS; i++) {
+          const consent = await Contract.new(dataController, [dataProcessor], 0xffff, 86400, [0, 1], { from: dataSubject });
+          gas[name]["DS grant"].push((await consent.grantConsent({ from: dataSubject })).receipt.gasUsed);
+          gas[name]["DC grant"].push((await consent.grantConsent({ from: dataController })).receipt.gasUsed);
+          assert.equal(await consent.verify(), true);
+          if (name === "packed") {
+            // The getter reads the packed flags (ConsentReader's ds_granted / dc_granted)
+            const flags = await consent.getValidity();
+            assert.deepEqual([Number(flags[0]), Number(flags[1])], [1, 1], "getValidity after both grants");
+          }
+          gas[name]["verify"].push(await consent.verify.estimateGas());
+          gas[name]["DC revoke"].push((await consent.revokeConsent({ from: dataController })).receipt.gasUsed);
+          if (name === "packed") {
+            const flags = await consent.getValidity();
+            assert.deepEqual([Number(flags[0]), Number(flags[1])], [1, 0], "getValidity after DC revoke");
+          }
+          gas[name]["erase"].push((await consent.eraseData({ from: dataSubject })).receipt.gasUsed);
+        }
+      }
+
+      function avg(arr) {
+        if (!arr.length) return 0;
+        return arr.reduce((a, b) => a + b, 0) / arr.length;
+      }
+
+      console.log("\n📊 Results (average gas, verify as an eth_estimateGas call):");
+      console.log("  Operation        Baseline       Packed    Saving");
+      for (const op of OPERATIONS) {
+        const before = avg(gas.baseline[op]);
+        const after = avg(gas.packed[op]);
+        console.log(`  ${op.padEnd(12)} ${Math.round(before).toLocaleString().padStart(12)} ${Math.round(after).toLocaleString().padStart(12)} ${(100 * (1 - after / before)).toFixed(1).padStart(8)}%`);
+      }
+
+      assert.isBelow(avg(gas.packed["verify"]), avg(gas.baseline["verify"]), "verify reads a single slot");
+      assert.isBelow(avg(gas.packed["erase"]), avg(gas.baseline["erase"]), "Erasure flag shares an already used slot");
+    });
+  });
 });
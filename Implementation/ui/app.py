@@ -1,7 +1,21 @@
 import streamlit as st
 import json
+import os
 from web3 import Web3
 import time
+import uuid
+
+from consent_registry import ConsentRegistryClient
+from consent_clone_factory import ConsentCloneFactoryClient
+from bulk_import import parse_consents_csv, import_consents
+from consent_indexer import ConsentIndexer, ROLES, DEFAULT_PAGE_SIZE
+from contract_artifacts import load_artifact, deployed_address
+from consent_reader import ConsentReader
+from consent_cache import VerificationCache
+from tx_pipeline import TransactionPipeline, SUCCESS, FINISHED
+from nonce_manager import NonceManager
+from provider_pool import ProviderPool
+from consent_subscriber import ConsentSubscriber, DEFAULT_WS_URL
 
 # Page config
 st.set_page_config(
@@ -10,11 +24,17 @@ st.set_page_config(
     layout="wide"
 )
 
-# Connect to Ganache
+# Connect to Ganache (or the CONSENT_RPC_URLS nodes, with failover)
+@st.cache_resource
+def get_provider_pool():
+    pool = ProviderPool.from_env()
+    pool.start()
+    return pool
+
 @st.cache_resource
 def get_web3():
     try:
-        w3 = Web3(Web3.HTTPProvider('http://127.0.0.1:8545'))
+        w3 = Web3(get_provider_pool())
         if w3.is_connected():
             return w3
         else:
@@ -35,17 +55,86 @@ def load_contract(_w3, contract_name):
         abi = contract_json['abi']
         bytecode = contract_json.get('bytecode', '')
         
-        # Get latest deployment
-        networks = contract_json.get('networks', {})
-        if networks:
-            network_id = list(networks.keys())[-1]
-            address = networks[network_id]['address']
+        # Deployment on the connected network
+        address = deployed_address(contract_json, _w3.net.version)
+        if address:
             return _w3.eth.contract(address=address, abi=abi), abi, bytecode
         return None, abi, bytecode
     except Exception as e:
         st.error(f"Error loading contract: {e}")
         return None, None, None
 
+# Local event index of consent state
+@st.cache_resource
+def get_indexer(_w3):
+    try:
+        indexer = ConsentIndexer(_w3, os.path.join(os.path.dirname(__file__), 'consents.db'))
+        clone_factory = ConsentCloneFactoryClient.from_artifact(_w3)
+        if clone_factory is not None:
+            indexer.track_factory(clone_factory.address)
+        # The consent deployed by `truffle migrate`; the UI's deployments are tracked from their receipts
+        collection_address = deployed_address(load_artifact('CollectionConsent'), _w3.net.version)
+        if collection_address:
+            indexer.track_consent(collection_address)
+        return indexer
+    except Exception as e:
+        st.warning(f"Consent index unavailable: {e}")
+        return None
+
+# Batched (multicall / JSON-RPC batch) consent reads
+@st.cache_resource
+def get_consent_reader(_w3):
+    try:
+        return ConsentReader.from_artifact(_w3)
+    except Exception as e:
+        st.warning(f"Batched consent reads unavailable: {e}")
+        return None
+
+# Snapshots only change with new blocks: widget reruns on the same block reuse them
+@st.cache_data(max_entries=64, show_spinner=False)
+def read_snapshots(addresses, block_number):
+    reader = get_consent_reader(w3)
+    if reader is None:
+        return [None] * len(addresses)
+    return reader.snapshots(list(addresses))
+
+# Live model of the consents on screen, updated by new blocks and consent events (CONSENT_WS_URL, or polling)
+@st.cache_resource
+def get_subscriber(_w3):
+    reader = get_consent_reader(_w3)
+    if reader is None:
+        return None
+    subscriber = ConsentSubscriber(_w3, reader, ws_url=os.environ.get('CONSENT_WS_URL', DEFAULT_WS_URL))
+    subscriber.start()
+    return subscriber
+
+def current_snapshots(addresses):
+    """Snapshots from the live model (no RPC once watched), or read at the current block without it."""
+    subscriber = get_subscriber(w3)
+    if subscriber is None:
+        return read_snapshots(tuple(addresses), w3.eth.block_number)
+    subscriber.watch(addresses)
+    return subscriber.snapshots(addresses)
+
+# verify() cache invalidated by revoke/erase events
+@st.cache_resource
+def get_verification_cache(_w3):
+    try:
+        cache = VerificationCache(_w3)
+        cache.start()
+        return cache
+    except Exception as e:
+        st.warning(f"Verification cache unavailable: {e}")
+        return None
+
+# Background transaction submission shared by all sessions
+@st.cache_resource
+def get_tx_pipeline():
+    # Nonces are read from the endpoint the transactions are sent to: the pool's primary
+    primary = get_provider_pool().primary
+    nonce_manager = NonceManager(Web3(primary.provider))
+    return TransactionPipeline(primary.uri, nonce_manager=nonce_manager)
+
 # Initialize Web3
 w3 = get_web3()
 
@@ -55,7 +144,25 @@ st.sidebar.markdown("---")
 
 if w3 and w3.is_connected():
     st.sidebar.success("✅ Connected to Ganache")
-    st.sidebar.info(f"Block: {w3.eth.block_number}")
+    subscriber = get_subscriber(w3)
+    # Re-rendered from the live model only: no RPC per rerun
+    live = getattr(st, 'fragment', None) if subscriber is not None else None
+    if live is not None:
+        @live(run_every=1)
+        def live_status():
+            stats = subscriber.stats()
+            st.info(f"Block: {stats['block_number'] if stats['block_number'] is not None else '…'}")
+            st.caption(f"Live updates: {stats['mode'] or 'starting'} ({stats['watched']} consent(s) watched)")
+        with st.sidebar:
+            live_status()
+    else:
+        st.sidebar.info(f"Block: {w3.eth.block_number}")
+    with st.sidebar.expander("🌐 RPC endpoints"):
+        for uri, endpoint in get_provider_pool().metrics().items():
+            latency = endpoint['latency_ewma_ms']
+            st.caption(f"{'🟢' if endpoint['available'] else '🔴'} {uri}: "
+                       f"{f'{latency:.1f} ms' if latency is not None else 'no requests yet'}, "
+                       f"{endpoint['requests']} requests, {endpoint['failures']} failures")
 else:
     st.sidebar.error("❌ Not connected to Ganache")
     st.sidebar.warning("Start Ganache: `ganache --port 8545`")
@@ -72,6 +179,89 @@ account_labels = {
     accounts[4]: "Data Controller 2",
 }
 
+# Transactions sent directly take their nonces from the pipeline's NonceManager
+def get_registry(deployer):
+    """ConsentRegistry deployed by `truffle migrate`, or one deployed for this session."""
+    nonce_manager = get_tx_pipeline().nonce_manager
+    registry = ConsentRegistryClient.from_artifact(w3, nonce_manager)
+    if registry is None:
+        if 'consent_registry' not in st.session_state:
+            st.session_state.consent_registry = ConsentRegistryClient.deploy(w3, deployer, nonce_manager).address
+        registry = ConsentRegistryClient(w3, st.session_state.consent_registry, nonce_manager=nonce_manager)
+    return registry
+
+def get_clone_factory(deployer):
+    """ConsentCloneFactory deployed by `truffle migrate`, or one deployed for this session."""
+    nonce_manager = get_tx_pipeline().nonce_manager
+    clone_factory = ConsentCloneFactoryClient.from_artifact(w3, nonce_manager)
+    if clone_factory is None:
+        if 'consent_clone_factory' not in st.session_state:
+            st.session_state.consent_clone_factory = ConsentCloneFactoryClient.deploy(w3, deployer, nonce_manager).address
+        clone_factory = ConsentCloneFactoryClient(w3, st.session_state.consent_clone_factory, nonce_manager=nonce_manager)
+    return clone_factory
+
+# Transactions of this session in the background pipeline
+tx_pipeline = get_tx_pipeline()
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.handled_jobs = set()
+
+def collect_transactions():
+    """Copies job statuses into the session and records the consents of mined deployments. Returns the newly finished jobs."""
+    jobs = tx_pipeline.jobs(owner=st.session_state.session_id)
+    st.session_state.transactions = jobs
+    finished = [job for job in jobs if job['status'] in FINISHED and job['id'] not in st.session_state.handled_jobs]
+    
+    for job in finished:
+        st.session_state.handled_jobs.add(job['id'])
+        meta = job['meta']
+        if job['status'] != SUCCESS or 'consent' not in meta:
+            continue
+        
+        consent = dict(meta['consent'], timestamp=time.time())
+        if meta['kind'] == 'contract':
+            consent['address'] = job['contract_address']
+        elif meta['kind'] == 'clone':
+            consent['address'] = ConsentCloneFactoryClient(w3, meta['factory']).cloned_address(job['receipt'])
+        
+        if meta['kind'] != 'registry':
+            indexer = get_indexer(w3)
+            if indexer is not None:
+                indexer.track_consent(consent['address'], job['block_number'])
+        
+        if 'deployed_consents' not in st.session_state:
+            st.session_state.deployed_consents = []
+        st.session_state.deployed_consents.append(consent)
+    return finished
+
+def show_transactions():
+    finished = collect_transactions()
+    for job in finished:
+        if job['status'] == SUCCESS:
+            st.toast(f"✅ {job['label']} mined ({job['gas_used']:,} gas)")
+        else:
+            st.toast(f"❌ {job['label']} {job['status']}: {job['error'] or 'transaction reverted'}")
+    
+    jobs = st.session_state.transactions
+    in_flight = [job for job in jobs if job['status'] not in FINISHED]
+    st.markdown(f"### ⏳ Transactions ({len(in_flight)} in flight)")
+    for job in reversed(jobs[-5:]):
+        icon = {'queued': '🕓', 'pending': '⏳', 'success': '✅'}.get(job['status'], '❌')
+        tx_hash = f" `{job['tx_hash'][:10]}...`" if job['tx_hash'] else ""
+        st.caption(f"{icon} {job['label']}{tx_hash}")
+    
+    # Refresh the whole page once mined transactions changed the chain state
+    if finished and getattr(st, 'fragment', None) is not None:
+        st.rerun()
+
+# Re-run only this panel every 2 s while transactions are mined (Streamlit >= 1.37)
+if getattr(st, 'fragment', None) is not None:
+    show_transactions = st.fragment(run_every=2)(show_transactions)
+
+with st.sidebar:
+    st.markdown("---")
+    show_transactions()
+
 # Main page
 st.title("🔐 GDPR-Compliant Consent Management System")
 st.markdown("### Blockchain-based Personal Data Access Control")
@@ -158,52 +348,119 @@ with tab1:
     
     st.markdown("---")
     
+    deployment_mode = st.radio(
+        "Deployment Mode",
+        ["Per-consent contract", "Minimal-proxy clone", "Consent registry"],
+        horizontal=True,
+        help="Minimal-proxy clone deploys a 55-byte EIP-1167 proxy of a shared CollectionConsent implementation. "
+             "Consent registry stores the consent in one shared contract: a single storage write instead of a contract deployment"
+    )
+    
     if st.button("🚀 Deploy Consent Contract", type="primary", use_container_width=True):
+        consent_info = {
+            'data_subject': data_subject,
+            'controller': controller,
+            'recipients': recipients,
+            'purposes': purposes
+        }
+        consent_args = [controller, recipients, data_flags, duration, purposes]
+        
+        # Transactions are submitted in the background: the sidebar follows them until they are mined
         if not recipients:
             st.error("Please select at least one recipient!")
+        elif deployment_mode == "Consent registry":
+            try:
+                registry = get_registry(controller)
+                consent_id = Web3.to_hex(ConsentRegistryClient.consent_id(data_subject, controller))
+                
+                tx_pipeline.transact(
+                    registry.contract.abi, registry.address, 'createConsent', consent_args, data_subject,
+                    label="Registry consent", owner=st.session_state.session_id,
+                    meta={'kind': 'registry', 'consent': dict(consent_info, address=registry.address, consent_id=consent_id)}
+                )
+                
+                st.success("📤 Registry write submitted")
+                st.code(f"Registry Address: {registry.address}\nConsent ID: {consent_id}")
+            except Exception as e:
+                st.error(f"❌ Registry write failed: {e}")
+        elif deployment_mode == "Minimal-proxy clone":
+            try:
+                clone_factory = get_clone_factory(controller)
+                
+                tx_pipeline.transact(
+                    clone_factory.contract.abi, clone_factory.address, 'createConsent', consent_args, data_subject,
+                    label="Consent clone", owner=st.session_state.session_id,
+                    meta={'kind': 'clone', 'factory': clone_factory.address, 'consent': consent_info}
+                )
+                
+                st.success("📤 Clone deployment submitted")
+            except Exception as e:
+                st.error(f"❌ Clone deployment failed: {e}")
         else:
-            with st.spinner("Deploying contract to blockchain..."):
-                try:
-                    # Load ABI and bytecode
-                    _, abi, bytecode = load_contract(w3, 'CollectionConsent')
+            try:
+                # Load ABI and bytecode
+                _, abi, bytecode = load_contract(w3, 'CollectionConsent')
+                
+                if abi and bytecode:
+                    tx_pipeline.deploy(
+                        abi, bytecode, consent_args, data_subject,
+                        label="Consent contract", owner=st.session_state.session_id,
+                        meta={'kind': 'contract', 'consent': consent_info}
+                    )
                     
-                    if abi and bytecode:
-                        # Create contract factory
-                        CollectionConsent = w3.eth.contract(abi=abi, bytecode=bytecode)
-                        
-                        # Deploy
-                        tx_hash = CollectionConsent.constructor(
-                            controller,
-                            recipients,
-                            data_flags,
-                            duration,
-                            purposes
-                        ).transact({'from': data_subject})
-                        
-                        # Wait for receipt
-                        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-                        
-                        contract_address = receipt['contractAddress'] if isinstance(receipt, dict) else receipt.contractAddress
-                        
-                        st.success(f"✅ Contract deployed successfully!")
-                        st.code(f"Contract Address: {contract_address}")
-                        st.balloons()
-                        
-                        # Store in session state
-                        if 'deployed_consents' not in st.session_state:
-                            st.session_state.deployed_consents = []
-                        
-                        st.session_state.deployed_consents.append({
-                            'address': contract_address,
-                            'data_subject': data_subject,
-                            'controller': controller,
-                            'recipients': recipients,
-                            'purposes': purposes,
-                            'timestamp': time.time()
-                        })
-                        
-                except Exception as e:
-                    st.error(f"❌ Deployment failed: {e}")
+                    st.success("📤 Contract deployment submitted")
+                    
+            except Exception as e:
+                st.error(f"❌ Deployment failed: {e}")
+
+    st.markdown("---")
+    st.subheader("📦 Bulk Import (Consent Registry)")
+    st.markdown(
+        "CSV columns: `subject,controller,recipients,purposes,data,duration` "
+        "(`recipients` and `purposes` separated by `;`). "
+        "Each subject creates all its consents in one transaction (a creation batch covers a single data subject) "
+        "and each controller grants them in one transaction."
+    )
+    
+    bulk_file = st.file_uploader("Consents CSV", type=["csv"], key="bulk_csv")
+    relay_creations = st.checkbox(
+        "Relay signed subject grants",
+        help="Each data subject signs its consents (EIP-712) and the first account relays them: "
+             "one transaction for many data subjects instead of one per data subject.",
+        key="bulk_relay",
+    )
+    
+    if bulk_file is not None and st.button("📦 Import Consents", use_container_width=True):
+        try:
+            bulk_consents = parse_consents_csv(bulk_file.getvalue().decode('utf-8'))
+            st.info(f"Parsed {len(bulk_consents)} consents")
+            
+            with st.spinner("Submitting batch transactions..."):
+                registry = get_registry(accounts[0])
+                summary = import_consents(registry, bulk_consents, relayer=accounts[0] if relay_creations else None)
+            
+            st.success(
+                f"✅ Imported {summary['consents'] - len(summary['rejected'])} consents in {summary['transactions']} transactions "
+                f"({summary['gas']:,} gas)"
+            )
+            if summary['rejected']:
+                st.warning(f"⚠️ {len(summary['rejected'])} signed creation(s) rejected (consent already exists or invalid signature)")
+            
+            if 'deployed_consents' not in st.session_state:
+                st.session_state.deployed_consents = []
+            
+            for consent in [c for c in bulk_consents if c not in summary['rejected']]:
+                st.session_state.deployed_consents.append({
+                    'address': registry.address,
+                    'consent_id': Web3.to_hex(ConsentRegistryClient.consent_id(consent['subject'], consent['controller'])),
+                    'data_subject': consent['subject'],
+                    'controller': consent['controller'],
+                    'recipients': consent['recipients'],
+                    'purposes': consent['purposes'],
+                    'timestamp': time.time()
+                })
+        except Exception as e:
+            st.error(f"❌ Bulk import failed: {e}")
 
 # TAB 2: View Consents
 with tab2:
@@ -219,16 +476,16 @@ with tab2:
         col1, col2, col3 = st.columns(3)
         
         try:
-            is_valid = collection_contract.functions.verify().call()
-            ds_consent = collection_contract.functions.consentFromDS().call()
-            dc_consent = collection_contract.functions.consentFromDC().call()
+            snapshot = current_snapshots((collection_contract.address,))[0]
+            if snapshot is None:
+                raise ValueError("contract getters not available")
             
             with col1:
-                st.metric("Contract Status", "✅ Valid" if is_valid else "❌ Invalid")
+                st.metric("Contract Status", "✅ Valid" if snapshot.valid else "❌ Invalid")
             with col2:
-                st.metric("Data Subject Consent", "✅ Granted" if ds_consent else "❌ Not Granted")
+                st.metric("Data Subject Consent", "✅ Granted" if snapshot.ds_granted else "❌ Not Granted")
             with col3:
-                st.metric("Controller Consent", "✅ Granted" if dc_consent else "❌ Not Granted")
+                st.metric("Controller Consent", "✅ Granted" if snapshot.dc_granted else "❌ Not Granted")
             
             # Show details
             st.markdown("---")
@@ -238,13 +495,13 @@ with tab2:
             
             with col1:
                 st.markdown("**Actors:**")
-                st.text(f"Data Subject: {collection_contract.functions.dataSubject().call()}")
-                st.text(f"Controller: {collection_contract.functions.controller().call()}")
+                st.text(f"Data Subject: {snapshot.data_subject}")
+                st.text(f"Controller: {snapshot.controller}")
             
             with col2:
                 st.markdown("**Consent Info:**")
-                st.text(f"Data Flags: {collection_contract.functions.data().call()}")
-                st.text(f"Duration: {collection_contract.functions.duration().call()} seconds")
+                st.text(f"Data Flags: {snapshot.data}")
+                st.text(f"Duration: {snapshot.duration} seconds")
             
         except Exception as e:
             st.error(f"Error reading contract: {e}")
@@ -258,15 +515,95 @@ with tab2:
         st.markdown("---")
         st.subheader("📋 Recently Deployed Consents")
         
+        # Current state of every deployed contract (registry entries excluded) in one read
+        contract_addresses = tuple(c['address'] for c in st.session_state.deployed_consents if 'consent_id' not in c)
+        try:
+            deployed_snapshots = dict(zip(contract_addresses, current_snapshots(contract_addresses)))
+        except Exception as e:
+            st.error(f"Error reading deployed consents: {e}")
+            deployed_snapshots = {}
+        
         for idx, consent in enumerate(st.session_state.deployed_consents):
             with st.expander(f"Consent #{idx + 1} - {consent['address'][:10]}..."):
+                snapshot = deployed_snapshots.get(consent['address'])
+                if snapshot is not None:
+                    st.text(f"Status: {'✅ Valid' if snapshot.valid else '❌ Invalid'} "
+                            f"(DS {'✅' if snapshot.ds_granted else '⏳'} | DC {'✅' if snapshot.dc_granted else '⏳'})")
                 st.code(f"Address: {consent['address']}")
+                if 'consent_id' in consent:
+                    st.text(f"Registry Consent ID: {consent['consent_id'][:18]}...")
                 st.text(f"Data Subject: {consent['data_subject'][:10]}...")
                 st.text(f"Controller: {consent['controller'][:10]}...")
                 st.text(f"Recipients: {len(consent['recipients'])} processor(s)")
                 st.text(f"Purposes: {consent['purposes']}")
                 st.text(f"Created: {time.ctime(consent['timestamp'])}")
 
+    # Consents followed by the local event index
+    indexer = get_indexer(w3)
+    if indexer is not None:
+        st.markdown("---")
+        st.subheader("📇 Indexed Consents (local SQLite)")
+        
+        try:
+            indexer.sync()
+        except Exception as e:
+            st.error(f"Error syncing consent index: {e}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            index_role = st.selectbox(
+                "Consents where the account is",
+                options=("all",) + ROLES,
+                format_func=lambda role: "any consent" if role == "all" else f"the {role}",
+                key="index_role"
+            )
+        with col2:
+            index_account = st.selectbox(
+                "Account",
+                options=accounts,
+                format_func=lambda x: f"{account_labels.get(x, 'Account')} ({x[:8]}...)",
+                key="index_account",
+                disabled=index_role == "all"
+            )
+        role, account = (None, None) if index_role == "all" else (index_role, index_account)
+        
+        # Keyset pages: the cursors of the pages seen so far, reset when the filter changes
+        page_key = (role, account)
+        if st.session_state.get('index_page_key') != page_key:
+            st.session_state.index_page_key = page_key
+            st.session_state.index_cursors = [None]
+        cursors = st.session_state.index_cursors
+        
+        indexed_consents, next_cursor = indexer.find_consents(role, account, DEFAULT_PAGE_SIZE, cursors[-1])
+        total = indexer.count_consents(role, account)
+        page = len(cursors)
+        st.caption(f"{total} consent(s) indexed up to block {indexer.last_block} · "
+                   f"page {page} of {max(1, -(-total // DEFAULT_PAGE_SIZE))}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("⬅️ Previous", disabled=page == 1, use_container_width=True, key="index_previous"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            if st.button("Next ➡️", disabled=next_cursor is None, use_container_width=True, key="index_next"):
+                cursors.append(next_cursor)
+                st.rerun()
+        
+        for consent in indexed_consents:
+            status = "✅ Valid" if indexer.is_valid(consent['address']) else "❌ Invalid"
+            with st.expander(f"{status} - {consent['address'][:10]}..."):
+                st.code(f"Address: {consent['address']}")
+                st.text(f"Data Subject: {consent['data_subject']}")
+                st.text(f"Controller: {consent['controller']}")
+                st.text(f"Recipients: {consent['recipients'] or '-'}")
+                st.text(f"Data Flags: {consent['data']}")
+                st.text(f"DS Granted: {bool(consent['ds_valid'])} | DC Granted: {bool(consent['dc_valid'])} | Erased: {bool(consent['erased'])}")
+                st.text(f"Valid: {time.ctime(consent['beginning_date'])} → {time.ctime(consent['expiration_date'])}")
+                for purpose in indexer.purposes_for_consent(consent['address']):
+                    st.text(f"  Processor {purpose['processor'][:10]}... purpose {purpose['purpose']}: "
+                            f"DC {purpose['dc_valid']} DS {purpose['ds_valid']} DP {purpose['dp_valid']}")
+
 # TAB 3: Grant/Revoke
 with tab3:
     st.header("✅ Grant or Revoke Consent")
@@ -278,9 +615,10 @@ with tab3:
         
         # Get current status
         try:
-            is_valid = collection_contract.functions.verify().call()
-            ds_consent = collection_contract.functions.consentFromDS().call()
-            dc_consent = collection_contract.functions.consentFromDC().call()
+            snapshot = current_snapshots((collection_contract.address,))[0]
+            if snapshot is None:
+                raise ValueError("contract getters not available")
+            is_valid, ds_consent, dc_consent = snapshot.valid, snapshot.ds_granted, snapshot.dc_granted
             
             col1, col2 = st.columns(2)
             
@@ -296,22 +634,14 @@ with tab3:
                 )
                 
                 if st.button("✅ Grant Consent", use_container_width=True):
-                    with st.spinner("Submitting transaction..."):
-                        try:
-                            tx_hash = collection_contract.functions.grantConsent().transact({
-                                'from': grant_account
-                            })
-                            receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-                            
-                            tx_status = receipt['status'] if isinstance(receipt, dict) else receipt.status
-                            
-                            if tx_status == 1:
-                                st.success("✅ Consent granted successfully!")
-                                st.rerun()
-                            else:
-                                st.error("❌ Transaction failed")
-                        except Exception as e:
-                            st.error(f"❌ Error: {e}")
+                    try:
+                        tx_pipeline.transact(
+                            collection_contract.abi, collection_contract.address, 'grantConsent', [], grant_account,
+                            label="Grant consent", owner=st.session_state.session_id
+                        )
+                        st.info("📤 Transaction submitted: status in the sidebar")
+                    except Exception as e:
+                        st.error(f"❌ Error: {e}")
             
             # Revoke Consent
             with col2:
@@ -325,22 +655,14 @@ with tab3:
                 )
                 
                 if st.button("❌ Revoke Consent", use_container_width=True):
-                    with st.spinner("Submitting transaction..."):
-                        try:
-                            tx_hash = collection_contract.functions.revokeConsent().transact({
-                                'from': revoke_account
-                            })
-                            receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-                            
-                            tx_status = receipt['status'] if isinstance(receipt, dict) else receipt.status
-                            
-                            if tx_status == 1:
-                                st.success("✅ Consent revoked successfully!")
-                                st.rerun()
-                            else:
-                                st.error("❌ Transaction failed")
-                        except Exception as e:
-                            st.error(f"❌ Error: {e}")
+                    try:
+                        tx_pipeline.transact(
+                            collection_contract.abi, collection_contract.address, 'revokeConsent', [], revoke_account,
+                            label="Revoke consent", owner=st.session_state.session_id
+                        )
+                        st.info("📤 Transaction submitted: status in the sidebar")
+                    except Exception as e:
+                        st.error(f"❌ Error: {e}")
             
             # Current Status
             st.markdown("---")
@@ -416,8 +738,16 @@ with tab4:
         if collection_contract:
             if st.button("Execute"):
                 try:
-                    is_valid = collection_contract.functions.verify().call()
-                    st.code(f"Consent Valid: {is_valid}")
+                    cache = get_verification_cache(w3)
+                    if cache is not None:
+                        is_valid = cache.verify(collection_contract.address)
+                        stats = cache.stats()
+                        st.code(f"Consent Valid: {is_valid}\n"
+                                f"Cache: {stats['hits']} hits / {stats['misses']} misses, "
+                                f"{stats['invalidations']} invalidated, {stats['stale_hits']} stale hits")
+                    else:
+                        is_valid = collection_contract.functions.verify().call()
+                        st.code(f"Consent Valid: {is_valid}")
                 except Exception as e:
                     st.error(f"Error: {e}")
         else:
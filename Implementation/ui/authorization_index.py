@@ -0,0 +1,120 @@
+"""
+Flattened (subject, processor, purpose) authorization table.
+
+On chain, "may processor P process subject S's data for purpose K?" takes
+two dependent calls: getProcessingConsentSC(P) on the subject's
+CollectionConsent, then verify(K) on the ProcessingConsent it returns.
+AuthorizationIndex keeps the answer precomputed per (subject, processor,
+purpose), merging the rules of both verify() functions:
+
+- flags: DS and DC granted on the CollectionConsent, data not erased,
+  processor not blacklisted, and DC, DS and DP granted for the purpose on
+  the ProcessingConsent (entries missing any of them are left out);
+- validity window: the intersection of both contracts' windows;
+- data: the bits allowed by both (collection data & purpose data).
+
+A lookup is a dict access plus the time and data comparisons. The table
+follows a ConsentIndexer: after each sync, only the consents that got
+events are recomputed.
+"""
+
+import threading
+import time
+from typing import NamedTuple
+
+
+class Authorization(NamedTuple):
+    """One consent under which a processor may process a subject's data for a purpose."""
+    consent: str
+    processing_consent: str
+    data: int
+    beginning_date: int
+    expiration_date: int
+
+    def allows(self, data_bits, now):
+        return self.beginning_date <= now <= self.expiration_date and data_bits & ~self.data == 0
+
+
+def _key(subject, processor, purpose):
+    return subject.lower(), processor.lower(), int(purpose)
+
+
+class AuthorizationIndex:
+    """In-memory (subject, processor, purpose) -> Authorizations table kept up to date by a ConsentIndexer."""
+
+    def __init__(self, indexer):
+        self.indexer = indexer
+        self.block_number = None
+        self.updates = 0
+        self._entries = {}          # key -> tuple of Authorizations (one per consent)
+        self._keys = {}             # consent address -> keys it has entries under
+        self._lock = threading.Lock()
+        with indexer._lock:
+            self._update(None, indexer.last_block)
+            indexer.add_listener(self._update)
+
+    def _update(self, consent_addresses, block_number):
+        """Recomputes the entries of the consents at `consent_addresses` (all when None)."""
+        rows = self.indexer.authorizations(consent_addresses)
+        with self._lock:
+            if consent_addresses is None:
+                self._entries, self._keys = {}, {}
+            else:
+                for consent in consent_addresses:
+                    for key in self._keys.pop(consent, ()):
+                        remaining = tuple(a for a in self._entries[key] if a.consent != consent)
+                        if remaining:
+                            self._entries[key] = remaining
+                        else:
+                            del self._entries[key]
+            for row in rows:
+                key = _key(row['data_subject'], row['processor'], row['purpose'])
+                authorization = Authorization(
+                    row['consent_address'],
+                    row['processing_address'],
+                    int(row['consent_data']) & int(row['purpose_data']),
+                    max(row['consent_beginning'], row['purpose_beginning']),
+                    min(row['consent_expiration'], row['purpose_expiration']),
+                )
+                self._entries[key] = self._entries.get(key, ()) + (authorization,)
+                self._keys.setdefault(row['consent_address'], set()).add(key)
+            self.block_number = block_number
+            self.updates += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, subject, processor, purpose):
+        """Authorizations of (subject, processor, purpose), whatever the time and data."""
+        return self._entries.get(_key(subject, processor, purpose), ())
+
+    def is_authorized(self, subject, processor, purpose, data_bits=0, now=None):
+        """The Authorization allowing `processor` to process `data_bits` of `subject` for `purpose` at `now`, or None."""
+        now = int(time.time()) if now is None else now
+        for authorization in self._entries.get(_key(subject, processor, purpose), ()):
+            if authorization.allows(data_bits, now):
+                return authorization
+        return None
+
+    def check_many(self, checks, now=None):
+        """
+        Answers (subject, processor, purpose, data_bits) checks with one Authorization or None each.
+        Returns (block the table reflects, answers), read together.
+        """
+        now = int(time.time()) if now is None else now
+        answers = []
+        with self._lock:
+            for subject, processor, purpose, data_bits in checks:
+                answers.append(next(
+                    (a for a in self._entries.get(_key(subject, processor, purpose), ()) if a.allows(data_bits, now)),
+                    None,
+                ))
+            return self.block_number, answers
+
+    def stats(self):
+        return {
+            'block_number': self.block_number,
+            'keys': len(self._entries),
+            'consents': len(self._keys),
+            'updates': self.updates,
+        }
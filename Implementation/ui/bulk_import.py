@@ -0,0 +1,108 @@
+"""
+Bulk import of consents into the ConsentRegistry from a CSV file.
+
+Expected header and columns:
+    subject,controller,recipients,purposes,data,duration
+`recipients` and `purposes` are ';'-separated lists. `purposes`, `data`
+and `duration` may be left empty (no default purposes, all data flags of
+the Create tab, one day).
+
+Rows are grouped so that each data subject creates all its consents with
+one createConsentBatch transaction and each controller grants all its
+consents with one grantConsentBatch transaction. createConsentBatch records
+the grant of its sender, so it covers one data subject: a file of N subjects
+takes at least N creation transactions. With a `relayer`, each data subject
+signs its consents instead (ConsentCreation, signed_consents.py) and the
+relayer creates them with submitSignedCreations, `chunk_size` consents per
+transaction whatever their data subjects.
+"""
+
+import csv
+import io
+from collections import OrderedDict
+
+from web3 import Web3
+
+from signed_consents import ConsentActionSigner, creation_to_tuple
+
+DEFAULT_DATA = 0b1011
+DEFAULT_DURATION = 86400
+
+# Keeps each transaction well below Ganache's default block gas limit
+DEFAULT_CHUNK_SIZE = 50
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(';') if item.strip()]
+
+
+def parse_consents_csv(text):
+    """Parses the CSV text into a list of consent dicts."""
+    consents = []
+    for line, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+        try:
+            consents.append({
+                'subject': Web3.to_checksum_address(row['subject'].strip()),
+                'controller': Web3.to_checksum_address(row['controller'].strip()),
+                'recipients': [Web3.to_checksum_address(r) for r in _split(row.get('recipients'))],
+                'purposes': [int(p) for p in _split(row.get('purposes'))],
+                'data': int(row['data'], 0) if (row.get('data') or '').strip() else DEFAULT_DATA,
+                'duration': int(row['duration']) if (row.get('duration') or '').strip() else DEFAULT_DURATION,
+            })
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Invalid row at line {line}: {e}") from e
+    return consents
+
+
+def _group_by(consents, key):
+    groups = OrderedDict()
+    for consent in consents:
+        groups.setdefault(consent[key], []).append(consent)
+    return groups
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def import_consents(registry, consents, chunk_size=DEFAULT_CHUNK_SIZE, relayer=None, signer=None):
+    """
+    Creates and grants `consents` through `registry` (a ConsentRegistryClient).
+    With `relayer`, the creations are signed by their data subjects and relayed from that account;
+    `signer(subject)` returns the ConsentActionSigner of a subject (default: signed by the node).
+    Returns a summary with the number of consents, transactions and gas used, and the consents
+    whose signed creation was rejected (they are not granted).
+    """
+    summary = {'consents': len(consents), 'transactions': 0, 'gas': 0, 'rejected': []}
+
+    def _record(receipt):
+        if receipt['status'] != 1:
+            raise RuntimeError(f"Batch transaction {Web3.to_hex(receipt['transactionHash'])} failed")
+        summary['transactions'] += 1
+        summary['gas'] += receipt['gasUsed']
+
+    if relayer is None:
+        for subject, subject_consents in _group_by(consents, 'subject').items():
+            for chunk in _chunks(subject_consents, chunk_size):
+                _record(registry.create_consent_batch(subject, chunk))
+        created = consents
+    else:
+        signer = signer or (lambda subject: ConsentActionSigner(registry, subject))
+        signers = {subject: signer(subject) for subject in _group_by(consents, 'subject')}
+        signed = [signers[c['subject']].sign_creation(c['controller'], c['recipients'], c['data'], c['duration'],
+                                                      c['purposes']) for c in consents]
+        created = []
+        for chunk, signed_chunk in zip(_chunks(consents, chunk_size), _chunks(signed, chunk_size)):
+            receipt = registry.submit_signed_creations(relayer, [creation_to_tuple(c) for c in signed_chunk])
+            _record(receipt)
+            rejected = set(registry.rejected_actions(receipt))
+            summary['rejected'] += [c for i, c in enumerate(chunk) if i in rejected]
+            created += [c for i, c in enumerate(chunk) if i not in rejected]
+
+    for controller, controller_consents in _group_by(created, 'controller').items():
+        subjects = [c['subject'] for c in controller_consents]
+        for chunk in _chunks(subjects, chunk_size):
+            _record(registry.grant_consent_batch(controller, chunk))
+
+    return summary
@@ -0,0 +1,314 @@
+"""
+Bounded cache of verify() results for resource servers.
+
+Test 2.8.1 shows the risk of caching an authorization decision: a token
+issued while the consent was valid keeps being accepted after revocation.
+VerificationCache keeps the speed of a cache without that replay window:
+
+- an entry lives at most `ttl` seconds; a valid entry is flipped to
+  invalid (without a new read) once the time is past the contract's
+  expirationDate (CollectionConsent) or the purpose's (ProcessingConsent),
+  tracked by an ExpiryScheduler;
+- `poll()` (or the background thread started by `start()`) reads the
+  contracts' logs and drops, as soon as they are seen, the entries of every
+  contract that emitted a revoke, grant, erase or modification event
+  (a purpose revoked on a CollectionConsent drops that purpose on all the
+  ProcessingConsents created by it); an entry cached while a poll runs
+  makes the next poll read again from the block polled up to before it was
+  read, so no event after the read is missed;
+- the least recently used entry is evicted when `max_entries` is reached.
+
+`stats()` reports hits, misses, evictions, expirations, invalidations and
+how stale the invalidated entries were (seconds between the revoking block
+and the invalidation, and hits served in that window).
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+
+from contract_artifacts import load_artifact
+from expiry_scheduler import ExpiryScheduler
+
+# Events after which a cached verify() result may be wrong
+COLLECTION_EVENTS = (
+    'ConsentGranted', 'ConsentRevoked', 'DataErased', 'DataModified',
+    'ConsentPurposeRevoked', 'ConsentProcessorRevoked',
+)
+PROCESSING_EVENTS = (
+    'ProcessingGranted', 'ProcessingRevoked', 'AllProcessingRevoked', 'ProcessingDataModified',
+)
+
+DEFAULT_TTL = 30.0
+DEFAULT_MAX_ENTRIES = 1024
+
+# Hit timestamps kept per entry to count hits served after a revocation
+HIT_HISTORY = 256
+
+
+def _event_topics(abi, names):
+    return [event_abi_to_log_topic(item) for item in abi if item.get('type') == 'event' and item['name'] in names]
+
+
+class _Entry:
+    __slots__ = ('valid', 'expires_at', 'hits')
+
+    def __init__(self, valid, expires_at):
+        self.valid = valid
+        self.expires_at = expires_at
+        self.hits = deque(maxlen=HIT_HISTORY)
+
+
+class VerificationCache:
+    """
+    LRU + TTL cache of CollectionConsent.verify() and ProcessingConsent.verify(purpose).
+
+    Keys are (contract address, None) for collection consents and
+    (contract address, purpose) for processing purposes.
+    """
+
+    def __init__(self, w3, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, clock=time.time):
+        self.w3 = w3
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+
+        collection_abi = load_artifact('CollectionConsent')['abi']
+        processing_abi = load_artifact('ProcessingConsent')['abi']
+        self._collection = w3.eth.contract(abi=collection_abi)
+        self._processing = w3.eth.contract(abi=processing_abi)
+        self._topics = _event_topics(collection_abi, COLLECTION_EVENTS) + \
+            _event_topics(processing_abi, PROCESSING_EVENTS)
+        self._purpose_revoked = _event_topics(collection_abi, ('ConsentPurposeRevoked',))[0]
+
+        self._entries = OrderedDict()
+        self.expiries = ExpiryScheduler()
+        self._parents = {}      # processing address -> CollectionConsent that created it
+        self._lock = threading.RLock()
+        self._last_block = None
+        self._rescan_from = None    # lowest _last_block an entry was read after, since the last poll
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_hits = 0
+        # Running totals of the invalidation lags: constant memory however long the cache runs
+        self._max_lag = 0.0
+        self._lag_sum = 0.0
+        self._lag_count = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # Lookups
+
+    def verify(self, consent_address):
+        """Cached CollectionConsent(consent_address).verify()."""
+        return self._get((Web3.to_checksum_address(consent_address), None))
+
+    def verify_purpose(self, processing_address, purpose):
+        """Cached ProcessingConsent(processing_address).verify(purpose)."""
+        return self._get((Web3.to_checksum_address(processing_address), purpose))
+
+    def _get(self, key):
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now <= entry.expires_at:
+                    self._entries.move_to_end(key)
+                    entry.hits.append(now)
+                    self.hits += 1
+                    return entry.valid
+                del self._entries[key]
+                self.expiries.cancel(key)
+                self.expirations += 1
+            self.misses += 1
+            if self._last_block is None:
+                # Events before the first lookup cannot affect the values read from now on
+                self._last_block = self.w3.eth.block_number
+            # The read sees at least this block: later events must reach the entry
+            read_after = self._last_block
+
+        valid, expiration_date, parent = self._read(key)
+        with self._lock:
+            if parent is not None:
+                self._parents[key[0]] = parent
+            if self._rescan_from is None or read_after < self._rescan_from:
+                self._rescan_from = read_after
+            self._entries[key] = _Entry(valid, now + self.ttl)
+            self._entries.move_to_end(key)
+            if valid:
+                self.expiries.schedule(key, expiration_date)
+            else:
+                self.expiries.cancel(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.expiries.cancel(evicted)
+                self.evictions += 1
+        return valid
+
+    def _expire(self, now):
+        """Flips to invalid the entries whose consent or purpose expired before `now`."""
+        for key in self.expiries.advance(now):
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.valid = False
+
+    def _read(self, key):
+        """(verify(), expirationDate, creating CollectionConsent if not known yet) of `key`."""
+        address, purpose = key
+        parent = None
+        if purpose is None:
+            contract = self._collection(address=address)
+            valid = contract.functions.verify().call()
+            _, expiration_date = contract.functions.getValidityWindow().call()
+        else:
+            contract = self._processing(address=address)
+            valid = contract.functions.verify(purpose).call()
+            _, expiration_date = contract.functions.getValidityWindow(purpose).call()
+            if address not in self._parents:
+                parent = contract.functions.getCollectionConsentSC().call()
+        return valid, expiration_date, parent
+
+    # Invalidation
+
+    def invalidate(self, address, since=None, purpose=None):
+        """
+        Drops every entry of `address` (the consent and all its purposes), or
+        only the entries of `purpose` in the ProcessingConsents created by
+        `address` when `purpose` is given.
+        `since` is the timestamp of the state change, used for the staleness metrics.
+        Returns the number of entries dropped.
+        """
+        address = Web3.to_checksum_address(address)
+        now = self.clock()
+        with self._lock:
+            if purpose is None:
+                keys = [key for key in self._entries if key[0] == address]
+            else:
+                keys = [key for key in self._entries if key[1] == purpose and self._parents.get(key[0]) == address]
+            for key in keys:
+                entry = self._entries.pop(key)
+                self.expiries.cancel(key)
+                if since is not None:
+                    lag = max(0.0, now - since)
+                    self._max_lag = max(self._max_lag, lag)
+                    self._lag_sum += lag
+                    self._lag_count += 1
+                    self.stale_hits += sum(1 for t in entry.hits if t >= since)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def poll(self):
+        """
+        Reads the logs of the cached contracts since the last poll (or since the block an entry
+        cached during the last poll was read after) and invalidates their entries.
+        """
+        with self._lock:
+            addresses = {key[0] for key in self._entries}
+            self._parents = {a: p for a, p in self._parents.items() if a in addresses}
+            addresses = sorted(addresses | set(self._parents.values()))
+            cursor = self._last_block
+            if self._rescan_from is not None:
+                cursor = min(cursor, self._rescan_from)
+            # Entries cached from now on are not in `addresses`: they set it again
+            self._rescan_from = None
+        if cursor is None:
+            latest = self.w3.eth.block_number
+            with self._lock:
+                self._last_block = latest if self._last_block is None else self._last_block
+            return 0
+        try:
+            return self._poll(addresses, cursor + 1)
+        except Exception:
+            with self._lock:
+                # Read again at the next poll
+                if self._rescan_from is None or cursor < self._rescan_from:
+                    self._rescan_from = cursor
+            raise
+
+    def _poll(self, addresses, from_block):
+        latest = self.w3.eth.block_number
+        if not addresses or from_block > latest:
+            with self._lock:
+                self._last_block = max(self._last_block, latest)
+            return 0
+
+        logs = self.w3.eth.get_logs({
+            'fromBlock': from_block,
+            'toBlock': latest,
+            'address': addresses,
+            'topics': [self._topics],
+        })
+        # Oldest change per contract, and per (consent, purpose) for purpose revocations
+        changed = {}
+        for log in logs:
+            address = Web3.to_checksum_address(log['address'])
+            key = (address, None)
+            if bytes(log['topics'][0]) == self._purpose_revoked:
+                key = (address, int.from_bytes(bytes(log['topics'][1]), 'big'))
+            changed[key] = min(changed.get(key, log['blockNumber']), log['blockNumber'])
+
+        dropped = 0
+        timestamps = {}
+        for (address, purpose), block in changed.items():
+            if block not in timestamps:
+                timestamps[block] = self.w3.eth.get_block(block)['timestamp']
+            dropped += self.invalidate(address, since=timestamps[block], purpose=purpose)
+        with self._lock:
+            self._last_block = max(self._last_block, latest)
+        return dropped
+
+    def start(self, interval=1.0):
+        """Starts the background thread that polls the logs every `interval` seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    self.poll()
+                    self.last_error = None
+                except Exception as e:
+                    # Retried at the next interval from the same block
+                    self.last_error = f'{type(e).__name__}: {e}'
+
+        self._thread = threading.Thread(target=_run, name='verification-cache', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    # Metrics
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'expired_consents': self.expiries.expired,
+                'invalidations': self.invalidations,
+                'stale_hits': self.stale_hits,
+                'max_staleness': self._max_lag,
+                'mean_staleness': self._lag_sum / self._lag_count if self._lag_count else 0.0,
+            }
@@ -0,0 +1,62 @@
+"""
+Python client for the ConsentCloneFactory contract.
+
+Each consent is still its own CollectionConsent contract, but deployed as
+an EIP-1167 minimal proxy of a shared implementation: a few hundred
+thousand gas instead of the full ~3M gas bytecode deployment.
+
+With a NonceManager, transactions take their nonces from it, so they do not
+collide with the ones TransactionPipeline sends from the same accounts.
+"""
+
+from contract_artifacts import load_artifact, deployed_address
+from nonce_manager import send_and_wait
+
+
+class ConsentCloneFactoryClient:
+    """Thin wrapper around a deployed ConsentCloneFactory."""
+
+    def __init__(self, w3, address, abi=None, nonce_manager=None):
+        if abi is None:
+            abi = load_artifact('ConsentCloneFactory')['abi']
+        self.w3 = w3
+        self.nonce_manager = nonce_manager
+        self.contract = w3.eth.contract(address=address, abi=abi)
+
+    @property
+    def address(self):
+        return self.contract.address
+
+    @classmethod
+    def from_artifact(cls, w3, nonce_manager=None):
+        """Client for the factory deployed by `truffle migrate`, or None if not deployed."""
+        artifact = load_artifact('ConsentCloneFactory')
+        address = deployed_address(artifact, w3.net.version)
+        if address is None:
+            return None
+        return cls(w3, address, artifact['abi'], nonce_manager)
+
+    @classmethod
+    def deploy(cls, w3, deployer, nonce_manager=None):
+        """Deploys both implementation contracts and the factory from `deployer`."""
+        def _deploy(contract_name, *args):
+            artifact = load_artifact(contract_name)
+            factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+            return send_and_wait(w3, nonce_manager, factory.constructor(*args), deployer)['contractAddress']
+
+        # Implementations are initialized by their constructors; their own state is never used.
+        processing_impl = _deploy('ProcessingConsent', deployer, deployer, deployer)
+        collection_impl = _deploy('CollectionConsent', deployer, [], 0, 0, [])
+        return cls(w3, _deploy('ConsentCloneFactory', collection_impl, processing_impl), nonce_manager=nonce_manager)
+
+    def create_consent(self, data_subject, controller, recipients, data, duration, purposes):
+        """Clones a CollectionConsent as `data_subject`. Returns (consent address, receipt)."""
+        receipt = send_and_wait(self.w3, self.nonce_manager, self.contract.functions.createConsent(
+            controller, recipients, data, duration, purposes
+        ), data_subject)
+        return self.cloned_address(receipt), receipt
+
+    def cloned_address(self, receipt):
+        """Address of the consent cloned in a createConsent receipt."""
+        event = self.contract.events.ConsentCloned().process_receipt(receipt)[0]
+        return event['args']['consent']
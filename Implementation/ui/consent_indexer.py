@@ -0,0 +1,618 @@
+"""
+Event-sourced consent indexer backed by a local SQLite database.
+
+Follows the logs emitted by CollectionConsent / ProcessingConsent contracts
+(and discovers new consents from ConsentCloneFactory) and folds them into
+indexed tables, so that "is this consent valid?" and "list consents for
+subject X" are answered from local storage instead of one RPC per getter.
+
+Validity is evaluated with the same rules as the contracts' verify():
+both flags set and beginningDate <= now <= expirationDate.
+Chain reorganizations are not handled (local dev chain).
+
+The consents table is also the registry of the deployed consents: lookups by
+subject, controller or processor (`find_consents`) go through indexes and
+return pages in creation order with a cursor to the next one.
+"""
+
+import sqlite3
+import threading
+import time
+
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+
+from contract_artifacts import load_artifact
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tracked (
+    address    TEXT PRIMARY KEY,
+    kind       TEXT NOT NULL,          -- collection | processing | factory
+    from_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS consents (
+    address          TEXT PRIMARY KEY,
+    data_subject     TEXT NOT NULL,
+    controller       TEXT NOT NULL,
+    recipients       TEXT NOT NULL,    -- ','-separated
+    default_purposes TEXT NOT NULL,    -- ','-separated
+    data             TEXT NOT NULL,    -- uint256 as decimal string
+    beginning_date   INTEGER NOT NULL,
+    expiration_date  INTEGER NOT NULL,
+    ds_valid         INTEGER NOT NULL,
+    dc_valid         INTEGER NOT NULL,
+    erased           INTEGER NOT NULL DEFAULT 0,
+    created_block    INTEGER NOT NULL,
+    updated_block    INTEGER NOT NULL
+);
+-- Lookups return pages in creation order: the indexes end with the page key (created_block, address)
+CREATE INDEX IF NOT EXISTS consents_page_by_subject ON consents (data_subject, created_block, address);
+CREATE INDEX IF NOT EXISTS consents_page_by_controller ON consents (controller, created_block, address);
+CREATE INDEX IF NOT EXISTS consents_by_creation ON consents (created_block, address);
+CREATE TABLE IF NOT EXISTS consent_recipients (
+    consent_address TEXT NOT NULL,
+    recipient       TEXT NOT NULL,
+    PRIMARY KEY (consent_address, recipient)
+);
+CREATE INDEX IF NOT EXISTS recipients_by_recipient ON consent_recipients (recipient);
+CREATE TABLE IF NOT EXISTS processing_consents (
+    address         TEXT PRIMARY KEY,
+    consent_address TEXT NOT NULL,
+    processor       TEXT NOT NULL,
+    blacklisted     INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS processing_by_consent ON processing_consents (consent_address);
+CREATE INDEX IF NOT EXISTS processing_by_processor ON processing_consents (processor);
+CREATE TABLE IF NOT EXISTS purposes (
+    processing_address TEXT NOT NULL,
+    purpose            INTEGER NOT NULL,
+    data               TEXT NOT NULL,
+    beginning_date     INTEGER NOT NULL,
+    expiration_date    INTEGER NOT NULL,
+    dc_valid           INTEGER NOT NULL,
+    ds_valid           INTEGER NOT NULL,
+    dp_valid           INTEGER NOT NULL,
+    PRIMARY KEY (processing_address, purpose)
+);
+-- Flags cleared by a revocation event, one row per (scope, cause) until the matching grant
+CREATE TABLE IF NOT EXISTS revocations (
+    consent_address TEXT NOT NULL,
+    processor       TEXT NOT NULL,     -- '' when the whole consent is revoked
+    purpose         INTEGER NOT NULL,  -- -1 when every purpose is revoked
+    cause           TEXT NOT NULL,     -- flag cleared (ds_valid, dc_valid, dp_valid), erased or blacklisted
+    PRIMARY KEY (consent_address, processor, purpose, cause)
+);
+"""
+
+# Consent lookups of `find_consents` / `count_consents`
+ROLES = ('subject', 'controller', 'processor')
+DEFAULT_PAGE_SIZE = 25
+
+# Column of the validity flag each actor controls
+COLLECTION_FLAGS = ('ds_valid', 'dc_valid')
+PROCESSING_FLAGS = ('dc_valid', 'ds_valid', 'dp_valid')
+
+# Scope wildcards of the revocations table
+ANY_PROCESSOR = ''
+ANY_PURPOSE = -1
+
+
+def _events_by_topic(abi):
+    return {
+        event_abi_to_log_topic(item): item['name']
+        for item in abi if item.get('type') == 'event'
+    }
+
+
+class ConsentIndexer:
+    """
+    Folds consent contract logs into a SQLite database.
+
+    Register the contracts to follow with `track_consent` (per-contract
+    deployments) or `track_factory` (clones), then call `sync()` periodically.
+    ProcessingConsent contracts are discovered from their parent's events.
+    """
+
+    def __init__(self, w3, db_path='consents.db', chunk_size=2000):
+        self.w3 = w3
+        self.chunk_size = chunk_size
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+        self._abis = {
+            'collection': load_artifact('CollectionConsent')['abi'],
+            'processing': load_artifact('ProcessingConsent')['abi'],
+            'factory': load_artifact('ConsentCloneFactory')['abi'],
+        }
+        self._topics = {kind: _events_by_topic(abi) for kind, abi in self._abis.items()}
+        self._decoders = {kind: self.w3.eth.contract(abi=abi) for kind, abi in self._abis.items()}
+        self._listeners = []
+        self._changed = set()
+
+    # Tracking
+
+    def _track(self, address, kind, from_block):
+        address = Web3.to_checksum_address(address)
+        with self._lock:
+            with self.db:
+                inserted = self.db.execute(
+                    "INSERT OR IGNORE INTO tracked (address, kind, from_block) VALUES (?, ?, ?)",
+                    (address, kind, from_block),
+                ).rowcount
+            # Blocks already synced are backfilled for this contract only
+            if inserted and from_block <= self.last_block:
+                self._sync_range(from_block, self.last_block, only=[address])
+                self._notify()
+
+    def track_consent(self, address, from_block=0):
+        """Follows a CollectionConsent from `from_block` (its deployment block or earlier)."""
+        self._track(address, 'collection', from_block)
+
+    def track_factory(self, address, from_block=0):
+        """Follows every consent cloned by a ConsentCloneFactory."""
+        self._track(address, 'factory', from_block)
+
+    def add_listener(self, callback):
+        """
+        `callback(consent_addresses, last_block)` is called after each sync (under the indexer lock)
+        with the CollectionConsents whose state, or whose ProcessingConsents' state, changed.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self):
+        changed, self._changed = self._changed, set()
+        for callback in list(self._listeners):
+            callback(changed, self.last_block)
+
+    def _tracked(self):
+        rows = self.db.execute("SELECT address, kind, from_block FROM tracked").fetchall()
+        return {row['address']: (row['kind'], row['from_block']) for row in rows}
+
+    @property
+    def last_block(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()
+        return int(row['value']) if row else -1
+
+    # Sync
+
+    def sync(self, to_block=None):
+        """Indexes all logs up to `to_block` (default: latest). Returns the number of logs applied."""
+        with self._lock:
+            if to_block is None:
+                to_block = self.w3.eth.block_number
+            applied = 0
+            start = self.last_block + 1
+            while start <= to_block:
+                end = min(start + self.chunk_size - 1, to_block)
+                applied += self._sync_range(start, end)
+                with self.db:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)", (str(end),)
+                    )
+                start = end + 1
+            self._notify()
+            return applied
+
+    def _sync_range(self, start, end, only=None):
+        applied = 0
+        fetched = set()
+        known = set(self._tracked())
+        candidates = set(only) if only is not None else set(known)
+        while True:
+            tracked = self._tracked()
+            pending = [
+                address for address in candidates
+                if address not in fetched and tracked[address][1] <= end
+            ]
+            if not pending:
+                return applied
+            fetched.update(pending)
+
+            logs = self.w3.eth.get_logs({'fromBlock': start, 'toBlock': end, 'address': pending})
+            logs = sorted(logs, key=lambda log: (log['blockNumber'], log['logIndex']))
+            with self.db:
+                for log in logs:
+                    address = Web3.to_checksum_address(log['address'])
+                    kind, from_block = tracked[address]
+                    if log['blockNumber'] < from_block:
+                        continue
+                    if self._apply(kind, address, log):
+                        applied += 1
+
+            # Contracts discovered in this range (clones, ProcessingConsents) are fetched on the next pass
+            discovered = set(self._tracked()) - known
+            known |= discovered
+            candidates |= discovered
+
+    def _apply(self, kind, address, log):
+        name = self._topics[kind].get(bytes(log['topics'][0])) if log['topics'] else None
+        if name is None:
+            return False
+        event = getattr(self._decoders[kind].events, name)().process_log(log)
+        handler = getattr(self, f'_on_{kind}_{name}', None)
+        if handler is None:
+            return False
+        handler(address, event['args'], log['blockNumber'])
+        if kind == 'collection':
+            self._changed.add(address)
+        elif kind == 'processing':
+            row = self.db.execute(
+                "SELECT consent_address FROM processing_consents WHERE address = ?", (address,)
+            ).fetchone()
+            if row is not None:
+                self._changed.add(row['consent_address'])
+        return True
+
+    # Event handlers (run inside the sync transaction)
+
+    def _on_factory_ConsentCloned(self, address, args, block):
+        self.db.execute(
+            "INSERT OR IGNORE INTO tracked (address, kind, from_block) VALUES (?, 'collection', ?)",
+            (args['consent'], block),
+        )
+
+    def _on_collection_ConsentCreated(self, address, args, block):
+        self.db.execute(
+            """INSERT OR REPLACE INTO consents
+               (address, data_subject, controller, recipients, default_purposes, data,
+                beginning_date, expiration_date, ds_valid, dc_valid, erased, created_block, updated_block)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, 0, 0, ?, ?)""",
+            (address, args['dataSubject'], args['controller'], ','.join(args['recipients']),
+             ','.join(str(p) for p in args['defaultPurposes']), str(args['data']),
+             args['beginningDate'], args['expirationDate'], block, block),
+        )
+        self._index_recipients(address, args['recipients'])
+
+    def _index_recipients(self, address, recipients):
+        self.db.executemany(
+            "INSERT OR IGNORE INTO consent_recipients (consent_address, recipient) VALUES (?, ?)",
+            [(address, recipient) for recipient in recipients],
+        )
+
+    def _revoke(self, consent_address, processor, purpose, cause):
+        self.db.execute(
+            "INSERT OR IGNORE INTO revocations (consent_address, processor, purpose, cause) VALUES (?, ?, ?, ?)",
+            (consent_address, processor, purpose, cause),
+        )
+
+    def _unrevoke(self, consent_address, processor, purpose, cause):
+        self.db.execute(
+            "DELETE FROM revocations WHERE consent_address = ? AND processor = ? AND purpose = ? AND cause = ?",
+            (consent_address, processor, purpose, cause),
+        )
+
+    def _set_collection_flag(self, address, actor, value, block):
+        row = self.db.execute(
+            "SELECT data_subject, controller FROM consents WHERE address = ?", (address,)
+        ).fetchone()
+        if row is None:
+            return
+        # Same precedence as the contract: a DS that is also the DC sets the DS flag
+        if actor == row['data_subject']:
+            column = COLLECTION_FLAGS[0]
+        elif actor == row['controller']:
+            column = COLLECTION_FLAGS[1]
+        else:
+            return
+        self.db.execute(
+            f"UPDATE consents SET {column} = ?, updated_block = ? WHERE address = ?", (value, block, address)
+        )
+        (self._unrevoke if value else self._revoke)(address, ANY_PROCESSOR, ANY_PURPOSE, column)
+
+    def _on_collection_ConsentGranted(self, address, args, block):
+        self._set_collection_flag(address, args['actor'], 1, block)
+
+    def _on_collection_ConsentRevoked(self, address, args, block):
+        self._set_collection_flag(address, args['actor'], 0, block)
+
+    def _on_collection_DataModified(self, address, args, block):
+        self.db.execute(
+            "UPDATE consents SET data = ?, updated_block = ? WHERE address = ?", (str(args['data']), block, address)
+        )
+
+    def _on_collection_DataErased(self, address, args, block):
+        self.db.execute("UPDATE consents SET erased = 1, updated_block = ? WHERE address = ?", (block, address))
+        self._revoke(address, ANY_PROCESSOR, ANY_PURPOSE, 'erased')
+
+    def _on_collection_ProcessingConsentCreated(self, address, args, block):
+        self.db.execute(
+            "INSERT OR IGNORE INTO processing_consents (address, consent_address, processor) VALUES (?, ?, ?)",
+            (args['processingConsent'], address, args['processor']),
+        )
+        self.db.execute(
+            "INSERT OR IGNORE INTO tracked (address, kind, from_block) VALUES (?, 'processing', ?)",
+            (args['processingConsent'], block),
+        )
+
+    def _on_collection_ConsentPurposeRevoked(self, address, args, block):
+        # The child contracts emit nothing: the DS flag of the purpose drops on all of them
+        # until the DS grants it again (ProcessingGranted)
+        self.db.execute(
+            """UPDATE purposes SET ds_valid = 0 WHERE purpose = ? AND processing_address IN
+               (SELECT address FROM processing_consents WHERE consent_address = ?)""",
+            (args['purpose'], address),
+        )
+        self.db.execute(
+            """INSERT OR IGNORE INTO revocations (consent_address, processor, purpose, cause)
+               SELECT p.consent_address, p.processor, u.purpose, 'ds_valid' FROM purposes u
+               JOIN processing_consents p ON p.address = u.processing_address
+               WHERE p.consent_address = ? AND u.purpose = ?""",
+            (address, args['purpose']),
+        )
+
+    def _on_collection_ConsentProcessorRevoked(self, address, args, block):
+        # The ProcessingConsent emits AllProcessingRevoked for the flags themselves
+        self.db.execute(
+            "UPDATE processing_consents SET blacklisted = 1 WHERE consent_address = ? AND processor = ?",
+            (address, args['processor']),
+        )
+        self._revoke(address, args['processor'], ANY_PURPOSE, 'blacklisted')
+
+    def _processing_parties(self, address):
+        return self.db.execute(
+            """SELECT c.data_subject, c.controller, p.processor, p.consent_address
+               FROM processing_consents p JOIN consents c ON c.address = p.consent_address
+               WHERE p.address = ?""",
+            (address,),
+        ).fetchone()
+
+    def _processing_flag(self, address, actor):
+        """(flag column `actor` controls, parties of the ProcessingConsent), or (None, parties)."""
+        row = self._processing_parties(address)
+        if row is None:
+            return None, None
+        # Same precedence as ProcessingConsent: controller, then DS, then processor
+        for column, party in zip(PROCESSING_FLAGS, (row['controller'], row['data_subject'], row['processor'])):
+            if actor == party:
+                return column, row
+        return None, row
+
+    def _on_processing_ProcessingPurposeCreated(self, address, args, block):
+        self.db.execute(
+            """INSERT OR REPLACE INTO purposes
+               (processing_address, purpose, data, beginning_date, expiration_date, dc_valid, ds_valid, dp_valid)
+               VALUES (?, ?, ?, ?, ?, 1, ?, 0)""",
+            (address, args['purpose'], str(args['data']), args['beginningDate'], args['expirationDate'],
+             1 if args['defaultTrue'] else 0),
+        )
+
+    def _on_processing_ProcessingGranted(self, address, args, block):
+        column, parties = self._processing_flag(address, args['actor'])
+        if column:
+            self.db.execute(
+                f"UPDATE purposes SET {column} = 1 WHERE processing_address = ? AND purpose = ?",
+                (address, args['purpose']),
+            )
+            self._unrevoke(parties['consent_address'], parties['processor'], args['purpose'], column)
+
+    def _on_processing_ProcessingRevoked(self, address, args, block):
+        column, parties = self._processing_flag(address, args['actor'])
+        if column:
+            self.db.execute(
+                f"UPDATE purposes SET {column} = 0 WHERE processing_address = ? AND purpose = ?",
+                (address, args['purpose']),
+            )
+            self._revoke(parties['consent_address'], parties['processor'], args['purpose'], column)
+
+    def _on_processing_AllProcessingRevoked(self, address, args, block):
+        column, parties = self._processing_flag(address, args['actor'])
+        if column:
+            self.db.execute(f"UPDATE purposes SET {column} = 0 WHERE processing_address = ?", (address,))
+            # One row per purpose: a later grant restores a single purpose
+            self.db.execute(
+                """INSERT OR IGNORE INTO revocations (consent_address, processor, purpose, cause)
+                   SELECT ?, ?, purpose, ? FROM purposes WHERE processing_address = ?""",
+                (parties['consent_address'], parties['processor'], column, address),
+            )
+
+    def _on_processing_ProcessingDataModified(self, address, args, block):
+        self.db.execute(
+            "UPDATE purposes SET data = ? WHERE processing_address = ? AND purpose = ?",
+            (str(args['data']), address, args['purpose']),
+        )
+
+    # Queries
+
+    def get_consent(self, address):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT * FROM consents WHERE address = ?", (Web3.to_checksum_address(address),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_valid(self, address, now=None):
+        """Local equivalent of CollectionConsent.verify()."""
+        now = int(time.time()) if now is None else now
+        with self._lock:
+            row = self.db.execute(
+                """SELECT 1 FROM consents WHERE address = ? AND ds_valid = 1 AND dc_valid = 1
+                   AND beginning_date <= ? AND expiration_date >= ?""",
+                (Web3.to_checksum_address(address), now, now),
+            ).fetchone()
+        return row is not None
+
+    def is_purpose_valid(self, consent_address, processor, purpose, now=None):
+        """Local equivalent of ProcessingConsent.verify(purpose) for the processor's child contract."""
+        now = int(time.time()) if now is None else now
+        with self._lock:
+            row = self.db.execute(
+                """SELECT 1 FROM processing_consents p JOIN purposes u ON u.processing_address = p.address
+                   WHERE p.consent_address = ? AND p.processor = ? AND u.purpose = ?
+                   AND u.dc_valid = 1 AND u.ds_valid = 1 AND u.dp_valid = 1
+                   AND u.beginning_date <= ? AND u.expiration_date >= ?""",
+                (Web3.to_checksum_address(consent_address), Web3.to_checksum_address(processor), purpose, now, now),
+            ).fetchone()
+        return row is not None
+
+    def allowed_consents(self, checks, now=None):
+        """
+        Answers (data_subject, processor, purpose, data_bits) checks: for each, the address of a consent
+        of the data subject under which the processor may process `data_bits` for the purpose (both
+        CollectionConsent and ProcessingConsent valid, the bits within the data of both), or None.
+        Returns (block the index is synced to, answers), both read under the same lock.
+        """
+        now = int(time.time()) if now is None else now
+        answers = []
+        with self._lock:
+            for data_subject, processor, purpose, data_bits in checks:
+                rows = self.db.execute(
+                    """SELECT c.address, c.data AS consent_data, u.data AS purpose_data FROM consents c
+                       JOIN processing_consents p ON p.consent_address = c.address
+                       JOIN purposes u ON u.processing_address = p.address
+                       WHERE c.data_subject = ? AND p.processor = ? AND u.purpose = ? AND p.blacklisted = 0
+                       AND c.ds_valid = 1 AND c.dc_valid = 1 AND c.erased = 0
+                       AND c.beginning_date <= ? AND c.expiration_date >= ?
+                       AND u.dc_valid = 1 AND u.ds_valid = 1 AND u.dp_valid = 1
+                       AND u.beginning_date <= ? AND u.expiration_date >= ?""",
+                    (Web3.to_checksum_address(data_subject), Web3.to_checksum_address(processor), purpose,
+                     now, now, now, now),
+                ).fetchall()
+                answers.append(next(
+                    (row['address'] for row in rows
+                     if data_bits & ~(int(row['consent_data']) & int(row['purpose_data'])) == 0),
+                    None,
+                ))
+            return self.last_block, answers
+
+    def authorizations(self, consent_addresses=None):
+        """
+        (subject, processor, purpose) rows of the consents at `consent_addresses` (default: all)
+        whose flags are all set: both CollectionConsent flags, not erased, processor not blacklisted
+        and the three ProcessingConsent flags of the purpose. The time and data are left to the caller.
+        """
+        query = """SELECT c.data_subject, p.processor, u.purpose, c.address AS consent_address,
+                          p.address AS processing_address, c.data AS consent_data, u.data AS purpose_data,
+                          c.beginning_date AS consent_beginning, c.expiration_date AS consent_expiration,
+                          u.beginning_date AS purpose_beginning, u.expiration_date AS purpose_expiration
+                   FROM consents c
+                   JOIN processing_consents p ON p.consent_address = c.address
+                   JOIN purposes u ON u.processing_address = p.address
+                   WHERE c.ds_valid = 1 AND c.dc_valid = 1 AND c.erased = 0 AND p.blacklisted = 0
+                   AND u.dc_valid = 1 AND u.ds_valid = 1 AND u.dp_valid = 1"""
+        with self._lock:
+            if consent_addresses is None:
+                return [dict(row) for row in self.db.execute(query).fetchall()]
+            addresses = list(consent_addresses)
+            rows = []
+            # Below SQLite's limit of bound parameters per statement
+            for i in range(0, len(addresses), 500):
+                chunk = addresses[i:i + 500]
+                rows += self.db.execute(
+                    f"{query} AND c.address IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            return [dict(row) for row in rows]
+
+    def revocations(self, consent_addresses=None):
+        """(consent_address, processor, purpose) scopes revoked on the consents at `consent_addresses`
+        (default: all), one row per cause: a scope revoked by two actors is listed twice."""
+        query = "SELECT consent_address, processor, purpose FROM revocations"
+        with self._lock:
+            if consent_addresses is None:
+                return [tuple(row) for row in self.db.execute(query).fetchall()]
+            addresses = list(consent_addresses)
+            rows = []
+            for i in range(0, len(addresses), 500):
+                chunk = addresses[i:i + 500]
+                rows += self.db.execute(
+                    f"{query} WHERE consent_address IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            return [tuple(row) for row in rows]
+
+    def is_revoked(self, consent_address, processor=None, purpose=None):
+        """
+        Whether the consent was revoked or erased, or, with `processor` (and `purpose`), whether
+        the processor was blacklisted or its processing (of the purpose) revoked.
+        """
+        scopes = [(ANY_PROCESSOR, ANY_PURPOSE)]
+        if processor is not None:
+            processor = Web3.to_checksum_address(processor)
+            scopes.append((processor, ANY_PURPOSE))
+            if purpose is not None:
+                scopes.append((processor, purpose))
+        with self._lock:
+            row = self.db.execute(
+                f"""SELECT 1 FROM revocations WHERE consent_address = ?
+                    AND ({' OR '.join(['(processor = ? AND purpose = ?)'] * len(scopes))}) LIMIT 1""",
+                [Web3.to_checksum_address(consent_address)] + [value for scope in scopes for value in scope],
+            ).fetchone()
+        return row is not None
+
+    def consents_for_subject(self, data_subject):
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT * FROM consents WHERE data_subject = ? ORDER BY created_block",
+                (Web3.to_checksum_address(data_subject),),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def consents_for_controller(self, controller):
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT * FROM consents WHERE controller = ? ORDER BY created_block",
+                (Web3.to_checksum_address(controller),),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def consents_for_processor(self, processor):
+        """Consents naming `processor` as a recipient or holding a ProcessingConsent of it."""
+        rows, _ = self.find_consents('processor', processor, limit=-1)
+        return rows
+
+    def _role_filter(self, role, address):
+        if role is None:
+            return [], []
+        if role not in ROLES:
+            raise ValueError(f"Unknown role {role!r}: one of {ROLES}")
+        address = Web3.to_checksum_address(address)
+        if role == 'subject':
+            return ['data_subject = ?'], [address]
+        if role == 'controller':
+            return ['controller = ?'], [address]
+        return ["""address IN (SELECT consent_address FROM consent_recipients WHERE recipient = ?
+                   UNION SELECT consent_address FROM processing_consents WHERE processor = ?)"""], [address, address]
+
+    def find_consents(self, role=None, address=None, limit=DEFAULT_PAGE_SIZE, after=None):
+        """
+        One page of consents in creation order: all of them, or those where `address` is the
+        `role` ('subject', 'controller' or 'processor'). `after` is the cursor returned with the
+        previous page. Returns (rows, cursor of the next page or None); `limit=-1` returns all rows
+        and `limit=0` none.
+        """
+        if limit == 0:
+            return [], None
+        conditions, params = self._role_filter(role, address)
+        if after is not None:
+            conditions.append('(created_block, address) > (?, ?)')
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            rows = self.db.execute(
+                f"SELECT * FROM consents {where} ORDER BY created_block, address LIMIT ?",
+                (*params, limit + 1 if limit >= 0 else -1),
+            ).fetchall()
+        if 0 <= limit < len(rows):
+            last = rows[limit - 1]
+            return [dict(row) for row in rows[:limit]], (last['created_block'], last['address'])
+        return [dict(row) for row in rows], None
+
+    def count_consents(self, role=None, address=None):
+        conditions, params = self._role_filter(role, address)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM consents {where}", params).fetchone()[0]
+
+    def purposes_for_consent(self, consent_address):
+        with self._lock:
+            rows = self.db.execute(
+                """SELECT p.processor, p.blacklisted, u.* FROM processing_consents p
+                   JOIN purposes u ON u.processing_address = p.address
+                   WHERE p.consent_address = ? ORDER BY p.processor, u.purpose""",
+                (Web3.to_checksum_address(consent_address),),
+            ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,201 @@
+"""
+Batched reads of CollectionConsent state.
+
+Reading one consent through the contract getters costs one eth_call per
+getter. ConsentReader sends the getters of many consent contracts together:
+as a single Multicall.tryBlockAndAggregate eth_call when the Multicall
+contract is deployed (migrations/4_deploy_multicall.js), otherwise as one
+JSON-RPC batch request. All values of one read come from the same block and
+are decoded into ConsentSnapshot objects.
+"""
+
+from dataclasses import dataclass
+
+from web3 import Web3
+
+from contract_artifacts import load_artifact, deployed_address
+
+# CollectionConsent getters read for each snapshot
+SNAPSHOT_GETTERS = (
+    'verify',
+    'getDataSubject',
+    'getController',
+    'getRecipients',
+    'getData',
+    'getValidity',
+    'getValidityWindow',
+    'isErased',
+    'getAllProcessors',
+)
+
+# Consents per Multicall eth_call, to stay below the node's eth_call gas cap
+DEFAULT_CHUNK_SIZE = 50
+
+
+@dataclass(frozen=True)
+class ConsentSnapshot:
+    """State of one CollectionConsent at `block_number`."""
+    address: str
+    block_number: int
+    valid: bool
+    data_subject: str
+    controller: str
+    recipients: tuple
+    data: int
+    ds_granted: bool
+    dc_granted: bool
+    beginning_date: int
+    expiration_date: int
+    erased: bool
+    processors: tuple
+
+    @property
+    def duration(self):
+        return self.expiration_date - self.beginning_date
+
+
+def _normalize(abi_type, value):
+    if abi_type == 'address':
+        return Web3.to_checksum_address(value)
+    if abi_type == 'address[]':
+        return tuple(Web3.to_checksum_address(v) for v in value)
+    if abi_type.endswith('[]'):
+        return tuple(value)
+    return value
+
+
+class ConsentReader:
+    """Reads ConsentSnapshots of CollectionConsent contracts in as few RPCs as possible."""
+
+    def __init__(self, w3, multicall_address=None, consent_abi=None, multicall_abi=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        if consent_abi is None:
+            consent_abi = load_artifact('CollectionConsent')['abi']
+        self.w3 = w3
+        self.chunk_size = chunk_size
+        self.consent = w3.eth.contract(abi=consent_abi)
+
+        self.multicall = None
+        if multicall_address is not None:
+            if multicall_abi is None:
+                multicall_abi = load_artifact('Multicall')['abi']
+            self.multicall = w3.eth.contract(address=multicall_address, abi=multicall_abi)
+
+        # Getters take no arguments: encode each call once
+        self._call_data = {}
+        self._output_types = {}
+        for fn_abi in consent_abi:
+            if fn_abi.get('type') == 'function' and fn_abi['name'] in SNAPSHOT_GETTERS:
+                self._call_data[fn_abi['name']] = self.consent.encode_abi(fn_abi['name'])
+                self._output_types[fn_abi['name']] = [o['type'] for o in fn_abi['outputs']]
+        missing = set(SNAPSHOT_GETTERS) - set(self._call_data)
+        if missing:
+            raise ValueError(f"CollectionConsent ABI lacks getters: {sorted(missing)} (recompile the contracts)")
+
+    @classmethod
+    def from_artifact(cls, w3, **kwargs):
+        """Reader using the Multicall deployed by `truffle migrate`, or JSON-RPC batches if not deployed."""
+        multicall_address, multicall_abi = None, None
+        try:
+            artifact = load_artifact('Multicall')
+            multicall_address, multicall_abi = deployed_address(artifact, w3.net.version), artifact['abi']
+        except FileNotFoundError:
+            pass
+        return cls(w3, multicall_address, multicall_abi=multicall_abi, **kwargs)
+
+    @property
+    def mode(self):
+        return 'multicall' if self.multicall is not None else 'batch'
+
+    def snapshot(self, address):
+        return self.snapshots([address])[0]
+
+    def snapshots(self, addresses, block_number=None):
+        """
+        Returns one ConsentSnapshot per address, in order, read at `block_number` (default: latest).
+        Addresses whose getters fail (not a CollectionConsent) get None.
+        """
+        addresses = [Web3.to_checksum_address(a) for a in addresses]
+        if not addresses:
+            return []
+        calls = [(address, self._call_data[name]) for address in addresses for name in SNAPSHOT_GETTERS]
+        block_number, results = self.aggregate(calls, block_number)
+
+        snapshots = []
+        n = len(SNAPSHOT_GETTERS)
+        for i, address in enumerate(addresses):
+            snapshots.append(self._decode(address, block_number, results[i * n:(i + 1) * n]))
+        return snapshots
+
+    def aggregate(self, calls, block_number=None):
+        """
+        Sends the (address, call data) `calls` in as few RPCs as possible, all at the same block.
+        Returns (block number, [(success, return data)]) in the order of `calls`.
+        """
+        if not calls:
+            return (self.w3.eth.block_number if block_number is None else block_number), []
+        if self.multicall is not None:
+            return self._read_multicall(calls, block_number)
+        return self._read_batch(calls, block_number)
+
+    def _read_multicall(self, calls, block_number=None):
+        """One tryBlockAndAggregate eth_call per chunk; later chunks are pinned to the first one's block."""
+        results = []
+        # chunk_size consents' worth of getter calls per eth_call
+        step = self.chunk_size * len(SNAPSHOT_GETTERS)
+        for start in range(0, len(calls), step):
+            fn = self.multicall.functions.tryBlockAndAggregate(False, calls[start:start + step])
+            chunk_block, _, chunk_results = fn.call(
+                block_identifier=block_number if block_number is not None else 'latest')
+            if block_number is None:
+                block_number = chunk_block
+            results.extend((success, bytes(data)) for success, data in chunk_results)
+        return block_number, results
+
+    def _read_batch(self, calls, block_number=None):
+        """One JSON-RPC batch with every eth_call, pinned to `block_number` (default: eth_blockNumber)."""
+        if block_number is None:
+            block_number = self.w3.eth.block_number
+        requests = [({'to': address, 'data': data}, block_number) for address, data in calls]
+        try:
+            with self.w3.batch_requests() as batch:
+                for request in requests:
+                    batch.add(self.w3.eth.call(*request))
+                responses = batch.execute()
+            return block_number, [(True, bytes(data)) for data in responses]
+        except Exception:
+            # A reverting call fails the whole batch: read each call on its own
+            results = []
+            for request in requests:
+                try:
+                    results.append((True, bytes(self.w3.eth.call(*request))))
+                except Exception:
+                    results.append((False, b''))
+            return block_number, results
+
+    def _decode(self, address, block_number, results):
+        values = {}
+        for name, (success, data) in zip(SNAPSHOT_GETTERS, results):
+            if not success or not data:
+                return None
+            types = self._output_types[name]
+            decoded = [_normalize(t, v) for t, v in zip(types, self.w3.codec.decode(types, data))]
+            values[name] = decoded[0] if len(decoded) == 1 else decoded
+
+        ds_valid, dc_valid = values['getValidity']
+        beginning_date, expiration_date = values['getValidityWindow']
+        return ConsentSnapshot(
+            address=address,
+            block_number=block_number,
+            valid=values['verify'],
+            data_subject=values['getDataSubject'],
+            controller=values['getController'],
+            recipients=values['getRecipients'],
+            data=values['getData'],
+            ds_granted=ds_valid != 0,
+            dc_granted=dc_valid != 0,
+            beginning_date=beginning_date,
+            expiration_date=expiration_date,
+            erased=values['isErased'],
+            processors=values['getAllProcessors'],
+        )
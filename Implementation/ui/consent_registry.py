@@ -0,0 +1,114 @@
+"""
+Python client for the ConsentRegistry contract.
+
+With the registry, creating a consent is a single storage write on an
+already deployed contract instead of a new CollectionConsent deployment.
+Consents are addressed by the (data subject, controller) pair.
+
+With a NonceManager, transactions take their nonces from it, so they do not
+collide with the ones TransactionPipeline sends from the same accounts.
+"""
+
+from web3 import Web3
+
+from contract_artifacts import load_artifact, deployed_address
+from nonce_manager import send_and_wait
+
+
+class ConsentRegistryClient:
+    """Thin wrapper around a deployed ConsentRegistry."""
+
+    def __init__(self, w3, address, abi=None, nonce_manager=None):
+        if abi is None:
+            abi = load_artifact('ConsentRegistry')['abi']
+        self.w3 = w3
+        self.nonce_manager = nonce_manager
+        self.contract = w3.eth.contract(address=address, abi=abi)
+
+    @property
+    def address(self):
+        return self.contract.address
+
+    @classmethod
+    def from_artifact(cls, w3, nonce_manager=None):
+        """Client for the registry deployed by `truffle migrate`, or None if not deployed."""
+        artifact = load_artifact('ConsentRegistry')
+        address = deployed_address(artifact, w3.net.version)
+        if address is None:
+            return None
+        return cls(w3, address, artifact['abi'], nonce_manager)
+
+    @classmethod
+    def deploy(cls, w3, deployer, nonce_manager=None):
+        """Deploys a new registry from `deployer` and returns a client for it."""
+        artifact = load_artifact('ConsentRegistry')
+        factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+        receipt = send_and_wait(w3, nonce_manager, factory.constructor(), deployer)
+        return cls(w3, receipt['contractAddress'], artifact['abi'], nonce_manager)
+
+    @staticmethod
+    def consent_id(data_subject, controller):
+        """Same key as ConsentRegistry.consentId(), computed locally."""
+        return Web3.solidity_keccak(['address', 'address'], [data_subject, controller])
+
+    def _transact(self, fn, sender):
+        return send_and_wait(self.w3, self.nonce_manager, fn, sender)
+
+    # Transactions
+
+    def create_consent(self, data_subject, controller, recipients, data, duration, purposes):
+        """Creates the consent as `data_subject` and returns the transaction receipt."""
+        fn = self.contract.functions.createConsent(controller, recipients, data, duration, purposes)
+        return self._transact(fn, data_subject)
+
+    def create_consent_batch(self, data_subject, consents):
+        """
+        Creates all `consents` for `data_subject` in one transaction, sent by the data subject:
+        a batch covers one data subject (see submit_signed_creations for many).
+        Each consent is a dict with controller, recipients, data, duration and purposes.
+        """
+        fn = self.contract.functions.createConsentBatch(
+            [c['controller'] for c in consents],
+            [c['recipients'] for c in consents],
+            [c['data'] for c in consents],
+            [c['duration'] for c in consents],
+            [c['purposes'] for c in consents],
+        )
+        return self._transact(fn, data_subject)
+
+    def grant_consent_batch(self, controller, data_subjects):
+        """Grants, as `controller`, the consents of all `data_subjects` in one transaction."""
+        return self._transact(self.contract.functions.grantConsentBatch(data_subjects), controller)
+
+    def grant_consent(self, data_subject, controller, actor):
+        return self._transact(self.contract.functions.grantConsent(data_subject, controller), actor)
+
+    def revoke_consent(self, data_subject, controller, actor):
+        return self._transact(self.contract.functions.revokeConsent(data_subject, controller), actor)
+
+    def submit_signed_actions(self, relayer, actions):
+        """Relays a batch of SignedAction tuples (see signed_consents.py) from `relayer`."""
+        return self._transact(self.contract.functions.submitSignedActions(actions), relayer)
+
+    def submit_signed_creations(self, relayer, creations):
+        """Relays a batch of SignedCreation tuples (see signed_consents.py) from `relayer`."""
+        return self._transact(self.contract.functions.submitSignedCreations(creations), relayer)
+
+    def rejected_actions(self, receipt):
+        """Batch indexes skipped by submitSignedActions or submitSignedCreations in this receipt."""
+        events = self.contract.events.SignedActionRejected().process_receipt(receipt)
+        return [event['args']['index'] for event in events]
+
+    # Reads
+
+    def exists(self, data_subject, controller):
+        return self.contract.functions.existsConsent(data_subject, controller).call()
+
+    def verify(self, data_subject, controller):
+        return self.contract.functions.verify(data_subject, controller).call()
+
+    def get_data(self, data_subject, controller):
+        return self.contract.functions.getData(data_subject, controller).call()
+
+    def get_recipients(self, data_subject, controller):
+        return self.contract.functions.getRecipients(data_subject, controller).call()
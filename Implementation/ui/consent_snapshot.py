@@ -0,0 +1,387 @@
+"""
+Columnar snapshots of consent state.
+
+A snapshot is the state of a set of CollectionConsent contracts and of their
+ProcessingConsent children at one block. It is read with batched getter
+calls through ConsentReader (Multicall or JSON-RPC batches):
+  - the CollectionConsent getters of ConsentReader, getAllProcessors included;
+  - getProcessingConsentSC of every processor;
+  - getPurposes of every ProcessingConsent;
+  - getDataPurpose, getValidityWindow, verify and verifyDS of every purpose.
+
+It is stored as a directory (<out>/block-<number>) with one .npy file per
+column and a meta.json holding the block number, block hash, state root and
+row counts. Addresses are (n, 20) and uint256 values (n, 32) big-endian byte
+arrays. `Snapshot.load` memory-maps the columns, so queries only page in the
+columns they touch.
+
+Tables (child rows point to their parent by row index):
+    consents     address, data_subject, controller, data, valid, ds_granted,
+                 dc_granted, erased, beginning_date, expiration_date, read_block
+    recipients   consent, address
+    processing   consent, processor, address
+    purposes     processing, purpose, data, beginning_date, expiration_date,
+                 valid, ds_valid
+
+Exports are incremental: from a previous snapshot, only the consents that
+emitted logs since its block (themselves or through their ProcessingConsents)
+and the new addresses are read again, the other rows are copied. `valid`
+columns are the contracts' verify() at `read_block`.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from web3 import Web3
+
+from consent_reader import ConsentReader
+from contract_artifacts import load_artifact
+
+SNAPSHOT_VERSION = 1
+
+COLUMNS = {
+    'consents': {
+        'address': (np.uint8, 20), 'data_subject': (np.uint8, 20), 'controller': (np.uint8, 20),
+        'data': (np.uint8, 32), 'valid': (np.bool_, None), 'ds_granted': (np.bool_, None),
+        'dc_granted': (np.bool_, None), 'erased': (np.bool_, None), 'beginning_date': (np.uint64, None),
+        'expiration_date': (np.uint64, None), 'read_block': (np.int64, None),
+    },
+    'recipients': {'consent': (np.int32, None), 'address': (np.uint8, 20)},
+    'processing': {'consent': (np.int32, None), 'processor': (np.uint8, 20), 'address': (np.uint8, 20)},
+    'purposes': {
+        'processing': (np.int32, None), 'purpose': (np.uint16, None), 'data': (np.uint8, 32),
+        'beginning_date': (np.uint64, None), 'expiration_date': (np.uint64, None),
+        'valid': (np.bool_, None), 'ds_valid': (np.bool_, None),
+    },
+}
+# Column of each table holding the index of the parent row: (column, parent table)
+PARENTS = {'recipients': ('consent', 'consents'), 'processing': ('consent', 'consents'),
+           'purposes': ('processing', 'processing')}
+
+# Block range per eth_getLogs request of incremental exports
+LOG_CHUNK_SIZE = 2000
+
+
+def address_bytes(address):
+    return bytes.fromhex(Web3.to_checksum_address(address)[2:])
+
+
+def to_address(row):
+    return Web3.to_checksum_address(bytes(row))
+
+
+def to_uint(row):
+    return int.from_bytes(bytes(row), 'big')
+
+
+def _empty_table(name):
+    return {column: [] for column in COLUMNS[name]}
+
+
+def _to_arrays(name, rows):
+    arrays = {}
+    for column, (dtype, width) in COLUMNS[name].items():
+        values = rows[column]
+        if width is None:
+            arrays[column] = np.array(values, dtype=dtype)
+        else:
+            arrays[column] = np.frombuffer(b''.join(values), dtype=dtype).reshape(-1, width)
+    return arrays
+
+
+def _row_count(columns):
+    return len(next(iter(columns.values())))
+
+
+def _select(tables, consent_rows):
+    """Rows of `tables` belonging to the consents at `consent_rows`, with their parent indices renumbered."""
+    selected = {'consents': {c: a[consent_rows] for c, a in tables['consents'].items()}}
+    keep = {'consents': consent_rows}
+    for name in ('recipients', 'processing', 'purposes'):
+        column, parent = PARENTS[name]
+        remap = np.full(_row_count(tables[parent]), -1, dtype=np.int64)
+        remap[keep[parent]] = np.arange(len(keep[parent]))
+        rows = np.flatnonzero(remap[tables[name][column]] >= 0)
+        selected[name] = {c: a[rows] for c, a in tables[name].items()}
+        selected[name][column] = remap[tables[name][column][rows]].astype(COLUMNS[name][column][0])
+        keep[name] = rows
+    return selected
+
+
+def _concat(first, second):
+    """`second` appended to `first`, parent indices of `second` shifted past `first`'s rows."""
+    merged = {}
+    for name, columns in COLUMNS.items():
+        merged[name] = {}
+        for column in columns:
+            tail = second[name][column]
+            if PARENTS.get(name, (None,))[0] == column:
+                parent = PARENTS[name][1]
+                tail = tail + _row_count(first[parent])
+            merged[name][column] = np.concatenate([first[name][column], tail.astype(first[name][column].dtype)])
+    return merged
+
+
+class Snapshot:
+    """A stored snapshot: `meta` and memory-mapped `tables` (table -> column -> array)."""
+
+    def __init__(self, path, meta, tables):
+        self.path = path
+        self.meta = meta
+        self.tables = tables
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {meta.get('version')} in {path}")
+        tables = {
+            name: {
+                column: np.load(os.path.join(path, f'{name}.{column}.npy'), mmap_mode=mmap_mode)
+                for column in columns
+            }
+            for name, columns in COLUMNS.items()
+        }
+        return cls(path, meta, tables)
+
+    @property
+    def block_number(self):
+        return self.meta['block_number']
+
+    def __len__(self):
+        return len(self.tables['consents']['address'])
+
+    def _rows(self, table, column, address):
+        return np.flatnonzero((self.tables[table][column] == np.frombuffer(address_bytes(address), np.uint8)).all(axis=1))
+
+    def consent_row(self, address):
+        rows = self._rows('consents', 'address', address)
+        if not len(rows):
+            raise KeyError(address)
+        return int(rows[0])
+
+    def addresses(self):
+        return [to_address(row) for row in self.tables['consents']['address']]
+
+    def consent(self, address):
+        row = self.consent_row(address)
+        consents = self.tables['consents']
+        recipients = self.tables['recipients']
+        return {
+            'address': Web3.to_checksum_address(address),
+            'data_subject': to_address(consents['data_subject'][row]),
+            'controller': to_address(consents['controller'][row]),
+            'recipients': [to_address(a) for a in recipients['address'][recipients['consent'] == row]],
+            'data': to_uint(consents['data'][row]),
+            'valid': bool(consents['valid'][row]),
+            'ds_granted': bool(consents['ds_granted'][row]),
+            'dc_granted': bool(consents['dc_granted'][row]),
+            'erased': bool(consents['erased'][row]),
+            'beginning_date': int(consents['beginning_date'][row]),
+            'expiration_date': int(consents['expiration_date'][row]),
+            'read_block': int(consents['read_block'][row]),
+        }
+
+    def consents_for_subject(self, data_subject):
+        return [to_address(self.tables['consents']['address'][row])
+                for row in self._rows('consents', 'data_subject', data_subject)]
+
+    def consents_for_controller(self, controller):
+        return [to_address(self.tables['consents']['address'][row])
+                for row in self._rows('consents', 'controller', controller)]
+
+    def valid_mask(self, now=None):
+        """Validity of every consent at `now` (default: current time), with the rules of verify()."""
+        now = int(time.time()) if now is None else now
+        consents = self.tables['consents']
+        return (consents['ds_granted'] & consents['dc_granted']
+                & (consents['beginning_date'] <= now) & (consents['expiration_date'] >= now))
+
+    def is_valid(self, address, now=None):
+        return bool(self.valid_mask(now)[self.consent_row(address)])
+
+    def purposes(self, address):
+        """[{processor, processing_consent, purpose, data, beginning_date, expiration_date, valid, ds_valid}]"""
+        processing, purposes = self.tables['processing'], self.tables['purposes']
+        result = []
+        for child in np.flatnonzero(processing['consent'] == self.consent_row(address)):
+            for row in np.flatnonzero(purposes['processing'] == child):
+                result.append({
+                    'processor': to_address(processing['processor'][child]),
+                    'processing_consent': to_address(processing['address'][child]),
+                    'purpose': int(purposes['purpose'][row]),
+                    'data': to_uint(purposes['data'][row]),
+                    'beginning_date': int(purposes['beginning_date'][row]),
+                    'expiration_date': int(purposes['expiration_date'][row]),
+                    'valid': bool(purposes['valid'][row]),
+                    'ds_valid': bool(purposes['ds_valid'][row]),
+                })
+        return result
+
+
+def latest_snapshot(out_dir):
+    """The snapshot of `out_dir` with the highest block, or None."""
+    if not os.path.isdir(out_dir):
+        return None
+    blocks = []
+    for name in os.listdir(out_dir):
+        if name.startswith('block-') and os.path.exists(os.path.join(out_dir, name, 'meta.json')):
+            blocks.append(int(name[len('block-'):]))
+    return Snapshot.load(os.path.join(out_dir, f'block-{max(blocks)}')) if blocks else None
+
+
+class SnapshotExporter:
+    """Reads the consent state of a set of CollectionConsent contracts and writes it as a Snapshot."""
+
+    def __init__(self, w3, reader=None, processing_abi=None):
+        self.w3 = w3
+        self.reader = reader if reader is not None else ConsentReader.from_artifact(w3)
+        if processing_abi is None:
+            processing_abi = load_artifact('ProcessingConsent')['abi']
+        self.collection = w3.eth.contract(abi=self.reader.consent.abi)
+        self.processing = w3.eth.contract(abi=processing_abi)
+
+    def _calls(self, contract, calls, block_number):
+        """Batched (address, function, args) calls at `block_number`, decoded; None for failed calls."""
+        encoded = [(address, contract.encode_abi(name, args=list(args))) for address, name, args in calls]
+        _, results = self.reader.aggregate(encoded, block_number)
+        decoded = []
+        for (_, name, _), (success, data) in zip(calls, results):
+            if not success or not data:
+                decoded.append(None)
+                continue
+            types = [o['type'] for o in contract.get_function_by_name(name).abi['outputs']]
+            values = self.w3.codec.decode(types, data)
+            decoded.append(values[0] if len(values) == 1 else values)
+        return decoded
+
+    def read(self, addresses, block_number):
+        """Tables of the consents at `addresses` (unreadable addresses are skipped)."""
+        rows = {name: _empty_table(name) for name in COLUMNS}
+        snapshots = [s for s in self.reader.snapshots(addresses, block_number) if s is not None]
+
+        children = []   # (consent row, processor)
+        for i, snapshot in enumerate(snapshots):
+            consents = rows['consents']
+            consents['address'].append(address_bytes(snapshot.address))
+            consents['data_subject'].append(address_bytes(snapshot.data_subject))
+            consents['controller'].append(address_bytes(snapshot.controller))
+            consents['data'].append(snapshot.data.to_bytes(32, 'big'))
+            consents['valid'].append(snapshot.valid)
+            consents['ds_granted'].append(snapshot.ds_granted)
+            consents['dc_granted'].append(snapshot.dc_granted)
+            consents['erased'].append(snapshot.erased)
+            consents['beginning_date'].append(snapshot.beginning_date)
+            consents['expiration_date'].append(snapshot.expiration_date)
+            consents['read_block'].append(snapshot.block_number)
+            for recipient in snapshot.recipients:
+                rows['recipients']['consent'].append(i)
+                rows['recipients']['address'].append(address_bytes(recipient))
+            children.extend((i, processor) for processor in snapshot.processors)
+
+        child_addresses = self._calls(self.collection, [
+            (snapshots[i].address, 'getProcessingConsentSC', (processor,)) for i, processor in children
+        ], block_number)
+        children = [(i, p, Web3.to_checksum_address(a)) for (i, p), a in zip(children, child_addresses) if a is not None]
+        purpose_lists = self._calls(self.processing, [(a, 'getPurposes', ()) for _, _, a in children], block_number)
+
+        purposes = []   # (processing row, ProcessingConsent address, purpose)
+        for j, ((i, processor, address), listed) in enumerate(zip(children, purpose_lists)):
+            rows['processing']['consent'].append(i)
+            rows['processing']['processor'].append(address_bytes(processor))
+            rows['processing']['address'].append(address_bytes(address))
+            purposes.extend((j, address, purpose) for purpose in (listed or ()))
+
+        getters = ('getDataPurpose', 'getValidityWindow', 'verify', 'verifyDS')
+        values = self._calls(self.processing, [
+            (address, name, (purpose,)) for _, address, purpose in purposes for name in getters
+        ], block_number)
+        for k, (j, _, purpose) in enumerate(purposes):
+            data, window, valid, ds_valid = values[k * len(getters):(k + 1) * len(getters)]
+            beginning_date, expiration_date = window or (0, 0)
+            table = rows['purposes']
+            table['processing'].append(j)
+            table['purpose'].append(purpose)
+            table['data'].append((data or 0).to_bytes(32, 'big'))
+            table['beginning_date'].append(beginning_date)
+            table['expiration_date'].append(expiration_date)
+            table['valid'].append(bool(valid))
+            table['ds_valid'].append(bool(ds_valid))
+
+        return {name: _to_arrays(name, table_rows) for name, table_rows in rows.items()}
+
+    def changed_consents(self, previous, to_block):
+        """Addresses of the consents of `previous` that emitted logs (or whose children did) since its block."""
+        consents = previous.tables['consents']['address']
+        processing = previous.tables['processing']
+        owner = {to_address(row): to_address(row) for row in consents}
+        owner.update({to_address(child): to_address(consents[parent])
+                      for child, parent in zip(processing['address'], processing['consent'])})
+        if not owner:
+            return set()
+
+        changed = set()
+        start = previous.block_number + 1
+        while start <= to_block:
+            end = min(start + LOG_CHUNK_SIZE - 1, to_block)
+            for log in self.w3.eth.get_logs({'fromBlock': start, 'toBlock': end, 'address': list(owner)}):
+                changed.add(owner[Web3.to_checksum_address(log['address'])])
+            start = end + 1
+        return changed
+
+    def export(self, addresses, out_dir, previous=None, block_number=None):
+        """
+        Writes the snapshot of `addresses` (plus the consents of `previous`) at `block_number`
+        (default: latest) under `out_dir` and returns it. With `previous`, only the consents
+        that changed since its block and the new addresses are read.
+        """
+        block = self.w3.eth.get_block('latest' if block_number is None else block_number)
+        block_number = block['number']
+        addresses = [Web3.to_checksum_address(a) for a in addresses]
+
+        if previous is not None:
+            if previous.block_number > block_number:
+                raise ValueError(f"Previous snapshot is at block {previous.block_number}, after {block_number}")
+            known = previous.addresses()
+            changed = self.changed_consents(previous, block_number)
+            kept_rows = np.array([i for i, a in enumerate(known) if a not in changed], dtype=np.int64)
+            kept = _select(previous.tables, kept_rows)
+            known = set(known)
+            to_read = sorted(changed) + [a for a in dict.fromkeys(addresses) if a not in known]
+            tables = _concat(kept, self.read(to_read, block_number))
+        else:
+            to_read = list(dict.fromkeys(addresses))
+            tables = self.read(to_read, block_number)
+
+        meta = {
+            'version': SNAPSHOT_VERSION,
+            'block_number': block_number,
+            'block_hash': Web3.to_hex(block['hash']),
+            'state_root': Web3.to_hex(block['stateRoot']),
+            'chain_id': self.w3.eth.chain_id,
+            'created_at': int(time.time()),
+            'previous_block': previous.block_number if previous is not None else None,
+            'read': len(to_read),
+            'rows': {name: _row_count(columns) for name, columns in tables.items()},
+        }
+        return write_snapshot(out_dir, meta, tables)
+
+
+def write_snapshot(out_dir, meta, tables):
+    """Writes the columns, then meta.json, in a temporary directory renamed into place."""
+    path = os.path.join(out_dir, f"block-{meta['block_number']}")
+    tmp = f'{path}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, columns in tables.items():
+        for column, array in columns.items():
+            np.save(os.path.join(tmp, f'{name}.{column}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    return Snapshot.load(path)
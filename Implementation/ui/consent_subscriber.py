@@ -0,0 +1,276 @@
+"""
+Live in-memory model of the consents shown by the UI.
+
+ConsentSubscriber keeps the latest block number and a ConsentSnapshot of
+every watched CollectionConsent up to date from a background thread, so the
+UI renders from memory instead of calling the node on every rerun:
+
+- over a WebSocket (`eth_subscribe` newHeads and logs of the watched
+  addresses), the node pushes new blocks and consent events;
+- without a WebSocket endpoint, or while it is down, it polls instead: one
+  eth_blockNumber per `poll_interval`, plus one eth_getLogs when there are
+  new blocks.
+Consents that emitted logs are read again (one batched ConsentReader read
+per block), so the RPC load depends on the blocks and the events, not on the
+number of users, widgets or reruns.
+
+Consents expire without an event: an ExpiryScheduler tracks the expiration
+date of every valid snapshot and, at the first block whose timestamp is
+past it, the snapshot is flipped to invalid and published like a change.
+
+Listeners (`add_listener`) are called with the changed addresses after each
+update; `wait(version)` blocks until the model changes.
+"""
+
+import asyncio
+import dataclasses
+import threading
+import time
+
+from web3 import AsyncWeb3, Web3, WebSocketProvider
+
+from expiry_scheduler import ExpiryScheduler
+from tx_pipeline import DEFAULT_PROVIDER_URL
+
+DEFAULT_WS_URL = DEFAULT_PROVIDER_URL.replace('http://', 'ws://', 1)
+DEFAULT_POLL_INTERVAL = 1.0     # seconds between polls without WebSocket
+DEFAULT_RETRY_INTERVAL = 15.0   # seconds of polling before trying the WebSocket again
+
+WEBSOCKET = 'websocket'
+POLLING = 'polling'
+
+
+class ConsentSubscriber:
+    """Background subscriber folding new blocks and consent logs into ConsentSnapshots."""
+
+    def __init__(self, w3, reader, ws_url=DEFAULT_WS_URL, poll_interval=DEFAULT_POLL_INTERVAL,
+                 retry_interval=DEFAULT_RETRY_INTERVAL):
+        self.w3 = w3
+        self.reader = reader
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+
+        self.mode = None
+        self.block_number = None
+        self.version = 0
+        self.last_error = None
+        self.blocks = 0
+        self.events = 0
+        self.reads = 0
+
+        self.expiries = ExpiryScheduler()
+        self._snapshots = {}
+        self._pending = set()
+        self._listeners = []
+        self._changed = threading.Condition()
+        self._lock = threading.RLock()
+
+        self._loop = None
+        self._thread = None
+        self._stopping = False
+        self._ws = None
+        self._logs_subscription = None
+
+    # Model
+
+    def watch(self, addresses):
+        """
+        Follows the consents at `addresses`; the new ones are read right away (one batched read).
+        If that read fails, their snapshots stay None until they are read again at the next block.
+        """
+        addresses = [Web3.to_checksum_address(a) for a in addresses]
+        with self._lock:
+            new = [a for a in dict.fromkeys(addresses) if a not in self._snapshots]
+            for address in new:
+                self._snapshots[address] = None
+        if new:
+            try:
+                self._refresh(new)
+            except Exception as e:
+                self.last_error = f'read: {type(e).__name__}: {e}'
+                with self._lock:
+                    self._pending.update(new)
+            if self._ws is not None:
+                asyncio.run_coroutine_threadsafe(self._subscribe_logs(self._ws), self._loop)
+
+    def unwatch(self, addresses):
+        with self._lock:
+            for address in addresses:
+                address = Web3.to_checksum_address(address)
+                self._snapshots.pop(address, None)
+                self.expiries.cancel(address)
+
+    @property
+    def watched(self):
+        with self._lock:
+            return list(self._snapshots)
+
+    def get(self, address):
+        with self._lock:
+            return self._snapshots.get(Web3.to_checksum_address(address))
+
+    def snapshots(self, addresses):
+        with self._lock:
+            return [self._snapshots.get(Web3.to_checksum_address(a)) for a in addresses]
+
+    def add_listener(self, callback):
+        """`callback(changed_addresses, block_number)` is called from the background thread after each update."""
+        self._listeners.append(callback)
+
+    def wait(self, version, timeout=None):
+        """Waits until the model is newer than `version`; returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'block_number': self.block_number,
+            'watched': len(self._snapshots),
+            'version': self.version,
+            'blocks': self.blocks,
+            'events': self.events,
+            'reads': self.reads,
+            'expiring': len(self.expiries),
+            'expired': self.expiries.expired,
+            'last_error': self.last_error,
+        }
+
+    def _refresh(self, addresses, block_number=None):
+        addresses = [a for a in addresses if a in self._snapshots]
+        if addresses:
+            snapshots = self.reader.snapshots(addresses, block_number)
+            self.reads += 1
+            with self._lock:
+                for address, snapshot in zip(addresses, snapshots):
+                    if address in self._snapshots:
+                        self._snapshots[address] = snapshot
+                        if snapshot is not None and snapshot.valid:
+                            self.expiries.schedule(address, snapshot.expiration_date)
+                        else:
+                            self.expiries.cancel(address)
+        self._publish(addresses)
+
+    def _publish(self, addresses):
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(addresses, self.block_number)
+            except Exception as e:
+                self.last_error = f'listener: {e}'
+
+    def _on_block(self, number, timestamp=None):
+        """New head: the consents with logs since the last one are read at this block, the expired ones flipped."""
+        self.block_number = number
+        self.blocks += 1
+        with self._lock:
+            changed, self._pending = list(self._pending), set()
+        try:
+            self._refresh(changed, number)
+        except Exception:
+            with self._lock:
+                # Read again at the next block
+                self._pending.update(changed)
+            raise
+        if len(self.expiries):
+            if timestamp is None:
+                timestamp = self.w3.eth.get_block(number)['timestamp']
+            self._expire(timestamp, number)
+
+    def _expire(self, timestamp, number):
+        expired = self.expiries.advance(timestamp, number)
+        if expired:
+            with self._lock:
+                for address in expired:
+                    snapshot = self._snapshots.get(address)
+                    if snapshot is not None:
+                        self._snapshots[address] = dataclasses.replace(snapshot, valid=False, block_number=number)
+            self._publish(expired)
+
+    def _on_log(self, address):
+        self.events += 1
+        with self._lock:
+            self._pending.add(Web3.to_checksum_address(address))
+
+    # Background thread
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._run(),),
+                                        name='consent-subscriber', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping = True
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    async def _run(self):
+        while not self._stopping:
+            if self.ws_url:
+                try:
+                    await self._run_websocket()
+                except Exception as e:
+                    self.last_error = f'websocket: {type(e).__name__}: {e}'
+                finally:
+                    self._ws = None
+            await self._run_polling(self.retry_interval if self.ws_url else None)
+
+    async def _run_websocket(self):
+        loop = asyncio.get_running_loop()
+        async with AsyncWeb3(WebSocketProvider(self.ws_url)) as w3:
+            heads = await w3.eth.subscribe('newHeads')
+            self._ws = w3
+            self._logs_subscription = None
+            await self._subscribe_logs(w3)
+            self.mode = WEBSOCKET
+            # Blocks mined while polling or disconnected
+            await loop.run_in_executor(None, self._catch_up)
+            async for message in w3.socket.process_subscriptions():
+                if self._stopping:
+                    return
+                result = message['result']
+                if message['subscription'] == heads:
+                    await loop.run_in_executor(None, self._on_block, result['number'], result.get('timestamp'))
+                else:
+                    self._on_log(result['address'])
+
+    async def _subscribe_logs(self, w3):
+        """(Re)subscribes to the logs of the watched addresses."""
+        addresses = self.watched
+        previous = self._logs_subscription
+        self._logs_subscription = await w3.eth.subscribe('logs', {'address': addresses}) if addresses else None
+        if previous is not None:
+            await w3.eth.unsubscribe(previous)
+
+    async def _run_polling(self, duration=None):
+        """Polls for `duration` seconds (forever when None)."""
+        self.mode = POLLING
+        loop = asyncio.get_running_loop()
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self._stopping and (deadline is None or time.monotonic() < deadline):
+            try:
+                await loop.run_in_executor(None, self._catch_up)
+            except Exception as e:
+                self.last_error = f'polling: {type(e).__name__}: {e}'
+            await asyncio.sleep(self.poll_interval)
+
+    def _catch_up(self):
+        """Folds the logs of the blocks since the last one seen (one eth_blockNumber, one eth_getLogs)."""
+        latest = self.w3.eth.block_number
+        if self.block_number is not None and latest <= self.block_number:
+            return
+        watched = self.watched
+        if self.block_number is not None and watched:
+            logs = self.w3.eth.get_logs({'fromBlock': self.block_number + 1, 'toBlock': latest, 'address': watched})
+            for log in logs:
+                self._on_log(log['address'])
+        self._on_block(latest)
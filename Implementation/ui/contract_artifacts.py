@@ -0,0 +1,76 @@
+"""
+Helpers to read the Truffle build artifacts (build/contracts/*.json)
+outside of the Streamlit session.
+
+The artifacts are not tracked: they are produced by `truffle compile`.
+`ensure_compiled` runs it when an artifact is missing or older than the
+contracts, so the tests never read the ABI of an outdated build.
+"""
+
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+
+PROJECT_DIR = os.path.join(os.path.dirname(__file__), '..')
+CONTRACTS_DIR = os.path.join(PROJECT_DIR, 'contracts')
+BUILD_DIR = os.path.join(PROJECT_DIR, 'build', 'contracts')
+
+CONTRACT_DECLARATION = re.compile(r'^\s*(?:abstract\s+)?(?:contract|library|interface)\s+(\w+)', re.MULTILINE)
+
+
+def load_artifact(contract_name):
+    """Returns the parsed Truffle artifact of `contract_name`."""
+    contract_path = os.path.join(BUILD_DIR, f'{contract_name}.json')
+    with open(contract_path, 'r') as f:
+        return json.load(f)
+
+
+def stale_artifacts():
+    """Names of the contracts whose artifact is missing or older than one of the sources."""
+    sources = glob.glob(os.path.join(CONTRACTS_DIR, '*.sol'))
+    if not sources:
+        return []
+    newest_source = max(os.path.getmtime(path) for path in sources)
+    stale = []
+    for path in sources:
+        with open(path, 'r') as f:
+            for name in CONTRACT_DECLARATION.findall(f.read()):
+                artifact_path = os.path.join(BUILD_DIR, f'{name}.json')
+                if not os.path.exists(artifact_path) or os.path.getmtime(artifact_path) < newest_source:
+                    stale.append(name)
+    return stale
+
+
+def ensure_compiled(timeout=600):
+    """
+    Runs `truffle compile` (installed globally or in node_modules/) if an artifact is stale.
+    Returns True when every artifact is up to date, False if it could not be compiled.
+    """
+    if not stale_artifacts():
+        return True
+    # Not through npx: without a registry it waits on the network instead of failing
+    truffle = shutil.which('truffle') or shutil.which('truffle', path=os.path.join(PROJECT_DIR, 'node_modules', '.bin'))
+    if truffle is None:
+        return False
+    try:
+        subprocess.run([truffle, 'compile'], cwd=PROJECT_DIR, capture_output=True, timeout=timeout, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return not stale_artifacts()
+
+
+def deployed_address(artifact, network_id=None):
+    """
+    Returns the address the artifact was deployed at on `network_id` (w3.net.version),
+    or at its latest network entry without one; None if not deployed there.
+    """
+    networks = artifact.get('networks', {})
+    if network_id is not None:
+        return networks.get(str(network_id), {}).get('address')
+    if not networks:
+        return None
+    network_id = list(networks.keys())[-1]
+    return networks[network_id]['address']
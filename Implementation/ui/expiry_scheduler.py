@@ -0,0 +1,107 @@
+"""
+Expiry scheduler for the validity windows of cached consents and purposes.
+
+verify() compares block.timestamp with expirationDate: a consent expires
+silently, without an event, so a cache fed by events (or holding verify()
+results) keeps answering "valid" after the expiration unless it re-reads.
+ExpiryScheduler tracks the expiration of every cached entry and, when the
+time is advanced past it (`advance(block_timestamp)`, on each new block),
+returns the expired keys and notifies the listeners, so the caches flip
+those entries to invalid at the first block after the expiration.
+
+Expiration dates are whole seconds, so the entries are kept in one slot per
+second (a timer wheel with a slot for every occupied second) and a heap
+orders the occupied slots: scheduling is O(1) in an occupied slot and
+O(log slots) otherwise, cancelling is O(1), and `advance` costs O(log slots)
+per expired slot plus O(1) per expired entry.
+"""
+
+import heapq
+import threading
+
+
+class ExpiryScheduler:
+    """Keys with an expiration time; `advance(now)` expires those with `expires_at < now`."""
+
+    def __init__(self):
+        self.now = None
+        self.block_number = None
+        self.expired = 0
+        self._expires_at = {}       # key -> expiration time
+        self._slots = {}            # expiration time -> keys expiring then (possibly empty)
+        self._times = []            # heap of the times of self._slots
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._expires_at)
+
+    def __contains__(self, key):
+        return key in self._expires_at
+
+    def expires_at(self, key):
+        return self._expires_at.get(key)
+
+    def schedule(self, key, expires_at):
+        """(Re)schedules `key`: it expires once the time is past `expires_at` (valid while now <= expires_at)."""
+        expires_at = int(expires_at)
+        with self._lock:
+            previous = self._expires_at.get(key)
+            if previous == expires_at:
+                return
+            if previous is not None:
+                self._slots[previous].discard(key)
+            self._expires_at[key] = expires_at
+            slot = self._slots.get(expires_at)
+            if slot is None:
+                slot = self._slots[expires_at] = set()
+                heapq.heappush(self._times, expires_at)
+            slot.add(key)
+
+    def cancel(self, key):
+        """Stops tracking `key`; returns whether it was tracked."""
+        with self._lock:
+            expires_at = self._expires_at.pop(key, None)
+            if expires_at is None:
+                return False
+            # The emptied slot stays in the heap until its time passes
+            self._slots[expires_at].discard(key)
+            return True
+
+    def next_expiry(self):
+        """Earliest expiration time still tracked, or None."""
+        with self._lock:
+            while self._times and not self._slots[self._times[0]]:
+                del self._slots[heapq.heappop(self._times)]
+            return self._times[0] if self._times else None
+
+    def add_listener(self, callback):
+        """`callback(keys, now, block_number)` is called by `advance` with the keys that expired."""
+        self._listeners.append(callback)
+
+    def advance(self, now, block_number=None):
+        """Moves the time to `now` (a block timestamp): expires and returns the keys past their expiration."""
+        expired = []
+        with self._lock:
+            self.now = now
+            self.block_number = block_number
+            while self._times and self._times[0] < now:
+                for key in self._slots.pop(heapq.heappop(self._times)):
+                    del self._expires_at[key]
+                    expired.append(key)
+            self.expired += len(expired)
+        if expired:
+            for callback in list(self._listeners):
+                callback(expired, now, block_number)
+        return expired
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tracked': len(self._expires_at),
+                'slots': len(self._slots),
+                'next_expiry': self.next_expiry(),
+                'expired': self.expired,
+                'now': self.now,
+                'block_number': self.block_number,
+            }
@@ -0,0 +1,329 @@
+"""
+Consent records kept off-chain in a Merkle tree, with only its root anchored on chain.
+
+A CollectionConsent costs a contract deployment plus a transaction per
+grant or revoke. MerkleConsents instead keeps the (data subject,
+controller) records in memory and commits the root of all of them to
+ConsentAnchor every `interval` seconds: one transaction of constant cost
+per batch, however many consents changed. Anyone holding a record and its
+proof checks it with ConsentAnchor.verifyWithProof() (or verify_proof()
+locally) against the latest root.
+
+Leaves are consent_leaf(record), ordered by consent id (the ConsentRegistry
+key); a node is the keccak256 of its two children, smaller hash first, and
+the last node of an odd level goes up unchanged. Proofs are served from the
+tree of the last commit, so they always match the anchored root.
+
+Trust: grant_consent/revoke_consent are authorized only by the `actor`
+address the caller passes in, which nothing authenticates. Whoever runs
+MerkleConsents (the anchorer) decides every ds_valid/dc_valid flag, and a
+proof shows what the anchorer committed, not that the data subject or the
+controller agreed to it. Where the flags must be the parties' own decisions,
+keep them on ConsentRegistry (signed_consents.py for gasless signed actions).
+"""
+
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from eth_abi import encode
+from web3 import Web3
+
+from contract_artifacts import load_artifact, deployed_address
+
+LEAF_TYPES = ['address', 'address', 'uint256', 'uint256', 'uint256', 'bool', 'bool']
+
+EMPTY_ROOT = b'\x00' * 32
+
+
+@dataclass(frozen=True)
+class ConsentRecord:
+    """Off-chain counterpart of a CollectionConsent's state."""
+    data_subject: str
+    controller: str
+    data: int
+    beginning_date: int
+    expiration_date: int
+    ds_valid: bool = True
+    dc_valid: bool = False
+
+    @property
+    def consent_id(self):
+        return consent_id(self.data_subject, self.controller)
+
+    def leaf(self):
+        return consent_leaf(self)
+
+    def verify(self, now=None):
+        """Same rule as CollectionConsent.verify()."""
+        now = int(time.time()) if now is None else now
+        return self.ds_valid and self.dc_valid and self.beginning_date <= now <= self.expiration_date
+
+
+def consent_id(data_subject, controller):
+    """Same key as ConsentRegistry.consentId()."""
+    return Web3.solidity_keccak(['address', 'address'], [data_subject, controller])
+
+
+def consent_leaf(record):
+    """Same hash as ConsentAnchor.consentLeaf()."""
+    return Web3.keccak(encode(LEAF_TYPES, [
+        Web3.to_checksum_address(record.data_subject),
+        Web3.to_checksum_address(record.controller),
+        record.data,
+        record.beginning_date,
+        record.expiration_date,
+        record.ds_valid,
+        record.dc_valid,
+    ]))
+
+
+def hash_pair(a, b):
+    return Web3.keccak(a + b) if a < b else Web3.keccak(b + a)
+
+
+def verify_proof(leaf, proof, root):
+    """Same check as ConsentAnchor.verifyWithProof(), against `root`."""
+    computed = bytes(leaf)
+    for sibling in proof:
+        computed = hash_pair(computed, bytes(sibling))
+    return computed == bytes(root)
+
+
+class MerkleTree:
+    """Merkle tree over a fixed list of leaves."""
+
+    def __init__(self, leaves):
+        self.levels = [[bytes(leaf) for leaf in leaves]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    def __len__(self):
+        return len(self.levels[0])
+
+    @property
+    def root(self):
+        return self.levels[-1][0] if self.levels[0] else EMPTY_ROOT
+
+    def proof(self, index):
+        """Sibling hashes from leaf `index` up to the root."""
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            index //= 2
+        return proof
+
+
+class MerkleConsents:
+    """
+    Off-chain consent records, committed as a Merkle root to a ConsentAnchor.
+
+    create/grant/revoke follow the CollectionConsent rules and only change
+    the working set; commit() anchors it. Reads and proofs come from the
+    last committed tree.
+    """
+
+    def __init__(self, anchor=None, anchorer=None):
+        self.anchor = anchor
+        self.anchorer = anchorer
+        self.results = []
+        self.last_error = None
+        self._records = {}          # consent id -> ConsentRecord (working set)
+        self._version = 0           # bumped on every change of the working set
+        self._committed_version = 0
+        self._committed = {}        # consent id -> (index, ConsentRecord) under self._tree
+        self._tree = MerkleTree([])
+        self._lock = threading.Lock()
+        self._committing = threading.Lock()     # one anchor transaction at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def root(self):
+        """Root of the last committed tree."""
+        return self._tree.root
+
+    @property
+    def pending(self):
+        """Whether the working set changed since the last commit."""
+        return self._version != self._committed_version
+
+    # Working set
+
+    def put(self, record):
+        with self._lock:
+            self._records[record.consent_id] = record
+            self._version += 1
+
+    def create_consent(self, data_subject, controller, data, duration, now=None):
+        """New record, granted by the data subject, as the CollectionConsent constructor does."""
+        now = int(time.time()) if now is None else now
+        record = ConsentRecord(data_subject, controller, data, now, now + duration)
+        self.put(record)
+        return record
+
+    def _set_flag(self, data_subject, controller, actor, value):
+        # `actor` is taken on trust: see the module docstring
+        with self._lock:
+            key = consent_id(data_subject, controller)
+            record = self._records.get(key)
+            if record is None:
+                raise KeyError('Consent does not exist.')
+            if actor.lower() == record.data_subject.lower():
+                record = replace(record, ds_valid=value)
+            elif actor.lower() == record.controller.lower():
+                record = replace(record, dc_valid=value)
+            else:
+                raise PermissionError('Actor not allowed to do this action.')
+            self._records[key] = record
+            self._version += 1
+            return record
+
+    def grant_consent(self, data_subject, controller, actor):
+        return self._set_flag(data_subject, controller, actor, True)
+
+    def revoke_consent(self, data_subject, controller, actor):
+        return self._set_flag(data_subject, controller, actor, False)
+
+    # Committed tree
+
+    def get(self, data_subject, controller):
+        """Committed record of (data_subject, controller), or None."""
+        entry = self._committed.get(consent_id(data_subject, controller))
+        return entry[1] if entry else None
+
+    def proof(self, data_subject, controller):
+        """(record, proof) under the committed root, or None if the consent was not committed."""
+        with self._lock:
+            entry = self._committed.get(consent_id(data_subject, controller))
+            if entry is None:
+                return None
+            index, record = entry
+            return record, self._tree.proof(index)
+
+    def build(self):
+        """
+        Tree of the working set, without anchoring it or serving proofs from it.
+        Returns (tree, committed entries by consent id, working set version).
+        """
+        with self._lock:
+            keys = sorted(self._records)
+            records = [self._records[key] for key in keys]
+            version = self._version
+        tree = MerkleTree([record.leaf() for record in records])
+        return tree, {key: (i, record) for i, (key, record) in enumerate(zip(keys, records))}, version
+
+    def commit(self):
+        """
+        Anchors the working set if it changed since the last commit. Proofs are served from the
+        new tree only once the anchor transaction succeeded; a failed one raises and the changes
+        stay pending. Returns the batch result, or None if there was nothing to commit.
+        """
+        with self._committing:
+            if not self.pending:
+                return None
+            start = time.perf_counter()
+            tree, committed, version = self.build()
+            receipt = self.anchor.anchor(tree.root, len(tree), self.anchorer)
+            if receipt['status'] != 1:
+                raise RuntimeError(f"anchor transaction {Web3.to_hex(receipt['transactionHash'])} reverted")
+            with self._lock:
+                self._tree, self._committed = tree, committed
+                self._committed_version = version
+        result = {
+            'root': tree.root,
+            'count': len(tree),
+            'gas': receipt['gasUsed'],
+            'seconds': time.perf_counter() - start,
+            'receipt': receipt,
+        }
+        self.results.append(result)
+        return result
+
+    def start(self, interval=15.0):
+        """Starts the background thread that commits the changes every `interval` seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    self.commit()
+                    self.last_error = None
+                except Exception as e:
+                    # Retried at the next interval: the changes are still pending
+                    self.last_error = f'{type(e).__name__}: {e}'
+
+        self._thread = threading.Thread(target=_run, name='merkle-consents', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and commits the remaining changes."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return self.commit()
+
+
+class ConsentAnchorClient:
+    """Thin wrapper around a deployed ConsentAnchor."""
+
+    def __init__(self, w3, address, abi=None):
+        if abi is None:
+            abi = load_artifact('ConsentAnchor')['abi']
+        self.w3 = w3
+        self.contract = w3.eth.contract(address=address, abi=abi)
+
+    @property
+    def address(self):
+        return self.contract.address
+
+    @classmethod
+    def from_artifact(cls, w3):
+        """Client for the anchor deployed by `truffle migrate`, or None if not deployed."""
+        artifact = load_artifact('ConsentAnchor')
+        address = deployed_address(artifact, w3.net.version)
+        if address is None:
+            return None
+        return cls(w3, address, artifact['abi'])
+
+    @classmethod
+    def deploy(cls, w3, deployer):
+        """Deploys a new anchor from `deployer` (its anchorer) and returns a client for it."""
+        artifact = load_artifact('ConsentAnchor')
+        factory = w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+        tx_hash = factory.constructor().transact({'from': deployer})
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        return cls(w3, receipt['contractAddress'], artifact['abi'])
+
+    def anchor(self, root, count, sender):
+        tx_hash = self.contract.functions.anchor(root, count).transact({'from': sender})
+        return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    def latest_epoch(self):
+        return self.contract.functions.latestEpoch().call()
+
+    def get_anchor(self, epoch):
+        """(root, timestamp, count, block number) of the root committed at `epoch`."""
+        return self.contract.functions.getAnchor(epoch).call()
+
+    def verify_with_proof(self, record, proof):
+        return self.contract.functions.verifyWithProof(record.leaf(), proof).call()
+
+    def verify_consent(self, record, proof):
+        """verifyWithProof plus the CollectionConsent.verify() rules, evaluated at the chain's time."""
+        return self.contract.functions.verifyConsent(
+            record.data_subject, record.controller, record.data, record.beginning_date,
+            record.expiration_date, record.ds_valid, record.dc_valid, proof,
+        ).call()
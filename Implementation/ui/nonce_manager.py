@@ -0,0 +1,260 @@
+"""
+Local nonce allocation for sending many transactions from one account.
+
+Without it, every submission asks the node for eth_getTransactionCount and
+concurrent submissions from the same account get the same nonce: one of
+them replaces or rejects the other. NonceManager hands out nonces from a
+local counter per account (one RPC the first time), limits how many
+transactions of an account are in flight, and keeps what it needs to repair
+the sequence:
+
+- `release` returns the nonce of a transaction that could not be sent, so
+  the next allocation reuses it instead of leaving a gap;
+- `resubmit` replaces a stuck transaction by the same nonce with a higher
+  gas price (`gas_bump`, at least the 10% nodes require for replacement);
+- `recover_gaps` compares the local state with the chain: mined nonces are
+  confirmed, dropped transactions are sent again and unused nonces below
+  the highest sent one are filled with 0-value self transfers.
+
+The same object can be shared by threads and by asyncio tasks
+(`allocate_async` waits for an in-flight slot without blocking the loop).
+"""
+
+import asyncio
+import heapq
+import threading
+import time
+
+from web3.exceptions import TransactionNotFound
+
+DEFAULT_MAX_IN_FLIGHT = 64
+DEFAULT_GAS_BUMP = 1.125
+
+# geth, ganache ("the tx doesn't have the correct nonce")
+NONCE_TOO_LOW_ERRORS = ('nonce too low', 'already been used', 'correct nonce')
+
+
+def is_nonce_too_low(error):
+    message = str(error).lower()
+    return any(text in message for text in NONCE_TOO_LOW_ERRORS)
+
+
+def send_and_wait(w3, nonce_manager, fn, sender):
+    """
+    Sends the contract call or constructor `fn` from `sender` and returns its receipt.
+    With a NonceManager the nonce is allocated by it, otherwise by the node.
+    """
+    if nonce_manager is None:
+        return w3.eth.wait_for_transaction_receipt(fn.transact({'from': sender}))
+    return nonce_manager.transact(fn.build_transaction({'from': sender}))
+
+
+class _AccountState:
+    __slots__ = ('condition', 'next_nonce', 'free', 'in_flight')
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.next_nonce = None
+        self.free = []          # heap of allocated nonces that were never sent
+        self.in_flight = {}     # nonce -> {'tx', 'tx_hash', 'sent_at'} (None while being sent)
+
+
+class NonceManager:
+    """Thread-safe and asyncio-safe nonce allocator for externally or node-signed transactions."""
+
+    def __init__(self, w3, max_in_flight=DEFAULT_MAX_IN_FLIGHT, gas_bump=DEFAULT_GAS_BUMP):
+        if gas_bump < 1.1:
+            raise ValueError("gas_bump must be at least 1.1: nodes reject replacements below +10%")
+        self.w3 = w3
+        self.max_in_flight = max_in_flight
+        self.gas_bump = gas_bump
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, account):
+        with self._lock:
+            state = self._accounts.get(account)
+            if state is None:
+                state = self._accounts[account] = _AccountState()
+            return state
+
+    # Allocation
+
+    def allocate(self, account, timeout=None):
+        """
+        Reserves the next nonce of `account`, waiting while `max_in_flight`
+        transactions are in flight. Raises TimeoutError after `timeout` seconds.
+        """
+        state = self._state(account)
+        with state.condition:
+            if not state.condition.wait_for(lambda: len(state.in_flight) < self.max_in_flight, timeout):
+                raise TimeoutError(f"{self.max_in_flight} transactions of {account} still in flight")
+            if state.next_nonce is None:
+                state.next_nonce = self.w3.eth.get_transaction_count(account, 'pending')
+            if state.free:
+                nonce = heapq.heappop(state.free)
+            else:
+                nonce = state.next_nonce
+                state.next_nonce += 1
+            state.in_flight[nonce] = None
+            return nonce
+
+    async def allocate_async(self, account, timeout=None):
+        """`allocate` for asyncio code: waits in an executor thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.allocate, account, timeout)
+
+    def record(self, account, nonce, tx_hash, tx=None):
+        """Stores the hash (and the transaction, for resubmission) sent with `nonce`."""
+        state = self._state(account)
+        with state.condition:
+            state.in_flight[nonce] = {'tx': tx, 'tx_hash': tx_hash, 'sent_at': time.time()}
+
+    def release(self, account, nonce):
+        """Gives back a nonce whose transaction was not sent; the next allocation reuses it."""
+        state = self._state(account)
+        with state.condition:
+            if state.in_flight.pop(nonce, False) is not False:
+                heapq.heappush(state.free, nonce)
+            state.condition.notify_all()
+
+    def confirm(self, account, nonce):
+        """Frees the in-flight slot of a mined transaction."""
+        state = self._state(account)
+        with state.condition:
+            state.in_flight.pop(nonce, None)
+            state.condition.notify_all()
+
+    def confirm_mined(self, account):
+        """Confirms every sent nonce below the account's mined transaction count. Returns how many."""
+        mined = self.w3.eth.get_transaction_count(account, 'latest')
+        state = self._state(account)
+        with state.condition:
+            done = [n for n, entry in state.in_flight.items() if entry is not None and n < mined]
+            for nonce in done:
+                del state.in_flight[nonce]
+            state.condition.notify_all()
+        return len(done)
+
+    def resync(self, account):
+        """
+        Re-reads the account nonce from the node, e.g. after another client
+        sent from the same account ("nonce too low"). Mined nonces are confirmed.
+        """
+        mined = self.w3.eth.get_transaction_count(account, 'latest')
+        pending = self.w3.eth.get_transaction_count(account, 'pending')
+        state = self._state(account)
+        with state.condition:
+            for nonce in [n for n in state.in_flight if n < mined]:
+                del state.in_flight[nonce]
+            state.free = [n for n in state.free if n >= pending]
+            heapq.heapify(state.free)
+            state.next_nonce = max(state.next_nonce or 0, pending)
+            state.condition.notify_all()
+        return state.next_nonce
+
+    def tx_hash(self, account, nonce):
+        """Hash last sent with `nonce`, or None if it is not in flight (mined, released or not sent yet)."""
+        state = self._state(account)
+        with state.condition:
+            entry = state.in_flight.get(nonce)
+            return entry['tx_hash'] if entry else None
+
+    def in_flight(self, account):
+        state = self._state(account)
+        with state.condition:
+            return len(state.in_flight)
+
+    # Sending
+
+    def send_transaction(self, tx, timeout=None):
+        """
+        Sends `tx` (eth_sendTransaction, unlocked account) with a locally allocated nonce.
+        Retries once after a resync if the node reports the nonce as used. Returns the hash.
+        """
+        account = tx['from']
+        for attempt in range(2):
+            nonce = self.allocate(account, timeout)
+            sent = dict(tx, nonce=nonce)
+            try:
+                tx_hash = self.w3.eth.send_transaction(sent)
+            except Exception as e:
+                if attempt == 0 and is_nonce_too_low(e):
+                    self.confirm(account, nonce)
+                    self.resync(account)
+                    continue
+                self.release(account, nonce)
+                raise
+            self.record(account, nonce, tx_hash, sent)
+            return tx_hash
+
+    def transact(self, tx, timeout=None):
+        """`send_transaction`, then waits for the receipt and frees the in-flight slot. Returns the receipt."""
+        receipt = self.w3.eth.wait_for_transaction_receipt(self.send_transaction(tx, timeout))
+        self.confirm_mined(tx['from'])
+        return receipt
+
+    def resubmit(self, account, nonce, bump=None):
+        """Replaces the in-flight transaction of `nonce` by the same one with a bumped gas price."""
+        bump = bump or self.gas_bump
+        state = self._state(account)
+        with state.condition:
+            entry = state.in_flight.get(nonce)
+        if not entry or entry['tx'] is None:
+            raise ValueError(f"No resubmittable transaction of {account} with nonce {nonce}")
+
+        tx = dict(entry['tx'], nonce=nonce)
+        if 'maxFeePerGas' in tx:
+            tx['maxFeePerGas'] = int(tx['maxFeePerGas'] * bump) + 1
+            tx['maxPriorityFeePerGas'] = int(tx.get('maxPriorityFeePerGas', 0) * bump) + 1
+        else:
+            tx['gasPrice'] = int((tx.get('gasPrice') or self.w3.eth.gas_price) * bump) + 1
+        tx_hash = self.w3.eth.send_transaction(tx)
+        self.record(account, nonce, tx_hash, tx)
+        return tx_hash
+
+    def recover_gaps(self, account):
+        """
+        Repairs the nonce sequence of `account` against the chain.
+        Returns the confirmed, resent and filled nonces.
+        """
+        mined = self.w3.eth.get_transaction_count(account, 'latest')
+        state = self._state(account)
+        with state.condition:
+            confirmed = sorted(n for n in state.in_flight if n < mined)
+            for nonce in confirmed:
+                del state.in_flight[nonce]
+            state.free = [n for n in state.free if n >= mined]
+            heapq.heapify(state.free)
+            sent = {n: dict(e) for n, e in state.in_flight.items() if e is not None}
+            gaps = sorted(state.free) if sent and state.free and min(state.free) < max(sent) else []
+            state.condition.notify_all()
+
+        # Transactions the node no longer knows (dropped from its pool) are sent again
+        resent = []
+        for nonce, entry in sorted(sent.items()):
+            try:
+                self.w3.eth.get_transaction(entry['tx_hash'])
+            except TransactionNotFound:
+                if entry['tx'] is not None:
+                    self.record(account, nonce, self.w3.eth.send_transaction(entry['tx']), entry['tx'])
+                    resent.append(nonce)
+
+        # Unsent nonces below sent ones block the account: fill them
+        filled = []
+        for nonce in gaps:
+            with state.condition:
+                if nonce not in state.free:
+                    continue
+                state.free.remove(nonce)
+                heapq.heapify(state.free)
+                state.in_flight[nonce] = None
+            tx = {'from': account, 'to': account, 'value': 0, 'nonce': nonce}
+            try:
+                self.record(account, nonce, self.w3.eth.send_transaction(tx), tx)
+                filled.append(nonce)
+            except Exception:
+                self.release(account, nonce)
+                raise
+
+        return {'confirmed': confirmed, 'resent': resent, 'filled': filled}
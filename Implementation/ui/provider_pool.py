@@ -0,0 +1,288 @@
+"""
+Pool of JSON-RPC endpoints behind one web3 provider.
+
+ProviderPool is a web3 provider (Web3(ProviderPool([...]))) that spreads the
+requests over several nodes:
+
+- every HTTP endpoint keeps its own requests.Session, so connections are
+  reused (keep-alive) instead of opened per call; `ws://` endpoints use a
+  persistent WebSocket and file paths (or `ipc://` URIs) a Unix socket, both
+  without the per-request HTTP overhead;
+- each read goes to a healthy endpoint picked at random, weighted by the
+  inverse of its recent latency (EWMA), so faster nodes get more traffic;
+- transactions and the reads that depend on them (STICKY_METHODS: nonces,
+  receipts, pending transactions, signing) all go to one primary endpoint,
+  so nonces and receipts come from the node that got the transactions;
+- a read failing at the transport level (connection refused, timeout, HTTP
+  error) is sent again to the next endpoint and the failing one is set
+  aside for `cooldown` seconds. A sticky request is only sent elsewhere if
+  it never reached the primary (connection refused): a timeout after a
+  node accepted a transaction must not send it twice. The next endpoint
+  then becomes the primary. JSON-RPC errors (reverts, bad params) are
+  answers, not failures, and are returned as they are;
+- `check_health()` (every `health_interval` seconds once `start()`ed) asks
+  every endpoint for eth_blockNumber: endpoints that do not answer or lag
+  more than `max_block_lag` blocks behind the highest are unhealthy until
+  a later check;
+- `metrics()` gives requests, failures and latency (EWMA, p50, p95) per
+  endpoint.
+
+Endpoints are taken from the CONSENT_RPC_URLS environment variable
+(','-separated) by `from_env`.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from web3.providers import HTTPProvider, IPCProvider, JSONBaseProvider
+
+try:
+    # Synchronous WebSocket provider of web3 v7
+    from web3 import LegacyWebSocketProvider
+except ImportError:
+    LegacyWebSocketProvider = None
+
+from tx_pipeline import DEFAULT_PROVIDER_URL
+
+ENV_URLS = 'CONSENT_RPC_URLS'
+
+DEFAULT_TIMEOUT = 10            # seconds per request
+DEFAULT_POOL_SIZE = 10          # kept-alive connections per HTTP endpoint
+DEFAULT_COOLDOWN = 10           # seconds a failing endpoint is skipped
+DEFAULT_HEALTH_INTERVAL = 5     # seconds between health checks
+DEFAULT_MAX_BLOCK_LAG = 5       # blocks behind the highest endpoint before it is unhealthy
+
+# Sent to the primary endpoint only: transactions, and the account state and receipts that must
+# come from the node that received them
+STICKY_METHODS = frozenset({
+    'eth_sendTransaction', 'eth_sendRawTransaction', 'eth_sign', 'eth_signTransaction',
+    'eth_signTypedData', 'eth_signTypedData_v4', 'eth_accounts',
+    'eth_getTransactionCount', 'eth_getTransactionReceipt', 'eth_getTransactionByHash',
+    'personal_sendTransaction', 'personal_sign', 'personal_unlockAccount',
+})
+
+LATENCY_WINDOW = 256            # latencies kept per endpoint for the percentiles
+EWMA_ALPHA = 0.2
+
+
+def make_provider(uri, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE):
+    """web3 provider of one endpoint: HTTP(S) with a keep-alive session, WebSocket or IPC."""
+    if uri.startswith(('http://', 'https://')):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # No retries inside the provider: the pool fails over to another endpoint instead
+        return HTTPProvider(uri, request_kwargs={'timeout': timeout}, session=session,
+                            exception_retry_configuration=None)
+    if uri.startswith(('ws://', 'wss://')):
+        if LegacyWebSocketProvider is None:
+            raise ValueError(f"{uri}: WebSocket endpoints need web3's LegacyWebSocketProvider (web3 v7)")
+        return LegacyWebSocketProvider(uri, websocket_timeout=timeout)
+    path = uri[len('ipc://'):] if uri.startswith('ipc://') else uri
+    return IPCProvider(path, timeout=timeout)
+
+
+def not_sent(error):
+    """Whether a transport error was raised before the request reached the node, so it can go elsewhere."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    # IPC socket missing or refusing connections
+    return isinstance(error, (ConnectionRefusedError, FileNotFoundError))
+
+
+class Endpoint:
+    """One node of the pool and its metrics."""
+
+    def __init__(self, uri, provider):
+        self.uri = uri
+        self.provider = provider
+        self.requests = 0
+        self.failures = 0
+        self.ewma_ms = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.healthy = True
+        self.down_until = 0.0
+        self.last_block = None
+        self.last_error = None
+
+    def available(self, now):
+        return self.healthy and now >= self.down_until
+
+    def succeeded(self, latency_ms):
+        self.requests += 1
+        self.latencies.append(latency_ms)
+        self.ewma_ms = latency_ms if self.ewma_ms is None else EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+        self.down_until = 0.0
+
+    def failed(self, error, cooldown):
+        self.requests += 1
+        self.failures += 1
+        self.last_error = f'{type(error).__name__}: {error}'
+        self.down_until = time.monotonic() + cooldown
+
+    def metrics(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else None
+
+        return {
+            'healthy': self.healthy,
+            'available': self.available(time.monotonic()),
+            'requests': self.requests,
+            'failures': self.failures,
+            'latency_ewma_ms': self.ewma_ms,
+            'latency_p50_ms': percentile(0.50),
+            'latency_p95_ms': percentile(0.95),
+            'last_block': self.last_block,
+            'last_error': self.last_error,
+        }
+
+
+class ProviderPool(JSONBaseProvider):
+    """web3 provider routing each request to one of several endpoints, with failover.
+
+    `primary` is the endpoint of the sticky requests, the first one at first.
+    """
+
+    def __init__(self, uris, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE, cooldown=DEFAULT_COOLDOWN,
+                 max_block_lag=DEFAULT_MAX_BLOCK_LAG, providers=None, seed=None):
+        super().__init__()
+        if not uris:
+            raise ValueError("ProviderPool needs at least one endpoint")
+        providers = providers or {}
+        self.endpoints = [Endpoint(uri, providers.get(uri) or make_provider(uri, timeout, pool_size)) for uri in uris]
+        self.cooldown = cooldown
+        self.max_block_lag = max_block_lag
+        self.primary = self.endpoints[0]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, default=DEFAULT_PROVIDER_URL, **kwargs):
+        """Pool of the CONSENT_RPC_URLS endpoints (','-separated), or of `default`."""
+        uris = [uri.strip() for uri in os.environ.get(ENV_URLS, '').split(',') if uri.strip()]
+        return cls(uris or [default], **kwargs)
+
+    def __str__(self):
+        return f"ProviderPool({', '.join(e.uri for e in self.endpoints)})"
+
+    # Routing
+
+    def _route(self):
+        """Endpoints in the order to try them: available ones latency-weighted, then the others."""
+        now = time.monotonic()
+        with self._lock:
+            up = [e for e in self.endpoints if e.available(now)]
+            down = sorted((e for e in self.endpoints if not e.available(now)),
+                          key=lambda e: (not e.healthy, e.down_until))
+            # Endpoints without a latency yet are tried first, to measure them
+            ordered = [e for e in up if e.ewma_ms is None]
+            self._random.shuffle(ordered)
+            up = [e for e in up if e.ewma_ms is not None]
+            while up:
+                weights = [1.0 / max(e.ewma_ms, 0.01) for e in up]
+                endpoint = self._random.choices(up, weights)[0]
+                ordered.append(endpoint)
+                up.remove(endpoint)
+        return ordered + down
+
+    def _sticky_route(self):
+        """The primary, then the other endpoints to move the primary to if it cannot be reached."""
+        primary = self.primary
+        return [primary] + [e for e in self._route() if e is not primary]
+
+    def _send(self, send, sticky=False):
+        error = None
+        for endpoint in self._sticky_route() if sticky else self._route():
+            start = time.perf_counter()
+            try:
+                response = send(endpoint.provider)
+            except Exception as e:
+                with self._lock:
+                    endpoint.failed(e, self.cooldown)
+                if sticky and not not_sent(e):
+                    # The node may have received it (e.g. a timeout after accepting a transaction)
+                    raise
+                error = e
+                continue
+            with self._lock:
+                endpoint.succeeded((time.perf_counter() - start) * 1000)
+                if sticky:
+                    self.primary = endpoint
+            return response
+        raise ConnectionError(f"No JSON-RPC endpoint of {self} answered (last error: {error})") from error
+
+    def make_request(self, method, params):
+        return self._send(lambda provider: provider.make_request(method, params), method in STICKY_METHODS)
+
+    def make_batch_request(self, batch_requests):
+        sticky = any(method in STICKY_METHODS for method, _ in batch_requests)
+        return self._send(lambda provider: provider.make_batch_request(batch_requests), sticky)
+
+    # Health checks
+
+    def check_health(self):
+        """Asks every endpoint for its block number and updates which ones are healthy."""
+        blocks = {}
+        for endpoint in self.endpoints:
+            start = time.perf_counter()
+            try:
+                response = endpoint.provider.make_request('eth_blockNumber', [])
+                if 'error' in response:
+                    raise ConnectionError(response['error'])
+                block = int(response['result'], 16)
+            except Exception as e:
+                with self._lock:
+                    endpoint.failed(e, self.cooldown)
+                    endpoint.healthy = False
+                continue
+            with self._lock:
+                endpoint.succeeded((time.perf_counter() - start) * 1000)
+                endpoint.last_block = block
+            blocks[endpoint] = block
+
+        highest = max(blocks.values()) if blocks else None
+        with self._lock:
+            for endpoint, block in blocks.items():
+                endpoint.healthy = highest - block <= self.max_block_lag
+        return self.metrics()
+
+    def start(self, interval=DEFAULT_HEALTH_INTERVAL):
+        """Starts the background thread that checks the endpoints every `interval` seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.check_health()
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.check_health()
+
+        self._thread = threading.Thread(target=_run, name='provider-pool-health', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    # Metrics
+
+    def metrics(self):
+        with self._lock:
+            return {endpoint.uri: dict(endpoint.metrics(), primary=endpoint is self.primary)
+                    for endpoint in self.endpoints}
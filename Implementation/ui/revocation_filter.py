@@ -0,0 +1,264 @@
+"""
+Counting Bloom filter of revoked consents, for fast negative checks.
+
+Revocations (revokeConsent, revokeConsentProcessor, eraseData, purpose
+revocations) are rare next to the checks. RevocationFilter holds every
+(consent, processor, purpose) scope of the ConsentIndexer's revocations
+table; a check that misses the filter is certainly not revoked and skips
+the SQL lookup (or the verify() call), only a hit (a revocation or a false
+positive) needs it. The filter follows the indexer: after each sync, the
+scopes of the consents that got events are removed and added again, which
+is why the counters count instead of being bits.
+
+The counters (one byte each, stuck once they reach 255) live in a memory-
+mapped file with a small header (sizes, number of scopes, block). When it
+is reopened at the block the indexer is synced to, the filter is used as
+is; otherwise it is rebuilt from the indexer.
+
+`stats()` reports the memory used, the expected false positive rate for the
+current fill and the rate observed on the checks that went to the lookup.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import random
+import struct
+import threading
+
+from consent_indexer import ANY_PROCESSOR, ANY_PURPOSE
+
+MAGIC = b'CBFREVO1'
+# magic, counters, hashes, items, block (-1 while an update is in progress)
+HEADER = struct.Struct('<8sQIxxxxqq')
+HEADER_SIZE = 64
+
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+
+MAX_COUNT = 255
+
+
+class CountingBloomFilter:
+    """Counting Bloom filter of byte keys over an anonymous or file-backed mmap."""
+
+    def __init__(self, size, hashes, path=None):
+        self.size = size
+        self.hashes = hashes
+        self.path = path
+        length = HEADER_SIZE + size
+        if path is None:
+            self._mmap = mmap.mmap(-1, length)
+            self.loaded = False
+        else:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != length:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, length)
+                self._mmap = mmap.mmap(fd, length)
+            finally:
+                os.close(fd)
+            magic, size, hashes, _, _ = HEADER.unpack_from(self._mmap)
+            self.loaded = (magic, size, hashes) == (MAGIC, self.size, self.hashes)
+        self.counters = memoryview(self._mmap)[HEADER_SIZE:]
+        if not self.loaded:
+            self.clear()
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate, path=None):
+        """Filter sized for `capacity` keys at `error_rate` false positives."""
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(size / capacity * math.log(2)))
+        return cls(size, hashes, path)
+
+    def _header(self):
+        return HEADER.unpack_from(self._mmap)
+
+    def _write_header(self, items, block):
+        HEADER.pack_into(self._mmap, 0, MAGIC, self.size, self.hashes, items, block)
+
+    @property
+    def items(self):
+        return self._header()[3]
+
+    @property
+    def block(self):
+        return self._header()[4]
+
+    @block.setter
+    def block(self, block):
+        self._write_header(self.items, block)
+
+    def clear(self):
+        self.counters[:] = bytes(self.size)
+        self._write_header(0, -1)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        counters = self.counters
+        for position in self._positions(key):
+            if counters[position] < MAX_COUNT:
+                counters[position] += 1
+        self._write_header(self.items + 1, self.block)
+
+    def remove(self, key):
+        """Removes one occurrence of a key added before (removing others corrupts the filter)."""
+        counters = self.counters
+        for position in self._positions(key):
+            # A saturated counter may stand for more keys than it can count: it stays
+            if 0 < counters[position] < MAX_COUNT:
+                counters[position] -= 1
+        self._write_header(self.items - 1, self.block)
+
+    def __contains__(self, key):
+        counters = self.counters
+        return all(counters[position] for position in self._positions(key))
+
+    def fill_ratio(self):
+        """Fraction of non-zero counters."""
+        return 1 - bytes(self.counters).count(0) / self.size
+
+    def false_positive_rate(self):
+        """Expected probability that a key not added is reported present, at the current fill."""
+        return self.fill_ratio() ** self.hashes
+
+    @property
+    def memory_bytes(self):
+        return HEADER_SIZE + self.size
+
+    def flush(self):
+        self._mmap.flush()
+
+    def close(self):
+        self.counters.release()
+        self._mmap.close()
+
+
+def scope_key(consent_address, processor=ANY_PROCESSOR, purpose=ANY_PURPOSE):
+    return f'{consent_address.lower()}|{processor.lower()}|{purpose}'.encode()
+
+
+class RevocationFilter:
+    """Counting Bloom filter of the revoked scopes of a ConsentIndexer, kept up to date after each sync."""
+
+    def __init__(self, indexer, path=None, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.indexer = indexer
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.checks = 0
+        self.skipped = 0
+        self.lookups = 0
+        self.false_positives = 0
+        self.updates = 0
+        self._keys = {}             # consent address -> keys it added, with repeats
+        self._lock = threading.Lock()
+        self.filter = CountingBloomFilter.for_capacity(capacity, error_rate, path)
+        with indexer._lock:
+            self.reused = self.filter.loaded and self.filter.block == indexer.last_block >= 0
+            if self.reused:
+                for consent, processor, purpose in indexer.revocations():
+                    self._keys.setdefault(consent, []).append(scope_key(consent, processor, purpose))
+                self.block_number = self.filter.block
+            else:
+                self._update(None, indexer.last_block)
+            indexer.add_listener(self._update)
+
+    def _update(self, consent_addresses, block_number):
+        """Replaces the keys of the consents at `consent_addresses` (all when None)."""
+        rows = self.indexer.revocations(consent_addresses)
+        with self._lock:
+            # Marked in progress: a file left in this state is rebuilt on reopening
+            self.filter.block = -1
+            if consent_addresses is None:
+                self.filter.clear()
+                self._keys = {}
+            else:
+                for consent in consent_addresses:
+                    for key in self._keys.pop(consent, ()):
+                        self.filter.remove(key)
+            for consent, processor, purpose in rows:
+                key = scope_key(consent, processor, purpose)
+                self.filter.add(key)
+                self._keys.setdefault(consent, []).append(key)
+            self.filter.block = block_number
+            self.block_number = block_number
+            self.updates += 1
+
+    def __len__(self):
+        return self.filter.items
+
+    def _probe(self, consent_address, processor, purpose):
+        keys = [scope_key(consent_address)]
+        if processor is not None:
+            keys.append(scope_key(consent_address, processor))
+            if purpose is not None:
+                keys.append(scope_key(consent_address, processor, purpose))
+        # Not while _update has removed a consent's keys and not added them back yet:
+        # a revoked scope would read as certainly not revoked
+        with self._lock:
+            return any(key in self.filter for key in keys)
+
+    def might_be_revoked(self, consent_address, processor=None, purpose=None):
+        """
+        False when the consent (and, if given, the processor and its purpose) is certainly not revoked.
+        Probes one key per scope that could revoke the check, so the false positive rate is up to 3x the key's.
+        """
+        self.checks += 1
+        hit = self._probe(consent_address, processor, purpose)
+        if not hit:
+            self.skipped += 1
+        return hit
+
+    def is_revoked(self, consent_address, processor=None, purpose=None):
+        """Same answer as ConsentIndexer.is_revoked(), which is only queried when the filter hits."""
+        if not self.might_be_revoked(consent_address, processor, purpose):
+            return False
+        self.lookups += 1
+        revoked = self.indexer.is_revoked(consent_address, processor, purpose)
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def sample_false_positive_rate(self, samples=10_000, seed=0):
+        """Share of `samples` random (never revoked) scopes the filter reports as present."""
+        rng = random.Random(seed)
+        keys = [scope_key('0x%040x' % rng.getrandbits(160)) for _ in range(samples)]
+        with self._lock:
+            hits = sum(key in self.filter for key in keys)
+        return hits / samples
+
+    def stats(self):
+        # Checks answered "not revoked" by the filter, plus the lookups that found nothing
+        negatives = self.skipped + self.false_positives
+        return {
+            'block_number': self.block_number,
+            'scopes': self.filter.items,
+            'consents': len(self._keys),
+            'capacity': self.capacity,
+            'counters': self.filter.size,
+            'hashes': self.filter.hashes,
+            'memory_bytes': self.filter.memory_bytes,
+            'fill_ratio': self.filter.fill_ratio(),
+            'expected_false_positive_rate': self.filter.false_positive_rate(),
+            'checks': self.checks,
+            'skipped_lookups': self.skipped,
+            'lookups': self.lookups,
+            'false_positives': self.false_positives,
+            'observed_false_positive_rate': self.false_positives / negatives if negatives else 0.0,
+            'reused': self.reused,
+            'updates': self.updates,
+        }
+
+    def flush(self):
+        self.filter.flush()
+
+    def close(self):
+        self.filter.flush()
+        self.filter.close()
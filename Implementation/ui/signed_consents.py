@@ -0,0 +1,311 @@
+"""
+EIP-712 signed consent grants/revokes and a relayer that submits them in batches.
+
+Data subjects and controllers sign ConsentAction messages off-chain (no
+transaction, no gas, no need to stay online). A relayer gathers the
+signatures and sends one ConsentRegistry.submitSignedActions transaction
+per batch of at most `max_batch` actions, flushing when `max_batch` actions
+are queued or when the oldest queued action is `max_age` seconds old. A batch
+whose transaction fails or reverts goes back to the front of the queue and is
+sent again with the next flush; after `max_attempts` failures in a row it is
+moved to `dead_letters` so it cannot hold back the actions behind it.
+
+Data subjects can also sign a ConsentCreation: their grant of a new
+ConsentRegistry consent with its terms (recipients, data, duration, default
+purposes). submitSignedCreations creates the consents of many data subjects
+in one relayer transaction (bulk_import.py), where createConsentBatch only
+covers its sender.
+
+Nonces are sequential per signer and consent (ConsentRegistry.getNonce), and
+any later grant/revoke of the signer voids its older signatures: the actions
+of one signer on one consent must be relayed in the order they were signed.
+"""
+
+import threading
+import time
+
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from web3 import Web3
+
+DOMAIN_NAME = 'ConsentRegistry'
+DOMAIN_VERSION = '1'
+
+CONSENT_ACTION_TYPES = {
+    'EIP712Domain': [
+        {'name': 'name', 'type': 'string'},
+        {'name': 'version', 'type': 'string'},
+        {'name': 'chainId', 'type': 'uint256'},
+        {'name': 'verifyingContract', 'type': 'address'},
+    ],
+    'ConsentAction': [
+        {'name': 'dataSubject', 'type': 'address'},
+        {'name': 'controller', 'type': 'address'},
+        {'name': 'grant', 'type': 'bool'},
+        {'name': 'nonce', 'type': 'uint256'},
+        {'name': 'deadline', 'type': 'uint256'},
+    ],
+    'ConsentCreation': [
+        {'name': 'dataSubject', 'type': 'address'},
+        {'name': 'controller', 'type': 'address'},
+        {'name': 'recipients', 'type': 'address[]'},
+        {'name': 'data', 'type': 'uint256'},
+        {'name': 'duration', 'type': 'uint256'},
+        {'name': 'defaultPurposes', 'type': 'uint256[]'},
+        {'name': 'nonce', 'type': 'uint256'},
+        {'name': 'deadline', 'type': 'uint256'},
+    ],
+}
+
+# Field order of ConsentRegistry.SignedAction and SignedCreation
+ACTION_FIELDS = ('dataSubject', 'controller', 'grant', 'nonce', 'deadline', 'v', 'r', 's')
+CREATION_FIELDS = ('dataSubject', 'controller', 'recipients', 'data', 'duration', 'defaultPurposes', 'nonce',
+                   'deadline', 'v', 'r', 's')
+
+
+def _domain(chain_id, registry_address):
+    return {
+        'name': DOMAIN_NAME,
+        'version': DOMAIN_VERSION,
+        'chainId': chain_id,
+        'verifyingContract': registry_address,
+    }
+
+
+def consent_action_typed_data(chain_id, registry_address, data_subject, controller, grant, nonce, deadline):
+    """Full EIP-712 message for a ConsentAction, as expected by eth_signTypedData_v4."""
+    return {
+        'types': {name: CONSENT_ACTION_TYPES[name] for name in ('EIP712Domain', 'ConsentAction')},
+        'primaryType': 'ConsentAction',
+        'domain': _domain(chain_id, registry_address),
+        'message': {
+            'dataSubject': data_subject,
+            'controller': controller,
+            'grant': grant,
+            'nonce': nonce,
+            'deadline': deadline,
+        },
+    }
+
+
+def consent_creation_typed_data(chain_id, registry_address, creation):
+    """Full EIP-712 message for a ConsentCreation; `creation` has the fields of CONSENT_ACTION_TYPES['ConsentCreation']."""
+    return {
+        'types': {name: CONSENT_ACTION_TYPES[name] for name in ('EIP712Domain', 'ConsentCreation')},
+        'primaryType': 'ConsentCreation',
+        'domain': _domain(chain_id, registry_address),
+        'message': {field['name']: creation[field['name']] for field in CONSENT_ACTION_TYPES['ConsentCreation']},
+    }
+
+
+def action_to_tuple(action):
+    """Converts a signed action dict to the SignedAction struct tuple."""
+    return tuple(action[field] for field in ACTION_FIELDS)
+
+
+def creation_to_tuple(creation):
+    """Converts a signed creation dict to the SignedCreation struct tuple."""
+    return tuple(creation[field] for field in CREATION_FIELDS)
+
+
+class ConsentActionSigner:
+    """
+    Signs ConsentActions for one account (the data subject or the controller),
+    and ConsentCreations for a data subject.
+
+    With `private_key` the signature is computed locally; without it the node
+    signs through eth_signTypedData_v4, which works for unlocked dev-chain accounts.
+    """
+
+    def __init__(self, registry, account, private_key=None):
+        self.w3 = registry.w3
+        self.registry_address = registry.address
+        self.account = account
+        self.private_key = private_key
+        # The chain id the contract hashes (Ganache's CHAINID opcode may differ from eth_chainId)
+        self.chain_id = registry.contract.functions.getChainId().call()
+        self._contract = registry.contract
+        self._next_nonces = {}      # (data_subject, controller) -> nonce after the last one signed here
+
+    def next_nonce(self, data_subject, controller):
+        """The registry's nonce for this consent, or the one after the signatures not relayed yet."""
+        nonce = self._contract.functions.getNonce(data_subject, controller, self.account).call()
+        return max(nonce, self._next_nonces.get((data_subject, controller), 0))
+
+    def sign(self, data_subject, controller, grant=True, ttl=3600, nonce=None):
+        """Returns a signed action dict ready to be relayed."""
+        if nonce is None:
+            nonce = self.next_nonce(data_subject, controller)
+        self._next_nonces[data_subject, controller] = nonce + 1
+        deadline = int(time.time()) + ttl
+        typed_data = consent_action_typed_data(
+            self.chain_id, self.registry_address, data_subject, controller, grant, nonce, deadline
+        )
+        v, r, s = self._sign(typed_data)
+        return {
+            'dataSubject': data_subject,
+            'controller': controller,
+            'grant': grant,
+            'nonce': nonce,
+            'deadline': deadline,
+            'v': v,
+            'r': r,
+            's': s,
+        }
+
+    def sign_creation(self, controller, recipients, data, duration, purposes, ttl=3600, nonce=None):
+        """
+        Returns a signed creation dict: this account's (the data subject's) grant of a new consent
+        with `controller` on these terms, ready for ConsentRegistryClient.submit_signed_creations.
+        """
+        if nonce is None:
+            nonce = self.next_nonce(self.account, controller)
+        self._next_nonces[self.account, controller] = nonce + 1
+        creation = {
+            'dataSubject': self.account,
+            'controller': controller,
+            'recipients': list(recipients),
+            'data': data,
+            'duration': duration,
+            'defaultPurposes': list(purposes),
+            'nonce': nonce,
+            'deadline': int(time.time()) + ttl,
+        }
+        creation['v'], creation['r'], creation['s'] = self._sign(
+            consent_creation_typed_data(self.chain_id, self.registry_address, creation)
+        )
+        return creation
+
+    def _sign(self, typed_data):
+        if self.private_key is not None:
+            signed = Account.sign_message(encode_typed_data(full_message=typed_data), self.private_key)
+            return signed.v, signed.r.to_bytes(32, 'big'), signed.s.to_bytes(32, 'big')
+        signature = bytes(self.w3.eth.sign_typed_data(self.account, typed_data))
+        v, r, s = signature[64], signature[:32], signature[32:64]
+        if v < 27:
+            v += 27
+        return v, r, s
+
+
+class ConsentRelayer:
+    """
+    Queues signed actions and submits them to the registry in batches.
+
+    Thread-safe: signers may call `submit` from several threads. Call `start()`
+    to flush by age in the background, and `stop()` to flush what is left.
+    """
+
+    def __init__(self, registry, relayer_account, max_batch=50, max_age=5.0, max_attempts=5):
+        self.registry = registry
+        self.relayer_account = relayer_account
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.max_attempts = max_attempts
+        self.results = []
+        self.dead_letters = []      # {'actions': [...], 'error': str} of the batches given up on
+        self.last_error = None
+        self._queue = []
+        self._oldest = None
+        self._failed_attempts = 0   # of the batch at the front of the queue
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._queue)
+
+    def submit(self, action):
+        """Queues a signed action; flushes right away when the batch is full."""
+        with self._lock:
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append(action)
+            full = len(self._queue) >= self.max_batch
+        if full:
+            try:
+                self.flush()
+            except Exception as e:
+                # The action is queued: sent again with the next flush
+                self.last_error = f'{type(e).__name__}: {e}'
+
+    def flush(self):
+        """
+        Submits the first `max_batch` queued actions. Returns the batch result, or None if the queue was empty.
+        If the transaction fails or reverts, the batch is queued again (or dead-lettered after
+        `max_attempts` failures) and the error raised.
+        """
+        with self._lock:
+            batch, oldest = self._queue[:self.max_batch], self._oldest
+            self._queue = self._queue[self.max_batch:]
+            if not self._queue:
+                self._oldest = None
+        if not batch:
+            return None
+
+        try:
+            receipt = self.registry.submit_signed_actions(
+                self.relayer_account, [action_to_tuple(a) for a in batch]
+            )
+            if receipt['status'] != 1:
+                raise RuntimeError(f"submitSignedActions transaction {Web3.to_hex(receipt['transactionHash'])} reverted")
+        except Exception as e:
+            with self._lock:
+                self._failed_attempts += 1
+                if self._failed_attempts >= self.max_attempts:
+                    self._failed_attempts = 0
+                    self.dead_letters.append({'actions': batch, 'error': f'{type(e).__name__}: {e}'})
+                else:
+                    # Ahead of the actions queued meanwhile, and as old as before
+                    self._queue = batch + self._queue
+                    self._oldest = oldest
+            raise
+        self._failed_attempts = 0
+        rejected = self.registry.rejected_actions(receipt)
+        result = {
+            'submitted': len(batch),
+            'applied': len(batch) - len(rejected),
+            'rejected': [batch[i] for i in rejected],
+            'gas': receipt['gasUsed'],
+            'receipt': receipt,
+        }
+        self.results.append(result)
+        return result
+
+    def flush_if_due(self):
+        with self._lock:
+            due = self._oldest is not None and time.monotonic() - self._oldest >= self.max_age
+        if due:
+            return self.flush()
+        return None
+
+    def start(self, interval=0.25):
+        """Starts the background thread that flushes batches older than `max_age`."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    if self.flush_if_due() is not None:
+                        self.last_error = None
+                except Exception as e:
+                    # Retried at the next interval: the batch is queued again
+                    self.last_error = f'{type(e).__name__}: {e}'
+
+        self._thread = threading.Thread(target=_run, name='consent-relayer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and flushes the remaining actions. Returns the batch results."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        results = []
+        while True:
+            result = self.flush()
+            if result is None:
+                return results
+            results.append(result)
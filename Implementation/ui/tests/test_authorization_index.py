@@ -0,0 +1,368 @@
+"""
+Tests of ui/authorization_index.py.
+
+AuthorizationIndexTest feeds a ConsentIndexer with logs encoded from the
+contracts' event ABIs by a stand-in chain; OnChainConsistencyTest compares
+the index with the contracts' verify() on a local node (Ganache at
+CONSENT_TEST_RPC_URL, default http://127.0.0.1:8545) and is skipped without
+one. Both compile the contracts first (contract_artifacts.ensure_compiled)
+and are skipped if `truffle compile` is not available.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import functools
+import os
+import random
+import sys
+import unittest
+
+from eth_abi import encode
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from authorization_index import AuthorizationIndex  # noqa: E402
+from consent_indexer import ConsentIndexer  # noqa: E402
+from contract_artifacts import ensure_compiled, load_artifact  # noqa: E402
+
+NOW = 1_700_000_000
+
+
+@functools.lru_cache(maxsize=None)
+def _has_events():
+    if not ensure_compiled():
+        return False
+    try:
+        return any(item['type'] == 'event' for item in load_artifact('CollectionConsent')['abi'])
+    except FileNotFoundError:
+        return False
+
+
+def address(n):
+    return Web3.to_checksum_address(f'0x{n:040x}')
+
+
+class StandInChain:
+    """Stand-in w3 for ConsentIndexer: serves the logs emitted with emit(), one block each."""
+
+    def __init__(self):
+        self.eth = self
+        self.block_number = 0
+        self.logs = []
+        self._abis = {name: load_artifact(name)['abi'] for name in ('CollectionConsent', 'ProcessingConsent')}
+
+    def contract(self, abi=None, address=None):
+        return Web3().eth.contract(abi=abi, address=address)
+
+    def get_logs(self, filter_params):
+        addresses = set(filter_params['address'])
+        return [log for log in self.logs if log['address'] in addresses
+                and filter_params['fromBlock'] <= log['blockNumber'] <= filter_params['toBlock']]
+
+    def emit(self, contract, address, name, **args):
+        event = next(item for item in self._abis[contract] if item['type'] == 'event' and item['name'] == name)
+        topics, types, values = [event_abi_to_log_topic(event)], [], []
+        for param in event['inputs']:
+            if param['indexed']:
+                topics.append(encode([param['type']], [args[param['name']]]))
+            else:
+                types.append(param['type'])
+                values.append(args[param['name']])
+        self.block_number += 1
+        self.logs.append({
+            'address': address, 'topics': topics, 'data': encode(types, values),
+            'blockNumber': self.block_number, 'logIndex': 0, 'transactionIndex': 0,
+            'transactionHash': b'\x01' * 32, 'blockHash': b'\x02' * 32, 'removed': False,
+        })
+
+
+@unittest.skipUnless(_has_events(), "contracts not compiled: `truffle compile` failed or is not installed")
+class AuthorizationIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = StandInChain()
+        self.indexer = ConsentIndexer(self.chain, ':memory:')
+        self.index = AuthorizationIndex(self.indexer)
+        self.subject, self.controller = address(1), address(2)
+        self.processors = [address(3), address(4)]
+        self.processing = {}
+
+    def create(self, consent, data=0b1111, beginning=NOW - 100, expiration=NOW + 1000, default_purposes=(0,)):
+        self.indexer.track_consent(consent, self.chain.block_number + 1)
+        self.chain.emit('CollectionConsent', consent, 'ConsentCreated', dataSubject=self.subject,
+                        controller=self.controller, recipients=self.processors, data=data, beginningDate=beginning,
+                        expirationDate=expiration, defaultPurposes=list(default_purposes))
+        self.chain.emit('CollectionConsent', consent, 'ConsentGranted', actor=self.controller)
+
+    def new_purpose(self, consent, processor, purpose, data, beginning=NOW - 100, expiration=NOW + 500, default=True):
+        key = (consent, processor)
+        if key not in self.processing:
+            self.processing[key] = address(0x1000 + len(self.processing))
+            self.chain.emit('CollectionConsent', consent, 'ProcessingConsentCreated', processor=processor,
+                            processingConsent=self.processing[key])
+        self.chain.emit('ProcessingConsent', self.processing[key], 'ProcessingPurposeCreated', purpose=purpose,
+                        data=data, beginningDate=beginning, expirationDate=expiration, defaultTrue=default)
+        return self.processing[key]
+
+    def allowed(self, processor, purpose, data_bits=0, now=NOW):
+        self.indexer.sync()
+        return self.index.is_authorized(self.subject, processor, purpose, data_bits, now)
+
+    def test_merges_both_consents(self):
+        consent = address(0x100)
+        self.create(consent, data=0b0111)
+        processing = self.new_purpose(consent, self.processors[0], 0, data=0b1101)
+        self.assertIsNone(self.allowed(self.processors[0], 0), "DP has not granted yet")
+
+        self.chain.emit('ProcessingConsent', processing, 'ProcessingGranted', purpose=0, actor=self.processors[0])
+        authorization = self.allowed(self.processors[0], 0)
+        self.assertEqual(authorization.consent, consent)
+        self.assertEqual(authorization.processing_consent, processing)
+        # Data within both consents, window of both
+        self.assertEqual(authorization.data, 0b0101)
+        self.assertEqual((authorization.beginning_date, authorization.expiration_date), (NOW - 100, NOW + 500))
+        self.assertIsNotNone(self.allowed(self.processors[0], 0, data_bits=0b0100))
+        self.assertIsNone(self.allowed(self.processors[0], 0, data_bits=0b0010))
+        self.assertIsNone(self.allowed(self.processors[0], 0, now=NOW + 501))
+        self.assertIsNone(self.allowed(self.processors[0], 0, now=NOW - 101))
+        self.assertIsNone(self.allowed(self.processors[1], 0))
+        self.assertIsNone(self.allowed(self.processors[0], 1))
+        # Case-insensitive addresses
+        self.assertIsNotNone(self.index.is_authorized(self.subject.lower(), self.processors[0].lower(), 0, now=NOW))
+
+    def test_follows_revocations(self):
+        consent = address(0x100)
+        self.create(consent)
+        first = self.new_purpose(consent, self.processors[0], 0, data=0b1)
+        second = self.new_purpose(consent, self.processors[1], 0, data=0b1)
+        for processing, processor in ((first, self.processors[0]), (second, self.processors[1])):
+            self.chain.emit('ProcessingConsent', processing, 'ProcessingGranted', purpose=0, actor=processor)
+        self.assertIsNotNone(self.allowed(self.processors[0], 0))
+        self.assertEqual(self.index.block_number, self.chain.block_number)
+
+        # Collection consent revoked, then granted again
+        self.chain.emit('CollectionConsent', consent, 'ConsentRevoked', actor=self.subject)
+        self.assertIsNone(self.allowed(self.processors[0], 0))
+        self.chain.emit('CollectionConsent', consent, 'ConsentGranted', actor=self.subject)
+        self.assertIsNotNone(self.allowed(self.processors[0], 0))
+
+        # Purpose revoked on every ProcessingConsent; granted again by the DS for one processor
+        self.chain.emit('CollectionConsent', consent, 'ConsentPurposeRevoked', purpose=0)
+        self.assertIsNone(self.allowed(self.processors[0], 0))
+        self.assertIsNone(self.allowed(self.processors[1], 0))
+        self.chain.emit('ProcessingConsent', first, 'ProcessingGranted', purpose=0, actor=self.subject)
+        self.assertIsNotNone(self.allowed(self.processors[0], 0))
+        self.assertIsNone(self.allowed(self.processors[1], 0))
+
+        # Processor blacklisted
+        self.chain.emit('CollectionConsent', consent, 'ConsentProcessorRevoked', processor=self.processors[0])
+        self.chain.emit('ProcessingConsent', first, 'AllProcessingRevoked', actor=self.subject)
+        self.assertIsNone(self.allowed(self.processors[0], 0))
+
+    def test_erased_data_and_data_changes(self):
+        consent = address(0x100)
+        self.create(consent, data=0b11)
+        processing = self.new_purpose(consent, self.processors[0], 2, data=0b11, default=False)
+        for actor in (self.subject, self.processors[0]):
+            self.chain.emit('ProcessingConsent', processing, 'ProcessingGranted', purpose=2, actor=actor)
+        self.assertIsNotNone(self.allowed(self.processors[0], 2, data_bits=0b10))
+
+        self.chain.emit('ProcessingConsent', processing, 'ProcessingDataModified', purpose=2, data=0b01)
+        self.assertIsNone(self.allowed(self.processors[0], 2, data_bits=0b10))
+        self.assertIsNotNone(self.allowed(self.processors[0], 2, data_bits=0b01))
+
+        self.chain.emit('CollectionConsent', consent, 'DataErased', dataSubject=self.subject)
+        self.assertIsNone(self.allowed(self.processors[0], 2))
+        self.assertEqual(len(self.index), 0)
+
+    def test_several_consents_of_a_subject(self):
+        first, second = address(0x100), address(0x200)
+        self.create(first)
+        self.create(second)
+        for consent in (first, second):
+            processing = self.new_purpose(consent, self.processors[0], 0, data=0b1)
+            self.chain.emit('ProcessingConsent', processing, 'ProcessingGranted', purpose=0, actor=self.processors[0])
+        self.indexer.sync()
+        self.assertEqual({a.consent for a in self.index.get(self.subject, self.processors[0], 0)}, {first, second})
+
+        self.chain.emit('CollectionConsent', first, 'ConsentRevoked', actor=self.controller)
+        self.assertEqual(self.allowed(self.processors[0], 0).consent, second)
+
+    def test_consent_pages(self):
+        consents = [address(0x100 + i) for i in range(5)]
+        for consent in consents:
+            self.create(consent)
+        self.indexer.sync()
+
+        pages, cursor = [], None
+        while True:
+            rows, cursor = self.indexer.find_consents('subject', self.subject, limit=2, after=cursor)
+            pages.append([row['address'] for row in rows])
+            if cursor is None:
+                break
+        self.assertEqual(pages, [consents[:2], consents[2:4], consents[4:]])
+        self.assertEqual(self.indexer.find_consents('subject', self.subject, limit=0), ([], None))
+        self.assertEqual(len(self.indexer.find_consents(limit=-1)[0]), 5)
+
+    def test_incremental_updates_match_a_rebuild_and_the_sql_reference(self):
+        rng = random.Random(7)
+        consents = [address(0x100 + i) for i in range(6)]
+        for consent in consents:
+            self.create(consent, data=rng.randrange(16), expiration=NOW + rng.randrange(-50, 1000))
+        checks = [(self.subject, processor, purpose, data_bits)
+                  for processor in self.processors for purpose in range(3) for data_bits in (0, 1, 2, 5)]
+        created = set()
+
+        for step in range(300):
+            consent, processor = rng.choice(consents), rng.choice(self.processors)
+            processing = self.processing.get((consent, processor))
+            purpose = rng.randrange(3)
+            action = rng.randrange(8)
+            if action == 0 or processing is None:
+                if (consent, processor, purpose) in created:
+                    continue
+                created.add((consent, processor, purpose))
+                processing = self.new_purpose(consent, processor, purpose, data=rng.randrange(16),
+                                              expiration=NOW + rng.randrange(-50, 1000), default=rng.random() < 0.5)
+            elif action == 1:
+                self.chain.emit('ProcessingConsent', processing, 'ProcessingGranted', purpose=purpose,
+                                actor=rng.choice([self.subject, self.controller, processor]))
+            elif action == 2:
+                self.chain.emit('ProcessingConsent', processing, 'ProcessingRevoked', purpose=purpose,
+                                actor=rng.choice([self.subject, self.controller, processor]))
+            elif action == 3:
+                self.chain.emit('CollectionConsent', consent, rng.choice(['ConsentGranted', 'ConsentRevoked']),
+                                actor=rng.choice([self.subject, self.controller]))
+            elif action == 4:
+                self.chain.emit('CollectionConsent', consent, 'ConsentPurposeRevoked', purpose=purpose)
+            elif action == 5:
+                self.chain.emit('ProcessingConsent', processing, 'ProcessingDataModified', purpose=purpose,
+                                data=rng.randrange(16))
+            elif action == 6:
+                self.chain.emit('CollectionConsent', consent, 'DataModified', data=rng.randrange(16))
+            elif step > 250:
+                self.chain.emit('CollectionConsent', consent, 'DataErased', dataSubject=self.subject)
+
+            if step % 10 == 0:
+                self.indexer.sync()
+                block, answers = self.index.check_many(checks, now=NOW)
+                _, reference = self.indexer.allowed_consents(checks, now=NOW)
+                self.assertEqual(block, self.indexer.last_block)
+                self.assertEqual([a is not None for a in answers], [r is not None for r in reference], f"step {step}")
+
+        self.indexer.sync()
+        rebuilt = AuthorizationIndex(self.indexer)
+        self.assertEqual(rebuilt._entries.keys(), self.index._entries.keys())
+        for key, authorizations in rebuilt._entries.items():
+            self.assertEqual(set(authorizations), set(self.index._entries[key]))
+
+
+def _node():
+    if not _has_events():
+        return None
+    w3 = Web3(Web3.HTTPProvider(os.environ.get('CONSENT_TEST_RPC_URL', 'http://127.0.0.1:8545'),
+                                request_kwargs={'timeout': 2}))
+    try:
+        return w3 if w3.is_connected() and len(w3.eth.accounts) >= 4 else None
+    except Exception:
+        return None
+
+
+@unittest.skipUnless(_node(), "no local node with unlocked accounts (Ganache) and compiled artifacts")
+class OnChainConsistencyTest(unittest.TestCase):
+    """The index agrees with CollectionConsent.verify() and ProcessingConsent.verify(purpose) after each step."""
+
+    PURPOSES = (0, 1)
+
+    def setUp(self):
+        self.w3 = _node()
+        self.subject, self.controller, *self.processors = self.w3.eth.accounts[:4]
+        self.abis = {name: load_artifact(name) for name in ('CollectionConsent', 'ProcessingConsent')}
+
+        artifact = self.abis['CollectionConsent']
+        factory = self.w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+        receipt = self.transact(factory.constructor(self.controller, self.processors, 0b1111, 1000, [0]), self.subject)
+        self.consent = self.w3.eth.contract(address=receipt['contractAddress'], abi=artifact['abi'])
+
+        self.indexer = ConsentIndexer(self.w3, ':memory:')
+        self.indexer.track_consent(self.consent.address, receipt['blockNumber'])
+        self.index = AuthorizationIndex(self.indexer)
+
+    def transact(self, fn, sender):
+        return self.w3.eth.wait_for_transaction_receipt(fn.transact({'from': sender}))
+
+    def processing(self, processor):
+        try:
+            address = self.consent.functions.getProcessingConsentSC(processor).call()
+        except ContractLogicError:
+            return None
+        return self.w3.eth.contract(address=address, abi=self.abis['ProcessingConsent']['abi'])
+
+    def on_chain(self, processor, purpose):
+        if not self.consent.functions.verify().call() or self.consent.functions.isErased().call():
+            return False
+        processing = self.processing(processor)
+        try:
+            return processing is not None and processing.functions.verify(purpose).call()
+        except ContractLogicError:
+            return False
+
+    def assert_consistent(self, step):
+        self.indexer.sync()
+        now = self.w3.eth.get_block('latest')['timestamp']
+        for processor in self.processors:
+            for purpose in self.PURPOSES:
+                self.assertEqual(
+                    self.index.is_authorized(self.subject, processor, purpose, now=now) is not None,
+                    self.on_chain(processor, purpose),
+                    f"{step}: processor {processor}, purpose {purpose}",
+                )
+
+    def test_lifecycle(self):
+        first, second = self.processors
+        consent = self.consent.functions
+        self.assert_consistent("created")
+        self.transact(consent.grantConsent(), self.controller)
+        self.assert_consistent("granted by the controller")
+
+        self.transact(consent.newPurpose(first, 0, 0b0011, 500), self.controller)
+        self.assert_consistent("default purpose added")
+        self.transact(self.processing(first).functions.grantConsent(0), first)
+        self.assert_consistent("granted by the processor")
+
+        self.transact(consent.newPurpose(first, 1, 0b0100, 500), self.controller)
+        for actor in (self.subject, first):
+            self.transact(self.processing(first).functions.grantConsent(1), actor)
+        self.assert_consistent("non-default purpose granted")
+
+        self.transact(consent.newPurpose(second, 0, 0b0001, 200), self.controller)
+        self.transact(self.processing(second).functions.grantConsent(0), second)
+        self.assert_consistent("second processor")
+
+        self.transact(consent.revokeConsentPurpose(0), self.subject)
+        self.assert_consistent("purpose 0 revoked")
+        self.transact(self.processing(first).functions.grantConsent(0), self.subject)
+        self.assert_consistent("purpose 0 granted again for the first processor")
+
+        self.transact(self.processing(first).functions.revokeConsent(1), first)
+        self.assert_consistent("purpose 1 revoked by the processor")
+
+        self.transact(consent.revokeConsent(), self.subject)
+        self.assert_consistent("revoked by the subject")
+        self.transact(consent.grantConsent(), self.subject)
+        self.assert_consistent("granted again by the subject")
+
+        self.transact(consent.revokeConsentProcessor(second), self.subject)
+        self.assert_consistent("second processor blacklisted")
+
+        for seconds in (300, 700):
+            self.w3.provider.make_request('evm_increaseTime', [seconds])
+            self.w3.provider.make_request('evm_mine', [])
+            self.assert_consistent(f"{seconds} seconds later")
+
+
+if __name__ == '__main__':
+    unittest.main()
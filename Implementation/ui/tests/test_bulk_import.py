@@ -0,0 +1,110 @@
+"""
+Tests of ui/bulk_import.py with a stand-in ConsentRegistry client.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from web3 import Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bulk_import import import_consents, parse_consents_csv  # noqa: E402
+from signed_consents import CREATION_FIELDS, ConsentActionSigner, consent_creation_typed_data  # noqa: E402
+
+RELAYER = '0x' + '99' * 20
+REGISTRY = '0x' + '22' * 20
+CHAIN_ID = 1337
+
+
+class StandInRegistry:
+    """Same interface as ConsentRegistryClient for bulk_import; records the batches of each transaction."""
+
+    def __init__(self):
+        self.address = REGISTRY
+        self.w3 = None
+        self.contract = SimpleNamespace(functions=SimpleNamespace(
+            getChainId=lambda: SimpleNamespace(call=lambda: CHAIN_ID),
+            getNonce=lambda ds, dc, signer: SimpleNamespace(call=lambda: 0)))
+        self.created = []       # (sender, [controller, ...])
+        self.relayed = []       # (sender, [creation dict, ...])
+        self.granted = []       # (controller, [subject, ...])
+        self.existing = set()   # (subject, controller) whose signed creation is rejected
+
+    def _receipt(self, **fields):
+        return dict(status=1, transactionHash=b'\x01' * 32, gasUsed=100000, **fields)
+
+    def create_consent_batch(self, data_subject, consents):
+        self.created.append((data_subject, [c['controller'] for c in consents]))
+        return self._receipt()
+
+    def submit_signed_creations(self, relayer, creations):
+        creations = [dict(zip(CREATION_FIELDS, c)) for c in creations]
+        self.relayed.append((relayer, creations))
+        rejected = [i for i, c in enumerate(creations) if (c['dataSubject'], c['controller']) in self.existing]
+        return self._receipt(rejected=rejected)
+
+    def rejected_actions(self, receipt):
+        return receipt['rejected']
+
+    def grant_consent_batch(self, controller, data_subjects):
+        self.granted.append((controller, list(data_subjects)))
+        return self._receipt()
+
+
+class ImportConsentsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = StandInRegistry()
+        self.subjects = [Account.create() for _ in range(3)]
+        self.controllers = [Web3.to_checksum_address('0x' + n * 20) for n in ('0a', '0b')]
+        rows = ['subject,controller,recipients,purposes,data,duration']
+        for subject in self.subjects:
+            for controller in self.controllers:
+                rows.append(f"{subject.address},{controller},{'0x' + '0c' * 20},0;2,,3600")
+        self.consents = parse_consents_csv('\n'.join(rows))
+        self.keys = {subject.address: subject.key for subject in self.subjects}
+
+    def signer(self, subject):
+        return ConsentActionSigner(self.registry, subject, self.keys[subject])
+
+    def test_direct_import_takes_a_creation_transaction_per_subject(self):
+        summary = import_consents(self.registry, self.consents, chunk_size=4)
+        self.assertEqual([sender for sender, _ in self.registry.created], [s.address for s in self.subjects])
+        self.assertEqual(len(self.registry.granted), 2)
+        self.assertEqual(summary['transactions'], 5)
+
+    def test_signed_creations_of_many_subjects_share_transactions(self):
+        summary = import_consents(self.registry, self.consents, chunk_size=4, relayer=RELAYER, signer=self.signer)
+        self.assertEqual(self.registry.created, [])
+        self.assertEqual([len(creations) for _, creations in self.registry.relayed], [4, 2])
+        self.assertEqual({sender for sender, _ in self.registry.relayed}, {RELAYER})
+        self.assertEqual(summary['transactions'], 4)
+
+        for _, creations in self.registry.relayed:
+            for creation in creations:
+                typed_data = consent_creation_typed_data(CHAIN_ID, REGISTRY, creation)
+                recovered = Account.recover_message(
+                    encode_typed_data(full_message=typed_data), vrs=(creation['v'], creation['r'], creation['s'])
+                )
+                self.assertEqual(recovered, creation['dataSubject'])
+                self.assertEqual((creation['defaultPurposes'], creation['duration']), ([0, 2], 3600))
+
+    def test_rejected_creations_are_not_granted(self):
+        rejected = (self.subjects[1].address, self.controllers[0])
+        self.registry.existing = {rejected}
+        summary = import_consents(self.registry, self.consents, chunk_size=4, relayer=RELAYER, signer=self.signer)
+        self.assertEqual([(c['subject'], c['controller']) for c in summary['rejected']], [rejected])
+        granted = dict(self.registry.granted)
+        self.assertNotIn(rejected[0], granted[self.controllers[0]])
+        self.assertEqual(len(granted[self.controllers[1]]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Tests of ui/consent_cache.py against the stand-in chain of
+test_authorization_index, extended with the contracts' reads. Compiles the
+contracts first (skipped without `truffle compile`).
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from consent_cache import VerificationCache  # noqa: E402
+from test_authorization_index import NOW, StandInChain, _has_events, address  # noqa: E402
+
+
+class StandInConsents(StandInChain):
+    """StandInChain that also answers verify(), getValidityWindow() and getCollectionConsentSC()."""
+
+    def __init__(self):
+        super().__init__()
+        self.valid = {}         # (address, purpose or None) -> verify() result
+        self.expiration = {}    # same keys -> expirationDate
+        self.parents = {}       # processing address -> collection address
+        self.reads = 0
+        self.on_block_number = None     # called once, at the next block_number read
+        self._block_number = 0
+
+    @property
+    def block_number(self):
+        hook, self.on_block_number = self.on_block_number, None
+        if hook is not None:
+            hook()
+        return self._block_number
+
+    @block_number.setter
+    def block_number(self, value):
+        self._block_number = value
+
+    def contract(self, abi=None, address=None):
+        return lambda address: SimpleNamespace(functions=SimpleNamespace(
+            verify=lambda purpose=None: SimpleNamespace(call=lambda: self._verify(address, purpose)),
+            getValidityWindow=lambda purpose=None: SimpleNamespace(
+                call=lambda: (NOW - 100, self.expiration.get((address, purpose), NOW + 1000))),
+            getCollectionConsentSC=lambda: SimpleNamespace(call=lambda: self.parents[address]),
+        ))
+
+    def _verify(self, address, purpose):
+        self.reads += 1
+        return self.valid.get((address, purpose), True)
+
+    def get_block(self, block_number):
+        return {'timestamp': NOW + block_number}
+
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def __call__(self):
+        return self.now
+
+
+@unittest.skipUnless(_has_events(), "contracts not compiled: `truffle compile` failed or is not installed")
+class VerificationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = StandInConsents()
+        self.clock = Clock()
+        self.cache = VerificationCache(self.chain, ttl=30, max_entries=3, clock=self.clock)
+        self.subject = address(1)
+
+    def test_entries_live_at_most_ttl_seconds(self):
+        consent = address(0x100)
+        self.assertTrue(self.cache.verify(consent))
+        self.chain.valid[consent, None] = False
+        self.clock.now += 30
+        self.assertTrue(self.cache.verify(consent))
+        self.assertEqual(self.chain.reads, 1)
+
+        self.clock.now += 1
+        self.assertFalse(self.cache.verify(consent))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 2, 1))
+
+    def test_valid_entries_flip_at_the_expiration_date(self):
+        consent = address(0x100)
+        self.chain.expiration[consent, None] = NOW + 10
+        self.assertTrue(self.cache.verify(consent))
+        self.clock.now = NOW + 11
+        self.assertFalse(self.cache.verify(consent))
+        self.assertEqual(self.chain.reads, 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        first, second, third, fourth = (address(0x100 + i) for i in range(4))
+        for consent in (first, second, third, first, fourth):
+            self.cache.verify(consent)
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+        reads = self.chain.reads
+        self.cache.verify(first)
+        self.assertEqual(self.chain.reads, reads)
+        self.cache.verify(second)
+        self.assertEqual(self.chain.reads, reads + 1)
+
+    def test_events_invalidate_the_entries_of_their_contract(self):
+        consent, other = address(0x100), address(0x200)
+        processing, processing_other = address(0x1000), address(0x1001)
+        self.chain.parents[processing] = consent
+        self.chain.parents[processing_other] = other
+        self.cache.verify(consent)
+        self.cache.verify_purpose(processing, 0)
+        self.cache.verify_purpose(processing_other, 0)
+
+        # A purpose revoked on the CollectionConsent drops it on its ProcessingConsents only
+        self.chain.emit('CollectionConsent', consent, 'ConsentPurposeRevoked', purpose=0)
+        self.assertEqual(self.cache.poll(), 1)
+        self.assertEqual(len(self.cache), 2)
+
+        self.chain.emit('CollectionConsent', consent, 'ConsentRevoked', actor=self.subject)
+        self.chain.valid[consent, None] = False
+        self.clock.now += 5
+        self.assertEqual(self.cache.poll(), 1)
+        self.assertFalse(self.cache.verify(consent))
+        self.assertEqual(self.cache.poll(), 0)
+        stats = self.cache.stats()
+        self.assertEqual(stats['invalidations'], 2)
+        self.assertGreater(stats['max_staleness'], 0)
+
+    def test_entry_cached_during_a_poll_sees_later_events(self):
+        cached, late = address(0x100), address(0x200)
+        self.cache.verify(cached)
+
+        def during_poll():
+            # Read after the poll took its address snapshot, revoked before it reads the latest block
+            self.assertTrue(self.cache.verify(late))
+            self.chain.emit('CollectionConsent', late, 'ConsentRevoked', actor=self.subject)
+            self.chain.valid[late, None] = False
+
+        self.chain.emit('CollectionConsent', cached, 'DataModified', data=1)
+        self.chain.on_block_number = during_poll
+        self.assertEqual(self.cache.poll(), 1)
+        self.assertEqual(len(self.cache), 1)
+
+        self.assertEqual(self.cache.poll(), 1)
+        self.assertFalse(self.cache.verify(late))
+
+    def test_failed_poll_is_read_again(self):
+        consent = address(0x100)
+        self.cache.verify(consent)
+        self.chain.emit('CollectionConsent', consent, 'ConsentRevoked', actor=self.subject)
+        get_logs = self.chain.get_logs
+
+        def failing(filter_params):
+            self.chain.get_logs = get_logs
+            raise ConnectionError('node down')
+
+        self.chain.get_logs = failing
+        with self.assertRaises(ConnectionError):
+            self.cache.poll()
+        self.assertEqual(self.cache.poll(), 1)
+
+    def test_staleness_metrics_are_running_totals(self):
+        for lag in (2, 8, 5):
+            consent = address(0x100 + lag)
+            self.cache.verify(consent)
+            self.assertEqual(self.cache.invalidate(consent, since=self.clock.now - lag), 1)
+        self.cache.invalidate(address(0x999), since=self.clock.now)  # nothing cached: no lag recorded
+        stats = self.cache.stats()
+        self.assertEqual(stats['max_staleness'], 8)
+        self.assertEqual(stats['mean_staleness'], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests of the tables of ui/consent_snapshot.py: row selection and
+concatenation (the incremental export) and the stored format.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from web3 import Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consent_snapshot import (  # noqa: E402
+    COLUMNS, SNAPSHOT_VERSION, _concat, _empty_table, _row_count, _select, _to_arrays, address_bytes,
+    latest_snapshot, write_snapshot,
+)
+
+NOW = 1_700_000_000
+
+
+def address(n):
+    return Web3.to_checksum_address(f'0x{n:040x}')
+
+
+def tables(consents):
+    """Tables of `consents`: (consent number, [processor number, ...]) with two purposes per processor."""
+    rows = {name: _empty_table(name) for name in COLUMNS}
+    for i, (n, processors) in enumerate(consents):
+        table = rows['consents']
+        table['address'].append(address_bytes(address(0x100 + n)))
+        table['data_subject'].append(address_bytes(address(1)))
+        table['controller'].append(address_bytes(address(2)))
+        table['data'].append(n.to_bytes(32, 'big'))
+        for column in ('valid', 'ds_granted', 'dc_granted'):
+            table[column].append(n % 2 == 0)
+        table['erased'].append(False)
+        table['beginning_date'].append(NOW - n)
+        table['expiration_date'].append(NOW + n)
+        table['read_block'].append(n)
+        for p in processors:
+            rows['recipients']['consent'].append(i)
+            rows['recipients']['address'].append(address_bytes(address(p)))
+            rows['processing']['consent'].append(i)
+            rows['processing']['processor'].append(address_bytes(address(p)))
+            rows['processing']['address'].append(address_bytes(address(0x1000 * n + p)))
+            for purpose in (0, 1):
+                table = rows['purposes']
+                table['processing'].append(len(rows['processing']['consent']) - 1)
+                table['purpose'].append(purpose)
+                table['data'].append((n * 10 + purpose).to_bytes(32, 'big'))
+                table['beginning_date'].append(NOW)
+                table['expiration_date'].append(NOW + purpose)
+                table['valid'].append(purpose == 0)
+                table['ds_valid'].append(True)
+    return {name: _to_arrays(name, table_rows) for name, table_rows in rows.items()}
+
+
+class SnapshotTablesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.consents = [(1, [3, 4]), (2, []), (3, [5]), (4, [3])]
+
+    def write(self, block_number, snapshot_tables):
+        meta = {'version': SNAPSHOT_VERSION, 'block_number': block_number,
+                'rows': {name: _row_count(columns) for name, columns in snapshot_tables.items()}}
+        return write_snapshot(self.directory.name, meta, snapshot_tables)
+
+    def assert_same_consents(self, snapshot, expected):
+        self.assertEqual(sorted(snapshot.addresses()), sorted(expected.addresses()))
+        for consent in expected.addresses():
+            self.assertEqual(snapshot.consent(consent), expected.consent(consent))
+            self.assertEqual(snapshot.purposes(consent), expected.purposes(consent))
+
+    def test_select_and_concat_round_trip(self):
+        full = tables(self.consents)
+        kept = _select(full, np.array([0, 2], dtype=np.int64))
+        self.assertEqual(len(kept['consents']['address']), 2)
+        self.assertEqual(list(kept['processing']['consent']), [0, 0, 1])
+        self.assertEqual(list(kept['purposes']['processing']), [0, 0, 1, 1, 2, 2])
+
+        merged = _concat(kept, _select(full, np.array([1, 3], dtype=np.int64)))
+        for name, columns in COLUMNS.items():
+            for column in columns:
+                self.assertEqual(merged[name][column].dtype, full[name][column].dtype, (name, column))
+        self.assert_same_consents(self.write(2, merged), self.write(1, full))
+
+    def test_select_nothing_and_concat_read_rows(self):
+        full = tables(self.consents)
+        empty = _select(full, np.array([], dtype=np.int64))
+        self.assertTrue(all(len(a) == 0 for columns in empty.values() for a in columns.values()))
+        merged = _concat(empty, tables(self.consents[2:]))
+        self.assert_same_consents(self.write(2, merged), self.write(1, tables(self.consents[2:])))
+
+    def test_latest_snapshot_is_the_highest_block(self):
+        self.assertIsNone(latest_snapshot(self.directory.name))
+        self.write(5, tables(self.consents[:1]))
+        self.write(12, tables(self.consents))
+        self.write(7, tables(self.consents[:2]))
+        snapshot = latest_snapshot(self.directory.name)
+        self.assertEqual((snapshot.block_number, len(snapshot)), (12, 4))
+        self.assertEqual(snapshot.purposes(address(0x101))[1]['data'], 11)
+        self.assertTrue(snapshot.is_valid(address(0x102), now=NOW))
+        self.assertFalse(snapshot.is_valid(address(0x103), now=NOW))
+
+
+if __name__ == '__main__':
+    unittest.main()
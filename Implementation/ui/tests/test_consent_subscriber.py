@@ -0,0 +1,115 @@
+"""
+Tests of ui/consent_subscriber.py in polling mode, with a stand-in node and
+ConsentReader.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from consent_reader import ConsentSnapshot  # noqa: E402
+from consent_subscriber import ConsentSubscriber  # noqa: E402
+
+NOW = 1_700_000_000
+
+
+def address(n):
+    return Web3.to_checksum_address(f'0x{n:040x}')
+
+
+class StandInNode:
+    """Stand-in w3: a block number moved by the test, a log per emit(), one second per block."""
+
+    def __init__(self):
+        self.eth = self
+        self.block_number = 1
+        self.logs = []
+
+    def get_logs(self, filter_params):
+        return [log for log in self.logs if log['address'] in filter_params['address']
+                and filter_params['fromBlock'] <= log['blockNumber'] <= filter_params['toBlock']]
+
+    def get_block(self, block_number):
+        return {'timestamp': NOW + block_number}
+
+    def emit(self, consent):
+        self.block_number += 1
+        self.logs.append({'address': consent, 'blockNumber': self.block_number})
+
+
+class StandInReader:
+    """ConsentReader whose next `failures` reads raise."""
+
+    def __init__(self, node):
+        self.node = node
+        self.failures = 0
+        self.valid = {}
+        self.reads = []
+
+    def snapshots(self, addresses, block_number=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('node down')
+        self.reads.append(list(addresses))
+        block_number = self.node.block_number if block_number is None else block_number
+        return [ConsentSnapshot(
+            address=a, block_number=block_number, valid=self.valid.get(a, True), data_subject=address(1),
+            controller=address(2), recipients=(), data=0, ds_granted=True, dc_granted=True,
+            beginning_date=NOW, expiration_date=NOW + 1000, erased=False, processors=(),
+        ) for a in addresses]
+
+
+class ConsentSubscriberTest(unittest.TestCase):
+
+    def setUp(self):
+        self.node = StandInNode()
+        self.reader = StandInReader(self.node)
+        self.subscriber = ConsentSubscriber(self.node, self.reader, ws_url=None)
+
+    def test_logs_read_the_consent_again(self):
+        consent, other = address(0x100), address(0x200)
+        self.subscriber.watch([consent, other])
+        self.subscriber._catch_up()
+        self.assertTrue(self.subscriber.get(consent).valid)
+
+        self.reader.valid[consent] = False
+        self.node.emit(consent)
+        self.subscriber._catch_up()
+        self.assertFalse(self.subscriber.get(consent).valid)
+        self.assertEqual(self.reader.reads, [[consent, other], [consent]])
+
+    def test_failed_first_read_is_retried_at_the_next_block(self):
+        consent = address(0x100)
+        self.reader.failures = 1
+        self.subscriber.watch([consent])
+        self.assertIsNone(self.subscriber.get(consent))
+        self.assertIn('node down', self.subscriber.last_error)
+
+        self.subscriber._catch_up()
+        self.assertEqual(self.subscriber.get(consent).block_number, 1)
+
+    def test_failed_block_read_is_retried(self):
+        consent = address(0x100)
+        self.subscriber.watch([consent])
+        self.subscriber._catch_up()
+
+        self.reader.valid[consent] = False
+        self.node.emit(consent)
+        self.reader.failures = 1
+        with self.assertRaises(ConnectionError):
+            self.subscriber._catch_up()
+        self.assertTrue(self.subscriber.get(consent).valid)
+
+        self.node.block_number += 1
+        self.subscriber._catch_up()
+        self.assertFalse(self.subscriber.get(consent).valid)
+
+
+if __name__ == '__main__':
+    unittest.main()
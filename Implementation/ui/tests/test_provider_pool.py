@@ -0,0 +1,203 @@
+"""
+Tests of ui/provider_pool.py against local stand-in JSON-RPC servers.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from provider_pool import ProviderPool  # noqa: E402
+
+
+class StandInNode:
+    """Minimal JSON-RPC node on 127.0.0.1: answers eth_blockNumber / eth_chainId, counts requests and connections."""
+
+    def __init__(self, block=100, delay=0.0, error=None):
+        self.block = block
+        self.delay = delay
+        self.error = error
+        self.requests = 0
+        self.connections = 0
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                node.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(node.delay)
+                if isinstance(body, list):
+                    answer = [node.answer(request) for request in body]
+                else:
+                    answer = node.answer(body)
+                data = json.dumps(answer).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, request):
+        self.requests += 1
+        if self.error is not None:
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': self.error}}
+        results = {'eth_blockNumber': hex(self.block), 'eth_chainId': '0x539', 'web3_clientVersion': 'stand-in',
+                   'eth_getTransactionCount': '0x5', 'eth_sendTransaction': '0x' + 'ab' * 32}
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': results[request['method']]}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def closed_port_url():
+    """URL of a local port nothing listens on (connection refused)."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{s.getsockname()[1]}'
+
+
+class ProviderPoolTest(unittest.TestCase):
+
+    def node(self, **kwargs):
+        node = StandInNode(**kwargs)
+        self.addCleanup(node.close)
+        return node
+
+    def test_fails_over_to_the_next_endpoint(self):
+        node = self.node()
+        dead = closed_port_url()
+        pool = ProviderPool([dead, node.url], timeout=2, seed=1)
+        w3 = Web3(pool)
+
+        for _ in range(5):
+            self.assertEqual(w3.eth.block_number, 100)
+
+        metrics = pool.metrics()
+        self.assertGreaterEqual(metrics[dead]['failures'], 1)
+        self.assertFalse(metrics[dead]['available'])
+        # Set aside after its first failure: the other requests went to the live node only
+        self.assertEqual(metrics[dead]['requests'], 1)
+        self.assertEqual(metrics[node.url]['requests'], 5)
+
+    def test_raises_when_no_endpoint_answers(self):
+        pool = ProviderPool([closed_port_url(), closed_port_url()], timeout=2)
+        with self.assertRaises(ConnectionError):
+            pool.make_request('eth_blockNumber', [])
+        self.assertFalse(Web3(pool).is_connected())
+
+    def test_json_rpc_errors_are_answers_not_failures(self):
+        failing, other = self.node(error='execution reverted'), self.node()
+        pool = ProviderPool([failing.url, other.url], seed=0)
+        pool.endpoints[1].healthy = False     # route everything to the first node
+
+        response = pool.make_request('eth_blockNumber', [])
+        self.assertEqual(response['error']['message'], 'execution reverted')
+        self.assertEqual(pool.metrics()[failing.url]['failures'], 0)
+        self.assertEqual(other.requests, 0)
+
+    def test_routing_favours_the_fastest_endpoint(self):
+        fast, slow = self.node(), self.node(delay=0.03)
+        pool = ProviderPool([fast.url, slow.url], seed=3)
+        for _ in range(60):
+            pool.make_request('eth_blockNumber', [])
+
+        metrics = pool.metrics()
+        self.assertLess(metrics[fast.url]['latency_ewma_ms'], metrics[slow.url]['latency_ewma_ms'])
+        self.assertGreater(fast.requests, 3 * slow.requests)
+        self.assertGreater(slow.requests, 0)
+
+    def test_http_connections_are_kept_alive(self):
+        node = self.node()
+        pool = ProviderPool([node.url])
+        for _ in range(30):
+            pool.make_request('eth_chainId', [])
+        self.assertEqual(node.requests, 30)
+        self.assertEqual(node.connections, 1)
+
+    def test_health_check_sets_lagging_and_dead_endpoints_aside(self):
+        current, lagging = self.node(block=100), self.node(block=90)
+        dead = closed_port_url()
+        pool = ProviderPool([current.url, lagging.url, dead], max_block_lag=5, timeout=2)
+
+        metrics = pool.check_health()
+        self.assertTrue(metrics[current.url]['healthy'])
+        self.assertFalse(metrics[lagging.url]['healthy'])
+        self.assertFalse(metrics[dead]['healthy'])
+        self.assertEqual(metrics[lagging.url]['last_block'], 90)
+
+        before = lagging.requests
+        for _ in range(10):
+            pool.make_request('eth_blockNumber', [])
+        self.assertEqual(lagging.requests, before)
+
+        # Caught up: healthy again at the next check
+        lagging.block = 100
+        self.assertTrue(pool.check_health()[lagging.url]['healthy'])
+
+    def test_batch_requests(self):
+        node = self.node(block=7)
+        w3 = Web3(ProviderPool([closed_port_url(), node.url], timeout=2, seed=2))
+        with w3.batch_requests() as batch:
+            batch.add(w3.eth.get_block_number())
+            batch.add(w3.eth.get_block_number())
+            self.assertEqual(batch.execute(), [7, 7])
+
+    def test_transactions_and_nonces_stick_to_the_primary(self):
+        primary, other = self.node(), self.node()
+        pool = ProviderPool([primary.url, other.url], seed=4)
+        for _ in range(10):
+            pool.make_request('eth_getTransactionCount', ['0x' + '11' * 20, 'pending'])
+            pool.make_request('eth_sendTransaction', [{}])
+        self.assertEqual((primary.requests, other.requests), (20, 0))
+        self.assertTrue(pool.metrics()[primary.url]['primary'])
+
+    def test_sent_transaction_is_not_sent_again_after_a_timeout(self):
+        slow, other = self.node(delay=1.0), self.node()
+        pool = ProviderPool([slow.url, other.url], timeout=0.2)
+        with self.assertRaises(Exception):
+            pool.make_request('eth_sendTransaction', [{}])
+        self.assertEqual(other.requests, 0)
+        self.assertIs(pool.primary, pool.endpoints[0])
+
+    def test_unreachable_primary_moves_to_the_next_endpoint(self):
+        node = self.node()
+        dead = closed_port_url()
+        pool = ProviderPool([dead, node.url], timeout=2)
+        self.assertEqual(pool.make_request('eth_sendTransaction', [{}])['result'], '0x' + 'ab' * 32)
+        self.assertEqual(pool.primary.uri, node.url)
+        pool.make_request('eth_getTransactionCount', ['0x' + '11' * 20, 'pending'])
+        self.assertEqual(node.requests, 2)
+
+    def test_from_env(self):
+        first, second = self.node(), self.node()
+        os.environ['CONSENT_RPC_URLS'] = f' {first.url} , {second.url} '
+        self.addCleanup(os.environ.pop, 'CONSENT_RPC_URLS')
+        pool = ProviderPool.from_env()
+        self.assertEqual([e.uri for e in pool.endpoints], [first.url, second.url])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+"""
+Tests of ui/revocation_filter.py.
+
+CountingBloomFilterTest covers the filter and its file; RevocationFilterTest
+feeds a ConsentIndexer with the stand-in chain of test_authorization_index
+and compiles the contracts first (skipped without `truffle compile`).
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from consent_indexer import ConsentIndexer  # noqa: E402
+from revocation_filter import CountingBloomFilter, RevocationFilter  # noqa: E402
+from test_authorization_index import NOW, StandInChain, _has_events, address  # noqa: E402
+
+
+class CountingBloomFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'revocations.bloom')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_add_and_remove_with_repeats(self):
+        bloom = CountingBloomFilter.for_capacity(1000, 0.01)
+        bloom.add(b'a')
+        bloom.add(b'a')
+        bloom.add(b'b')
+        self.assertIn(b'a', bloom)
+        self.assertEqual(bloom.items, 3)
+        bloom.remove(b'a')
+        self.assertIn(b'a', bloom)
+        bloom.remove(b'a')
+        self.assertNotIn(b'a', bloom)
+        self.assertIn(b'b', bloom)
+        bloom.remove(b'b')
+        self.assertEqual(bloom.fill_ratio(), 0)
+
+    def test_false_positive_rate_at_capacity(self):
+        bloom = CountingBloomFilter.for_capacity(2000, 0.01)
+        for i in range(2000):
+            bloom.add(b'in%d' % i)
+        rate = sum(b'out%d' % i in bloom for i in range(20000)) / 20000
+        self.assertLess(rate, 0.02)
+        self.assertAlmostEqual(bloom.false_positive_rate(), 0.01, delta=0.005)
+
+    def test_reopened_file_keeps_the_counters(self):
+        bloom = CountingBloomFilter(1000, 4, self.path)
+        self.assertFalse(bloom.loaded)
+        bloom.add(b'a')
+        bloom.block = 12
+        bloom.close()
+
+        bloom = CountingBloomFilter(1000, 4, self.path)
+        self.assertTrue(bloom.loaded)
+        self.assertEqual((bloom.items, bloom.block), (1, 12))
+        self.assertIn(b'a', bloom)
+        bloom.close()
+
+        # Other sizes start empty
+        bloom = CountingBloomFilter(1000, 5, self.path)
+        self.assertFalse(bloom.loaded)
+        self.assertNotIn(b'a', bloom)
+        self.assertEqual((bloom.items, bloom.block), (0, -1))
+        bloom.close()
+
+
+@unittest.skipUnless(_has_events(), "contracts not compiled: `truffle compile` failed or is not installed")
+class RevocationFilterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'revocations.bloom')
+        self.db_path = os.path.join(self.directory.name, 'consents.db')
+        self.chain = StandInChain()
+        self.indexer = ConsentIndexer(self.chain, self.db_path)
+        self.filter = RevocationFilter(self.indexer, self.path, capacity=1000)
+        self.subject, self.controller = address(1), address(2)
+        self.processors = [address(3), address(4)]
+        self.processing = {}
+
+    def tearDown(self):
+        self.filter.close()
+        self.indexer.db.close()
+        self.directory.cleanup()
+
+    def create(self, consent):
+        self.indexer.track_consent(consent, self.chain.block_number + 1)
+        self.chain.emit('CollectionConsent', consent, 'ConsentCreated', dataSubject=self.subject,
+                        controller=self.controller, recipients=self.processors, data=0b1111,
+                        beginningDate=NOW - 100, expirationDate=NOW + 1000, defaultPurposes=[0])
+        self.chain.emit('CollectionConsent', consent, 'ConsentGranted', actor=self.controller)
+        for processor in self.processors:
+            self.processing[consent, processor] = address(0x1000 + len(self.processing))
+            self.chain.emit('CollectionConsent', consent, 'ProcessingConsentCreated', processor=processor,
+                            processingConsent=self.processing[consent, processor])
+            for purpose in (0, 1):
+                self.chain.emit('ProcessingConsent', self.processing[consent, processor], 'ProcessingPurposeCreated',
+                                purpose=purpose, data=0b1, beginningDate=NOW - 100, expirationDate=NOW + 500,
+                                defaultTrue=True)
+
+    def revoked(self, consent, processor=None, purpose=None):
+        self.indexer.sync()
+        answer = self.filter.is_revoked(consent, processor, purpose)
+        self.assertEqual(answer, self.indexer.is_revoked(consent, processor, purpose))
+        return answer
+
+    def test_follows_revocations_and_grants(self):
+        consent = address(0x100)
+        self.create(consent)
+        first, second = self.processors
+        self.assertFalse(self.revoked(consent))
+        self.assertFalse(self.revoked(consent, first, 0))
+
+        # Revoked by both, granted again by one: still revoked
+        self.chain.emit('CollectionConsent', consent, 'ConsentRevoked', actor=self.subject)
+        self.chain.emit('CollectionConsent', consent, 'ConsentRevoked', actor=self.controller)
+        self.assertTrue(self.revoked(consent))
+        self.assertTrue(self.revoked(consent, first, 1))
+        self.chain.emit('CollectionConsent', consent, 'ConsentGranted', actor=self.subject)
+        self.assertTrue(self.revoked(consent))
+        self.chain.emit('CollectionConsent', consent, 'ConsentGranted', actor=self.controller)
+        self.assertFalse(self.revoked(consent))
+
+        # Purpose revoked for every processor, granted again by the DS for one
+        self.chain.emit('CollectionConsent', consent, 'ConsentPurposeRevoked', purpose=0)
+        self.assertTrue(self.revoked(consent, first, 0))
+        self.assertTrue(self.revoked(consent, second, 0))
+        self.assertFalse(self.revoked(consent, first, 1))
+        self.chain.emit('ProcessingConsent', self.processing[consent, first], 'ProcessingGranted',
+                        purpose=0, actor=self.subject)
+        self.assertFalse(self.revoked(consent, first, 0))
+        self.assertTrue(self.revoked(consent, second, 0))
+
+        # All purposes revoked by the processor, one granted again
+        self.chain.emit('ProcessingConsent', self.processing[consent, first], 'AllProcessingRevoked', actor=first)
+        self.assertTrue(self.revoked(consent, first, 0))
+        self.assertTrue(self.revoked(consent, first, 1))
+        self.chain.emit('ProcessingConsent', self.processing[consent, first], 'ProcessingGranted',
+                        purpose=1, actor=first)
+        self.assertFalse(self.revoked(consent, first, 1))
+
+        # Blacklisting and erasure are final
+        self.chain.emit('CollectionConsent', consent, 'ConsentProcessorRevoked', processor=second)
+        self.assertTrue(self.revoked(consent, second))
+        self.assertTrue(self.revoked(consent, second, 1))
+        self.assertFalse(self.revoked(consent))
+        self.chain.emit('CollectionConsent', consent, 'DataErased', dataSubject=self.subject)
+        self.assertTrue(self.revoked(consent))
+        self.assertTrue(self.revoked(consent, first, 1))
+
+    def test_negative_checks_skip_the_lookup(self):
+        consents = [address(0x100 + i) for i in range(20)]
+        for consent in consents:
+            self.create(consent)
+        self.chain.emit('CollectionConsent', consents[0], 'ConsentRevoked', actor=self.subject)
+        self.indexer.sync()
+
+        for consent in consents:
+            for processor in self.processors:
+                self.revoked(consent, processor, 0)
+        stats = self.filter.stats()
+        self.assertEqual(stats['checks'], 40)
+        self.assertEqual(stats['scopes'], 1)
+        self.assertGreaterEqual(stats['skipped_lookups'], 38 - stats['false_positives'])
+        self.assertEqual(stats['lookups'], 2 + stats['false_positives'])
+        self.assertEqual(stats['memory_bytes'], self.filter.filter.size + 64)
+        self.assertLess(self.filter.sample_false_positive_rate(), 0.01)
+
+    def test_incremental_updates_match_a_rebuild(self):
+        rng = random.Random(3)
+        consents = [address(0x100 + i) for i in range(5)]
+        for consent in consents:
+            self.create(consent)
+        for step in range(200):
+            consent, processor = rng.choice(consents), rng.choice(self.processors)
+            actor = rng.choice([self.subject, self.controller, processor])
+            event = rng.choice(['revoke', 'grant', 'revoke_purpose', 'grant_purpose', 'revoke_all'])
+            if event in ('revoke', 'grant') and actor != processor:
+                name = 'ConsentRevoked' if event == 'revoke' else 'ConsentGranted'
+                self.chain.emit('CollectionConsent', consent, name, actor=actor)
+            elif event == 'revoke_all':
+                self.chain.emit('ProcessingConsent', self.processing[consent, processor], 'AllProcessingRevoked',
+                                actor=actor)
+            else:
+                name = 'ProcessingRevoked' if event == 'revoke_purpose' else 'ProcessingGranted'
+                self.chain.emit('ProcessingConsent', self.processing[consent, processor], name,
+                                purpose=rng.randrange(2), actor=actor)
+            if step % 10 == 0:
+                self.indexer.sync()
+        self.indexer.sync()
+
+        rebuilt = RevocationFilter(self.indexer, capacity=1000)
+        self.assertEqual(bytes(rebuilt.filter.counters), bytes(self.filter.filter.counters))
+        self.assertEqual(len(rebuilt), len(self.filter))
+        for consent in consents:
+            for processor in self.processors:
+                for purpose in (0, 1):
+                    self.revoked(consent, processor, purpose)
+        rebuilt.close()
+
+    def test_reopened_at_the_indexed_block(self):
+        consent = address(0x100)
+        self.create(consent)
+        self.chain.emit('CollectionConsent', consent, 'ConsentRevoked', actor=self.subject)
+        self.indexer.sync()
+        self.filter.close()
+        self.indexer.db.close()
+
+        self.indexer = ConsentIndexer(self.chain, self.db_path)
+        self.filter = RevocationFilter(self.indexer, self.path, capacity=1000)
+        self.assertTrue(self.filter.reused)
+        self.assertTrue(self.filter.is_revoked(consent))
+        self.chain.emit('CollectionConsent', consent, 'ConsentGranted', actor=self.subject)
+        self.assertFalse(self.revoked(consent))
+        self.filter.close()
+
+        # The database is behind the file: rebuilt
+        self.filter = RevocationFilter(ConsentIndexer(StandInChain(), ':memory:'), self.path, capacity=1000)
+        self.assertFalse(self.filter.reused)
+        self.assertEqual(len(self.filter), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
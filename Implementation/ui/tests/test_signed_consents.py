@@ -0,0 +1,176 @@
+"""
+Tests of ui/signed_consents.py with a stand-in ConsentRegistry client.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from signed_consents import ConsentActionSigner, ConsentRelayer, consent_action_typed_data  # noqa: E402
+
+RELAYER = '0x' + '99' * 20
+REGISTRY = '0x' + '22' * 20
+
+
+class StandInRegistry:
+    """Same interface as ConsentRegistryClient for the relayer; fails or reverts the next `failures` batches."""
+
+    def __init__(self):
+        self.failures = []      # exceptions to raise, or 'revert'
+        self.batches = []
+        self.rejected = set()   # nonces submitSignedActions skips
+        self.lock = threading.Lock()
+
+    def submit_signed_actions(self, relayer, actions):
+        with self.lock:
+            if self.failures:
+                failure = self.failures.pop(0)
+                if failure != 'revert':
+                    raise failure
+                return {'status': 0, 'transactionHash': b'\x01' * 32, 'gasUsed': 30000}
+            self.batches.append(actions)
+            return {'status': 1, 'transactionHash': b'\x02' * 32, 'gasUsed': 21000 + 10000 * len(actions),
+                    'actions': actions}
+
+    def rejected_actions(self, receipt):
+        return [i for i, action in enumerate(receipt['actions']) if action[3] in self.rejected]
+
+
+def action(nonce):
+    return {'dataSubject': '0x' + '01' * 20, 'controller': '0x' + '02' * 20, 'grant': True, 'nonce': nonce,
+            'deadline': 2 ** 40, 'v': 27, 'r': b'\x00' * 32, 's': b'\x00' * 32}
+
+
+def nonces(batch):
+    return [a[3] for a in batch]
+
+
+class ConsentRelayerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = StandInRegistry()
+
+    def test_flushes_full_batches(self):
+        relayer = ConsentRelayer(self.registry, RELAYER, max_batch=3)
+        for nonce in range(7):
+            relayer.submit(action(nonce))
+        self.assertEqual([nonces(b) for b in self.registry.batches], [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(len(relayer), 1)
+
+        self.registry.rejected = {6}
+        result = relayer.flush()
+        self.assertEqual((result['submitted'], result['applied']), (1, 0))
+        self.assertEqual(result['rejected'], [action(6)])
+        self.assertIsNone(relayer.flush())
+
+    def test_failed_batches_are_queued_again(self):
+        relayer = ConsentRelayer(self.registry, RELAYER, max_batch=100)
+        relayer.submit(action(0))
+        relayer.submit(action(1))
+
+        self.registry.failures = [ConnectionError('node down'), 'revert']
+        with self.assertRaises(ConnectionError):
+            relayer.flush()
+        self.assertEqual(len(relayer), 2)
+        with self.assertRaisesRegex(RuntimeError, 'reverted'):
+            relayer.flush()
+        self.assertEqual(len(relayer), 2)
+
+        relayer.submit(action(2))
+        relayer.flush()
+        self.assertEqual([nonces(b) for b in self.registry.batches], [[0, 1, 2]])
+        self.assertEqual(len(relayer.results), 1)
+
+    def test_a_failed_full_batch_keeps_the_submitted_action(self):
+        relayer = ConsentRelayer(self.registry, RELAYER, max_batch=2)
+        self.registry.failures = [ConnectionError('node down')]
+        relayer.submit(action(0))
+        relayer.submit(action(1))
+        self.assertEqual(len(relayer), 2)
+        self.assertIn('node down', relayer.last_error)
+
+        relayer.submit(action(2))
+        self.assertEqual([nonces(b) for b in self.registry.batches], [[0, 1]])
+        self.assertEqual(relayer.stop()[0]['submitted'], 1)
+        self.assertEqual([nonces(b) for b in self.registry.batches], [[0, 1], [2]])
+
+    def test_a_batch_failing_max_attempts_times_is_dead_lettered(self):
+        relayer = ConsentRelayer(self.registry, RELAYER, max_batch=2, max_attempts=3)
+        self.registry.failures = ['revert'] * 3
+        for nonce in range(3):
+            relayer.submit(action(nonce))   # the 2nd and 3rd submits flush [0, 1]: two failures
+        with self.assertRaisesRegex(RuntimeError, 'reverted'):
+            relayer.flush()
+        self.assertEqual(len(relayer), 1)
+        self.assertEqual([[a['nonce'] for a in d['actions']] for d in relayer.dead_letters], [[0, 1]])
+        self.assertIn('reverted', relayer.dead_letters[0]['error'])
+
+        relayer.flush()
+        self.assertEqual([nonces(b) for b in self.registry.batches], [[2]])
+
+    def test_background_flush_survives_errors(self):
+        relayer = ConsentRelayer(self.registry, RELAYER, max_batch=100, max_age=0.05)
+        self.registry.failures = [ConnectionError('node down')]
+        relayer.submit(action(0))
+        relayer.start(interval=0.02)
+
+        deadline = time.monotonic() + 5
+        while not self.registry.batches and time.monotonic() < deadline:
+            time.sleep(0.02)
+        relayer.stop()
+        self.assertEqual([nonces(b) for b in self.registry.batches], [[0]])
+        self.assertIsNone(relayer.last_error)
+        self.assertEqual(len(relayer), 0)
+
+
+class ConsentActionSignerTest(unittest.TestCase):
+
+    def test_local_signature_recovers_the_signer(self):
+        account = Account.create()
+        registry = SimpleNamespace(
+            w3=None, address=REGISTRY,
+            contract=SimpleNamespace(functions=SimpleNamespace(
+                getChainId=lambda: SimpleNamespace(call=lambda: 1337))),
+        )
+        signer = ConsentActionSigner(registry, account.address, account.key)
+        signed = signer.sign(account.address, '0x' + '02' * 20, grant=False, nonce=5)
+
+        typed_data = consent_action_typed_data(1337, REGISTRY, account.address, '0x' + '02' * 20, False, 5,
+                                               signed['deadline'])
+        recovered = Account.recover_message(
+            encode_typed_data(full_message=typed_data), vrs=(signed['v'], signed['r'], signed['s'])
+        )
+        self.assertEqual(recovered, account.address)
+
+    def test_nonces_follow_the_registry_and_the_unrelayed_signatures(self):
+        account = Account.create()
+        controller, other = '0x' + '02' * 20, '0x' + '03' * 20
+        registry_nonces = {}
+        registry = SimpleNamespace(
+            w3=None, address=REGISTRY,
+            contract=SimpleNamespace(functions=SimpleNamespace(
+                getChainId=lambda: SimpleNamespace(call=lambda: 1337),
+                getNonce=lambda ds, dc, signer: SimpleNamespace(call=lambda: registry_nonces.get(dc, 0)))),
+        )
+        signer = ConsentActionSigner(registry, account.address, account.key)
+        signed = [signer.sign(account.address, controller, grant=g) for g in (True, False, True)]
+        self.assertEqual([a['nonce'] for a in signed], [0, 1, 2])
+        self.assertEqual(signer.sign(account.address, other)['nonce'], 0)
+
+        # A direct revoke advanced the registry's nonce past the unrelayed signatures
+        registry_nonces[controller] = 7
+        self.assertEqual(signer.sign(account.address, controller)['nonce'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Tests of ui/tx_pipeline.py with a NonceManager, against a stand-in JSON-RPC
+node that mines an account's transactions in nonce order.
+
+Run from Implementation/ui:
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from web3 import HTTPProvider, Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nonce_manager import NonceManager, send_and_wait  # noqa: E402
+from tx_pipeline import ERROR, SUCCESS, TransactionPipeline  # noqa: E402
+
+SENDER = Web3.to_checksum_address('0x' + '11' * 20)
+CONTRACT = Web3.to_checksum_address('0x' + '22' * 20)
+ABI = [{'type': 'function', 'name': name, 'inputs': [], 'outputs': [], 'stateMutability': 'nonpayable'}
+       for name in ('ok', 'fail')]
+FAIL_SELECTOR = Web3.keccak(text='fail()')[:4].to_0x_hex()
+
+
+class StandInChain:
+    """
+    JSON-RPC node on 127.0.0.1 with a transaction pool: a transaction is mined as soon as every lower
+    nonce of its sender is, if its fee is at least `min_fee`. Estimating `fail()` reverts after `fail_delay`.
+    """
+
+    def __init__(self, min_fee=0, fail_delay=0.0):
+        self.min_fee = min_fee
+        self.fail_delay = fail_delay
+        self.mined = {}         # account -> mined transaction count
+        self.pool = {}          # (account, nonce) -> (hash, tx)
+        self.receipts = {}      # hash -> receipt
+        self.sent = []
+        self._lock = threading.Lock()
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                data = json.dumps(node.answer(body)).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def answer(self, request):
+        method, params = request['method'], request['params']
+        if method == 'eth_estimateGas' and params[0].get('data', '').startswith(FAIL_SELECTOR):
+            time.sleep(self.fail_delay)
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': 3, 'message': 'execution reverted'}}
+        with self._lock:
+            try:
+                result = self.result(method, params)
+            except ValueError as e:
+                return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32000, 'message': str(e)}}
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+    def result(self, method, params):
+        if method == 'eth_sendTransaction':
+            tx = params[0]
+            account, nonce = tx['from'].lower(), int(tx['nonce'], 16)
+            if nonce < self.mined.get(account, 0):
+                raise ValueError('nonce too low')
+            tx_hash = Web3.keccak(text=json.dumps(tx, sort_keys=True)).to_0x_hex()
+            self.pool[account, nonce] = (tx_hash, tx)
+            self.sent.append(tx)
+            self.mine(account)
+            return tx_hash
+        if method == 'eth_getTransactionReceipt':
+            return self.receipts.get(params[0])
+        if method == 'eth_getTransactionByHash':
+            known = [tx for tx_hash, tx in self.pool.values() if tx_hash == params[0]]
+            return dict(known[0], hash=params[0]) if known else None
+        if method == 'eth_getTransactionCount':
+            account = params[0].lower()
+            count = self.mined.get(account, 0)
+            while params[1] == 'pending' and (account, count) in self.pool:
+                count += 1
+            return hex(count)
+        results = {'eth_chainId': '0x539', 'eth_estimateGas': '0x5208', 'eth_gasPrice': '0x1',
+                   'eth_maxPriorityFeePerGas': '0x1', 'eth_blockNumber': '0x1',
+                   'eth_getBlockByNumber': {'number': '0x1', 'baseFeePerGas': '0x1', 'gasLimit': '0x1c9c380'}}
+        return results[method]
+
+    def mine(self, account):
+        while (account, self.mined.get(account, 0)) in self.pool:
+            tx_hash, tx = self.pool[account, self.mined.get(account, 0)]
+            if int(tx.get('maxFeePerGas', tx.get('gasPrice', '0x0')), 16) < self.min_fee:
+                return
+            del self.pool[account, self.mined.get(account, 0)]
+            self.mined[account] = self.mined.get(account, 0) + 1
+            self.receipts[tx_hash] = {
+                'transactionHash': tx_hash, 'transactionIndex': '0x0', 'blockHash': '0x' + '00' * 32,
+                'blockNumber': hex(self.mined[account]), 'from': tx['from'], 'to': tx.get('to'),
+                'cumulativeGasUsed': '0x5208', 'gasUsed': '0x5208', 'contractAddress': None,
+                'logs': [], 'logsBloom': '0x' + '00' * 256, 'status': '0x1',
+            }
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TransactionPipelineTest(unittest.TestCase):
+
+    def pipeline(self, chain, **kwargs):
+        self.addCleanup(chain.close)
+        self.nonces = NonceManager(Web3(HTTPProvider(chain.url)))
+        pipeline = TransactionPipeline(chain.url, poll_interval=0.05, nonce_manager=self.nonces, **kwargs)
+        self.addCleanup(pipeline.close)
+        return pipeline
+
+    def test_jobs_are_mined_in_nonce_order(self):
+        pipeline = self.pipeline(StandInChain())
+        jobs = [pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER) for _ in range(5)]
+        for job_id in jobs:
+            self.assertEqual(pipeline.wait(job_id, timeout=10)['status'], SUCCESS)
+        self.assertEqual(sorted(pipeline.job(job_id)['nonce'] for job_id in jobs), list(range(5)))
+        self.assertEqual(self.nonces.in_flight(SENDER), 0)
+
+    def test_a_nonce_used_by_another_client_is_retried_once(self):
+        chain = StandInChain()
+        pipeline = self.pipeline(chain)
+        self.assertEqual(pipeline.wait(pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER), timeout=10)['nonce'], 0)
+        chain.mined[SENDER.lower()] += 1    # nonce 1 sent by another client
+
+        job = pipeline.wait(pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER), timeout=10)
+        self.assertEqual((job['status'], job['nonce']), (SUCCESS, 2))
+        self.assertEqual(self.nonces.in_flight(SENDER), 0)
+
+    def test_direct_transactions_take_their_nonces_from_the_manager(self):
+        chain = StandInChain()
+        pipeline = self.pipeline(chain)
+        w3 = Web3(HTTPProvider(chain.url))
+        send_and_wait(w3, self.nonces, w3.eth.contract(address=CONTRACT, abi=ABI).functions.ok(), SENDER)
+
+        job = pipeline.wait(pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER), timeout=10)
+        self.assertEqual([int(tx['nonce'], 16) for tx in chain.sent], [0, 1])
+        self.assertEqual((job['status'], job['nonce']), (SUCCESS, 1))
+        self.assertEqual(self.nonces.in_flight(SENDER), 0)
+
+    def test_a_released_nonce_is_filled_when_later_ones_are_stuck(self):
+        chain = StandInChain(fail_delay=0.3)
+        pipeline = self.pipeline(chain, stuck_after=0.2)
+        failing = pipeline.transact(ABI, CONTRACT, 'fail', [], SENDER)
+        time.sleep(0.1)     # allocated nonce 0, still estimating
+        stuck = pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER)
+
+        self.assertEqual(pipeline.wait(failing, timeout=10)['status'], ERROR)
+        job = pipeline.wait(stuck, timeout=10)
+        self.assertEqual((job['status'], job['nonce']), (SUCCESS, 1))
+        fillers = [job for job in pipeline.jobs() if job['label'] == 'nonce gap filler']
+        self.assertEqual([(job['nonce'], job['status']) for job in fillers], [(0, SUCCESS)])
+        self.assertEqual(self.nonces.in_flight(SENDER), 0)
+
+    def test_stuck_transactions_are_resubmitted_with_a_higher_fee(self):
+        chain = StandInChain(min_fee=4)
+        pipeline = self.pipeline(chain, stuck_after=0.2)
+        job_id = pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER)
+
+        job = pipeline.wait(job_id, timeout=10)
+        self.assertEqual(job['status'], SUCCESS)
+        self.assertGreaterEqual(job['resubmissions'], 1)
+        fees = [int(tx['maxFeePerGas'], 16) for tx in chain.sent]
+        self.assertEqual(fees, sorted(fees))
+        self.assertLess(fees[0], 4)
+        self.assertEqual(job['tx_hash'], job['receipt']['transactionHash'].to_0x_hex())
+
+    def test_resubmissions_are_limited(self):
+        chain = StandInChain(min_fee=10 ** 6)
+        pipeline = self.pipeline(chain, stuck_after=0.05, max_resubmissions=2)
+        job_id = pipeline.transact(ABI, CONTRACT, 'ok', [], SENDER)
+
+        with self.assertRaises(TimeoutError):
+            pipeline.wait(job_id, timeout=1)
+        self.assertEqual(pipeline.job(job_id)['resubmissions'], 2)
+        self.assertEqual(len(chain.sent), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
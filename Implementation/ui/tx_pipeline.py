@@ -0,0 +1,327 @@
+"""
+Non-blocking transaction submission for the Streamlit UI.
+
+`transact()` + `wait_for_transaction_receipt()` blocks the Streamlit script
+until the transaction is mined, so one user waits for every click and the
+page freezes. TransactionPipeline runs an asyncio event loop (AsyncWeb3) in
+a background thread: `transact`/`deploy` queue the submission and return a
+job id at once, a single receipt poller follows every pending hash, and the
+UI reads job statuses on its next rerun. Many deployments and grants can be
+in flight at the same time, from one or several sessions.
+
+Job status goes queued -> pending (hash known) -> success | failed
+(reverted) | error (could not be submitted).
+
+With a NonceManager (nonce_manager.py) the pipeline assigns nonces
+locally, so concurrent jobs of one account never wait on or collide over
+eth_getTransactionCount, and at most `max_in_flight` of them are pending.
+A job still pending `stuck_after` seconds after it was sent makes the
+poller repair its sender's nonces (recover_gaps: a nonce released by a
+failed submission would otherwise hold back every later one) and replace
+the transaction with a higher gas price (resubmit), up to
+`max_resubmissions` times. Every hash a job was sent with is watched until
+one of them is mined.
+
+`close()` lets the poller and the submissions in progress finish instead of
+cancelling them mid-request, then closes the HTTP sessions and the loop.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from web3 import AsyncHTTPProvider, AsyncWeb3, Web3
+from web3.exceptions import TransactionNotFound
+
+from nonce_manager import is_nonce_too_low
+
+DEFAULT_PROVIDER_URL = 'http://127.0.0.1:8545'
+DEFAULT_STUCK_AFTER = 60.0
+DEFAULT_MAX_RESUBMISSIONS = 3
+
+QUEUED = 'queued'
+PENDING = 'pending'
+SUCCESS = 'success'
+FAILED = 'failed'
+ERROR = 'error'
+FINISHED = (SUCCESS, FAILED, ERROR)
+
+
+class TransactionPipeline:
+    """Submits transactions asynchronously and tracks their receipts in the background."""
+
+    def __init__(self, provider_url=DEFAULT_PROVIDER_URL, poll_interval=0.5, max_finished=200, nonce_manager=None,
+                 stuck_after=DEFAULT_STUCK_AFTER, max_resubmissions=DEFAULT_MAX_RESUBMISSIONS):
+        self.nonce_manager = nonce_manager
+        self.poll_interval = poll_interval
+        self.max_finished = max_finished
+        self.stuck_after = stuck_after
+        self.max_resubmissions = max_resubmissions
+        self.last_error = None
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._pending = {}
+        self._callbacks = {}
+        self._submissions = set()
+        self._closing = False
+        self._lock = threading.Lock()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='tx-pipeline', daemon=True)
+        self._thread.start()
+        self.w3 = AsyncWeb3(AsyncHTTPProvider(provider_url))
+        self._poller = asyncio.run_coroutine_threadsafe(self._poll_receipts(), self._loop)
+
+    # Submission
+
+    def transact(self, abi, address, function_name, args, sender, label=None, owner=None, meta=None, on_done=None):
+        """Queues `function_name(*args)` on the contract at `address`, sent from `sender`. Returns the job id."""
+        async def build(params):
+            contract = self.w3.eth.contract(address=address, abi=abi)
+            return await contract.functions[function_name](*args).build_transaction(params)
+        return self._enqueue(build, label or function_name, sender, owner, meta, on_done)
+
+    def deploy(self, abi, bytecode, args, sender, label=None, owner=None, meta=None, on_done=None):
+        """Queues a contract deployment. The job's `contract_address` is set once it is mined."""
+        async def build(params):
+            contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
+            return await contract.constructor(*args).build_transaction(params)
+        return self._enqueue(build, label or 'deploy', sender, owner, meta, on_done)
+
+    def _enqueue(self, build, label, sender, owner, meta, on_done):
+        job_id = next(self._ids)
+        with self._lock:
+            self._jobs[job_id] = self._new_job(job_id, label, sender, owner, meta)
+            if on_done is not None:
+                self._callbacks[job_id] = on_done
+        submission = asyncio.run_coroutine_threadsafe(self._submit(job_id, build), self._loop)
+        with self._lock:
+            self._submissions.add(submission)
+        submission.add_done_callback(self._submission_done)
+        return job_id
+
+    def _submission_done(self, submission):
+        with self._lock:
+            self._submissions.discard(submission)
+
+    @staticmethod
+    def _new_job(job_id, label, sender, owner, meta):
+        return {
+            'id': job_id,
+            'label': label,
+            'sender': sender,
+            'owner': owner,
+            'meta': meta or {},
+            'status': QUEUED,
+            'nonce': None,
+            'tx_hash': None,
+            'resubmissions': 0,
+            'receipt': None,
+            'contract_address': None,
+            'gas_used': None,
+            'block_number': None,
+            'error': None,
+            'submitted_at': time.time(),
+            'sent_at': None,
+            'finished_at': None,
+        }
+
+    async def _submit(self, job_id, build):
+        with self._lock:
+            sender = self._jobs[job_id]['sender']
+        # Like NonceManager.send_transaction: retried once after a resync if the nonce was used
+        for attempt in range(2):
+            params = {'from': sender}
+            nonce = None
+            try:
+                if self.nonce_manager is not None:
+                    nonce = await self.nonce_manager.allocate_async(sender)
+                    params['nonce'] = nonce
+                tx = await build(params)
+                tx_hash = Web3.to_hex(await self.w3.eth.send_transaction(tx))
+                break
+            except Exception as e:
+                if nonce is not None:
+                    if is_nonce_too_low(e):
+                        # Another client used this nonce: it is not ours to reuse
+                        self.nonce_manager.confirm(sender, nonce)
+                        await self._loop.run_in_executor(None, self.nonce_manager.resync, sender)
+                        if attempt == 0:
+                            continue
+                    else:
+                        self.nonce_manager.release(sender, nonce)
+                self._finish(job_id, ERROR, error=str(e))
+                return
+        if nonce is not None:
+            self.nonce_manager.record(sender, nonce, tx_hash, tx)
+        self._sent(job_id, tx_hash, status=PENDING, nonce=nonce)
+
+    def _sent(self, job_id, tx_hash, **fields):
+        """Watches `tx_hash` for the job, along with the hashes it was sent with before."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINISHED:
+                return
+            job.update(tx_hash=tx_hash, sent_at=time.time(), **fields)
+            self._pending[tx_hash] = job_id
+
+    # Receipts
+
+    async def _receipt(self, tx_hash):
+        try:
+            return await self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    async def _poll_receipts(self):
+        while not self._closing:
+            with self._lock:
+                pending = list(self._pending.items())
+            if pending:
+                receipts = await asyncio.gather(
+                    *(self._receipt(tx_hash) for tx_hash, _ in pending), return_exceptions=True
+                )
+                for (tx_hash, job_id), receipt in zip(pending, receipts):
+                    if receipt is None or isinstance(receipt, Exception):
+                        continue
+                    with self._lock:
+                        if self._pending.pop(tx_hash, None) is None:
+                            continue
+                        # The other hashes of the job were replaced by this one
+                        for other in [h for h, j in self._pending.items() if j == job_id]:
+                            del self._pending[other]
+                    self._finish(
+                        job_id,
+                        SUCCESS if receipt['status'] == 1 else FAILED,
+                        receipt=receipt,
+                        contract_address=receipt.get('contractAddress'),
+                        gas_used=receipt['gasUsed'],
+                        block_number=receipt['blockNumber'],
+                        tx_hash=Web3.to_hex(receipt['transactionHash']),
+                    )
+            stuck = self._stuck()
+            if stuck:
+                try:
+                    await self._loop.run_in_executor(None, self._unstick, stuck)
+                    self.last_error = None
+                except Exception as e:
+                    # Tried again at the next poll: the jobs are still stuck
+                    self.last_error = f'{type(e).__name__}: {e}'
+            await asyncio.sleep(self.poll_interval)
+
+    # Stuck transactions
+
+    def _stuck(self):
+        """
+        Copies of the pending jobs with a managed nonce sent more than `stuck_after` seconds ago
+        and resubmitted less than `max_resubmissions` times.
+        """
+        if self.nonce_manager is None:
+            return []
+        deadline = time.time() - self.stuck_after
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()
+                    if job['status'] == PENDING and job['nonce'] is not None and job['sent_at'] < deadline
+                    and job['resubmissions'] < self.max_resubmissions]
+
+    def _unstick(self, stuck):
+        """Repairs the nonces of the senders of `stuck` jobs, then bumps the gas price of those still pending."""
+        for sender in {job['sender'] for job in stuck}:
+            recovered = self.nonce_manager.recover_gaps(sender)
+            for nonce in recovered['filled']:
+                self._track_filler(sender, nonce)
+            for job in stuck:
+                if job['sender'] == sender and job['nonce'] in recovered['resent']:
+                    self._sent(job['id'], Web3.to_hex(self.nonce_manager.tx_hash(sender, job['nonce'])))
+                    job['resent'] = True
+
+        for job in stuck:
+            if job.get('resent'):
+                continue
+            if self.nonce_manager.tx_hash(job['sender'], job['nonce']) is None:
+                continue    # Mined: the receipt is read at the next poll
+            try:
+                tx_hash = Web3.to_hex(self.nonce_manager.resubmit(job['sender'], job['nonce']))
+            except Exception as e:
+                if is_nonce_too_low(e):
+                    continue    # Mined meanwhile
+                raise
+            self._sent(job['id'], tx_hash, resubmissions=job['resubmissions'] + 1)
+
+    def _track_filler(self, sender, nonce):
+        """Job of a 0-value transfer recover_gaps sent to fill a gap, so its nonce is confirmed once mined."""
+        job_id = next(self._ids)
+        with self._lock:
+            self._jobs[job_id] = self._new_job(job_id, 'nonce gap filler', sender, None, {})
+            self._jobs[job_id]['nonce'] = nonce
+        self._sent(job_id, Web3.to_hex(self.nonce_manager.tx_hash(sender, nonce)), status=PENDING)
+
+    def _finish(self, job_id, status, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(status=status, finished_at=time.time(), **fields)
+            if self.nonce_manager is not None and job['nonce'] is not None:
+                self.nonce_manager.confirm(job['sender'], job['nonce'])
+            callback = self._callbacks.pop(job_id, None)
+            snapshot = dict(job)
+            self._trim()
+        if callback is not None:
+            try:
+                callback(snapshot)
+            except Exception:
+                pass
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    # Status
+
+    def job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def jobs(self, owner=None):
+        """Copies of the known jobs (of `owner` only, if given), oldest first."""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values() if owner is None or job['owner'] == owner]
+
+    def in_flight(self, owner=None):
+        return [job for job in self.jobs(owner) if job['status'] not in FINISHED]
+
+    def wait(self, job_id, timeout=60.0):
+        """Blocks until the job is finished (scripts and tests). Returns the job."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.job(job_id)
+            if job is None or job['status'] in FINISHED:
+                return job
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Transaction job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(min(self.poll_interval, 0.1))
+
+    def close(self, timeout=5.0):
+        """
+        Stops the poller after its current round and waits for the submissions in progress,
+        then disconnects the provider and closes the loop. Only what is still running after
+        `timeout` seconds is cancelled.
+        """
+        self._closing = True
+        with self._lock:
+            running = [self._poller, *self._submissions]
+        _, not_done = concurrent.futures.wait(running, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        try:
+            asyncio.run_coroutine_threadsafe(self.w3.provider.disconnect(), self._loop).result(timeout=timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+        if not self._thread.is_alive():
+            self._loop.close()